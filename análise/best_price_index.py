@@ -0,0 +1,324 @@
+# Índice de melhor preço entre casas de apostas do MaraBet AI
+#
+# Para cada (fixture, market, selection) mantém o maior preço disponível e a
+# casa que o oferece, atualizado à medida que chegam odds. Sobre o índice, o
+# ArbitrageScanner deteta arbitragens/surebets e calcula probabilidades de
+# consenso sem margem numa única passagem vetorizada em numpy.
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+import re
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BookKey = Tuple[int, str]
+
+# Conjunto completo de seleções de cada mercado: sem todas elas a soma das
+# probabilidades implícitas não é um livro e parece uma arbitragem
+MARKET_SELECTIONS = {
+    'h2h': frozenset({'Home', 'Draw', 'Away'}),
+    'totals': frozenset({'Over', 'Under'}),
+    'btts': frozenset({'Yes', 'No'}),
+}
+
+DEFAULT_TOTALS_LINE = 2.5
+
+_TOTALS_SELECTION = re.compile(r'^(Over|Under)(?:\s+([0-9]+(?:\.[0-9]+)?))?$')
+
+
+def market_line(market: str, selection: str) -> Tuple[str, str]:
+    """(mercado avaliado, seleção sem linha): totals é separado por linha
+
+    'Over'/'Under' usam a linha padrão e ficam em 'totals'; 'Over 1.5' vai
+    para 'totals 1.5'. Outros mercados não mudam.
+    """
+    if market == 'totals':
+        match = _TOTALS_SELECTION.match(selection)
+        if match is not None:
+            line = float(match.group(2)) if match.group(2) else DEFAULT_TOTALS_LINE
+            return (market if line == DEFAULT_TOTALS_LINE else f"{market} {line:g}"), match.group(1)
+    return market, selection
+
+
+@dataclass
+class ArbitrageOpportunity:
+    """Arbitragem entre casas: soma das probabilidades implícitas < 1"""
+    fixture_id: int
+    market: str
+    overround: float
+    profit_margin: float
+    is_surebet: bool
+    legs: List[Dict[str, Any]] = field(default_factory=list)
+    detected_at: datetime = field(default_factory=datetime.now)
+
+
+class _MarketBook:
+    """Preços de um mercado de uma partida em todas as casas"""
+
+    __slots__ = ('prices', 'best')
+
+    def __init__(self):
+        self.prices: Dict[str, Dict[str, float]] = {}
+        self.best: Dict[str, Tuple[float, str]] = {}
+
+    def update(self, bookmaker: str, selection: str, odd: float):
+        quotes = self.prices.setdefault(selection, {})
+        quotes[bookmaker] = odd
+
+        best = self.best.get(selection)
+        if best is None or odd >= best[0]:
+            self.best[selection] = (odd, bookmaker)
+        elif best[1] == bookmaker:
+            # A melhor casa piorou o preço: recalcula só esta seleção
+            top = max(quotes, key=quotes.get)
+            self.best[selection] = (quotes[top], top)
+
+    def remove_bookmaker(self, bookmaker: str):
+        for selection in list(self.prices):
+            quotes = self.prices[selection]
+            if quotes.pop(bookmaker, None) is None:
+                continue
+            if not quotes:
+                del self.prices[selection]
+                del self.best[selection]
+            elif self.best[selection][1] == bookmaker:
+                top = max(quotes, key=quotes.get)
+                self.best[selection] = (quotes[top], top)
+
+    @property
+    def overround(self) -> float:
+        return sum(1 / odd for odd, _ in self.best.values())
+
+
+class BestPriceIndex:
+    """Índice ao vivo do melhor preço por (fixture, market, selection)"""
+
+    def __init__(self):
+        self._books: Dict[BookKey, _MarketBook] = {}
+
+    def __len__(self) -> int:
+        return len(self._books)
+
+    def update(self, fixture_id: int, bookmaker: str, market: str, selection: str, odd: float):
+        """Incorpora uma cotação; O(1) exceto quando a melhor casa piora o preço"""
+        if odd is None or odd <= 1.0:
+            return
+        key = (int(fixture_id), str(market))
+        book = self._books.get(key)
+        if book is None:
+            book = self._books[key] = _MarketBook()
+        book.update(str(bookmaker), str(selection), float(odd))
+
+    def update_many(self, observations: Iterable[Dict]) -> int:
+        """Incorpora observações planas (fixture_id, bookmaker, market, selection, odd)"""
+        count = 0
+        for obs in observations:
+            self.update(obs['fixture_id'], obs['bookmaker'], obs['market'], obs['selection'], obs['odd'])
+            count += 1
+        return count
+
+    def add_collector_odds(self, fixture_id: int, odds_list: List[Dict[str, Any]]) -> int:
+        """Incorpora odds no formato do OddsCollector ({'bookmaker', 'odds': {market: {outcome: odd}}})"""
+        count = 0
+        for odds_data in odds_list:
+            for market, market_odds in odds_data.get('odds', {}).items():
+                for outcome, odd in market_odds.items():
+                    self.update(fixture_id, odds_data['bookmaker'], market, outcome, odd)
+                    count += 1
+        return count
+
+    def remove_bookmaker(self, fixture_id: int, market: str, bookmaker: str):
+        """Retira uma casa (ex.: mercado suspenso) de um mercado"""
+        book = self._books.get((int(fixture_id), str(market)))
+        if book is not None:
+            book.remove_bookmaker(str(bookmaker))
+
+    def forget_fixture(self, fixture_id: int) -> int:
+        keys = [k for k in self._books if k[0] == int(fixture_id)]
+        for key in keys:
+            del self._books[key]
+        return len(keys)
+
+    def best_price(self, fixture_id: int, market: str, selection: str) -> Optional[Tuple[float, str]]:
+        """(melhor odd, casa) de uma seleção"""
+        book = self._books.get((int(fixture_id), str(market)))
+        if book is None:
+            return None
+        return book.best.get(str(selection))
+
+    def best_prices(self, fixture_id: int, market: str) -> Dict[str, Tuple[float, str]]:
+        book = self._books.get((int(fixture_id), str(market)))
+        return dict(book.best) if book else {}
+
+    def overround(self, fixture_id: int, market: str) -> Optional[float]:
+        """Soma das probabilidades implícitas dos melhores preços entre casas"""
+        book = self._books.get((int(fixture_id), str(market)))
+        if book is None or not book.best:
+            return None
+        return book.overround
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Achata todas as cotações em arrays paralelos para o scanner
+
+        Returns:
+            Dict com group (índice do mercado), selection (índice global da
+            seleção), bookmaker (índice da casa), odd e is_best, mais as listas
+            de chaves correspondentes aos índices
+        """
+        groups, selections, bookmakers, odds, is_best = [], [], [], [], []
+        group_keys: List[BookKey] = []
+        selection_keys: List[Tuple[int, str]] = []
+        bookmaker_ids: Dict[str, int] = {}
+
+        for group_id, (key, book) in enumerate(self._books.items()):
+            group_keys.append(key)
+            for selection, quotes in book.prices.items():
+                selection_id = len(selection_keys)
+                selection_keys.append((group_id, selection))
+                best_bookmaker = book.best[selection][1]
+                for bookmaker, odd in quotes.items():
+                    groups.append(group_id)
+                    selections.append(selection_id)
+                    bookmakers.append(bookmaker_ids.setdefault(bookmaker, len(bookmaker_ids)))
+                    odds.append(odd)
+                    is_best.append(bookmaker == best_bookmaker)
+
+        return {
+            'group': np.asarray(groups, dtype=np.int64),
+            'selection': np.asarray(selections, dtype=np.int64),
+            'bookmaker': np.asarray(bookmakers, dtype=np.int64),
+            'odd': np.asarray(odds, dtype=np.float64),
+            'is_best': np.asarray(is_best, dtype=bool),
+            'group_keys': group_keys,
+            'selection_keys': selection_keys,
+            'bookmaker_names': list(bookmaker_ids)
+        }
+
+
+class ArbitrageScanner:
+    """Varre o BestPriceIndex numa única passagem vetorizada
+
+    Mercados conhecidos (MARKET_SELECTIONS) só são avaliados com todas as
+    seleções cotadas — h2h com Home, Draw e Away, totals com Over e Under da
+    mesma linha; a arbitragem e o consenso de totals são calculados por linha.
+
+    Args:
+        min_selections: Seleções mínimas para avaliar mercados fora de
+            MARKET_SELECTIONS
+        surebet_margin: Lucro mínimo garantido para marcar como surebet
+    """
+
+    def __init__(self, min_selections: int = 2, surebet_margin: float = 0.01):
+        self.min_selections = min_selections
+        self.surebet_margin = surebet_margin
+
+    def scan(self, index: BestPriceIndex) -> Dict[str, Any]:
+        """Calcula overround, arbitragens e probabilidades de consenso
+
+        Returns:
+            Dict com 'arbitrages' (List[ArbitrageOpportunity]), 'overround'
+            ({(fixture, market): float}) e 'consensus'
+            ({(fixture, market): {selection: probabilidade sem margem}})
+        """
+        arrays = index.to_arrays()
+        if arrays['odd'].size == 0:
+            return {'arbitrages': [], 'overround': {}, 'consensus': {}}
+
+        # Reagrupa as seleções por mercado avaliado (totals linha a linha)
+        group_keys: List[BookKey] = []
+        group_ids: Dict[BookKey, int] = {}
+        required_per_group: List[int] = []
+        n_selections = len(arrays['selection_keys'])
+        selection_group = np.empty(n_selections, dtype=np.int64)
+        in_market_set = np.zeros(n_selections, dtype=bool)
+        for selection_id, (book_group, name) in enumerate(arrays['selection_keys']):
+            fixture_id, market = arrays['group_keys'][book_group]
+            label, outcome = market_line(market, name)
+            key = (fixture_id, label)
+            if key not in group_ids:
+                group_ids[key] = len(group_keys)
+                group_keys.append(key)
+                required_per_group.append(len(MARKET_SELECTIONS.get(market, ())))
+            selection_group[selection_id] = group_ids[key]
+            in_market_set[selection_id] = outcome in MARKET_SELECTIONS.get(market, ())
+
+        selection = arrays['selection']
+        group = selection_group[selection]
+        bookmaker = arrays['bookmaker']
+        implied = 1.0 / arrays['odd']
+        n_groups = len(group_keys)
+        n_bookmakers = len(arrays['bookmaker_names'])
+
+        selections_per_group = np.bincount(selection_group, minlength=n_groups)
+        required = np.asarray(required_per_group, dtype=np.int64)
+        required_quoted = np.bincount(selection_group, weights=in_market_set, minlength=n_groups)
+
+        # Overround entre casas: soma de 1/melhor odd de cada seleção
+        best_rows = np.flatnonzero(arrays['is_best'])
+        overround = np.bincount(group[best_rows], weights=implied[best_rows], minlength=n_groups)
+
+        # Consenso sem margem: normaliza o livro de cada casa e faz a média
+        # entre as casas que cotam todas as seleções do mercado
+        book_id = group * n_bookmakers + bookmaker
+        book_sum = np.bincount(book_id, weights=implied, minlength=n_groups * n_bookmakers)
+        book_count = np.bincount(book_id, minlength=n_groups * n_bookmakers)
+        complete = book_count[book_id] == selections_per_group[group]
+        fair = np.where(complete, implied / book_sum[book_id], 0.0)
+        fair_sum = np.bincount(selection, weights=fair, minlength=n_selections)
+        fair_count = np.bincount(selection, weights=complete.astype(np.float64), minlength=n_selections)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            consensus = fair_sum / fair_count
+
+        eligible = np.where(
+            required > 0,
+            (required_quoted == required) & (selections_per_group == required),
+            selections_per_group >= self.min_selections
+        )
+        arbitrage_groups = np.flatnonzero(eligible & (overround < 1.0))
+
+        overround_by_key = {}
+        consensus_by_key: Dict[BookKey, Dict[str, float]] = {}
+        for group_id in np.flatnonzero(eligible):
+            overround_by_key[group_keys[group_id]] = float(overround[group_id])
+        for selection_id, (_, name) in enumerate(arrays['selection_keys']):
+            group_id = selection_group[selection_id]
+            if eligible[group_id] and fair_count[selection_id] > 0:
+                consensus_by_key.setdefault(group_keys[group_id], {})[name] = float(consensus[selection_id])
+
+        arbitrages = []
+        for group_id in arbitrage_groups:
+            fixture_id, market = group_keys[group_id]
+            book_overround = float(overround[group_id])
+            margin = 1.0 / book_overround - 1.0
+            rows = best_rows[group[best_rows] == group_id]
+            arbitrages.append(ArbitrageOpportunity(
+                fixture_id=fixture_id,
+                market=market,
+                overround=book_overround,
+                profit_margin=margin,
+                is_surebet=margin >= self.surebet_margin,
+                legs=[{
+                    'selection': arrays['selection_keys'][selection[r]][1],
+                    'bookmaker': arrays['bookmaker_names'][bookmaker[r]],
+                    'odd': float(arrays['odd'][r]),
+                    'stake_fraction': float(implied[r] / book_overround)
+                } for r in rows]
+            ))
+
+        arbitrages.sort(key=lambda a: a.profit_margin, reverse=True)
+        if arbitrages:
+            logger.info(f"Arbitragem: {len(arbitrages)} oportunidades em {n_groups} mercados")
+
+        return {
+            'arbitrages': arbitrages,
+            'overround': overround_by_key,
+            'consensus': consensus_by_key
+        }
+
+
+# Índice partilhado do processo: alimentado pelo OddsDeltaStore da coleta e
+# consultado pelo ValueIdentifier
+best_price_index = BestPriceIndex()
@@ -0,0 +1,271 @@
+# Motor de line movement e closing line do MaraBet AI
+#
+# Mantém, por (fixture, market, selection), o estado incremental do preço em
+# todas as casas: abertura e fecho (consenso entre casas), máximos/mínimos,
+# inclinação do movimento (mínimos quadrados com somas acumuladas) e steam
+# moves. Cada atualização custa O(1) amortizado e a consulta para scoring ao
+# vivo é um lookup em dicionário.
+from collections import deque
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SelectionKey = Tuple[int, str, str]
+
+
+@dataclass
+class LineMovementFeatures:
+    """Features de movimento de linha de uma seleção"""
+    fixture_id: int
+    market: str
+    selection: str
+    opening_odd: float
+    closing_odd: float
+    max_odd: float
+    min_odd: float
+    movement_pct: float
+    slope_per_hour: float
+    steam_moves: int
+    last_steam_at: Optional[datetime]
+    consensus_odd: float
+    consensus_probability: float
+    n_bookmakers: int
+    n_updates: int
+    first_seen: datetime
+    last_seen: datetime
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class _SelectionState:
+    """Estado incremental de uma seleção (todas as casas de apostas)"""
+
+    __slots__ = (
+        'opening_prices', 'opening_sum', 'max_odd', 'min_odd', 'prices', 'price_sum',
+        'first_seen', 'last_seen', 'n_updates',
+        'sum_t', 'sum_p', 'sum_tt', 'sum_tp',
+        'recent_moves', 'steam_moves', 'last_steam_at'
+    )
+
+    def __init__(self, timestamp: datetime):
+        # Primeiro preço de cada casa: o consenso de abertura usa as mesmas casas do atual
+        self.opening_prices: Dict[str, float] = {}
+        self.opening_sum = 0.0
+        self.max_odd = float('-inf')
+        self.min_odd = float('inf')
+        self.prices: Dict[str, float] = {}
+        self.price_sum = 0.0
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.n_updates = 0
+        # Somas para regressão linear do consenso contra o tempo (horas)
+        self.sum_t = self.sum_p = self.sum_tt = self.sum_tp = 0.0
+        self.recent_moves: Deque[Tuple[datetime, str, int]] = deque()
+        self.steam_moves = 0
+        self.last_steam_at: Optional[datetime] = None
+
+    @property
+    def consensus(self) -> float:
+        return self.price_sum / len(self.prices)
+
+    @property
+    def opening(self) -> float:
+        return self.opening_sum / len(self.opening_prices)
+
+    @property
+    def slope(self) -> float:
+        n = self.n_updates
+        denominator = n * self.sum_tt - self.sum_t ** 2
+        if n < 2 or denominator <= 1e-12:
+            return 0.0
+        return (n * self.sum_tp - self.sum_t * self.sum_p) / denominator
+
+
+class LineMovementEngine:
+    """Calcula features de line movement de forma incremental
+
+    Args:
+        steam_threshold: Variação relativa mínima de preço para contar como movimento
+        steam_window_minutes: Janela em que as casas precisam mover-se juntas
+        steam_min_bookmakers: Número mínimo de casas movendo na mesma direção
+    """
+
+    def __init__(self,
+                 steam_threshold: float = 0.03,
+                 steam_window_minutes: float = 10,
+                 steam_min_bookmakers: int = 3):
+        self.steam_threshold = steam_threshold
+        self.steam_window_seconds = steam_window_minutes * 60
+        self.steam_min_bookmakers = steam_min_bookmakers
+        self._states: Dict[SelectionKey, _SelectionState] = {}
+        self._fixture_index: Dict[int, List[SelectionKey]] = {}
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def update(self, fixture_id: int, bookmaker: str, market: str, selection: str,
+               odd: float, timestamp: Optional[datetime] = None):
+        """Incorpora uma observação de odds (deve chegar em ordem temporal por seleção)"""
+        if odd is None or odd <= 1.0:
+            return
+
+        timestamp = timestamp or datetime.utcnow()
+        key = (int(fixture_id), str(market), str(selection))
+        odd = float(odd)
+
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _SelectionState(timestamp)
+            self._fixture_index.setdefault(key[0], []).append(key)
+
+        previous = state.prices.get(bookmaker)
+        if previous is not None and previous == odd:
+            return
+
+        if bookmaker not in state.opening_prices:
+            state.opening_prices[bookmaker] = odd
+            state.opening_sum += odd
+        state.max_odd = max(state.max_odd, odd)
+        state.min_odd = min(state.min_odd, odd)
+
+        state.price_sum += odd - (previous or 0.0)
+        state.prices[bookmaker] = odd
+        state.last_seen = timestamp
+        state.n_updates += 1
+
+        t = (timestamp - state.first_seen).total_seconds() / 3600
+        p = state.consensus
+        state.sum_t += t
+        state.sum_p += p
+        state.sum_tt += t * t
+        state.sum_tp += t * p
+
+        if previous is not None:
+            self._track_steam(state, bookmaker, previous, odd, timestamp)
+
+    def _track_steam(self, state: _SelectionState, bookmaker: str,
+                     previous: float, odd: float, timestamp: datetime):
+        change = odd / previous - 1
+        if abs(change) < self.steam_threshold:
+            return
+
+        direction = 1 if change > 0 else -1
+        moves = state.recent_moves
+        moves.append((timestamp, bookmaker, direction))
+        while moves and (timestamp - moves[0][0]).total_seconds() > self.steam_window_seconds:
+            moves.popleft()
+
+        movers = {b for _, b, d in moves if d == direction}
+        if len(movers) < self.steam_min_bookmakers:
+            return
+
+        # Um único steam por janela, mesmo que mais casas continuem a mover
+        if state.last_steam_at is None or \
+                (timestamp - state.last_steam_at).total_seconds() > self.steam_window_seconds:
+            state.steam_moves += 1
+            state.last_steam_at = timestamp
+
+    def update_many(self, observations: Iterable[Dict]) -> int:
+        """Incorpora várias observações (dicts no formato de odds_movements)"""
+        count = 0
+        for obs in observations:
+            self.update(obs['fixture_id'], obs['bookmaker'], obs['market'],
+                        obs['selection'], obs['odd'], obs.get('timestamp'))
+            count += 1
+        return count
+
+    def get_features(self, fixture_id: int, market: str, selection: str) -> Optional[LineMovementFeatures]:
+        """Lookup O(1) das features de uma seleção, para scoring ao vivo"""
+        state = self._states.get((int(fixture_id), str(market), str(selection)))
+        if state is None:
+            return None
+
+        consensus = state.consensus
+        opening = state.opening
+        return LineMovementFeatures(
+            fixture_id=int(fixture_id),
+            market=str(market),
+            selection=str(selection),
+            opening_odd=opening,
+            closing_odd=consensus,
+            max_odd=state.max_odd,
+            min_odd=state.min_odd,
+            movement_pct=consensus / opening - 1,
+            slope_per_hour=state.slope,
+            steam_moves=state.steam_moves,
+            last_steam_at=state.last_steam_at,
+            consensus_odd=consensus,
+            consensus_probability=1 / consensus,
+            n_bookmakers=len(state.prices),
+            n_updates=state.n_updates,
+            first_seen=state.first_seen,
+            last_seen=state.last_seen
+        )
+
+    def get_fixture_features(self, fixture_id: int) -> List[LineMovementFeatures]:
+        """Features de todas as seleções de uma partida"""
+        return [self.get_features(*key) for key in self._fixture_index.get(int(fixture_id), [])]
+
+    def fixture_ids(self) -> List[int]:
+        """Partidas com estado em memória"""
+        return list(self._fixture_index)
+
+    def forget_fixture(self, fixture_id: int) -> int:
+        """Remove o estado de uma partida já encerrada"""
+        keys = self._fixture_index.pop(int(fixture_id), [])
+        for key in keys:
+            del self._states[key]
+        return len(keys)
+
+    def forget_stale(self, before: datetime) -> int:
+        """Remove partidas sem nenhuma atualização desde `before`
+
+        Rede de segurança para partidas cujo encerramento nunca chega a ser
+        observado (ex.: adiadas ou fora das ligas monitoradas).
+
+        Returns:
+            Número de partidas removidas
+        """
+        stale = [
+            fixture_id for fixture_id, keys in self._fixture_index.items()
+            if all(self._states[key].last_seen < before for key in keys)
+        ]
+        for fixture_id in stale:
+            self.forget_fixture(fixture_id)
+        return len(stale)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Todas as features em formato tabular"""
+        rows = [self.get_features(*key).to_dict() for key in self._states]
+        return pd.DataFrame(rows, columns=list(LineMovementFeatures.__dataclass_fields__))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, **kwargs) -> 'LineMovementEngine':
+        """API em lote para backtests: replay ordenado de um histórico de odds
+
+        Args:
+            df: DataFrame com fixture_id, bookmaker, market, selection, odd e
+                timestamp (ex.: OddsArchive.query ou odds_movements)
+        """
+        engine = cls(**kwargs)
+        if df.empty:
+            return engine
+
+        ordered = df.sort_values('timestamp', kind='mergesort')
+        for row in ordered[['fixture_id', 'bookmaker', 'market', 'selection', 'odd', 'timestamp']].itertuples(index=False):
+            engine.update(row.fixture_id, row.bookmaker, row.market, row.selection,
+                          row.odd, pd.Timestamp(row.timestamp).to_pydatetime())
+
+        logger.info(f"Line movement: {len(engine)} seleções a partir de {len(df)} observações")
+        return engine
+
+
+def compute_line_movement(df: pd.DataFrame, **kwargs) -> pd.DataFrame:
+    """Features de line movement para todo um histórico de odds"""
+    return LineMovementEngine.from_frame(df, **kwargs).to_frame()
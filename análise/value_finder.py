@@ -1,19 +1,29 @@
 from typing import Dict, List, Optional
 from datetime import datetime
 import logging
+import numpy as np
+import pandas as pd
 from armazenamento.banco_de_dados import SessionLocal, Match, Odds, Prediction
 from processadores.statistics import StatisticsProcessor
+from análise.line_movement import LineMovementEngine
 from settings.settings import MIN_CONFIDENCE, MAX_CONFIDENCE, MIN_VALUE_EV
 from notifications.notification_integrator import notify_prediction
+from notifications.notification_queue import enqueue_notification
 
 logger = logging.getLogger(__name__)
 
 class ValueFinder:
     """Identifica apostas com valor positivo"""
     
-    def __init__(self):
+    PROBABILITY_KEYS = ['home_win', 'draw', 'away_win', 'over_25', 'under_25', 'btts_yes', 'btts_no']
+    
+    # Simulação de cálculo (substitua por modelo real), na ordem de PROBABILITY_KEYS
+    BASELINE_PROBABILITIES = np.array([0.45, 0.30, 0.25, 0.68, 0.32, 0.58, 0.42])
+    
+    def __init__(self, line_movement: Optional[LineMovementEngine] = None):
         self.stats_processor = StatisticsProcessor()
         self.db = SessionLocal()
+        self.line_movement = line_movement
     
     def analyze_match(self, match_data: Dict, odds_data: List[Dict]) -> Optional[Prediction]:
         """Analisa uma partida e busca valor"""
@@ -57,28 +67,7 @@ class ValueFinder:
             logger.info(f"✅ Valor encontrado: {best_value['market']} - EV: {best_value['ev']:.2%}")
             
             # Enviar notificação sobre a predição
-            try:
-                prediction_data = {
-                    'fixture_id': prediction.fixture_id,
-                    'market': prediction.market,
-                    'selection': prediction.selection,
-                    'expected_value': prediction.expected_value,
-                    'confidence': prediction.confidence,
-                    'stake_percentage': prediction.stake_percentage,
-                    'recommended': prediction.recommended,
-                    'match': {
-                        'home_team': match_data.get('teams', {}).get('home', {}).get('name', 'N/A'),
-                        'away_team': match_data.get('teams', {}).get('away', {}).get('name', 'N/A'),
-                        'league': 'N/A'  # Pode ser obtido dos dados da partida
-                    }
-                }
-                
-                # Enviar notificação de forma assíncrona
-                import asyncio
-                asyncio.create_task(notify_prediction(prediction_data))
-                
-            except Exception as e:
-                logger.error(f"Erro ao enviar notificação: {e}")
+            self._notify(prediction, match_data)
             
             return prediction
             
@@ -87,6 +76,164 @@ class ValueFinder:
             self.db.rollback()
             return None
     
+    def analyze_matches(self, matches: List[Dict],
+                        odds_by_fixture: Dict[int, List[Dict]]) -> List[Prediction]:
+        """Analisa uma rodada inteira de uma vez
+        
+        Calcula as probabilidades de todas as partidas numa matriz, cruza-as
+        com as odds num único DataFrame, filtra os candidatos de forma
+        vetorizada e grava todas as predições numa única transação.
+        
+        Args:
+            matches: Partidas no formato {'fixture': {'id'}, 'teams': {...}}
+            odds_by_fixture: Odds por fixture_id, no formato de analyze_match
+        
+        Returns:
+            Predições com valor gravadas no banco
+        """
+        if not matches:
+            return []
+        
+        try:
+            fixture_ids = pd.Index([m['fixture']['id'] for m in matches])
+            probabilities = self._calculate_probabilities_batch(matches)
+            
+            frame = self._build_odds_frame(odds_by_fixture)
+            if frame.empty:
+                return []
+            
+            rows = fixture_ids.get_indexer(frame['fixture_id'])
+            known = (rows >= 0) & (frame['prob_col'].values >= 0)
+            frame = frame[known].assign(
+                probability=probabilities[rows[known], frame['prob_col'].values[known]]
+            )
+            frame = frame[frame['probability'] != 0]
+            if frame.empty:
+                return []
+            
+            odd = frame['odd'].values
+            probability = frame['probability'].values
+            ev = probability * odd - 1
+            frame = frame.assign(
+                implied_probability=1 / odd,
+                ev=ev,
+                confidence=np.minimum(probability + np.minimum(ev * 0.5, 0.15), 0.95)
+            )
+            
+            # Melhor valor por partida (primeiro máximo, como em _find_best_value)
+            best = frame.loc[frame.groupby('fixture_id', sort=False)['ev'].idxmax()]
+            candidates = best[
+                (best['ev'] >= MIN_VALUE_EV) &
+                (best['confidence'] >= MIN_CONFIDENCE) &
+                (best['confidence'] <= MAX_CONFIDENCE)
+            ]
+            if candidates.empty:
+                return []
+            
+            stakes = self._calculate_stakes(candidates['probability'].values, candidates['odd'].values)
+            
+            predictions = []
+            for candidate, stake in zip(candidates.itertuples(index=False), stakes):
+                predictions.append(Prediction(
+                    fixture_id=int(candidate.fixture_id),
+                    market=candidate.market,
+                    selection=candidate.selection,
+                    predicted_probability=float(candidate.probability),
+                    implied_probability=float(candidate.implied_probability),
+                    recommended_odd=float(candidate.odd),
+                    current_odd=float(candidate.odd),
+                    expected_value=float(candidate.ev),
+                    confidence=float(candidate.confidence),
+                    stake_percentage=float(stake),
+                    recommended=True,
+                    factors=self._get_factors(
+                        dict(zip(self.PROBABILITY_KEYS, probabilities[fixture_ids.get_loc(candidate.fixture_id)])),
+                        candidate.market, int(candidate.fixture_id), candidate.selection
+                    )
+                ))
+            
+            # Uma única transação para toda a rodada
+            self.db.add_all(predictions)
+            self.db.commit()
+            
+            logger.info(f"✅ {len(predictions)} predições com valor em {len(matches)} partidas")
+            
+            matches_by_id = {m['fixture']['id']: m for m in matches}
+            for prediction in predictions:
+                self._notify(prediction, matches_by_id.get(prediction.fixture_id, {}))
+            
+            return predictions
+            
+        except Exception as e:
+            logger.error(f"Erro ao analisar partidas em lote: {e}")
+            self.db.rollback()
+            return []
+    
+    def _calculate_probabilities_batch(self, matches: List[Dict]) -> np.ndarray:
+        """Matriz (partidas x PROBABILITY_KEYS) de probabilidades
+        
+        O modelo base monta a matriz numa única operação. Subclasses que
+        substituem _calculate_probabilities sem fornecer uma versão em lote
+        caem no cálculo partida a partida para manter os dois caminhos iguais.
+        """
+        if type(self)._calculate_probabilities is ValueFinder._calculate_probabilities:
+            return np.tile(self.BASELINE_PROBABILITIES, (len(matches), 1))
+        return np.array([
+            [probs.get(key, 0.0) for key in self.PROBABILITY_KEYS]
+            for probs in (self._calculate_probabilities(match) for match in matches)
+        ], dtype=float).reshape(len(matches), len(self.PROBABILITY_KEYS))
+    
+    def _build_odds_frame(self, odds_by_fixture: Dict[int, List[Dict]]) -> pd.DataFrame:
+        """Achata as odds de todas as partidas num DataFrame"""
+        columns = {key: i for i, key in enumerate(self.PROBABILITY_KEYS)}
+        records = []
+        for fixture_id, odds_data in odds_by_fixture.items():
+            for odds in odds_data:
+                for market in odds.get('bookmakers', [{}])[0].get('markets', []):
+                    market_name = market.get('key')
+                    for outcome in market.get('outcomes', []):
+                        selection = outcome.get('name')
+                        price = outcome.get('price')
+                        if not price:
+                            continue
+                        records.append((
+                            fixture_id, market_name, selection, float(price),
+                            columns.get(self._map_selection(market_name, selection), -1)
+                        ))
+        
+        return pd.DataFrame(records, columns=['fixture_id', 'market', 'selection', 'odd', 'prob_col'])
+    
+    def _calculate_stakes(self, probability: np.ndarray, odd: np.ndarray,
+                          fraction: float = 0.25) -> np.ndarray:
+        """Kelly fracionado vetorizado (mesma regra de StatisticsProcessor.kelly_criterion)"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            kelly = (odd * probability - 1) / (odd - 1) * fraction
+        kelly = np.where((probability <= 0) | (odd <= 1), 0.0, kelly)
+        return np.clip(kelly, 0.0, 0.10)
+    
+    def _notify(self, prediction: Prediction, match_data: Dict):
+        """Entrega a notificação à fila assíncrona (não bloqueia a análise)"""
+        try:
+            prediction_data = {
+                'fixture_id': prediction.fixture_id,
+                'market': prediction.market,
+                'selection': prediction.selection,
+                'expected_value': prediction.expected_value,
+                'confidence': prediction.confidence,
+                'stake_percentage': prediction.stake_percentage,
+                'recommended': prediction.recommended,
+                'match': {
+                    'home_team': match_data.get('teams', {}).get('home', {}).get('name', 'N/A'),
+                    'away_team': match_data.get('teams', {}).get('away', {}).get('name', 'N/A'),
+                    'league': 'N/A'  # Pode ser obtido dos dados da partida
+                }
+            }
+            
+            enqueue_notification(notify_prediction, prediction_data)
+            
+        except Exception as e:
+            logger.error(f"Erro ao enviar notificação: {e}")
+    
     def _calculate_probabilities(self, match_data: Dict) -> Dict:
         """Calcula probabilidades reais do jogo"""
         
@@ -97,17 +244,7 @@ class ValueFinder:
         away_team = match_data['teams']['away']['name']
         
         # Simulação de cálculo (substitua por modelo real)
-        probabilities = {
-            'home_win': 0.45,
-            'draw': 0.30,
-            'away_win': 0.25,
-            'over_25': 0.68,
-            'under_25': 0.32,
-            'btts_yes': 0.58,
-            'btts_no': 0.42
-        }
-        
-        return probabilities
+        return dict(zip(self.PROBABILITY_KEYS, self.BASELINE_PROBABILITIES.tolist()))
     
     def _find_best_value(self, probabilities: Dict, odds_data: List[Dict]) -> Optional[Dict]:
         """Encontra a melhor oportunidade de valor"""
@@ -116,6 +253,7 @@ class ValueFinder:
         best_ev = -1
         
         for odds in odds_data:
+            fixture_id = odds.get('fixture_id')
             for market in odds.get('bookmakers', [{}])[0].get('markets', []):
                 market_name = market.get('key')
                 
@@ -143,7 +281,7 @@ class ValueFinder:
                             'odd': odd,
                             'ev': value['expected_value'],
                             'confidence': self._calculate_confidence(value, probabilities),
-                            'factors': self._get_factors(probabilities, market_name)
+                            'factors': self._get_factors(probabilities, market_name, fixture_id, selection)
                         }
         
         return best_value
@@ -188,13 +326,29 @@ class ValueFinder:
         
         return min(base_confidence + ev_boost, 0.95)
     
-    def _get_factors(self, probabilities: Dict, market: str) -> Dict:
+    def _get_factors(self, probabilities: Dict, market: str,
+                     fixture_id: Optional[int] = None, selection: Optional[str] = None) -> Dict:
         """Retorna fatores que justificam a recomendação"""
-        return {
+        factors = {
             'model_probability': probabilities.get(market, 0),
             'statistical_edge': 'High value detected',
             'timestamp': datetime.now().isoformat()
         }
+        
+        # Movimento de linha (abertura vs atual, steam) quando disponível
+        if self.line_movement is not None and fixture_id is not None:
+            movement = self.line_movement.get_features(fixture_id, market, selection)
+            if movement:
+                factors['line_movement'] = {
+                    'opening_odd': movement.opening_odd,
+                    'consensus_odd': movement.consensus_odd,
+                    'movement_pct': movement.movement_pct,
+                    'slope_per_hour': movement.slope_per_hour,
+                    'steam_moves': movement.steam_moves,
+                    'n_bookmakers': movement.n_bookmakers
+                }
+        
+        return factors
     
     def __del__(self):
         self.db.close()
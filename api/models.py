@@ -60,6 +60,14 @@ class MatchResponse(BaseModel):
     venue: Optional[str] = None
     referee: Optional[str] = None
 
+class PredictionIntervalResponse(BaseModel):
+    """Intervalo conformal online da probabilidade prevista"""
+    lower_bound: float = Field(..., ge=0, le=1)
+    upper_bound: float = Field(..., ge=0, le=1)
+    confidence_level: float = Field(..., gt=0, lt=1)
+    method: str
+    sample_size: int
+
 class PredictionResponse(BaseModel):
     """Resposta de previsão"""
     id: str
@@ -72,6 +80,7 @@ class PredictionResponse(BaseModel):
     expected_value: float
     kelly_fraction: float = Field(..., ge=0, le=1)
     recommended: bool = False
+    interval: Optional[PredictionIntervalResponse] = None
     created_at: datetime
 
 class ValueBetResponse(BaseModel):
@@ -2,10 +2,13 @@ from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
+import os
 
 from storage.database import get_db, Match, Prediction, BettingHistory
 from services.collector_service import CollectorService
 from services.analyzer_service import AnalyzerService
+from config.settings import settings
+from confidence.conformal_calibrator import ReloadingCalibratorRegistry
 from api.models import *
 from utils.logger import get_logger
 
@@ -16,6 +19,38 @@ router = APIRouter()
 collector_service = CollectorService()
 analyzer_service = AnalyzerService()
 
+# Janelas conformais gravadas por settle_predictions, relidas quando o arquivo muda
+conformal_registry = ReloadingCalibratorRegistry(
+    os.path.join(settings.ml_model_path, 'conformal_calibration.joblib')
+)
+
+# Mercado das janelas conformais (o mesmo da liquidação) por tipo de previsão
+PREDICTION_MARKETS = {
+    PredictionType.HOME_WIN.value: 'h2h',
+    PredictionType.DRAW.value: 'h2h',
+    PredictionType.AWAY_WIN.value: 'h2h',
+    PredictionType.OVER_2_5.value: 'totals',
+    PredictionType.UNDER_2_5.value: 'totals',
+    PredictionType.BTTS.value: 'btts',
+    PredictionType.NO_BTTS.value: 'btts',
+}
+
+def attach_interval(prediction, confidence_level: float = 0.95):
+    """Anexa à previsão o intervalo conformal do seu (modelo, mercado)"""
+    prediction_type = getattr(prediction.prediction_type, 'value', prediction.prediction_type)
+    market = PREDICTION_MARKETS.get(prediction_type, prediction_type)
+    interval = conformal_registry.prediction_interval(
+        prediction.model_name, market, prediction.probability, confidence_level
+    )
+    prediction.interval = PredictionIntervalResponse(
+        lower_bound=interval.lower_bound,
+        upper_bound=interval.upper_bound,
+        confidence_level=interval.confidence_level,
+        method=interval.method,
+        sample_size=interval.sample_size
+    )
+    return prediction
+
 @router.get("/matches/live", response_model=List[MatchResponse])
 async def get_live_matches(
     league_id: Optional[int] = None,
@@ -60,7 +95,7 @@ async def get_predictions(
             Prediction.created_at.desc()
         ).limit(limit).all()
         
-        return predictions
+        return [attach_interval(p) for p in predictions]
     except Exception as e:
         logger.error(f"Erro ao buscar previsões: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, JSON
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, DateTime, Boolean, JSON, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -8,6 +8,12 @@ Base = declarative_base()
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine)
 
+if engine.dialect.name == 'sqlite':
+    @event.listens_for(engine, 'connect')
+    def _sqlite_incremental_vacuum(dbapi_connection, connection_record):
+        # Em bancos novos permite devolver espaço com incremental_vacuum (ver armazenamento.retention)
+        dbapi_connection.execute('PRAGMA auto_vacuum = INCREMENTAL')
+
 class Match(Base):
     __tablename__ = 'matches'
     
@@ -45,6 +51,23 @@ class Odds(Base):
     odd = Column(Float)
     timestamp = Column(DateTime, default=datetime.utcnow, index=True)
 
+class OddsMovement(Base):
+    """Delta de odds: uma linha apenas quando o preço de uma seleção muda"""
+    __tablename__ = 'odds_movements'
+    
+    id = Column(Integer, primary_key=True)
+    fixture_id = Column(Integer, nullable=False)
+    bookmaker = Column(String, nullable=False)
+    market = Column(String, nullable=False)
+    selection = Column(String, nullable=False)
+    odd = Column(Float, nullable=False)
+    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        Index('ix_odds_movements_key_time', 'fixture_id', 'bookmaker', 'market', 'selection', 'timestamp'),
+        Index('ix_odds_movements_timestamp', 'timestamp'),
+    )
+
 class Prediction(Base):
     __tablename__ = 'predictions'
     
@@ -86,6 +109,56 @@ class BettingHistory(Base):
     placed_at = Column(DateTime, default=datetime.utcnow)
     settled_at = Column(DateTime, nullable=True)
 
+class SettledPrediction(Base):
+    """Marca cada predição já cruzada com o resultado (contabilizada uma única vez)"""
+    __tablename__ = 'settled_predictions'
+    
+    prediction_id = Column(Integer, primary_key=True)
+    fixture_id = Column(Integer, index=True)
+    
+    model = Column(String)
+    league_id = Column(Integer)
+    market = Column(String)
+    
+    outcome = Column(Integer, nullable=True)  # 1 acerto, 0 erro, None anulada
+    profit = Column(Float, nullable=True)  # Lucro com stake unitário
+    
+    settled_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class CalibrationAggregate(Base):
+    """Totais acumulados de calibração por modelo/liga/mercado (append-only)
+
+    Cada liquidação acrescenta uma linha com os totais correntes da chave, de
+    modo que a última linha é o estado atual e a diferença entre duas linhas
+    dá as métricas de qualquer janela.
+    """
+    __tablename__ = 'calibration_aggregates'
+    
+    id = Column(Integer, primary_key=True)
+    model = Column(String, nullable=False)
+    league_id = Column(Integer, nullable=False)
+    market = Column(String, nullable=False)
+    sequence = Column(Integer, nullable=False)
+    
+    n = Column(Integer, nullable=False)
+    hits = Column(Integer, nullable=False)
+    brier_sum = Column(Float, nullable=False)
+    log_loss_sum = Column(Float, nullable=False)
+    profit_sum = Column(Float, nullable=False)
+    stake_sum = Column(Float, nullable=False)
+    staked_profit_sum = Column(Float, nullable=False)
+    
+    bin_counts = Column(JSON, nullable=False)
+    bin_probability_sums = Column(JSON, nullable=False)
+    bin_hits = Column(JSON, nullable=False)
+    
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint('model', 'league_id', 'market', 'sequence', name='uq_calibration_aggregates_key_seq'),
+        Index('ix_calibration_aggregates_key_time', 'model', 'league_id', 'market', 'created_at'),
+    )
+
 # Criar todas as tabelas
 Base.metadata.create_all(engine)
 
@@ -0,0 +1,427 @@
+# Cruzamento incremental de predições com resultados do MaraBet AI
+#
+# Quando as partidas terminam, as predições ainda não liquidadas são cruzadas
+# em lote com o placar final. Cada predição é marcada em `settled_predictions`
+# (garantindo que entra uma única vez nas métricas) e os totais de calibração
+# por (modelo, liga, mercado) avançam numa nova linha de
+# `calibration_aggregates`. Como cada linha guarda os totais acumulados, a
+# leitura do estado atual é a última linha da chave e qualquer janela móvel é
+# a diferença entre duas linhas, sem reler o histórico de predições.
+#
+# Os calibradores conformais online são alimentados a partir das marcas de
+# `settled_predictions`, seguindo um cursor (settled_at, prediction_id): assim
+# recebem as predições liquidadas por qualquer caminho (tarefa periódica ou
+# atualização de uma partida), cada uma uma única vez.
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta
+import logging
+import re
+
+import numpy as np
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
+
+from armazenamento.banco_de_dados import CalibrationAggregate, Match, Prediction, SettledPrediction
+
+logger = logging.getLogger(__name__)
+
+# Placar final disponível; CANC/ABD anulam as predições da partida
+SETTLED_STATUSES = frozenset({'FT', 'AET', 'PEN'})
+VOID_STATUSES = frozenset({'CANC', 'ABD'})
+
+DEFAULT_MODEL = 'value_finder'
+DEFAULT_BINS = 10
+DEFAULT_TOTALS_LINE = 2.5
+EPSILON = 1e-15
+
+# Marcas mais recentes que isto podem pertencer a um lote ainda sem commit
+DEFAULT_FEED_LAG = timedelta(minutes=5)
+
+CalibrationKey = Tuple[str, int, str]
+
+
+def resolve_outcome(market: str, selection: str, home_score: Any, away_score: Any) -> Optional[int]:
+    """Resolve se a seleção venceu (1), perdeu (0) ou não tem resultado (None)
+
+    Suporta h2h (Home/Draw/Away), totals (Over/Under, linha opcional na
+    seleção, padrão 2.5) e btts (Yes/No). Linhas inteiras com total igual à
+    linha (push) e mercados desconhecidos retornam None.
+    """
+    if home_score is None or away_score is None or not selection:
+        return None
+
+    home, away = int(home_score), int(away_score)
+    selection = str(selection).strip()
+
+    if market == 'h2h':
+        winner = 'Home' if home > away else 'Away' if away > home else 'Draw'
+        if selection not in ('Home', 'Draw', 'Away'):
+            return None
+        return int(selection == winner)
+
+    if market == 'totals':
+        match = re.match(r'^(Over|Under)(?:\s+([0-9]+(?:\.[0-9]+)?))?$', selection)
+        if match is None:
+            return None
+        line = float(match.group(2)) if match.group(2) else DEFAULT_TOTALS_LINE
+        total = home + away
+        if total == line:
+            return None
+        return int((total > line) == (match.group(1) == 'Over'))
+
+    if market == 'btts':
+        if selection not in ('Yes', 'No'):
+            return None
+        return int((home > 0 and away > 0) == (selection == 'Yes'))
+
+    return None
+
+
+def empty_totals(n_bins: int = DEFAULT_BINS) -> Dict[str, Any]:
+    """Totais zerados de uma chave de calibração"""
+    return {
+        'n': 0, 'hits': 0, 'brier_sum': 0.0, 'log_loss_sum': 0.0,
+        'profit_sum': 0.0, 'stake_sum': 0.0, 'staked_profit_sum': 0.0,
+        'bin_counts': np.zeros(n_bins, dtype=np.int64),
+        'bin_probability_sums': np.zeros(n_bins),
+        'bin_hits': np.zeros(n_bins, dtype=np.int64),
+    }
+
+
+def _row_totals(row: CalibrationAggregate) -> Dict[str, Any]:
+    return {
+        'n': row.n, 'hits': row.hits, 'brier_sum': row.brier_sum, 'log_loss_sum': row.log_loss_sum,
+        'profit_sum': row.profit_sum, 'stake_sum': row.stake_sum, 'staked_profit_sum': row.staked_profit_sum,
+        'bin_counts': np.asarray(row.bin_counts, dtype=np.int64),
+        'bin_probability_sums': np.asarray(row.bin_probability_sums, dtype=float),
+        'bin_hits': np.asarray(row.bin_hits, dtype=np.int64),
+    }
+
+
+def combine_totals(a: Dict[str, Any], b: Dict[str, Any], sign: int = 1) -> Dict[str, Any]:
+    """Soma (ou subtrai, com sign=-1) dois conjuntos de totais"""
+    return {name: a[name] + sign * b[name] for name in a}
+
+
+def calibration_metrics(totals: Dict[str, Any]) -> Dict[str, Any]:
+    """Converte totais em Brier, log-loss, ROI e diagrama de confiabilidade"""
+    n = int(totals['n'])
+    counts = np.asarray(totals['bin_counts'])
+    n_bins = len(counts)
+    edges = np.linspace(0.0, 1.0, n_bins + 1)
+
+    reliability = []
+    ece = 0.0
+    for i in range(n_bins):
+        count = int(counts[i])
+        mean_predicted = float(totals['bin_probability_sums'][i] / count) if count else None
+        observed_rate = float(totals['bin_hits'][i] / count) if count else None
+        if count:
+            ece += count / n * abs(mean_predicted - observed_rate)
+        reliability.append({
+            'lower': float(edges[i]), 'upper': float(edges[i + 1]), 'count': count,
+            'mean_predicted': mean_predicted, 'observed_rate': observed_rate
+        })
+
+    return {
+        'n': n,
+        'hit_rate': totals['hits'] / n if n else None,
+        'brier': totals['brier_sum'] / n if n else None,
+        'log_loss': totals['log_loss_sum'] / n if n else None,
+        'roi': totals['profit_sum'] / n if n else None,
+        'staked_roi': totals['staked_profit_sum'] / totals['stake_sum'] if totals['stake_sum'] else None,
+        'ece': ece if n else None,
+        'reliability': reliability,
+    }
+
+
+class CalibrationJoinService:
+    """Liquida predições em lote e mantém a calibração acumulada por chave"""
+
+    def __init__(self, db, n_bins: int = DEFAULT_BINS, default_model: str = DEFAULT_MODEL,
+                 max_retries: int = 3, calibrators=None):
+        """
+        Args:
+            calibrators: ConformalCalibratorRegistry alimentado por
+                `feed_calibrators` (opcional)
+        """
+        self.db = db
+        self.n_bins = n_bins
+        self.default_model = default_model
+        self.max_retries = max_retries
+        self.calibrators = calibrators
+
+    def _pending(self, fixture_ids: Optional[List[int]], limit: int):
+        """Predições ainda não liquidadas de partidas encerradas"""
+        query = self.db.query(
+            Prediction, Match.league_id, Match.status, Match.home_score, Match.away_score
+        ).join(
+            Match, Match.fixture_id == Prediction.fixture_id
+        ).outerjoin(
+            SettledPrediction, SettledPrediction.prediction_id == Prediction.id
+        ).filter(
+            SettledPrediction.prediction_id.is_(None),
+            Match.status.in_(SETTLED_STATUSES | VOID_STATUSES)
+        )
+        if fixture_ids is not None:
+            query = query.filter(Prediction.fixture_id.in_(fixture_ids))
+        return query.order_by(Prediction.id).limit(limit).all()
+
+    def _model_name(self, prediction: Prediction) -> str:
+        factors = prediction.factors if isinstance(prediction.factors, dict) else {}
+        return str(factors.get('model') or self.default_model)
+
+    def _latest_rows(self, keys: Iterable[CalibrationKey]) -> Dict[CalibrationKey, CalibrationAggregate]:
+        """Última linha (maior sequence) de cada chave"""
+        keys = set(keys)
+        if not keys:
+            return {}
+
+        models, leagues, markets = (set(k[i] for k in keys) for i in range(3))
+        key_columns = (CalibrationAggregate.model, CalibrationAggregate.league_id, CalibrationAggregate.market)
+        latest = self.db.query(
+            *key_columns, func.max(CalibrationAggregate.sequence).label('last_seq')
+        ).filter(
+            CalibrationAggregate.model.in_(models),
+            CalibrationAggregate.league_id.in_(leagues),
+            CalibrationAggregate.market.in_(markets)
+        ).group_by(*key_columns).subquery()
+
+        rows = self.db.query(CalibrationAggregate).join(latest, and_(
+            CalibrationAggregate.model == latest.c.model,
+            CalibrationAggregate.league_id == latest.c.league_id,
+            CalibrationAggregate.market == latest.c.market,
+            CalibrationAggregate.sequence == latest.c.last_seq
+        )).all()
+        return {
+            (r.model, r.league_id, r.market): r for r in rows
+            if (r.model, r.league_id, r.market) in keys
+        }
+
+    def _batch_deltas(self, rows) -> Tuple[List[Dict], Dict[CalibrationKey, Dict[str, Any]]]:
+        """Marcas de liquidação e totais do lote por chave"""
+        settled, scored = [], []
+        now = datetime.utcnow()
+
+        for prediction, league_id, status, home_score, away_score in rows:
+            key = (self._model_name(prediction), int(league_id or 0), str(prediction.market))
+            odd = prediction.current_odd or prediction.recommended_odd
+            outcome = None
+            if status in SETTLED_STATUSES and prediction.predicted_probability is not None and odd:
+                outcome = resolve_outcome(prediction.market, prediction.selection, home_score, away_score)
+
+            profit = None if outcome is None else (odd - 1.0 if outcome else -1.0)
+            settled.append({
+                'prediction_id': prediction.id, 'fixture_id': prediction.fixture_id,
+                'model': key[0], 'league_id': key[1], 'market': key[2],
+                'outcome': outcome, 'profit': profit, 'settled_at': now
+            })
+            if outcome is not None:
+                scored.append((key, prediction.predicted_probability, outcome, odd,
+                               prediction.stake_percentage or 0.0))
+
+        deltas = {}
+        if not scored:
+            return settled, deltas
+
+        keys = [s[0] for s in scored]
+        probability = np.clip(np.array([s[1] for s in scored], dtype=float), EPSILON, 1 - EPSILON)
+        outcome = np.array([s[2] for s in scored], dtype=np.int64)
+        odd = np.array([s[3] for s in scored], dtype=float)
+        stake = np.array([s[4] for s in scored], dtype=float)
+
+        brier = (probability - outcome) ** 2
+        log_loss = -(outcome * np.log(probability) + (1 - outcome) * np.log(1 - probability))
+        profit = np.where(outcome == 1, odd - 1.0, -1.0)
+        bins = np.minimum((probability * self.n_bins).astype(int), self.n_bins - 1)
+
+        unique_keys = sorted(set(keys))
+        index = {k: i for i, k in enumerate(unique_keys)}
+        group = np.array([index[k] for k in keys])
+        for k, i in index.items():
+            mask = group == i
+            deltas[k] = {
+                'n': int(mask.sum()),
+                'hits': int(outcome[mask].sum()),
+                'brier_sum': float(brier[mask].sum()),
+                'log_loss_sum': float(log_loss[mask].sum()),
+                'profit_sum': float(profit[mask].sum()),
+                'stake_sum': float(stake[mask].sum()),
+                'staked_profit_sum': float((stake * profit)[mask].sum()),
+                'bin_counts': np.bincount(bins[mask], minlength=self.n_bins),
+                'bin_probability_sums': np.bincount(bins[mask], weights=probability[mask], minlength=self.n_bins),
+                'bin_hits': np.bincount(bins[mask], weights=outcome[mask], minlength=self.n_bins).astype(np.int64),
+            }
+        return settled, deltas
+
+    def _write_batch(self, settled: List[Dict], deltas: Dict[CalibrationKey, Dict[str, Any]]):
+        """Grava marcas e novas linhas acumuladas numa única transação"""
+        latest = self._latest_rows(deltas)
+        now = datetime.utcnow()
+        aggregates = []
+        for key, delta in deltas.items():
+            previous = latest.get(key)
+            base = _row_totals(previous) if previous is not None else empty_totals(self.n_bins)
+            totals = combine_totals(base, delta)
+            aggregates.append({
+                'model': key[0], 'league_id': key[1], 'market': key[2],
+                'sequence': (previous.sequence + 1) if previous is not None else 1,
+                'n': int(totals['n']), 'hits': int(totals['hits']),
+                'brier_sum': float(totals['brier_sum']), 'log_loss_sum': float(totals['log_loss_sum']),
+                'profit_sum': float(totals['profit_sum']), 'stake_sum': float(totals['stake_sum']),
+                'staked_profit_sum': float(totals['staked_profit_sum']),
+                'bin_counts': [int(v) for v in totals['bin_counts']],
+                'bin_probability_sums': [float(v) for v in totals['bin_probability_sums']],
+                'bin_hits': [int(v) for v in totals['bin_hits']],
+                'created_at': now
+            })
+
+        self.db.bulk_insert_mappings(SettledPrediction, settled)
+        if aggregates:
+            self.db.bulk_insert_mappings(CalibrationAggregate, aggregates)
+        self.db.commit()
+
+    def settle(self, fixture_ids: Optional[List[int]] = None, batch_size: int = 5000) -> Dict[str, int]:
+        """Liquida todas as predições pendentes (ou só das partidas indicadas)
+
+        Conflitos com outro worker (mesma predição ou mesma sequence de uma
+        chave) desfazem o lote, que é relido e recalculado.
+
+        Returns:
+            Resumo com predições liquidadas, anuladas e chaves atualizadas
+        """
+        summary = {'settled': 0, 'void': 0, 'keys': 0}
+        keys = set()
+        retries = 0
+
+        while True:
+            rows = self._pending(fixture_ids, batch_size)
+            if not rows:
+                break
+
+            settled, deltas = self._batch_deltas(rows)
+            try:
+                self._write_batch(settled, deltas)
+            except IntegrityError:
+                self.db.rollback()
+                retries += 1
+                if retries > self.max_retries:
+                    raise
+                logger.warning(f"Conflito ao liquidar predições, repetindo lote ({retries}/{self.max_retries})")
+                continue
+
+            retries = 0
+            voided = sum(1 for s in settled if s['outcome'] is None)
+            summary['settled'] += len(settled) - voided
+            summary['void'] += voided
+            keys.update(deltas)
+
+        summary['keys'] = len(keys)
+        if summary['settled'] or summary['void']:
+            logger.info(f"Predições liquidadas: {summary['settled']} (anuladas: {summary['void']}) "
+                        f"em {summary['keys']} chaves")
+        return summary
+
+    def feed_calibrators(self, calibrators=None, lag: timedelta = DEFAULT_FEED_LAG,
+                         now: Optional[datetime] = None, batch_size: int = 5000) -> int:
+        """Alimenta os calibradores conformais com as predições liquidadas desde o cursor
+
+        Lê `settled_predictions` (de qualquer caminho de liquidação) em ordem de
+        (settled_at, prediction_id) até `now - lag` e avança o cursor guardado
+        no próprio registro, que é persistido junto com as janelas.
+
+        Returns:
+            Número de resíduos inseridos
+        """
+        calibrators = calibrators if calibrators is not None else self.calibrators
+        if calibrators is None:
+            return 0
+
+        until = (now or datetime.utcnow()) - lag
+        fed = 0
+        while True:
+            query = self.db.query(
+                SettledPrediction.prediction_id, SettledPrediction.model, SettledPrediction.market,
+                SettledPrediction.outcome, SettledPrediction.settled_at, Prediction.predicted_probability
+            ).join(
+                Prediction, Prediction.id == SettledPrediction.prediction_id
+            ).filter(
+                SettledPrediction.outcome.isnot(None),
+                SettledPrediction.settled_at <= until
+            )
+            if calibrators.cursor is not None:
+                settled_at, prediction_id = calibrators.cursor
+                query = query.filter(or_(
+                    SettledPrediction.settled_at > settled_at,
+                    and_(SettledPrediction.settled_at == settled_at,
+                         SettledPrediction.prediction_id > prediction_id)
+                ))
+            rows = query.order_by(SettledPrediction.settled_at, SettledPrediction.prediction_id).limit(batch_size).all()
+            if not rows:
+                break
+
+            for row in rows:
+                if row.predicted_probability is not None:
+                    calibrators.update(row.model, row.market, row.predicted_probability,
+                                       row.outcome, row.settled_at)
+                    fed += 1
+            calibrators.cursor = (rows[-1].settled_at, rows[-1].prediction_id)
+
+        return fed
+    
+    def _latest(self, model: str, league_id: int, market: str,
+                before: Optional[datetime] = None) -> Optional[CalibrationAggregate]:
+        query = self.db.query(CalibrationAggregate).filter(
+            CalibrationAggregate.model == model,
+            CalibrationAggregate.league_id == league_id,
+            CalibrationAggregate.market == market
+        )
+        if before is not None:
+            query = query.filter(CalibrationAggregate.created_at < before)
+        return query.order_by(CalibrationAggregate.sequence.desc()).first()
+
+    def get_totals(self, model: str, market: str, league_id: Optional[int] = None,
+                   since: Optional[datetime] = None) -> Dict[str, Any]:
+        """Totais atuais (ou liquidados desde `since`) de uma chave
+
+        Sem `league_id` soma a última linha de cada liga do modelo/mercado.
+        """
+        if league_id is None:
+            leagues = [r[0] for r in self.db.query(CalibrationAggregate.league_id).filter(
+                CalibrationAggregate.model == model, CalibrationAggregate.market == market
+            ).distinct()]
+        else:
+            leagues = [league_id]
+
+        totals = empty_totals(self.n_bins)
+        for league in leagues:
+            current = self._latest(model, league, market)
+            if current is None:
+                continue
+            totals = combine_totals(totals, _row_totals(current))
+            if since is not None:
+                baseline = self._latest(model, league, market, before=since)
+                if baseline is not None:
+                    totals = combine_totals(totals, _row_totals(baseline), sign=-1)
+        return totals
+
+    def get_metrics(self, model: str, market: str, league_id: Optional[int] = None,
+                    since: Optional[datetime] = None) -> Dict[str, Any]:
+        """Métricas de calibração atuais ou da janela desde `since`"""
+        return calibration_metrics(self.get_totals(model, market, league_id, since))
+
+    def current(self, model: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Métricas atuais de todas as chaves (uma linha por chave)"""
+        key_columns = (CalibrationAggregate.model, CalibrationAggregate.league_id, CalibrationAggregate.market)
+        keys = self.db.query(*key_columns).distinct()
+        if model is not None:
+            keys = keys.filter(CalibrationAggregate.model == model)
+
+        report = []
+        for row in self._latest_rows(tuple(k) for k in keys).values():
+            report.append({
+                'model': row.model, 'league_id': row.league_id, 'market': row.market,
+                'updated_at': row.created_at.isoformat(),
+                **calibration_metrics(_row_totals(row))
+            })
+        return sorted(report, key=lambda r: (r['model'], r['league_id'], r['market']))
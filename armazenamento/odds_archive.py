@@ -0,0 +1,328 @@
+# Arquivo colunar de histórico de odds do MaraBet AI
+#
+# Layout em disco (particionamento hive, 100% local/offline):
+#
+#   <root>/league_id=39/month=2024-01/part-<id>.parquet
+#
+# Cada ficheiro é ordenado por (fixture_id, timestamp) e escrito em row groups
+# pequenos, para que os filtros por liga/mês eliminem partições inteiras e os
+# filtros por fixture/tempo usem as estatísticas dos row groups. `kickoff` (início
+# da partida, nulo em ficheiros antigos) delimita as odds de fecho pré-jogo.
+from typing import Dict, Iterable, List, Mapping, Optional
+from datetime import datetime
+from pathlib import Path
+import json
+import logging
+import uuid
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    from pyarrow import fs as pafs
+except ImportError:
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SCHEMA_FIELDS = [
+    ('fixture_id', 'int64'),
+    ('bookmaker', 'string'),
+    ('market', 'string'),
+    ('selection', 'string'),
+    ('odd', 'float64'),
+    ('timestamp', 'timestamp[us]'),
+    ('kickoff', 'timestamp[us]'),
+]
+
+# Colunas de partição (hive) acrescentadas pelo dataset
+PARTITION_FIELDS = [('league_id', 'int32'), ('month', 'string')]
+
+# Seleções h2h/totals -> colunas usadas pelo backtesting e pelas features
+SELECTION_COLUMNS = {
+    ('h2h', 'Home'): 'home_odd',
+    ('h2h', 'Draw'): 'draw_odd',
+    ('h2h', 'Away'): 'away_odd',
+    ('totals', 'Over'): 'over_odd',
+    ('totals', 'Under'): 'under_odd',
+}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow é necessário para o arquivo de odds: pip install pyarrow")
+
+
+class OddsArchive:
+    """Arquivo Parquet particionado por liga e mês, com consultas por intervalo de tempo"""
+
+    STATE_FILE = '_export_state.json'
+
+    def __init__(self, root_dir: str, row_group_size: int = 64_000):
+        _require_pyarrow()
+        self.root = Path(root_dir)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.row_group_size = row_group_size
+        self.schema = pa.schema(
+            [(name, pa.type_for_alias(type_name)) for name, type_name in ARCHIVE_SCHEMA_FIELDS]
+        )
+        # Leitura por memory-map: os column chunks não são copiados para o heap
+        self.filesystem = pafs.LocalFileSystem(use_mmap=True)
+
+    # ------------------------------------------------------------------ escrita
+
+    def _partition_dir(self, league_id: int, month: str) -> Path:
+        return self.root / f"league_id={int(league_id)}" / f"month={month}"
+
+    def write(self, df: pd.DataFrame) -> int:
+        """Escreve observações de odds nas partições correspondentes
+
+        Args:
+            df: DataFrame com league_id, fixture_id, bookmaker, market,
+                selection, odd, timestamp e (opcional) kickoff
+
+        Returns:
+            Número de linhas escritas
+        """
+        if df.empty:
+            return 0
+
+        df = df.copy()
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df['kickoff'] = pd.to_datetime(df['kickoff']) if 'kickoff' in df.columns else pd.NaT
+        df['month'] = df['timestamp'].dt.strftime('%Y-%m')
+
+        written = 0
+        for (league_id, month), part in df.groupby(['league_id', 'month'], sort=False):
+            part = part.sort_values(['fixture_id', 'timestamp'], kind='mergesort')
+            table = pa.Table.from_pandas(
+                part[[name for name, _ in ARCHIVE_SCHEMA_FIELDS]],
+                schema=self.schema,
+                preserve_index=False
+            )
+
+            target = self._partition_dir(league_id, month)
+            target.mkdir(parents=True, exist_ok=True)
+            pq.write_table(
+                table,
+                target / f"part-{datetime.utcnow():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}.parquet",
+                row_group_size=self.row_group_size,
+                compression='zstd'
+            )
+            written += len(part)
+
+        return written
+
+    def compact(self, league_id: int, month: str) -> int:
+        """Junta os ficheiros de uma partição num único ficheiro ordenado"""
+        target = self._partition_dir(league_id, month)
+        files = sorted(target.glob('part-*.parquet'))
+        if len(files) <= 1:
+            return len(files)
+
+        table = pa.concat_tables([self._conform(pq.read_table(f, memory_map=True)) for f in files])
+        table = table.sort_by([('fixture_id', 'ascending'), ('timestamp', 'ascending')])
+
+        tmp = target / f"compact-{uuid.uuid4().hex[:8]}.tmp"
+        pq.write_table(table, tmp, row_group_size=self.row_group_size, compression='zstd')
+        for f in files:
+            f.unlink()
+        tmp.rename(target / f"part-{datetime.utcnow():%Y%m%d%H%M%S}-compact.parquet")
+        return 1
+
+    def _conform(self, table):
+        """Alinha ficheiros antigos (sem kickoff) ao schema atual"""
+        for field in self.schema:
+            if field.name not in table.column_names:
+                table = table.append_column(field, pa.nulls(len(table), field.type))
+        return table.select(self.schema.names).cast(self.schema)
+
+    # ----------------------------------------------------------------- exportação
+
+    def _load_state(self) -> Dict:
+        path = self.root / self.STATE_FILE
+        if path.exists():
+            return json.loads(path.read_text())
+        return {}
+
+    def _save_state(self, state: Dict):
+        (self.root / self.STATE_FILE).write_text(json.dumps(state, indent=2))
+
+    def export_from_db(self, db, batch_size: int = 50_000, until: Optional[datetime] = None) -> Dict:
+        """Exporta incrementalmente odds do banco operacional para o arquivo
+
+        Lê `odds_movements` e a tabela legada `odds` (juntando `matches` para
+        obter a liga e o kickoff) a partir da última marca d'água exportada.
+
+        Args:
+            db: Sessão SQLAlchemy do banco operacional
+            batch_size: Linhas por lote lido do banco
+            until: Exporta apenas até este instante (default: agora)
+
+        Returns:
+            Resumo da exportação por tabela
+        """
+        from armazenamento.banco_de_dados import Match, Odds, OddsMovement
+
+        until = until or datetime.utcnow()
+        state = self._load_state()
+        summary = {}
+
+        for model in (OddsMovement, Odds):
+            table_name = model.__tablename__
+            since = state.get(table_name)
+            since = datetime.fromisoformat(since) if since else None
+
+            query = db.query(
+                Match.league_id, model.fixture_id, model.bookmaker, model.market,
+                model.selection, model.odd, model.timestamp, Match.date.label('kickoff')
+            ).join(Match, Match.fixture_id == model.fixture_id).filter(model.timestamp <= until)
+            if since is not None:
+                query = query.filter(model.timestamp > since)
+
+            rows = 0
+            batch = []
+            for row in query.order_by(model.timestamp).yield_per(batch_size):
+                batch.append(row._asdict())
+                if len(batch) >= batch_size:
+                    rows += self.write(pd.DataFrame(batch))
+                    batch = []
+            if batch:
+                rows += self.write(pd.DataFrame(batch))
+
+            state[table_name] = until.isoformat()
+            summary[table_name] = rows
+            logger.info(f"Arquivo de odds: {rows} linhas exportadas de {table_name}")
+
+        self._save_state(state)
+        return summary
+
+    # -------------------------------------------------------------------- leitura
+
+    def dataset(self):
+        # Schema explícito: ficheiros sem kickoff são lidos com a coluna nula
+        partition_schema = pa.schema(
+            [(name, pa.type_for_alias(type_name)) for name, type_name in PARTITION_FIELDS]
+        )
+        return ds.dataset(
+            str(self.root),
+            format='parquet',
+            schema=pa.unify_schemas([self.schema, partition_schema]),
+            partitioning=ds.partitioning(partition_schema, flavor='hive'),
+            filesystem=self.filesystem,
+            exclude_invalid_files=True,
+            ignore_prefixes=['_', '.']
+        )
+
+    def _build_filter(self, league_ids, start, end, fixture_ids, markets, bookmakers):
+        conditions = []
+        if league_ids is not None:
+            conditions.append(ds.field('league_id').isin([int(x) for x in league_ids]))
+        if start is not None:
+            start = pd.Timestamp(start)
+            conditions.append(ds.field('month') >= start.strftime('%Y-%m'))
+            conditions.append(ds.field('timestamp') >= pa.scalar(start.to_pydatetime(), pa.timestamp('us')))
+        if end is not None:
+            end = pd.Timestamp(end)
+            conditions.append(ds.field('month') <= end.strftime('%Y-%m'))
+            conditions.append(ds.field('timestamp') <= pa.scalar(end.to_pydatetime(), pa.timestamp('us')))
+        if fixture_ids is not None:
+            conditions.append(ds.field('fixture_id').isin([int(x) for x in fixture_ids]))
+        if markets is not None:
+            conditions.append(ds.field('market').isin(list(markets)))
+        if bookmakers is not None:
+            conditions.append(ds.field('bookmaker').isin(list(bookmakers)))
+
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def query(self,
+              league_ids: Optional[Iterable[int]] = None,
+              start: Optional[datetime] = None,
+              end: Optional[datetime] = None,
+              fixture_ids: Optional[Iterable[int]] = None,
+              markets: Optional[Iterable[str]] = None,
+              bookmakers: Optional[Iterable[str]] = None,
+              columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Consulta o arquivo com predicate pushdown
+
+        Filtros de liga e mês eliminam partições; filtros de fixture, tempo,
+        mercado e casa de apostas são avaliados sobre as estatísticas dos
+        row groups antes de qualquer coluna ser lida.
+        """
+        if not any(self.root.glob('league_id=*')):
+            return pd.DataFrame(columns=columns or ['league_id'] + [n for n, _ in ARCHIVE_SCHEMA_FIELDS])
+
+        table = self.dataset().to_table(
+            columns=columns,
+            filter=self._build_filter(league_ids, start, end, fixture_ids, markets, bookmakers)
+        )
+        df = table.to_pandas()
+        if 'month' in df.columns and (columns is None or 'month' not in columns):
+            df = df.drop(columns='month')
+        return df
+
+    def closing_lines(self, kickoffs: Optional[Mapping[int, datetime]] = None, **filters) -> pd.DataFrame:
+        """Último preço pré-jogo de cada (fixture, bookmaker, market, selection)
+
+        Observações a partir do kickoff (odds ao vivo) são descartadas antes
+        de tomar o último preço. O kickoff vem da coluna arquivada ou de
+        `kickoffs` (fixture_id -> início), que tem precedência.
+        """
+        df = self.query(**filters)
+        if df.empty:
+            return df
+
+        kickoff = pd.to_datetime(df['kickoff'])
+        if kickoffs is not None:
+            kickoff = pd.to_datetime(df['fixture_id'].map(pd.Series(kickoffs, dtype=object))).fillna(kickoff)
+        unknown = kickoff.isna()
+        if unknown.any():
+            logger.warning(
+                f"Arquivo de odds: {df.loc[unknown, 'fixture_id'].nunique()} partidas sem kickoff; "
+                f"as odds de fecho podem incluir preços ao vivo"
+            )
+        df = df[unknown | (df['timestamp'] < kickoff)]
+        if df.empty:
+            return df
+
+        df = df.sort_values(['fixture_id', 'timestamp'], kind='mergesort')
+        return df.groupby(
+            ['fixture_id', 'bookmaker', 'market', 'selection'], as_index=False, sort=False
+        ).last()
+
+    def closing_odds_frame(self, bookmaker: Optional[str] = None,
+                           kickoffs: Optional[Mapping[int, datetime]] = None, **filters) -> pd.DataFrame:
+        """Odds de fecho em formato largo (uma linha por fixture)
+
+        Retorna fixture_id, league_id, date e as colunas home_odd, draw_odd,
+        away_odd, over_odd e under_odd (média entre casas quando `bookmaker`
+        não é informado), no formato usado pelo backtesting e pelas features.
+        """
+        if bookmaker is not None:
+            filters['bookmakers'] = [bookmaker]
+        filters.setdefault('markets', sorted({market for market, _ in SELECTION_COLUMNS}))
+
+        closing = self.closing_lines(kickoffs=kickoffs, **filters)
+        columns = ['fixture_id', 'league_id', 'date'] + list(SELECTION_COLUMNS.values())
+        if closing.empty:
+            return pd.DataFrame(columns=columns)
+
+        closing['column'] = [
+            SELECTION_COLUMNS.get((m, s)) for m, s in zip(closing['market'], closing['selection'])
+        ]
+        closing = closing.dropna(subset=['column'])
+
+        wide = closing.pivot_table(index='fixture_id', columns='column', values='odd', aggfunc='mean')
+        meta = closing.groupby('fixture_id').agg(league_id=('league_id', 'first'), date=('timestamp', 'max'))
+        wide = meta.join(wide).reset_index()
+
+        for column in columns:
+            if column not in wide.columns:
+                wide[column] = float('nan')
+        return wide[columns]
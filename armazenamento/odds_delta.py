@@ -0,0 +1,342 @@
+# Armazenamento delta de odds do MaraBet AI
+#
+# Em vez de gravar uma linha por observação, guardamos o último preço visto
+# por (fixture, bookmaker, market, selection) e só persistimos movimentos de
+# preço em `odds_movements`. O snapshot completo em qualquer instante é
+# reconstruído a partir do último delta anterior a esse instante.
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+from itertools import islice
+import logging
+
+from sqlalchemy import and_, func
+
+from armazenamento.banco_de_dados import OddsMovement
+
+logger = logging.getLogger(__name__)
+
+OddsKey = Tuple[int, str, str, str]
+
+
+def make_odds_key(fixture_id: Any, bookmaker: Any, market: Any, selection: Any) -> OddsKey:
+    """Normaliza a chave (fixture, bookmaker, market, selection)"""
+    return (int(fixture_id), str(bookmaker), str(market), str(selection))
+
+
+def flatten_bookmaker_odds(odds_list: Iterable[Dict]) -> List[Dict]:
+    """Converte o formato bookmakers/markets/outcomes em observações planas"""
+    observations = []
+    for odds_data in odds_list:
+        fixture_id = odds_data.get('fixture_id')
+        if fixture_id is None:
+            continue
+
+        for bookmaker in odds_data.get('bookmakers', []):
+            for market in bookmaker.get('markets', []):
+                for outcome in market.get('outcomes', []):
+                    if outcome.get('price') is None:
+                        continue
+                    observations.append({
+                        'fixture_id': fixture_id,
+                        'bookmaker': bookmaker.get('title'),
+                        'market': market.get('key'),
+                        'selection': outcome.get('name'),
+                        'odd': outcome.get('price')
+                    })
+    return observations
+
+
+class OddsChangeDetector:
+    """Detecta mudanças de preço mantendo o último valor visto por seleção
+
+    O estado fica em memória e, se um cliente Redis for fornecido, também num
+    hash partilhado entre workers, para que um processo recém-iniciado não
+    regrave preços que outro worker já persistiu. A memória guarda no máximo
+    `max_entries` chaves, descartando as atualizadas há mais tempo; o Redis
+    (ou `OddsDeltaStore.warm_up`) repõe o que for preciso.
+    """
+
+    REDIS_KEY = 'marabet:odds:last_seen'
+
+    def __init__(self, redis_client=None, tolerance: float = 1e-6, max_entries: Optional[int] = 200_000):
+        self.redis_client = redis_client
+        self.tolerance = tolerance
+        self.max_entries = max_entries
+        self._last_seen: Dict[OddsKey, float] = {}
+        self.stats = {'observed': 0, 'changed': 0}
+
+    @staticmethod
+    def _redis_field(key: OddsKey) -> str:
+        return '|'.join(str(part) for part in key)
+
+    def _load_from_redis(self, keys: List[OddsKey]):
+        """Preenche a memória com preços conhecidos no Redis"""
+        if not self.redis_client or not keys:
+            return
+
+        try:
+            values = self.redis_client.hmget(self.REDIS_KEY, [self._redis_field(k) for k in keys])
+        except Exception as e:
+            logger.warning(f"Redis indisponível para detecção de odds: {e}")
+            return
+
+        self._remember({key: float(value) for key, value in zip(keys, values) if value is not None})
+
+    def _remember(self, prices: Dict[OddsKey, float]):
+        """Atualiza a memória mantendo a ordem de atualização e o limite de chaves"""
+        for key, price in prices.items():
+            self._last_seen.pop(key, None)
+            self._last_seen[key] = price
+        if self.max_entries is not None:
+            excess = len(self._last_seen) - self.max_entries
+            for key in list(islice(self._last_seen, max(excess, 0))):
+                del self._last_seen[key]
+
+    def _store_in_redis(self, changes: Dict[OddsKey, float]):
+        if not self.redis_client or not changes:
+            return
+
+        try:
+            self.redis_client.hset(
+                self.REDIS_KEY,
+                mapping={self._redis_field(k): repr(v) for k, v in changes.items()}
+            )
+        except Exception as e:
+            logger.warning(f"Erro ao atualizar últimas odds no Redis: {e}")
+
+    def prime(self, prices: Dict[OddsKey, float]):
+        """Inicializa o estado com preços já persistidos"""
+        self._remember(prices)
+
+    def last_price(self, key: OddsKey) -> Optional[float]:
+        return self._last_seen.get(key)
+
+    def forget_fixture(self, fixture_id: int) -> int:
+        """Descarta o estado de uma partida encerrada"""
+        return self.forget_fixtures([fixture_id])
+
+    def forget_fixtures(self, fixture_ids: Iterable[int]) -> int:
+        """Descarta o estado (memória e Redis) de várias partidas encerradas
+
+        No Redis são apagados também os campos gravados por outros workers.
+        """
+        fixture_ids = {int(f) for f in fixture_ids}
+        if not fixture_ids:
+            return 0
+
+        keys = [k for k in self._last_seen if k[0] in fixture_ids]
+        for key in keys:
+            del self._last_seen[key]
+        removed = {self._redis_field(k) for k in keys}
+
+        if self.redis_client:
+            try:
+                # Uma única partida: o Redis filtra pelo prefixo do campo
+                match = f"{next(iter(fixture_ids))}|*" if len(fixture_ids) == 1 else None
+                fields = set()
+                for field, _ in self.redis_client.hscan_iter(self.REDIS_KEY, match=match):
+                    field = field.decode() if isinstance(field, bytes) else field
+                    if int(field.split('|', 1)[0]) in fixture_ids:
+                        fields.add(field)
+                if fields:
+                    self.redis_client.hdel(self.REDIS_KEY, *fields)
+                removed |= fields
+            except Exception as e:
+                logger.warning(f"Erro ao limpar odds no Redis: {e}")
+
+        return len(removed)
+
+    def find_changes(self, observations: Iterable[Dict], timestamp: Optional[datetime] = None) -> List[Dict]:
+        """Retorna as observações cujo preço mudou, sem as marcar como vistas
+
+        Os deltas devolvidos só passam a contar como último preço depois de
+        `apply`, chamado pelo chamador após gravar os deltas com sucesso: se
+        a gravação falhar, o mesmo movimento volta a ser detectado.
+
+        Args:
+            observations: Dicts com fixture_id, bookmaker, market, selection e odd
+            timestamp: Instante da coleta (default: agora, UTC)
+
+        Returns:
+            Lista de deltas (fixture_id, bookmaker, market, selection, odd, timestamp)
+        """
+        timestamp = timestamp or datetime.utcnow()
+
+        # Dentro do mesmo lote prevalece a última observação de cada chave
+        latest: Dict[OddsKey, Tuple[float, datetime]] = {}
+        for obs in observations:
+            odd = obs.get('odd')
+            if odd is None:
+                continue
+            key = make_odds_key(obs['fixture_id'], obs['bookmaker'], obs['market'], obs['selection'])
+            latest[key] = (float(odd), obs.get('timestamp') or timestamp)
+
+        self.stats['observed'] += len(latest)
+
+        unknown = [k for k in latest if k not in self._last_seen]
+        self._load_from_redis(unknown)
+
+        deltas = []
+        for key, (odd, observed_at) in latest.items():
+            previous = self._last_seen.get(key)
+            if previous is not None and abs(previous - odd) <= self.tolerance:
+                continue
+
+            deltas.append({
+                'fixture_id': key[0],
+                'bookmaker': key[1],
+                'market': key[2],
+                'selection': key[3],
+                'odd': odd,
+                'timestamp': observed_at
+            })
+
+        return deltas
+
+    def apply(self, deltas: List[Dict]):
+        """Marca como vistos os deltas já gravados (memória e Redis)"""
+        changes = {
+            make_odds_key(d['fixture_id'], d['bookmaker'], d['market'], d['selection']): d['odd']
+            for d in deltas
+        }
+        self._remember(changes)
+        self._store_in_redis(changes)
+        self.stats['changed'] += len(changes)
+
+    def detect(self, observations: Iterable[Dict], timestamp: Optional[datetime] = None) -> List[Dict]:
+        """find_changes seguido de apply, para quem não persiste os deltas"""
+        deltas = self.find_changes(observations, timestamp)
+        self.apply(deltas)
+        return deltas
+
+
+class OddsDeltaStore:
+    """Persiste movimentos de odds e reconstrói snapshots em qualquer instante"""
+
+    def __init__(self, db, detector: Optional[OddsChangeDetector] = None, best_price_index=None):
+        """
+        Args:
+            db: Sessão SQLAlchemy
+            detector: Detector de mudanças (partilhado entre coletas)
+            best_price_index: BestPriceIndex atualizado com todos os preços vistos
+        """
+        self.db = db
+        self.detector = detector or OddsChangeDetector()
+        self.best_price_index = best_price_index
+
+    def _latest_movements(self, fixture_ids: Optional[List[int]] = None, at: Optional[datetime] = None):
+        """Query com o último movimento de cada chave até `at`"""
+        key_columns = (
+            OddsMovement.fixture_id, OddsMovement.bookmaker,
+            OddsMovement.market, OddsMovement.selection
+        )
+
+        latest = self.db.query(*key_columns, func.max(OddsMovement.timestamp).label('last_ts'))
+        if fixture_ids is not None:
+            latest = latest.filter(OddsMovement.fixture_id.in_(fixture_ids))
+        if at is not None:
+            latest = latest.filter(OddsMovement.timestamp <= at)
+        latest = latest.group_by(*key_columns).subquery()
+
+        return self.db.query(OddsMovement).join(latest, and_(
+            OddsMovement.fixture_id == latest.c.fixture_id,
+            OddsMovement.bookmaker == latest.c.bookmaker,
+            OddsMovement.market == latest.c.market,
+            OddsMovement.selection == latest.c.selection,
+            OddsMovement.timestamp == latest.c.last_ts
+        ))
+
+    def warm_up(self, fixture_ids: Optional[List[int]] = None) -> int:
+        """Carrega no detector o último preço persistido de cada seleção"""
+        rows = self._latest_movements(fixture_ids).all()
+        self.detector.prime({
+            make_odds_key(r.fixture_id, r.bookmaker, r.market, r.selection): r.odd
+            for r in rows
+        })
+        if self.best_price_index is not None:
+            for r in rows:
+                self.best_price_index.update(r.fixture_id, r.bookmaker, r.market, r.selection, r.odd)
+        return len(rows)
+
+    def record(self, observations: Iterable[Dict], timestamp: Optional[datetime] = None) -> int:
+        """Grava apenas os movimentos de preço num único bulk insert
+
+        Returns:
+            Número de deltas gravados
+        """
+        observations = list(observations)
+        deltas = self.detector.find_changes(observations, timestamp)
+        if deltas:
+            self.db.bulk_insert_mappings(OddsMovement, deltas)
+            self.db.commit()
+            # Só depois do commit: se a gravação falhar o movimento não se perde
+            self.detector.apply(deltas)
+
+        # O índice recebe também os preços repetidos: um processo recém-iniciado
+        # não tem neles deltas, mas precisa do preço atual de cada casa
+        if self.best_price_index is not None:
+            for obs in observations:
+                self.best_price_index.update(obs['fixture_id'], obs['bookmaker'], obs['market'],
+                                             obs['selection'], obs.get('odd'))
+        return len(deltas)
+
+    def snapshot_at(self, fixture_id: int, at: Optional[datetime] = None) -> List[Dict]:
+        """Reconstrói todas as odds de uma partida tal como estavam em `at`"""
+        rows = self._latest_movements([fixture_id], at).order_by(
+            OddsMovement.bookmaker, OddsMovement.market, OddsMovement.selection, OddsMovement.id
+        ).all()
+
+        # Deltas com o mesmo timestamp: prevalece o último inserido
+        snapshot = {}
+        for r in rows:
+            snapshot[make_odds_key(r.fixture_id, r.bookmaker, r.market, r.selection)] = {
+                'fixture_id': r.fixture_id,
+                'bookmaker': r.bookmaker,
+                'market': r.market,
+                'selection': r.selection,
+                'odd': r.odd,
+                'timestamp': r.timestamp
+            }
+
+        return list(snapshot.values())
+
+    def snapshots_at(self, fixture_ids: List[int], at: Optional[datetime] = None) -> Dict[int, List[Dict]]:
+        """snapshot_at para várias partidas numa única consulta"""
+        rows = self._latest_movements(list(fixture_ids), at).order_by(
+            OddsMovement.fixture_id, OddsMovement.bookmaker, OddsMovement.market,
+            OddsMovement.selection, OddsMovement.id
+        ).all()
+
+        snapshots: Dict[int, Dict[OddsKey, Dict]] = {}
+        for r in rows:
+            snapshots.setdefault(r.fixture_id, {})[
+                make_odds_key(r.fixture_id, r.bookmaker, r.market, r.selection)
+            ] = {
+                'fixture_id': r.fixture_id,
+                'bookmaker': r.bookmaker,
+                'market': r.market,
+                'selection': r.selection,
+                'odd': r.odd,
+                'timestamp': r.timestamp
+            }
+
+        return {fixture_id: list(entries.values()) for fixture_id, entries in snapshots.items()}
+
+    def history(self, fixture_id: int, market: Optional[str] = None,
+                start: Optional[datetime] = None,
+                end: Optional[datetime] = None) -> Dict[OddsKey, List[Tuple[datetime, float]]]:
+        """Série compacta (timestamp, preço) por seleção, para line movement"""
+        query = self.db.query(OddsMovement).filter(OddsMovement.fixture_id == fixture_id)
+        if market is not None:
+            query = query.filter(OddsMovement.market == market)
+        if start is not None:
+            query = query.filter(OddsMovement.timestamp >= start)
+        if end is not None:
+            query = query.filter(OddsMovement.timestamp <= end)
+
+        series: Dict[OddsKey, List[Tuple[datetime, float]]] = {}
+        for r in query.order_by(OddsMovement.timestamp, OddsMovement.id):
+            key = make_odds_key(r.fixture_id, r.bookmaker, r.market, r.selection)
+            series.setdefault(key, []).append((r.timestamp, r.odd))
+
+        return series
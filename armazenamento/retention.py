@@ -0,0 +1,381 @@
+# Motor de retenção de dados do MaraBet AI
+#
+# Substitui o VACUUM completo e os DELETE sem limite da manutenção por uma
+# limpeza online: cada tabela é podada em lotes pequenos, percorridos pelo
+# índice da coluna temporal, com uma transação curta por lote e uma pausa
+# entre lotes para os coletores poderem escrever. As linhas de odds/partidas
+# são arquivadas em ficheiros comprimidos antes de serem apagadas.
+#
+# SQLite: o espaço é devolvido com `PRAGMA incremental_vacuum(N)` depois de
+# cada lote (requer auto_vacuum=INCREMENTAL, ver enable_incremental_vacuum).
+# Postgres: tabelas particionadas por mês (<tabela>_pYYYYMM) perdem as
+# partições antigas inteiras com DETACH + DROP, sem DELETE linha a linha.
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import gzip
+import json
+import logging
+import os
+import time
+import uuid
+
+import pandas as pd
+from sqlalchemy import DateTime, bindparam, inspect, text
+
+logger = logging.getLogger(__name__)
+
+SQLITE_AUTO_VACUUM_INCREMENTAL = 2
+
+
+@dataclass
+class RetentionPolicy:
+    """Política de retenção de uma tabela
+
+    Args:
+        table: Nome da tabela
+        time_column: Coluna temporal indexada usada para o corte
+        max_age: Idade máxima das linhas
+        archive: 'odds' (OddsArchive em Parquet), 'rows' (JSONL gzip) ou None
+        where: Condição SQL adicional (ex.: apenas partidas terminadas)
+        key_column: Chave primária usada para apagar cada lote
+        keep_unsettled: Preserva linhas de partidas com predições ainda não
+            liquidadas (a liquidação lê a partida e as odds)
+    """
+    table: str
+    time_column: str
+    max_age: timedelta
+    archive: Optional[str] = None
+    where: Optional[str] = None
+    key_column: str = 'id'
+    keep_unsettled: bool = False
+
+
+# Odds antes de partidas: o arquivo de odds precisa da liga da partida
+DEFAULT_POLICIES = [
+    RetentionPolicy('odds_movements', 'timestamp', timedelta(days=180), archive='odds',
+                    keep_unsettled=True),
+    RetentionPolicy('odds', 'timestamp', timedelta(days=90), archive='odds', keep_unsettled=True),
+    RetentionPolicy('matches', 'date', timedelta(days=730), archive='rows',
+                    where="status IN ('FT', 'AET', 'PEN')", keep_unsettled=True),
+    RetentionPolicy('application_logs', 'created_at', timedelta(days=30)),
+    RetentionPolicy('user_sessions', 'last_activity', timedelta(days=7)),
+    RetentionPolicy('cache_data', 'expires_at', timedelta(days=1)),
+    RetentionPolicy('performance_metrics', 'created_at', timedelta(days=90)),
+]
+
+
+class RetentionEngine:
+    """Poda online em lotes com arquivo prévio e métricas de throughput/locks
+
+    Args:
+        engine: Engine SQLAlchemy do banco operacional
+        archive_dir: Diretório dos arquivos JSONL comprimidos
+        odds_archive_dir: Diretório do OddsArchive (Parquet)
+        batch_size: Linhas apagadas por transação
+        pause: Pausa entre lotes (cede o lock de escrita aos coletores)
+        vacuum_pages: Páginas devolvidas por incremental_vacuum após cada lote
+        max_batches: Limite de lotes por tabela e execução (None = até esgotar)
+    """
+
+    def __init__(self, engine, archive_dir: str = 'data/retention_archive',
+                 odds_archive_dir: str = 'data/odds_archive', batch_size: int = 2000,
+                 pause: float = 0.05, vacuum_pages: int = 500, max_batches: Optional[int] = None):
+        self.engine = engine
+        self.archive_dir = Path(archive_dir)
+        self.odds_archive_dir = odds_archive_dir
+        self.batch_size = batch_size
+        self.pause = pause
+        self.vacuum_pages = vacuum_pages
+        self.max_batches = max_batches
+        self.dialect = engine.dialect.name
+        self._odds_archive = None
+
+    # ------------------------------------------------------------------ SQLite
+
+    def auto_vacuum_mode(self) -> Optional[int]:
+        if self.dialect != 'sqlite':
+            return None
+        with self.engine.connect() as conn:
+            return conn.exec_driver_sql('PRAGMA auto_vacuum').scalar()
+
+    def enable_incremental_vacuum(self, convert: bool = False) -> Dict[str, Any]:
+        """Ativa auto_vacuum=INCREMENTAL no SQLite
+
+        Num banco já existente o modo só muda após um VACUUM; com
+        `convert=True` esse VACUUM único é executado (para uma janela de
+        manutenção). Depois disso, nunca mais é necessário um VACUUM completo.
+        """
+        if self.dialect != 'sqlite':
+            return {'supported': False}
+        with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            before = conn.exec_driver_sql('PRAGMA auto_vacuum').scalar()
+            if before != SQLITE_AUTO_VACUUM_INCREMENTAL:
+                conn.exec_driver_sql('PRAGMA auto_vacuum = INCREMENTAL')
+                if convert:
+                    conn.exec_driver_sql('VACUUM')
+            after = conn.exec_driver_sql('PRAGMA auto_vacuum').scalar()
+        pending = after != SQLITE_AUTO_VACUUM_INCREMENTAL
+        if pending:
+            logger.warning("auto_vacuum=INCREMENTAL pendente: requer um VACUUM único (convert=True)")
+        return {'supported': True, 'mode_before': before, 'mode': after, 'conversion_pending': pending}
+
+    def _incremental_vacuum(self, conn) -> int:
+        if self.dialect != 'sqlite' or not self.vacuum_pages:
+            return 0
+        free_before = conn.exec_driver_sql('PRAGMA freelist_count').scalar()
+        # executescript corre o pragma até ao fim (execute só liberta uma página por passo)
+        conn.connection.driver_connection.executescript(f'PRAGMA incremental_vacuum({int(self.vacuum_pages)});')
+        return free_before - conn.exec_driver_sql('PRAGMA freelist_count').scalar()
+
+    # ------------------------------------------------------------------- poda
+
+    def run(self, policies: Optional[List[RetentionPolicy]] = None, now: Optional[datetime] = None) -> Dict[str, Dict]:
+        """Aplica as políticas; devolve as métricas por tabela"""
+        now = now or datetime.utcnow()
+        tables = set(inspect(self.engine).get_table_names())
+        results = {}
+        for policy in policies or DEFAULT_POLICIES:
+            if policy.table not in tables:
+                continue
+            cutoff = now - policy.max_age
+            try:
+                if self.dialect == 'postgresql' and self._is_partitioned(policy.table):
+                    results[policy.table] = self.drop_partitions_before(policy, cutoff)
+                else:
+                    results[policy.table] = self.prune(policy, cutoff)
+            except Exception as e:
+                logger.error(f"Erro na retenção de {policy.table}: {e}")
+                results[policy.table] = {'error': str(e)}
+        return results
+
+    def prune(self, policy: RetentionPolicy, cutoff: datetime) -> Dict[str, Any]:
+        """Apaga em lotes as linhas anteriores a `cutoff`, arquivando-as antes"""
+        select_sql = self._select_sql(policy)
+        delete_sql = text(
+            f"DELETE FROM {policy.table} WHERE {policy.key_column} IN :ids"
+        ).bindparams(bindparam('ids', expanding=True))
+
+        stats = {'rows_deleted': 0, 'rows_archived': 0, 'batches': 0, 'lock_wait_seconds': 0.0,
+                 'max_lock_wait_seconds': 0.0, 'vacuumed_pages': 0}
+        start = time.perf_counter()
+
+        with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            while self.max_batches is None or stats['batches'] < self.max_batches:
+                # Leitura fora do lock de escrita: as linhas antigas já não mudam
+                rows = [dict(row._mapping) for row in conn.execute(
+                    select_sql, {'cutoff': cutoff, 'limit': self.batch_size}
+                )]
+                if not rows:
+                    break
+
+                if policy.archive:
+                    stats['rows_archived'] += self._archive(policy, rows)
+
+                lock_wait = self._begin_write(conn, policy.table)
+                try:
+                    deleted = conn.execute(delete_sql, {'ids': [r[policy.key_column] for r in rows]}).rowcount
+                    conn.exec_driver_sql('COMMIT')
+                except Exception:
+                    conn.exec_driver_sql('ROLLBACK')
+                    raise
+
+                stats['rows_deleted'] += deleted
+                stats['batches'] += 1
+                stats['lock_wait_seconds'] += lock_wait
+                stats['max_lock_wait_seconds'] = max(stats['max_lock_wait_seconds'], lock_wait)
+                stats['vacuumed_pages'] += self._incremental_vacuum(conn)
+
+                if len(rows) < self.batch_size:
+                    break
+                if self.pause:
+                    time.sleep(self.pause)
+
+        elapsed = time.perf_counter() - start
+        stats['elapsed_seconds'] = elapsed
+        stats['rows_per_second'] = stats['rows_deleted'] / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"Retenção {policy.table}: {stats['rows_deleted']} linhas em {stats['batches']} lotes "
+            f"({stats['rows_per_second']:.0f} linhas/s, espera por locks {stats['lock_wait_seconds']:.3f}s)"
+        )
+        return stats
+
+    def _unsettled_condition(self) -> Optional[str]:
+        """Condição que exclui partidas com predições sem liquidação"""
+        tables = set(inspect(self.engine).get_table_names())
+        if 'predictions' not in tables:
+            return None
+        if 'settled_predictions' in tables:
+            return (
+                "NOT EXISTS (SELECT 1 FROM predictions p "
+                "LEFT JOIN settled_predictions s ON s.prediction_id = p.id "
+                "WHERE p.fixture_id = t.fixture_id AND s.prediction_id IS NULL)"
+            )
+        return "NOT EXISTS (SELECT 1 FROM predictions p WHERE p.fixture_id = t.fixture_id)"
+
+    def _select_sql(self, policy: RetentionPolicy):
+        conditions = f"t.{policy.time_column} < :cutoff"
+        if policy.where:
+            conditions += f" AND ({policy.where})"
+        if policy.keep_unsettled:
+            unsettled = self._unsettled_condition()
+            if unsettled:
+                conditions += f" AND {unsettled}"
+        if policy.archive == 'odds':
+            columns = "t.*, COALESCE(m.league_id, 0) AS league_id, m.date AS kickoff"
+            source = f"{policy.table} t LEFT JOIN matches m ON m.fixture_id = t.fixture_id"
+        elif policy.archive:
+            columns, source = 't.*', f"{policy.table} t"
+        else:
+            columns, source = f"t.{policy.key_column}", f"{policy.table} t"
+        return text(
+            f"SELECT {columns} FROM {source} WHERE {conditions} "
+            f"ORDER BY t.{policy.time_column} LIMIT :limit"
+        ).bindparams(bindparam('cutoff', type_=DateTime()))
+
+    def _begin_write(self, conn, table: str) -> float:
+        """Abre a transação do lote adquirindo já o lock de escrita; devolve a espera"""
+        start = time.perf_counter()
+        if self.dialect == 'sqlite':
+            conn.exec_driver_sql('BEGIN IMMEDIATE')
+        else:
+            conn.exec_driver_sql('BEGIN')
+            if self.dialect == 'postgresql':
+                conn.exec_driver_sql(f'LOCK TABLE {table} IN ROW EXCLUSIVE MODE')
+        return time.perf_counter() - start
+
+    # ---------------------------------------------------------------- arquivo
+
+    def _archive(self, policy: RetentionPolicy, rows: List[Dict[str, Any]]) -> int:
+        if policy.archive == 'odds':
+            return self._archive_odds(policy, rows)
+        return self._archive_rows(policy.table, rows)
+
+    def _archive_odds(self, policy: RetentionPolicy, rows: List[Dict[str, Any]]) -> int:
+        from armazenamento.odds_archive import OddsArchive
+
+        if self._odds_archive is None:
+            self._odds_archive = OddsArchive(self.odds_archive_dir)
+        df = pd.DataFrame(rows)
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+
+        # Linhas já exportadas por export_odds_archive não são duplicadas
+        watermark = self._odds_archive._load_state().get(policy.table)
+        if watermark:
+            df = df[df['timestamp'] > pd.Timestamp(datetime.fromisoformat(watermark))]
+        return self._odds_archive.write(df)
+
+    def _archive_rows(self, table: str, rows: List[Dict[str, Any]]) -> int:
+        target = self.archive_dir / table
+        target.mkdir(parents=True, exist_ok=True)
+        path = target / f"part-{datetime.utcnow():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}.jsonl.gz"
+        with open(path, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                for row in rows:
+                    f.write((json.dumps(row, default=str, ensure_ascii=False) + '\n').encode('utf-8'))
+            raw.flush()
+            os.fsync(raw.fileno())
+        return len(rows)
+
+    # --------------------------------------------------------------- Postgres
+
+    def _is_partitioned(self, table: str) -> bool:
+        with self.engine.connect() as conn:
+            return conn.execute(
+                text("SELECT relkind = 'p' FROM pg_class WHERE relname = :t"), {'t': table}
+            ).scalar() or False
+
+    def _has_kept_rows(self, partition: str) -> bool:
+        """True se a partição tem linhas de partidas com predições por liquidar"""
+        unsettled = self._unsettled_condition()
+        if not unsettled:
+            return False
+        kept = unsettled.replace('NOT EXISTS', 'EXISTS', 1)
+        with self.engine.connect() as conn:
+            return conn.execute(text(f"SELECT 1 FROM {partition} t WHERE {kept} LIMIT 1")).first() is not None
+
+    @staticmethod
+    def partition_name(table: str, month: datetime) -> str:
+        return f"{table}_p{month:%Y%m}"
+
+    def ensure_monthly_partitions(self, table: str, months_ahead: int = 2, start: Optional[datetime] = None) -> List[str]:
+        """Cria as partições mensais do mês corrente e dos próximos meses"""
+        month = (start or datetime.utcnow()).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        created = []
+        with self.engine.begin() as conn:
+            for _ in range(months_ahead + 1):
+                upper = _next_month(month)
+                name = self.partition_name(table, month)
+                conn.exec_driver_sql(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')"
+                )
+                created.append(name)
+                month = upper
+        return created
+
+    def drop_partitions_before(self, policy: RetentionPolicy, cutoff: datetime) -> Dict[str, Any]:
+        """Arquiva e remove as partições mensais inteiramente anteriores a `cutoff`"""
+        prefix = f"{policy.table}_p"
+        with self.engine.connect() as conn:
+            partitions = [row[0] for row in conn.execute(text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :t ORDER BY c.relname"
+            ), {'t': policy.table})]
+
+        stats = {'partitions_dropped': [], 'rows_archived': 0, 'rows_deleted': 0, 'lock_wait_seconds': 0.0}
+        start = time.perf_counter()
+        for name in partitions:
+            if not name.startswith(prefix):
+                continue
+            try:
+                month = datetime.strptime(name[len(prefix):], '%Y%m')
+            except ValueError:
+                continue
+            if _next_month(month) > cutoff:
+                continue
+
+            partition_policy = RetentionPolicy(name, policy.time_column, policy.max_age,
+                                               archive=policy.archive, key_column=policy.key_column,
+                                               where=policy.where, keep_unsettled=policy.keep_unsettled)
+            if policy.where or (policy.keep_unsettled and self._has_kept_rows(name)):
+                # Há linhas a preservar: a partição é podada em lotes e fica
+                pruned = self.prune(partition_policy, _next_month(month))
+                stats['rows_archived'] += pruned['rows_archived']
+                stats['rows_deleted'] += pruned['rows_deleted']
+                stats['lock_wait_seconds'] += pruned['lock_wait_seconds']
+                continue
+
+            if policy.archive:
+                select_sql = self._select_sql(partition_policy)
+                # Sem corte temporal: a partição inteira é anterior ao limite
+                with self.engine.connect() as conn:
+                    result = conn.execution_options(stream_results=True).execute(
+                        select_sql, {'cutoff': _next_month(month), 'limit': 2 ** 62}
+                    )
+                    while True:
+                        chunk = [dict(row._mapping) for row in result.fetchmany(self.batch_size)]
+                        if not chunk:
+                            break
+                        stats['rows_archived'] += self._archive(partition_policy, chunk)
+
+            with self.engine.begin() as conn:
+                lock_start = time.perf_counter()
+                conn.exec_driver_sql(f"ALTER TABLE {policy.table} DETACH PARTITION {name}")
+                stats['lock_wait_seconds'] += time.perf_counter() - lock_start
+                stats['rows_deleted'] += conn.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+                conn.exec_driver_sql(f"DROP TABLE {name}")
+            stats['partitions_dropped'].append(name)
+            logger.info(f"Retenção {policy.table}: partição {name} removida")
+
+        elapsed = time.perf_counter() - start
+        stats['elapsed_seconds'] = elapsed
+        stats['rows_per_second'] = stats['rows_deleted'] / elapsed if elapsed > 0 else 0.0
+        return stats
+
+
+def _next_month(month: datetime) -> datetime:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
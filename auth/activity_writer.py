@@ -0,0 +1,285 @@
+"""
+Escritor em lote para atividades e sessões de autenticação do MaraBet AI
+Acumula registos em memória e grava-os com bulk insert por tamanho ou tempo
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.exc import DisconnectionError, OperationalError, SQLAlchemyError
+from sqlalchemy.orm import Session, sessionmaker
+
+from auth.models import UserActivity, UserSession
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPILL_PATH = os.path.join('data', 'auth_audit_spill.jsonl')
+DEFAULT_QUARANTINE_PATH = os.path.join('data', 'auth_audit_quarantine.jsonl')
+
+
+class AuditWriter:
+    """Escritor assíncrono e em lote para UserActivity e UserSession
+
+    Os registos ficam num buffer e são gravados por um thread de fundo quando o
+    buffer atinge `max_batch` ou a cada `flush_interval` segundos, com um
+    bulk insert e um único commit por tabela. No encerramento, o que não for
+    possível gravar é escrito (com fsync) num ficheiro JSONL local e
+    recuperado no próximo arranque. Registos que o banco rejeita um a um vão
+    para um ficheiro de quarentena, para não bloquearem o resto do buffer.
+
+    Args:
+        session_factory: Fábrica de sessões; se omitida, é criada a partir do
+            bind da primeira sessão recebida
+        max_batch: Registos pendentes que disparam uma gravação imediata
+        flush_interval: Intervalo máximo entre gravações
+        max_buffer: Limite do buffer quando o banco está indisponível
+        spill_path: Ficheiro de spill local
+        quarantine_path: Ficheiro dos registos rejeitados pelo banco
+    """
+
+    MODELS = {'activity': UserActivity, 'session': UserSession}
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None,
+                 max_batch: int = 500, flush_interval: float = 2.0,
+                 max_buffer: int = 50000, spill_path: str = DEFAULT_SPILL_PATH,
+                 quarantine_path: str = DEFAULT_QUARANTINE_PATH):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.spill_path = Path(spill_path)
+        self.quarantine_path = Path(quarantine_path)
+
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in self.MODELS}
+        # Registos retirados do buffer por uma gravação ainda não confirmada
+        self._in_flight: Dict[str, int] = {kind: 0 for kind in self.MODELS}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'buffered': 0, 'written': 0, 'flushes': 0, 'failures': 0, 'spilled': 0, 'recovered': 0, 'quarantined': 0}
+
+    # ------------------------------------------------------------------
+    # Registo
+
+    def bind(self, db: Session):
+        """Usa o engine da sessão recebida se ainda não houver fábrica"""
+        if self.session_factory is None:
+            self.session_factory = sessionmaker(bind=db.get_bind())
+            self._recover_spill()
+
+    def add_activity(self, db: Optional[Session] = None, **row):
+        row.setdefault('created_at', datetime.utcnow())
+        self._add('activity', row, db)
+
+    def add_session(self, db: Optional[Session] = None, **row):
+        now = datetime.utcnow()
+        row.setdefault('is_active', True)
+        row.setdefault('created_at', now)
+        row.setdefault('last_activity', now)
+        self._add('session', row, db)
+
+    def _add(self, kind: str, row: Dict[str, Any], db: Optional[Session]):
+        if db is not None:
+            self.bind(db)
+        self._ensure_started()
+        with self._lock:
+            buffer = self._buffers[kind]
+            if len(buffer) >= self.max_buffer:
+                buffer.pop(0)
+                logger.warning(f"Buffer de auditoria cheio: registo de {kind} mais antigo descartado")
+            buffer.append(row)
+            self.stats['buffered'] += 1
+            pending = len(buffer)
+        if pending >= self.max_batch:
+            self._wakeup.set()
+
+    def pending(self, kind: Optional[str] = None) -> int:
+        """Registos ainda não gravados, incluindo os de uma gravação em curso"""
+        with self._lock:
+            if kind is not None:
+                return len(self._buffers[kind]) + self._in_flight[kind]
+            return sum(len(buffer) for buffer in self._buffers.values()) + sum(self._in_flight.values())
+
+    # ------------------------------------------------------------------
+    # Gravação
+
+    def flush(self, kinds: Optional[List[str]] = None) -> int:
+        """Grava os registos pendentes; devolve quantos foram escritos"""
+        if self.session_factory is None:
+            return 0
+        written = 0
+        with self._flush_lock:
+            for kind in kinds or list(self.MODELS):
+                with self._lock:
+                    rows, self._buffers[kind] = self._buffers[kind], []
+                    self._in_flight[kind] = len(rows)
+                if not rows:
+                    continue
+                try:
+                    written += self._write_batch(kind, rows)
+                finally:
+                    with self._lock:
+                        self._in_flight[kind] = 0
+        if written:
+            self.stats['written'] += written
+            self.stats['flushes'] += 1
+        return written
+
+    def _write_batch(self, kind: str, rows: List[Dict[str, Any]]) -> int:
+        """Grava um lote; se o banco rejeitar o lote, isola os registos inválidos"""
+        try:
+            self._write(kind, rows)
+            return len(rows)
+        except Exception as e:
+            self.stats['failures'] += 1
+            logger.error(f"Erro ao gravar {len(rows)} registos de {kind}: {e}")
+            if isinstance(e, (OperationalError, DisconnectionError)) or not isinstance(e, SQLAlchemyError):
+                # Banco indisponível: o lote inteiro volta para a próxima tentativa
+                self._requeue(kind, rows)
+                return 0
+
+        written, rejected = 0, []
+        for row in rows:
+            try:
+                self._write(kind, [row])
+                written += 1
+            except Exception as e:
+                rejected.append((row, e))
+        if not written:
+            # Nenhum registo passou: não há como distinguir um registo inválido de uma falha do banco
+            self._requeue(kind, rows)
+            return 0
+        self._quarantine(kind, rejected)
+        return written
+
+    def _requeue(self, kind: str, rows: List[Dict[str, Any]]):
+        """Devolve registos ao início do buffer para a próxima tentativa"""
+        with self._lock:
+            self._buffers[kind] = (rows + self._buffers[kind])[-self.max_buffer:]
+            self._in_flight[kind] = 0
+
+    def _write(self, kind: str, rows: List[Dict[str, Any]]):
+        db = self.session_factory()
+        try:
+            db.bulk_insert_mappings(self.MODELS[kind], rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='auth-audit-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Erro no escritor de auditoria: {e}")
+
+    def close(self):
+        """Para o thread, grava o que falta e faz spill do que não foi possível"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+        self._spill()
+
+    # ------------------------------------------------------------------
+    # Spill local
+
+    def _spill(self):
+        with self._lock:
+            leftovers = {kind: rows for kind, rows in self._buffers.items() if rows}
+            self._buffers = {kind: [] for kind in self.MODELS}
+        if not leftovers:
+            return
+
+        self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+        count = 0
+        with open(self.spill_path, 'a', encoding='utf-8') as f:
+            for kind, rows in leftovers.items():
+                for row in rows:
+                    f.write(json.dumps({'kind': kind, 'row': row}, default=_encode_datetime) + '\n')
+                    count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        self.stats['spilled'] += count
+        logger.warning(f"{count} registos de auditoria guardados em {self.spill_path}")
+
+    def _quarantine(self, kind: str, rejected: List):
+        if not rejected:
+            return
+        self.quarantine_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.quarantine_path, 'a', encoding='utf-8') as f:
+            for row, error in rejected:
+                f.write(json.dumps({'kind': kind, 'row': row, 'error': str(error)},
+                                   default=_encode_quarantined) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.stats['quarantined'] += len(rejected)
+        logger.error(f"{len(rejected)} registos de {kind} rejeitados pelo banco guardados em {self.quarantine_path}")
+
+    def _recover_spill(self):
+        """Recoloca no buffer os registos de um spill anterior"""
+        if not self.spill_path.exists():
+            return
+        recovered = 0
+        with open(self.spill_path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                row = {k: _decode_datetime(k, v) for k, v in entry['row'].items()}
+                with self._lock:
+                    self._buffers[entry['kind']].append(row)
+                recovered += 1
+        self.spill_path.unlink()
+        self.stats['recovered'] += recovered
+        if recovered:
+            logger.info(f"{recovered} registos de auditoria recuperados de {self.spill_path}")
+
+
+_DATETIME_FIELDS = ('created_at', 'expires_at', 'last_activity')
+
+
+def _encode_datetime(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(value)}")
+
+
+def _encode_quarantined(value):
+    # Um registo rejeitado pode trazer valores não serializáveis: guarda a representação
+    return value.isoformat() if isinstance(value, datetime) else repr(value)
+
+
+def _decode_datetime(key: str, value):
+    if key in _DATETIME_FIELDS and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+# Instância global
+audit_writer = AuditWriter()
+atexit.register(audit_writer.close)
@@ -4,7 +4,7 @@ Sistema completo de login, registro, gerenciamento de usuários
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
-from fastapi.security import HTTPBearer
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
@@ -17,7 +17,7 @@ from auth.models import (
     UserActivityResponse, UserSessionResponse, UserRole, UserStatus
 )
 from auth.jwt_auth import (
-    jwt_auth, authenticate_user, get_user_by_id, get_user_by_username,
+    jwt_auth, security, authenticate_user, get_user_by_id, get_user_by_username,
     get_user_by_email, create_user_session, get_active_session,
     deactivate_session, deactivate_all_user_sessions, cleanup_expired_sessions,
     get_current_user, get_current_active_user, require_role, require_superuser,
@@ -186,14 +186,15 @@ async def login_user(
 async def logout_user(
     request: Request,
     current_user: dict = Depends(get_current_active_user),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
     """
     Desloga usuário e invalida sessão
     """
     try:
-        # Aqui você pode implementar lógica para invalidar o token
-        # Por simplicidade, vamos apenas logar a atividade
+        # Revoga o token de acesso atual (propagado aos outros processos via Redis)
+        jwt_auth.revoke_token(credentials.credentials)
         
         log_user_activity(
             db, current_user["user_id"], "user_logout",
@@ -744,6 +745,7 @@ async def revoke_all_sessions(
     """
     try:
         count = deactivate_all_user_sessions(db, current_user["user_id"])
+        jwt_auth.revoke_user_tokens(current_user["user_id"])
         
         # Log da atividade
         log_user_activity(
@@ -13,8 +13,11 @@ from sqlalchemy.orm import Session
 from config_environment import get_config
 import secrets
 import hashlib
+import time
 
 from auth.models import User, UserSession, TokenData, UserRole, UserStatus
+from auth.activity_writer import audit_writer
+from auth.token_cache import token_cache, revocation_list
 
 # Configurações
 SECRET_KEY = get_config('security.jwt_secret_key')
@@ -22,6 +25,9 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+# Erro base de tokens (python-jose expõe JWTError; PyJWT, PyJWTError)
+JWTError = getattr(jwt, 'JWTError', getattr(jwt, 'PyJWTError', Exception))
+
 # Contexto de criptografia
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -31,11 +37,13 @@ security = HTTPBearer()
 class JWTAuth:
     """Classe principal para autenticação JWT"""
     
-    def __init__(self):
+    def __init__(self, token_cache=token_cache, revocation_list=revocation_list):
         self.secret_key = SECRET_KEY
         self.algorithm = ALGORITHM
         self.access_token_expire_minutes = ACCESS_TOKEN_EXPIRE_MINUTES
         self.refresh_token_expire_days = REFRESH_TOKEN_EXPIRE_DAYS
+        self.token_cache = token_cache
+        self.revocation_list = revocation_list
     
     def create_access_token(self, data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
         """Cria token de acesso JWT"""
@@ -46,7 +54,7 @@ class JWTAuth:
         else:
             expire = datetime.utcnow() + timedelta(minutes=self.access_token_expire_minutes)
         
-        to_encode.update({"exp": expire, "type": "access"})
+        to_encode.update({"exp": expire, "type": "access", "iat": time.time(), "jti": secrets.token_hex(16)})
         
         encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
         return encoded_jwt
@@ -60,13 +68,44 @@ class JWTAuth:
         else:
             expire = datetime.utcnow() + timedelta(days=self.refresh_token_expire_days)
         
-        to_encode.update({"exp": expire, "type": "refresh"})
+        to_encode.update({"exp": expire, "type": "refresh", "iat": time.time(), "jti": secrets.token_hex(16)})
         
         encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
         return encoded_jwt
     
     def verify_token(self, token: str, token_type: str = "access") -> Dict[str, Any]:
-        """Verifica e decodifica token JWT"""
+        """Verifica e decodifica token JWT
+        
+        Tokens já verificados são servidos do cache (sem nova verificação de
+        assinatura); a revogação é sempre consultada no filtro em memória.
+        """
+        payload = self.token_cache.get(token) if self.token_cache is not None else None
+        if payload is None:
+            payload = self._decode(token, token_type)
+            if self.token_cache is not None:
+                self.token_cache.put(token, payload)
+        elif payload.get("type") != token_type:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail=f"Token inválido: tipo esperado '{token_type}'"
+            )
+        
+        if self.revocation_list is not None and self.revocation_list.is_revoked(
+                self._token_id(token, payload), payload.get("user_id"), payload.get("iat")):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token revogado"
+            )
+        
+        return payload
+    
+    @staticmethod
+    def _token_id(token: str, payload: Dict[str, Any]) -> str:
+        """Identificador de revogação: jti ou, em tokens antigos, o digest do token"""
+        return payload.get("jti") or hashlib.sha256(token.encode('utf-8')).hexdigest()
+    
+    def _decode(self, token: str, token_type: str) -> Dict[str, Any]:
+        """Verifica a assinatura e as claims do token"""
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
             
@@ -92,7 +131,7 @@ class JWTAuth:
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token expirado"
             )
-        except jwt.JWTError:
+        except JWTError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token inválido"
@@ -106,6 +145,7 @@ class JWTAuth:
             "username": user.username,
             "role": user.role.value,
             "email": user.email,
+            "full_name": user.full_name,
             "is_verified": user.is_verified,
             "is_superuser": user.is_superuser
         }
@@ -141,11 +181,31 @@ class JWTAuth:
             "username": payload.get("username"),
             "role": payload.get("role"),
             "email": payload.get("email"),
+            "full_name": payload.get("full_name"),
             "is_verified": payload.get("is_verified"),
             "is_superuser": payload.get("is_superuser")
         }
         
         return self.create_access_token(token_data)
+    
+    def revoke_token(self, token: str) -> bool:
+        """Revoga um token até à sua expiração"""
+        try:
+            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        except JWTError:
+            # Expirado ou inválido: não há nada a revogar
+            return False
+        
+        if self.token_cache is not None:
+            self.token_cache.discard(token)
+        if self.revocation_list is not None and payload.get("exp") is not None:
+            self.revocation_list.revoke_token(self._token_id(token, payload), float(payload["exp"]))
+        return True
+    
+    def revoke_user_tokens(self, user_id: int):
+        """Revoga todos os tokens já emitidos para o usuário"""
+        if self.revocation_list is not None:
+            self.revocation_list.revoke_user(user_id)
 
 # Instância global
 jwt_auth = JWTAuth()
@@ -188,7 +248,11 @@ def get_user_by_email(db: Session, email: str) -> Optional[User]:
     return db.query(User).filter(User.email == email).first()
 
 def create_user_session(db: Session, user_id: int, ip_address: str = None, user_agent: str = None) -> UserSession:
-    """Cria nova sessão de usuário"""
+    """Cria nova sessão de usuário
+    
+    A sessão é gravada em lote pelo audit_writer; as leituras de sessões
+    gravam antes os registos pendentes, pelo que a sessão é visível de imediato.
+    """
     # Gera tokens únicos
     session_token = secrets.token_urlsafe(32)
     refresh_token = secrets.token_urlsafe(32)
@@ -196,7 +260,7 @@ def create_user_session(db: Session, user_id: int, ip_address: str = None, user_
     # Expiração da sessão (7 dias)
     expires_at = datetime.utcnow() + timedelta(days=7)
     
-    session = UserSession(
+    row = dict(
         user_id=user_id,
         session_token=session_token,
         refresh_token=refresh_token,
@@ -204,15 +268,19 @@ def create_user_session(db: Session, user_id: int, ip_address: str = None, user_
         user_agent=user_agent,
         expires_at=expires_at
     )
+    audit_writer.add_session(db, **row)
     
-    db.add(session)
-    db.commit()
-    db.refresh(session)
-    
-    return session
+    return UserSession(**row, is_active=True)
+
+def _flush_pending_sessions(db: Session):
+    """Garante que sessões ainda no buffer são visíveis para a consulta"""
+    if audit_writer.pending('session'):
+        audit_writer.bind(db)
+        audit_writer.flush(['session'])
 
 def get_active_session(db: Session, session_token: str) -> Optional[UserSession]:
     """Busca sessão ativa por token"""
+    _flush_pending_sessions(db)
     return db.query(UserSession).filter(
         UserSession.session_token == session_token,
         UserSession.is_active == True,
@@ -221,6 +289,7 @@ def get_active_session(db: Session, session_token: str) -> Optional[UserSession]
 
 def deactivate_session(db: Session, session_token: str) -> bool:
     """Desativa sessão"""
+    _flush_pending_sessions(db)
     session = db.query(UserSession).filter(
         UserSession.session_token == session_token
     ).first()
@@ -234,39 +303,57 @@ def deactivate_session(db: Session, session_token: str) -> bool:
 
 def deactivate_all_user_sessions(db: Session, user_id: int) -> int:
     """Desativa todas as sessões de um usuário"""
-    sessions = db.query(UserSession).filter(
+    _flush_pending_sessions(db)
+    count = db.query(UserSession).filter(
         UserSession.user_id == user_id,
         UserSession.is_active == True
-    ).all()
-    
-    count = 0
-    for session in sessions:
-        session.is_active = False
-        count += 1
+    ).update({UserSession.is_active: False}, synchronize_session=False)
     
     db.commit()
     return count
 
-def cleanup_expired_sessions(db: Session) -> int:
-    """Remove sessões expiradas"""
-    expired_sessions = db.query(UserSession).filter(
-        UserSession.expires_at < datetime.utcnow()
-    ).all()
-    
-    count = len(expired_sessions)
-    for session in expired_sessions:
-        db.delete(session)
+def cleanup_expired_sessions(db: Session, batch_size: int = 1000, max_batches: Optional[int] = None) -> int:
+    """Remove sessões expiradas em lotes incrementais
+    
+    Cada lote percorre o índice de expires_at a partir das sessões mais
+    antigas e apaga por chave primária, com um commit por lote, sem carregar
+    a tabela inteira nem manter uma transação longa.
+    
+    Args:
+        batch_size: Sessões apagadas por lote
+        max_batches: Limite de lotes por execução (None = até esgotar)
+    """
+    now = datetime.utcnow()
+    count = 0
+    batches = 0
+    
+    while max_batches is None or batches < max_batches:
+        ids = [row[0] for row in db.query(UserSession.id).filter(
+            UserSession.expires_at < now
+        ).order_by(UserSession.expires_at).limit(batch_size).all()]
+        if not ids:
+            break
+        
+        count += db.query(UserSession).filter(
+            UserSession.id.in_(ids)
+        ).delete(synchronize_session=False)
+        db.commit()
+        batches += 1
+        
+        if len(ids) < batch_size:
+            break
     
-    db.commit()
     return count
 
 # Dependências do FastAPI
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> TokenData:
     """Dependência para obter usuário atual do token"""
-    token = credentials.credentials
-    
+    return _authenticate(credentials.credentials, jwt_auth)
+
+def _authenticate(token: str, auth: JWTAuth) -> TokenData:
+    """Valida o token de acesso e devolve os dados do usuário (sem acesso ao banco)"""
     try:
-        payload = jwt_auth.verify_token(token, "access")
+        payload = auth.verify_token(token, "access")
         user_id = payload.get("user_id")
         username = payload.get("username")
         role = payload.get("role")
@@ -361,7 +448,7 @@ def verify_password_reset_token(token: str) -> Optional[int]:
         
         return payload.get("user_id")
         
-    except jwt.JWTError:
+    except JWTError:
         return None
 
 def generate_email_verification_token(user_id: int) -> str:
@@ -387,26 +474,22 @@ def verify_email_verification_token(token: str) -> Optional[int]:
         
         return payload.get("user_id")
         
-    except jwt.JWTError:
+    except JWTError:
         return None
 
 # Middleware para logging de atividades
 def log_user_activity(db: Session, user_id: int, activity_type: str, description: str = None, 
                      ip_address: str = None, user_agent: str = None, metadata: str = None):
-    """Registra atividade do usuário"""
-    from auth.models import UserActivity
-    
-    activity = UserActivity(
+    """Registra atividade do usuário (gravada em lote pelo audit_writer)"""
+    audit_writer.add_activity(
+        db,
         user_id=user_id,
         activity_type=activity_type,
         description=description,
         ip_address=ip_address,
         user_agent=user_agent,
-        metadata=metadata
+        activity_metadata=metadata
     )
-    
-    db.add(activity)
-    db.commit()
 
 # Função para validar força da senha
 def validate_password_strength(password: str) -> Dict[str, Any]:
@@ -462,3 +545,25 @@ def validate_password_strength(password: str) -> Dict[str, Any]:
         "feedback": feedback,
         "is_valid": score >= 3
     }
+
+def benchmark_authentication(n: int = 5000) -> Dict[str, float]:
+    """Mede autenticações por segundo no caminho de get_current_user
+    
+    Compara a verificação completa do JWT em cada pedido (comportamento
+    anterior) com o cache de tokens verificados e o filtro de revogação.
+    """
+    from auth.token_cache import VerifiedTokenCache, RevocationList
+    
+    results = {}
+    scenarios = (
+        ('uncached', JWTAuth(token_cache=None, revocation_list=None)),
+        ('cached', JWTAuth(token_cache=VerifiedTokenCache(), revocation_list=RevocationList())),
+    )
+    for label, auth in scenarios:
+        token = auth.create_access_token({"user_id": 1, "username": "benchmark", "role": UserRole.USER.value})
+        _authenticate(token, auth)
+        start = time.perf_counter()
+        for _ in range(n):
+            _authenticate(token, auth)
+        results[f'{label}_rps'] = n / (time.perf_counter() - start)
+    return results
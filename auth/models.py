@@ -145,7 +145,7 @@ class UserSession(Base):
     ip_address = Column(String(45), nullable=True)
     user_agent = Column(Text, nullable=True)
     is_active = Column(Boolean, default=True, nullable=False)
-    expires_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     last_activity = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
@@ -210,7 +210,8 @@ class UserActivity(Base):
     description = Column(Text, nullable=True)
     ip_address = Column(String(45), nullable=True)
     user_agent = Column(Text, nullable=True)
-    metadata = Column(Text, nullable=True)  # JSON com dados adicionais
+    # `metadata` é reservado no declarative: o atributo tem outro nome, a coluna mantém-se
+    activity_metadata = Column('metadata', Text, nullable=True)  # JSON com dados adicionais
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
     def __repr__(self):
@@ -225,7 +226,7 @@ class UserActivity(Base):
             "description": self.description,
             "ip_address": self.ip_address,
             "user_agent": self.user_agent,
-            "metadata": self.metadata,
+            "metadata": self.activity_metadata,
             "created_at": self.created_at.isoformat() if self.created_at else None
         }
 
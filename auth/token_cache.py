@@ -0,0 +1,322 @@
+"""
+Cache de tokens verificados e filtro de revogação para o MaraBet AI
+Evita a verificação de assinatura e o acesso ao banco no caminho quente da autenticação
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+REVOKED_TOKENS_KEY = 'marabet:auth:revoked'
+REVOKED_USERS_KEY = 'marabet:auth:revoked_users'
+
+
+def token_digest(token: str) -> bytes:
+    """Digest SHA-256 do token (o token em si nunca é guardado)"""
+    return hashlib.sha256(token.encode('utf-8')).digest()
+
+
+class VerifiedTokenCache:
+    """LRU limitado de digests de tokens verificados para as claims decodificadas
+
+    Cada entrada expira no menor entre o `exp` do token e `ttl` segundos após
+    a verificação, pelo que um token nunca é aceite depois de expirar.
+
+    Args:
+        maxsize: Número máximo de tokens em cache
+        ttl: Tempo máximo de vida de uma entrada em segundos
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: 'OrderedDict[bytes, Tuple[Dict[str, Any], float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = token_digest(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            claims, expires_at = entry
+            if now >= expires_at:
+                del self._entries[key]
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+        return dict(claims)
+
+    def put(self, token: str, claims: Dict[str, Any]):
+        exp = claims.get('exp')
+        if exp is None:
+            return
+        expires_at = min(float(exp), time.time() + self.ttl)
+        key = token_digest(token)
+        with self._lock:
+            self._entries[key] = (dict(claims), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def discard(self, token: str):
+        with self._lock:
+            self._entries.pop(token_digest(token), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'size': len(self._entries),
+            'hit_rate': self.stats['hits'] / total if total else 0.0
+        }
+
+
+class BloomFilter:
+    """Filtro de Bloom simples sobre um bytearray (double hashing com BLAKE2b)
+
+    Args:
+        capacity: Número de elementos previsto
+        error_rate: Taxa de falsos positivos desejada para essa capacidade
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def clear(self):
+        self._bits = bytearray(len(self._bits))
+        self.count = 0
+
+
+class RevocationList:
+    """Lista de revogação de tokens com filtro de Bloom local e conjunto no Redis
+
+    O Redis é a fonte de verdade partilhada entre processos: um sorted set
+    com os ids de tokens revogados (score = expiração do token) e um hash
+    com o instante de revogação global por usuário ("logout de todas as
+    sessões"). Cada processo mantém um filtro de Bloom com esses ids,
+    reconstruído a cada `sync_interval` segundos; um negativo do filtro
+    dispensa qualquer I/O e só os positivos (revogações reais ou falsos
+    positivos) são confirmados, primeiro no registo exato local e depois
+    no Redis.
+
+    Args:
+        redis_client: Cliente Redis (None = apenas local)
+        capacity: Capacidade prevista do filtro de Bloom
+        error_rate: Taxa de falsos positivos do filtro
+        sync_interval: Intervalo entre ressincronizações com o Redis
+        user_revocation_ttl: Duração de uma revogação por usuário (tempo de
+            vida máximo de um token)
+    """
+
+    def __init__(self, redis_client=None, capacity: int = 100000, error_rate: float = 0.001,
+                 sync_interval: float = 30.0, user_revocation_ttl: float = 7 * 24 * 3600):
+        self.redis = redis_client
+        self.sync_interval = sync_interval
+        self.user_revocation_ttl = user_revocation_ttl
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._tokens: Dict[str, float] = {}
+        self._users: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._last_sync = 0.0
+        self.stats = {'checks': 0, 'bloom_positives': 0, 'confirmed': 0, 'syncs': 0, 'redis_errors': 0}
+
+    # ------------------------------------------------------------------
+    # Revogação
+
+    def revoke_token(self, token_id: str, expires_at: float):
+        """Revoga um token até à sua expiração"""
+        now = time.time()
+        if expires_at <= now:
+            return
+        with self._lock:
+            self._tokens[token_id] = expires_at
+            self._bloom.add(f'jti:{token_id}')
+        if self.redis is not None:
+            try:
+                self.redis.zadd(REVOKED_TOKENS_KEY, {token_id: expires_at})
+            except Exception as e:
+                self.stats['redis_errors'] += 1
+                logger.warning(f"Erro ao registar revogação no Redis: {e}")
+
+    def revoke_user(self, user_id: Any, revoked_at: Optional[float] = None):
+        """Revoga todos os tokens do usuário emitidos até `revoked_at`"""
+        revoked_at = revoked_at if revoked_at is not None else time.time()
+        key = str(user_id)
+        with self._lock:
+            self._users[key] = max(revoked_at, self._users.get(key, 0.0))
+            self._bloom.add(f'user:{key}')
+        if self.redis is not None:
+            try:
+                self.redis.hset(REVOKED_USERS_KEY, key, revoked_at)
+            except Exception as e:
+                self.stats['redis_errors'] += 1
+                logger.warning(f"Erro ao registar revogação no Redis: {e}")
+
+    # ------------------------------------------------------------------
+    # Verificação
+
+    def is_revoked(self, token_id: Optional[str], user_id: Any = None, issued_at: Optional[float] = None) -> bool:
+        """Indica se o token foi revogado (sem I/O quando o filtro é negativo)"""
+        self.stats['checks'] += 1
+        if time.time() - self._last_sync >= self.sync_interval:
+            self.sync()
+
+        if token_id is not None and f'jti:{token_id}' in self._bloom:
+            self.stats['bloom_positives'] += 1
+            if self._confirm_token(token_id):
+                self.stats['confirmed'] += 1
+                return True
+
+        if user_id is not None and f'user:{user_id}' in self._bloom:
+            self.stats['bloom_positives'] += 1
+            revoked_at = self._confirm_user(str(user_id))
+            if revoked_at is not None and (issued_at or 0.0) <= revoked_at:
+                self.stats['confirmed'] += 1
+                return True
+
+        return False
+
+    def _confirm_token(self, token_id: str) -> bool:
+        now = time.time()
+        expires_at = self._tokens.get(token_id)
+        if expires_at is not None:
+            return expires_at > now
+        if self.redis is not None:
+            try:
+                score = self.redis.zscore(REVOKED_TOKENS_KEY, token_id)
+                return score is not None and float(score) > now
+            except Exception as e:
+                self.stats['redis_errors'] += 1
+                logger.warning(f"Erro ao confirmar revogação no Redis: {e}")
+        return False
+
+    def _confirm_user(self, user_id: str) -> Optional[float]:
+        revoked_at = self._users.get(user_id)
+        if self.redis is not None:
+            try:
+                value = self.redis.hget(REVOKED_USERS_KEY, user_id)
+                if value is not None:
+                    return max(float(value), revoked_at or 0.0)
+            except Exception as e:
+                self.stats['redis_errors'] += 1
+                logger.warning(f"Erro ao confirmar revogação no Redis: {e}")
+        return revoked_at
+
+    # ------------------------------------------------------------------
+    # Sincronização
+
+    def sync(self):
+        """Reconstrói o filtro a partir do Redis e descarta revogações expiradas"""
+        now = time.time()
+        self._last_sync = now
+        tokens = {tid: exp for tid, exp in self._tokens.items() if exp > now}
+        users = {uid: at for uid, at in self._users.items() if at + self.user_revocation_ttl > now}
+
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline()
+                pipe.zremrangebyscore(REVOKED_TOKENS_KEY, '-inf', now)
+                pipe.zrangebyscore(REVOKED_TOKENS_KEY, now, '+inf', withscores=True)
+                pipe.hgetall(REVOKED_USERS_KEY)
+                _, remote_tokens, remote_users = pipe.execute()
+                for tid, exp in remote_tokens:
+                    tokens[_text(tid)] = float(exp)
+                expired_users = []
+                for uid, at in remote_users.items():
+                    uid, at = _text(uid), float(at)
+                    if at + self.user_revocation_ttl > now:
+                        users[uid] = max(at, users.get(uid, 0.0))
+                    else:
+                        expired_users.append(uid)
+                if expired_users:
+                    self.redis.hdel(REVOKED_USERS_KEY, *expired_users)
+            except Exception as e:
+                self.stats['redis_errors'] += 1
+                logger.warning(f"Erro ao sincronizar revogações com o Redis: {e}")
+
+        bloom = BloomFilter(self._bloom.capacity, self._bloom.error_rate)
+        for tid in tokens:
+            bloom.add(f'jti:{tid}')
+        for uid in users:
+            bloom.add(f'user:{uid}')
+        with self._lock:
+            # Revogações locais feitas durante a sincronização não se perdem
+            for tid, exp in self._tokens.items():
+                if tid not in tokens and exp > now:
+                    tokens[tid] = exp
+                    bloom.add(f'jti:{tid}')
+            for uid, at in self._users.items():
+                if uid not in users and at + self.user_revocation_ttl > now:
+                    users[uid] = at
+                    bloom.add(f'user:{uid}')
+            self._tokens, self._users, self._bloom = tokens, users, bloom
+        self.stats['syncs'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, 'revoked_tokens': len(self._tokens), 'revoked_users': len(self._users)}
+
+
+def _text(value) -> str:
+    return value.decode('utf-8') if isinstance(value, bytes) else str(value)
+
+
+def _default_redis_client():
+    """Cliente Redis da configuração do ambiente (a ligação só é aberta no primeiro uso)"""
+    if not REDIS_AVAILABLE:
+        return None
+    try:
+        from config_environment import get_redis_url
+        return redis.Redis.from_url(get_redis_url(), socket_timeout=0.5, socket_connect_timeout=0.5)
+    except Exception as e:
+        logger.warning(f"Redis indisponível para revogações; a usar apenas registo local: {e}")
+        return None
+
+
+# Instâncias globais
+token_cache = VerifiedTokenCache()
+revocation_list = RevocationList(redis_client=_default_redis_client())
@@ -444,8 +444,25 @@ class BackupManager:
             logger.error(f"Erro na validação do backup {backup_id}: {e}")
             return False
     
+    def create_incremental_backup(self) -> Optional[Dict]:
+        """Backup incremental e deduplicado do banco de dados"""
+        if 'database' not in self.backup_paths:
+            return None
+        
+        from backup.incremental_backup import IncrementalBackup
+        
+        try:
+            manifest = IncrementalBackup(str(self.backup_dir / 'incremental')).backup(self.backup_paths['database'])
+            return {k: v for k, v in manifest.to_dict().items() if k not in ('chunks', 'changes')}
+        except Exception as e:
+            logger.error(f"Erro no backup incremental: {e}")
+            return None
+    
     def schedule_backups(self):
         """Agenda backups automáticos"""
+        # Backup incremental do banco a cada 15 minutos
+        schedule.every(15).minutes.do(self.create_incremental_backup)
+        
         # Backup diário às 2h
         schedule.every().day.at("02:00").do(self.create_backup, "daily")
         
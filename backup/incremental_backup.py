@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+Backups incrementais e deduplicados do banco SQLite do MaraBet AI
+Snapshot online em passos de páginas, chunks definidos pelo conteúdo e manifestos encadeados
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Tabela "gear" fixa: os cortes dependem apenas do conteúdo, nunca da execução
+_GEAR = np.random.default_rng(0x4D415241).integers(0, 2 ** 32, size=256, dtype=np.uint64)
+
+_CODEC_ZLIB = b'z'
+_CODEC_ZSTD = b's'
+
+
+def content_defined_chunks(stream, min_size: int = 16 * 1024, avg_size: int = 64 * 1024,
+                           max_size: int = 256 * 1024, window: int = 48,
+                           block_size: int = 4 * 1024 * 1024) -> Iterator[bytes]:
+    """Divide um ficheiro em chunks com fronteiras definidas pelo conteúdo
+
+    O hash é a soma, numa janela deslizante de `window` bytes, de valores
+    aleatórios por byte (calculada com numpy por diferença de somas
+    acumuladas). Há corte quando os bits baixos do hash são zero, pelo que
+    uma alteração local só muda os chunks que a rodeiam.
+    """
+    mask = np.uint64((1 << max(1, int(np.log2(max(avg_size - min_size, 2))))) - 1)
+    buffer = b''
+    eof = False
+    while not eof:
+        block = stream.read(block_size)
+        eof = not block
+        buffer += block
+        if not buffer:
+            break
+
+        data = np.frombuffer(buffer, dtype=np.uint8)
+        sums = np.cumsum(_GEAR[data], dtype=np.uint64)
+        rolling = sums.copy()
+        rolling[window:] -= sums[:-window]
+        # Posição i é candidata: o chunk termina em i + 1
+        candidates = np.flatnonzero((rolling & mask) == 0) + 1
+
+        start = 0
+        while True:
+            lower = start + min_size
+            idx = np.searchsorted(candidates, lower)
+            end = int(candidates[idx]) if idx < len(candidates) else None
+            if end is None or end - start > max_size:
+                end = start + max_size
+            if end > len(buffer):
+                if eof:
+                    end = len(buffer)
+                else:
+                    break
+            if end <= start:
+                break
+            yield buffer[start:end]
+            start = end
+            if start >= len(buffer):
+                break
+        buffer = buffer[start:]
+
+
+def _diff_chunks(parent: List[List], chunks: List[List]) -> List[List]:
+    """Operações que reconstroem `chunks` a partir de `parent` (ver BackupManifest)"""
+    positions: Dict[str, int] = {}
+    for i, (digest, _) in enumerate(parent):
+        positions.setdefault(digest, i)
+
+    ops: List[List] = []
+    run_start = run_len = 0
+    for digest, length in chunks:
+        # Continua a cópia em curso se o próximo chunk do pai coincidir
+        if run_len and run_start + run_len < len(parent) and parent[run_start + run_len][0] == digest:
+            run_len += 1
+            continue
+        if run_len:
+            ops.append(['c', run_start, run_len])
+            run_len = 0
+        position = positions.get(digest)
+        if position is not None:
+            run_start, run_len = position, 1
+        else:
+            ops.append(['n', digest, length])
+    if run_len:
+        ops.append(['c', run_start, run_len])
+    return ops
+
+
+class ChunkStore:
+    """Armazenamento local de chunks endereçados pelo SHA-256, comprimidos
+
+    Args:
+        root: Diretório do store
+        level: Nível de compressão (zstd se disponível, senão zlib)
+    """
+
+    def __init__(self, root: str, level: int = 3):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.level = level
+        self._compressor = zstandard.ZstdCompressor(level=level) if ZSTD_AVAILABLE else None
+
+    def path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def has(self, digest: str) -> bool:
+        return self.path(digest).exists()
+
+    def put(self, data: bytes) -> Tuple[str, int]:
+        """Guarda o chunk se ainda não existir; devolve (digest, bytes escritos)"""
+        digest = hashlib.sha256(data).hexdigest()
+        target = self.path(digest)
+        if target.exists():
+            # Renova o mtime: a retenção não apaga chunks reaproveitados há pouco
+            os.utime(target)
+            return digest, 0
+        if self._compressor is not None:
+            payload = _CODEC_ZSTD + self._compressor.compress(data)
+        else:
+            payload = _CODEC_ZLIB + zlib.compress(data, self.level)
+        target.parent.mkdir(exist_ok=True)
+        tmp = target.with_suffix(f'.{uuid.uuid4().hex[:8]}.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, target)
+        return digest, len(payload)
+
+    def get(self, digest: str) -> bytes:
+        payload = self.path(digest).read_bytes()
+        codec, body = payload[:1], payload[1:]
+        if codec == _CODEC_ZSTD:
+            if not ZSTD_AVAILABLE:
+                raise ImportError("zstandard é necessário para ler este chunk: pip install zstandard")
+            return zstandard.ZstdDecompressor().decompress(body)
+        return zlib.decompress(body)
+
+    def verify(self, digest: str) -> str:
+        """'ok', 'missing' ou 'corrupt'"""
+        try:
+            data = self.get(digest)
+        except FileNotFoundError:
+            return 'missing'
+        except Exception:
+            return 'corrupt'
+        return 'ok' if hashlib.sha256(data).hexdigest() == digest else 'corrupt'
+
+    def digests(self) -> Iterator[str]:
+        for path in self.root.glob('*/*'):
+            if not path.name.endswith('.tmp'):
+                yield path.name
+
+    def modified_at(self, digest: str) -> float:
+        return self.path(digest).stat().st_mtime
+
+    def remove(self, digest: str) -> int:
+        path = self.path(digest)
+        size = path.stat().st_size
+        path.unlink()
+        return size
+
+
+@dataclass
+class BackupManifest:
+    """Manifesto de um backup
+
+    Um manifesto completo lista todos os chunks; um incremental descreve a
+    lista face à do `parent` como operações: ['c', início, n] copia n chunks
+    do pai a partir de `início` e ['n', digest, tamanho] acrescenta um chunk.
+    """
+    backup_id: str
+    created_at: datetime
+    source: str
+    size: int
+    sha256: str
+    num_chunks: int
+    parent: Optional[str] = None
+    chunks: Optional[List[List]] = None
+    changes: Optional[List[List]] = None
+    new_chunks: int = 0
+    new_bytes: int = 0
+    duration_seconds: float = 0.0
+    snapshot_seconds: float = 0.0
+
+    @property
+    def is_full(self) -> bool:
+        return self.parent is None
+
+    def to_dict(self) -> Dict:
+        data = dict(self.__dict__)
+        data['created_at'] = self.created_at.isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'BackupManifest':
+        data = dict(data)
+        data['created_at'] = datetime.fromisoformat(data['created_at'])
+        return cls(**data)
+
+
+class IncrementalBackup:
+    """Backups incrementais de um banco SQLite com deduplicação de chunks
+
+    Cada backup tira um snapshot com a API de backup online do SQLite em
+    passos de `step_pages` páginas (os escritores só esperam durante um
+    passo), divide-o em chunks definidos pelo conteúdo e guarda apenas os
+    chunks novos. O manifesto é incremental em relação ao anterior, com um
+    manifesto completo a cada `full_every` backups para limitar a cadeia.
+
+    Args:
+        store_dir: Diretório raiz (chunks/, manifests/, staging/)
+        step_pages: Páginas copiadas por passo do backup online
+        step_sleep: Pausa entre passos do backup online
+        full_every: Backups entre manifestos completos
+        workers: Threads da verificação paralela
+    """
+
+    def __init__(self, store_dir: str = 'backups/incremental', step_pages: int = 1024,
+                 step_sleep: float = 0.005, full_every: int = 96, workers: int = 4,
+                 min_chunk: int = 16 * 1024, avg_chunk: int = 64 * 1024, max_chunk: int = 256 * 1024):
+        self.root = Path(store_dir)
+        self.store = ChunkStore(str(self.root / 'chunks'))
+        self.manifest_dir = self.root / 'manifests'
+        self.staging_dir = self.root / 'staging'
+        self.manifest_dir.mkdir(parents=True, exist_ok=True)
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        self.step_pages = step_pages
+        self.step_sleep = step_sleep
+        self.full_every = full_every
+        self.workers = workers
+        self.chunk_sizes = (min_chunk, avg_chunk, max_chunk)
+        self._lock = threading.Lock()
+        self._lock_path = self.root / '.lock'
+
+    @contextmanager
+    def _store_lock(self):
+        """Exclusão mútua entre threads e processos (workers Celery) sobre o store"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._lock_path, 'a') as handle:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    # ------------------------------------------------------------------
+    # Backup
+
+    def snapshot(self, source_db: str, target: Path) -> float:
+        """Cópia consistente com a API de backup online, em passos de páginas"""
+        start = time.perf_counter()
+        src = sqlite3.connect(source_db)
+        dst = sqlite3.connect(str(target))
+        try:
+            src.backup(dst, pages=self.step_pages, sleep=self.step_sleep)
+        finally:
+            dst.close()
+            src.close()
+        return time.perf_counter() - start
+
+    def backup(self, source_db: str) -> BackupManifest:
+        """Cria um backup incremental de `source_db`"""
+        with self._store_lock():
+            start = time.perf_counter()
+            created_at = datetime.utcnow()
+            backup_id = f"{created_at:%Y%m%dT%H%M%S%f}"
+            staging = self.staging_dir / f"{backup_id}.db"
+            try:
+                snapshot_seconds = self.snapshot(source_db, staging)
+
+                chunks = []
+                new_chunks = new_bytes = size = 0
+                file_hash = hashlib.sha256()
+                min_chunk, avg_chunk, max_chunk = self.chunk_sizes
+                with open(staging, 'rb') as f:
+                    for data in content_defined_chunks(f, min_chunk, avg_chunk, max_chunk):
+                        digest, written = self.store.put(data)
+                        chunks.append([digest, len(data)])
+                        file_hash.update(data)
+                        size += len(data)
+                        if written:
+                            new_chunks += 1
+                            new_bytes += written
+            finally:
+                if staging.exists():
+                    staging.unlink()
+
+            manifest = BackupManifest(
+                backup_id=backup_id, created_at=created_at, source=str(source_db), size=size,
+                sha256=file_hash.hexdigest(), num_chunks=len(chunks),
+                new_chunks=new_chunks, new_bytes=new_bytes, snapshot_seconds=snapshot_seconds
+            )
+            parent = self._latest()
+            if parent is not None and self._chain_length(parent) < self.full_every:
+                changes = _diff_chunks(self.resolve(parent.backup_id), chunks)
+                if len(changes) < len(chunks) // 2:
+                    manifest.parent = parent.backup_id
+                    manifest.changes = changes
+            if manifest.parent is None:
+                manifest.chunks = chunks
+
+            manifest.duration_seconds = time.perf_counter() - start
+            self._write_manifest(manifest)
+
+        logger.info(
+            f"Backup incremental {backup_id}: {size} bytes, {new_chunks}/{len(chunks)} chunks novos "
+            f"({new_bytes} bytes gravados) em {manifest.duration_seconds:.2f}s"
+        )
+        return manifest
+
+    # ------------------------------------------------------------------
+    # Manifestos
+
+    def _manifest_path(self, backup_id: str) -> Path:
+        return self.manifest_dir / f"{backup_id}.json"
+
+    def _write_manifest(self, manifest: BackupManifest):
+        path = self._manifest_path(manifest.backup_id)
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(manifest.to_dict(), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def load_manifest(self, backup_id: str) -> BackupManifest:
+        with open(self._manifest_path(backup_id)) as f:
+            return BackupManifest.from_dict(json.load(f))
+
+    def list_backups(self) -> List[BackupManifest]:
+        """Manifestos por ordem cronológica"""
+        return sorted(
+            (self.load_manifest(p.stem) for p in self.manifest_dir.glob('*.json')),
+            key=lambda m: m.created_at
+        )
+
+    def _latest(self) -> Optional[BackupManifest]:
+        backups = self.list_backups()
+        return backups[-1] if backups else None
+
+    def _chain_length(self, manifest: BackupManifest) -> int:
+        length = 1
+        while manifest.parent is not None:
+            manifest = self.load_manifest(manifest.parent)
+            length += 1
+        return length
+
+    def resolve(self, backup_id: str) -> List[List]:
+        """Lista completa de chunks de um backup, aplicando a cadeia de manifestos"""
+        chain = [self.load_manifest(backup_id)]
+        while chain[-1].parent is not None:
+            chain.append(self.load_manifest(chain[-1].parent))
+
+        chunks = list(chain[-1].chunks)
+        for manifest in reversed(chain[:-1]):
+            parent_chunks, chunks = chunks, []
+            for op in manifest.changes:
+                if op[0] == 'c':
+                    chunks.extend(parent_chunks[op[1]:op[1] + op[2]])
+                else:
+                    chunks.append([op[1], op[2]])
+            if len(chunks) != manifest.num_chunks:
+                raise ValueError(f"Cadeia de manifestos inconsistente em {manifest.backup_id}")
+        return chunks
+
+    def find(self, at: datetime) -> Optional[BackupManifest]:
+        """Último backup criado até `at`"""
+        candidates = [m for m in self.list_backups() if m.created_at <= at]
+        return candidates[-1] if candidates else None
+
+    # ------------------------------------------------------------------
+    # Restauração e verificação
+
+    def restore(self, target: str, backup_id: Optional[str] = None, at: Optional[datetime] = None) -> BackupManifest:
+        """Restaura um backup (por id, ou o último até `at`) para `target`"""
+        if backup_id is not None:
+            manifest = self.load_manifest(backup_id)
+        else:
+            manifest = self.find(at or datetime.utcnow())
+            if manifest is None:
+                raise FileNotFoundError(f"Nenhum backup até {at}")
+
+        target_path = Path(target)
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target_path.with_name(f".{target_path.name}.{uuid.uuid4().hex[:8]}.restore")
+        file_hash = hashlib.sha256()
+        try:
+            with open(tmp, 'wb') as f:
+                for digest, length in self.resolve(manifest.backup_id):
+                    data = self.store.get(digest)
+                    if len(data) != length:
+                        raise ValueError(f"Chunk {digest} com tamanho inesperado")
+                    file_hash.update(data)
+                    f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            if file_hash.hexdigest() != manifest.sha256:
+                raise ValueError(f"Checksum do backup {manifest.backup_id} não confere")
+            os.replace(tmp, target_path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+        logger.info(f"Backup {manifest.backup_id} restaurado em {target_path}")
+        return manifest
+
+    def verify(self, backup_id: Optional[str] = None, workers: Optional[int] = None) -> Dict:
+        """Verifica em paralelo os chunks de um backup (ou de todos)"""
+        manifests = [self.load_manifest(backup_id)] if backup_id else self.list_backups()
+        digests = sorted({digest for m in manifests for digest, _ in self.resolve(m.backup_id)})
+
+        with ThreadPoolExecutor(max_workers=workers or self.workers) as executor:
+            results = list(executor.map(self.store.verify, digests))
+
+        report = {
+            'backups': len(manifests),
+            'chunks_checked': len(digests),
+            'missing': [d for d, r in zip(digests, results) if r == 'missing'],
+            'corrupt': [d for d, r in zip(digests, results) if r == 'corrupt'],
+        }
+        report['valid'] = not report['missing'] and not report['corrupt']
+        return report
+
+    # ------------------------------------------------------------------
+    # Retenção
+
+    def prune(self, keep_within: timedelta = timedelta(days=7), keep_last: int = 4,
+              now: Optional[datetime] = None, grace: timedelta = timedelta(hours=1)) -> Dict:
+        """Remove backups antigos e os chunks que deixaram de ser referenciados
+
+        Manifestos mantidos cujo pai é removido passam a completos. Chunks
+        gravados ou reaproveitados há menos de `grace` nunca são apagados,
+        mesmo sem manifesto que os referencie (backup concorrente ainda sem manifesto).
+        """
+        with self._store_lock():
+            now = now or datetime.utcnow()
+            backups = self.list_backups()
+            keep = {
+                m.backup_id for i, m in enumerate(backups)
+                if m.created_at >= now - keep_within or i >= len(backups) - keep_last
+            }
+
+            for manifest in backups:
+                if manifest.backup_id in keep and manifest.parent is not None and manifest.parent not in keep:
+                    manifest.chunks = self.resolve(manifest.backup_id)
+                    manifest.parent = None
+                    manifest.changes = None
+                    self._write_manifest(manifest)
+            # Filhos são reescritos antes de apagar os pais
+            removed = [m.backup_id for m in backups if m.backup_id not in keep]
+            for backup_id in removed:
+                self._manifest_path(backup_id).unlink()
+
+            referenced = {digest for backup_id in keep for digest, _ in self.resolve(backup_id)}
+            cutoff = (now - grace).replace(tzinfo=timezone.utc).timestamp()
+            freed = chunks_removed = 0
+            for digest in list(self.store.digests()):
+                if digest not in referenced and self.store.modified_at(digest) < cutoff:
+                    freed += self.store.remove(digest)
+                    chunks_removed += 1
+
+        logger.info(f"Retenção de backups: {len(removed)} removidos, {chunks_removed} chunks ({freed} bytes)")
+        return {'backups_removed': removed, 'chunks_removed': chunks_removed, 'bytes_freed': freed}
+
+    def get_stats(self) -> Dict:
+        backups = self.list_backups()
+        stored = sum(p.stat().st_size for p in self.store.root.glob('*/*'))
+        logical = sum(m.size for m in backups)
+        return {
+            'backups': len(backups),
+            'logical_bytes': logical,
+            'stored_bytes': stored,
+            'dedup_ratio': logical / stored if stored else 0.0,
+            'latest': backups[-1].created_at.isoformat() if backups else None
+        }
@@ -1,11 +1,48 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import logging
+import re
 from .base_collector import BaseCollector
 from settings.settings import API_FOOTBALL_KEY, API_FOOTBALL_HOST, MONITORED_LEAGUES
 
 logger = logging.getLogger(__name__)
 
+# Nomes de mercado da API-Football -> chaves usadas no resto do sistema
+# (odds_movements, arquivo de odds, ValueFinder e liquidação das predições)
+API_FOOTBALL_MARKETS = {
+    'Match Winner': 'h2h',
+    'Goals Over/Under': 'totals',
+    'Both Teams Score': 'btts',
+}
+
+# Linha de gols implícita nas seleções 'Over'/'Under' sem linha
+DEFAULT_TOTALS_LINE = 2.5
+
+_TOTALS_VALUE = re.compile(r'^(Over|Under)\s+([0-9]+(?:\.[0-9]+)?)$')
+
+
+def normalize_odds_selection(bet_name: str, value: str) -> Optional[Tuple[str, str]]:
+    """Converte (mercado, valor) da API-Football em (market, selection) internos
+
+    A linha padrão de gols vira apenas 'Over'/'Under'; outras linhas mantêm o
+    número ('Over 1.5'). Mercados não usados pelo sistema retornam None.
+    """
+    market = API_FOOTBALL_MARKETS.get(bet_name)
+    if market is None or value is None:
+        return None
+
+    value = str(value).strip()
+    if market == 'totals':
+        match = _TOTALS_VALUE.match(value)
+        if match is None:
+            return None
+        line = float(match.group(2))
+        return market, match.group(1) if line == DEFAULT_TOTALS_LINE else f"{match.group(1)} {line:g}"
+
+    if value not in ('Home', 'Draw', 'Away', 'Yes', 'No'):
+        return None
+    return market, value
+
 class FootballCollector(BaseCollector):
     """Coletor para dados da API-Football"""
     
@@ -90,6 +127,49 @@ class FootballCollector(BaseCollector):
             logger.error(f"Erro ao coletar estatísticas da partida {fixture_id}: {e}")
             return {}
     
+    def collect_fixture(self, fixture_id: int) -> Dict:
+        """Coleta status e placar atuais de uma partida"""
+        params = {'id': fixture_id}
+        
+        try:
+            data = self._make_request('fixtures', params=params, headers=self.headers)
+            response = data.get('response', [])
+            return response[0] if response else {}
+        except Exception as e:
+            logger.error(f"Erro ao coletar partida {fixture_id}: {e}")
+            return {}
+    
+    def collect_fixture_odds(self, fixture_id: int) -> List[Dict]:
+        """Coleta odds de uma partida no formato bookmakers/markets/outcomes, com chaves internas"""
+        params = {'fixture': fixture_id}
+        
+        try:
+            data = self._make_request('odds', params=params, headers=self.headers)
+        except Exception as e:
+            logger.error(f"Erro ao coletar odds da partida {fixture_id}: {e}")
+            return []
+        
+        odds_list = []
+        for entry in data.get('response', []):
+            bookmakers = []
+            for bookmaker in entry.get('bookmakers', []):
+                markets: Dict[str, List[Dict]] = {}
+                for bet in bookmaker.get('bets', []):
+                    for value in bet.get('values', []):
+                        if value.get('odd') is None:
+                            continue
+                        normalized = normalize_odds_selection(bet.get('name'), value.get('value'))
+                        if normalized is None:
+                            continue
+                        market, selection = normalized
+                        markets.setdefault(market, []).append({'name': selection, 'price': float(value['odd'])})
+                bookmakers.append({
+                    'title': bookmaker.get('name'),
+                    'markets': [{'key': key, 'outcomes': outcomes} for key, outcomes in markets.items()]
+                })
+            odds_list.append({'fixture_id': fixture_id, 'bookmakers': bookmakers})
+        return odds_list
+    
     def collect_all_monitored_leagues(self, days: int = 7) -> List[Dict]:
         """Coleta partidas de todas as ligas monitoradas"""
         all_matches = []
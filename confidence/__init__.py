@@ -4,15 +4,31 @@ Cálculo e visualização de intervalos de confiança para previsões
 """
 
 from .confidence_calculator import ConfidenceCalculator
-from .uncertainty_analyzer import UncertaintyAnalyzer
-from .confidence_visualizer import ConfidenceVisualizer
 from .prediction_intervals import PredictionIntervals
 from .bootstrap_confidence import BootstrapConfidence
+from .interval_engine import IntervalEngine
+from .conformal_calibrator import OnlineConformalCalibrator, ConformalCalibratorRegistry, ReloadingCalibratorRegistry
+
+# Análise e visualização dependem de matplotlib/seaborn/plotly, opcionais para
+# quem só calcula intervalos (ex.: tarefas Celery de liquidação)
+try:
+    from .uncertainty_analyzer import UncertaintyAnalyzer
+except ImportError:
+    UncertaintyAnalyzer = None
+
+try:
+    from .confidence_visualizer import ConfidenceVisualizer
+except ImportError:
+    ConfidenceVisualizer = None
 
 __all__ = [
     'ConfidenceCalculator',
     'UncertaintyAnalyzer',
     'ConfidenceVisualizer',
     'PredictionIntervals',
-    'BootstrapConfidence'
+    'BootstrapConfidence',
+    'IntervalEngine',
+    'OnlineConformalCalibrator',
+    'ConformalCalibratorRegistry',
+    'ReloadingCalibratorRegistry'
 ]
@@ -14,6 +14,8 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import cross_val_score
 import warnings
 
+from .interval_engine import IntervalEngine, critical_values, tail_levels
+
 logger = logging.getLogger(__name__)
 
 class ConfidenceMethod(Enum):
@@ -376,20 +378,82 @@ class ConfidenceCalculator:
             Dicionário com intervalos para cada nível
         """
         try:
-            intervals = {}
+            predictions = np.array(predictions, dtype=float)
             
-            for level in confidence_levels:
-                interval = self.calculate_confidence_interval(
-                    predictions, method, level
-                )
-                intervals[level] = interval
+            # Amostra única depende dos parâmetros de cada método
+            if predictions.size <= 1:
+                return {
+                    level: self.calculate_confidence_interval(predictions, method, level)
+                    for level in confidence_levels
+                }
             
-            return intervals
+            # Estado calculado uma vez e consultado para todos os níveis
+            engine = IntervalEngine(predictions, self.bootstrap_samples)
+            return self.calculate_engine_intervals(engine, confidence_levels, method)
             
         except Exception as e:
             logger.error(f"❌ Erro ao calcular múltiplos níveis: {e}")
             return {}
     
+    def calculate_engine_intervals(self,
+                                   engine: IntervalEngine,
+                                   confidence_levels: List[float],
+                                   method: ConfidenceMethod = ConfidenceMethod.NORMAL) -> Dict[float, ConfidenceInterval]:
+        """
+        Intervalos de todos os níveis a partir de um IntervalEngine
+        
+        Equivalente a calculate_confidence_interval por nível, mas com
+        quantis e valores críticos vetorizados sobre o estado compartilhado.
+        """
+        levels = np.asarray(confidence_levels, dtype=float)
+        n = engine.n
+        df = None
+        
+        if method in (ConfidenceMethod.NORMAL, ConfidenceMethod.PREDICTION):
+            mean = np.full(len(levels), engine.mean)
+            if method == ConfidenceMethod.NORMAL:
+                standard_error = engine.sample_std / np.sqrt(n)
+            else:
+                standard_error = engine.sample_std * np.sqrt(1 + 1/n)
+            margin = critical_values(levels, n) * standard_error
+            lower, upper = mean - margin, mean + margin
+            df = n - 1 if n < 30 else None
+        elif method == ConfidenceMethod.BOOTSTRAP:
+            lower_q, upper_q = tail_levels(levels)
+            lower, upper = engine.bootstrap_quantile(lower_q), engine.bootstrap_quantile(upper_q)
+            mean = np.full(len(levels), np.mean(engine.bootstrap_means))
+            margin = (upper - lower) / 2
+            standard_error = np.std(engine.bootstrap_means)
+        elif method == ConfidenceMethod.QUANTILE:
+            lower_q, upper_q = tail_levels(levels)
+            lower, upper = engine.quantile(lower_q), engine.quantile(upper_q)
+            mean = np.full(len(levels), engine.mean)
+            margin = (upper - lower) / 2
+            standard_error = engine.std / np.sqrt(n)
+        elif method == ConfidenceMethod.BAYESIAN:
+            mean = np.full(len(levels), engine.mean)
+            margin = critical_values(levels, n, use_t=False) * engine.sample_std
+            lower, upper = mean - margin, mean + margin
+            standard_error = engine.sample_std / np.sqrt(n)
+        else:
+            raise ValueError(f"Método não suportado: {method}")
+        
+        margin = np.broadcast_to(margin, levels.shape)
+        return {
+            level: ConfidenceInterval(
+                prediction=float(mean[i]),
+                lower_bound=float(lower[i]),
+                upper_bound=float(upper[i]),
+                confidence_level=level,
+                margin_of_error=float(margin[i]),
+                method=method.value,
+                sample_size=n,
+                standard_error=float(standard_error),
+                degrees_of_freedom=df
+            )
+            for i, level in enumerate(confidence_levels)
+        }
+    
     def calculate_prediction_uncertainty(self,
                                        predictions: Union[List[float], np.ndarray],
                                        actual_values: Optional[Union[List[float], np.ndarray]] = None,
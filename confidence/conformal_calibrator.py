@@ -0,0 +1,365 @@
+"""
+Calibração Conformal Online - MaraBet AI
+Janela deslizante com decaimento temporal de resíduos para intervalos
+conformais consultados por previsão, sem job de recalibração offline
+"""
+
+import math
+import os
+import time
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+import joblib
+import numpy as np
+
+from .prediction_intervals import PredictionInterval
+
+logger = logging.getLogger(__name__)
+
+Timestamp = Union[None, float, int, datetime]
+
+# Acima deste expoente os pesos são rebaseados para evitar overflow
+_MAX_EXPONENT = 60.0
+
+
+def _to_seconds(timestamp: Timestamp) -> float:
+    if timestamp is None:
+        return time.time()
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    return float(timestamp)
+
+
+class _FenwickTree:
+    """Árvore de Fenwick de pesos por bin: soma e busca por prefixo em O(log n)"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.tree = [0.0] * (size + 1)
+        self.top = 1 << (size.bit_length() - 1)
+
+    def add(self, index: int, weight: float):
+        index += 1
+        while index <= self.size:
+            self.tree[index] += weight
+            index += index & -index
+
+    def search(self, target: float) -> int:
+        """Menor bin cujo peso acumulado atinge `target` (size se não houver)"""
+        position = 0
+        step = self.top
+        while step:
+            nxt = position + step
+            if nxt <= self.size and self.tree[nxt] < target:
+                position = nxt
+                target -= self.tree[nxt]
+            step >>= 1
+        return position
+
+
+class OnlineConformalCalibrator:
+    """
+    Calibrador conformal incremental (split conformal ponderado)
+
+    Os resíduos |real - previsto| são quantizados numa grade fina
+    (arredondando para cima, o que só alarga o intervalo) e guardados numa
+    árvore de Fenwick ordenada por valor: inserção, expiração e quantil
+    ponderado custam O(log n). O peso de cada resíduo decai com meia-vida
+    `half_life_days`; a janela descarta resíduos mais antigos que
+    `max_age_days` ou além de `max_size`. Os quantis por nível ficam em cache
+    até a próxima atualização, então a consulta por previsão é O(1).
+    """
+
+    def __init__(self,
+                 half_life_days: Optional[float] = 30.0,
+                 max_age_days: Optional[float] = 180.0,
+                 max_size: int = 5000,
+                 resolution: float = 1e-4,
+                 max_residual: float = 1.0,
+                 min_samples: int = 30):
+        """
+        Args:
+            half_life_days: Meia-vida do peso dos resíduos (None = sem decaimento)
+            max_age_days: Idade máxima na janela (None = sem limite)
+            max_size: Número máximo de resíduos na janela
+            resolution: Largura dos bins da grade de resíduos
+            max_residual: Maior resíduo finito; acima disso o bin é infinito
+            min_samples: Mínimo de resíduos para emitir intervalo finito
+        """
+        self.half_life_days = half_life_days
+        self.max_age_days = max_age_days
+        self.max_size = max_size
+        self.resolution = resolution
+        self.max_residual = max_residual
+        self.min_samples = min_samples
+
+        self.decay = math.log(2) / (half_life_days * 86400) if half_life_days else 0.0
+        self.max_age = max_age_days * 86400 if max_age_days else None
+        self.n_grid = int(round(max_residual / resolution))
+
+        self.reset()
+
+    def reset(self):
+        """Esvazia a janela de calibração"""
+        # Bins 0..n_grid são finitos; o último bin guarda resíduos acima de max_residual
+        self._tree = _FenwickTree(self.n_grid + 2)
+        self._window = deque()  # (timestamp, bin, peso)
+        self._total = 0.0
+        self._reference = None
+        self._latest = None
+        self._cache: Dict[float, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._window)
+
+    def _bin(self, residual: float) -> int:
+        residual = abs(residual)
+        if residual > self.max_residual:
+            return self.n_grid + 1
+        return min(int(math.ceil(residual / self.resolution - 1e-9)), self.n_grid)
+
+    def _bin_value(self, index: int) -> float:
+        return math.inf if index > self.n_grid else index * self.resolution
+
+    def _weight(self, timestamp: float) -> float:
+        return math.exp(self.decay * (timestamp - self._reference)) if self.decay else 1.0
+
+    def _rebase(self, timestamp: float):
+        """Move a referência dos pesos para perto de `timestamp` e reconstrói a árvore"""
+        self._reference = timestamp - (_MAX_EXPONENT / 2) / self.decay
+        entries = [(t, index) for t, index, _ in self._window]
+        self._tree = _FenwickTree(self.n_grid + 2)
+        self._window = deque()
+        self._total = 0.0
+        for t, index in entries:
+            weight = self._weight(t)
+            self._tree.add(index, weight)
+            self._window.append((t, index, weight))
+            self._total += weight
+
+    def _pop_oldest(self):
+        _, index, weight = self._window.popleft()
+        self._tree.add(index, -weight)
+        self._total -= weight
+
+    def _expire(self, now: float):
+        while len(self._window) > self.max_size:
+            self._pop_oldest()
+        if self.max_age is not None:
+            while self._window and self._window[0][0] < now - self.max_age:
+                self._pop_oldest()
+        if not self._window:
+            self._total = 0.0
+
+    def update_residual(self, residual: float, timestamp: Timestamp = None):
+        """Insere um resíduo de não-conformidade na janela"""
+        t = _to_seconds(timestamp)
+        if self._reference is None:
+            self._reference = t
+        elif self.decay and self.decay * (t - self._reference) > _MAX_EXPONENT:
+            self._rebase(t)
+
+        index = self._bin(residual)
+        weight = self._weight(t)
+        self._tree.add(index, weight)
+        self._window.append((t, index, weight))
+        self._total += weight
+
+        self._latest = t if self._latest is None else max(self._latest, t)
+        self._expire(self._latest)
+        self._cache.clear()
+
+    def update(self, prediction: float, actual: float, timestamp: Timestamp = None):
+        """Registra uma previsão liquidada (resíduo |real - previsto|)"""
+        self.update_residual(actual - prediction, timestamp)
+
+    def update_many(self, predictions: Iterable[float], actuals: Iterable[float],
+                    timestamps: Optional[Iterable[Timestamp]] = None):
+        """Registra um lote de previsões liquidadas"""
+        predictions = list(predictions)
+        timestamps = list(timestamps) if timestamps is not None else [None] * len(predictions)
+        for prediction, actual, timestamp in zip(predictions, actuals, timestamps):
+            self.update(prediction, actual, timestamp)
+
+    def advance(self, timestamp: Timestamp = None):
+        """Expira resíduos antigos sem inserir novos"""
+        now = _to_seconds(timestamp)
+        self._latest = now if self._latest is None else max(self._latest, now)
+        self._expire(self._latest)
+        self._cache.clear()
+
+    def quantile(self, confidence_level: float) -> float:
+        """
+        Raio conformal para o nível pedido
+
+        Menor resíduo r com peso acumulado >= nível x (W + w_teste), onde o
+        ponto de teste recebe o peso do instante mais recente. Sem decaimento
+        equivale ao quantil ceil((n+1)(1-alpha))/n do split conformal.
+        """
+        cached = self._cache.get(confidence_level)
+        if cached is not None:
+            return cached
+
+        if len(self._window) < self.min_samples:
+            radius = math.inf
+        else:
+            test_weight = self._weight(self._latest)
+            target = confidence_level * (self._total + test_weight)
+            index = self._tree.search(target) if target <= self._total else self.n_grid + 1
+            radius = self._bin_value(index)
+
+        self._cache[confidence_level] = radius
+        return radius
+
+    def interval(self, prediction: float, confidence_level: float = 0.95,
+                 bounds: Optional[Tuple[float, float]] = (0.0, 1.0)) -> Tuple[float, float]:
+        """Limites (inferior, superior) para uma previsão, recortados a `bounds`"""
+        radius = self.quantile(confidence_level)
+        lower, upper = prediction - radius, prediction + radius
+        if bounds is not None:
+            lower, upper = max(lower, bounds[0]), min(upper, bounds[1])
+        return lower, upper
+
+    def prediction_interval(self, prediction: float, confidence_level: float = 0.95,
+                            bounds: Optional[Tuple[float, float]] = (0.0, 1.0)) -> PredictionInterval:
+        """Intervalo no mesmo formato de PredictionIntervals"""
+        lower, upper = self.interval(prediction, confidence_level, bounds)
+        return PredictionInterval(
+            prediction=prediction,
+            lower_bound=lower,
+            upper_bound=upper,
+            confidence_level=confidence_level,
+            interval_width=upper - lower,
+            method="conformal_online",
+            sample_size=len(self._window)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'half_life_days': self.half_life_days,
+            'max_age_days': self.max_age_days,
+            'max_size': self.max_size,
+            'resolution': self.resolution,
+            'max_residual': self.max_residual,
+            'min_samples': self.min_samples,
+            'timestamps': np.array([t for t, _, _ in self._window], dtype=float),
+            'bins': np.array([index for _, index, _ in self._window], dtype=np.int32),
+            'latest': self._latest
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "OnlineConformalCalibrator":
+        calibrator = cls(
+            half_life_days=data['half_life_days'], max_age_days=data['max_age_days'],
+            max_size=data['max_size'], resolution=data['resolution'],
+            max_residual=data['max_residual'], min_samples=data['min_samples']
+        )
+        for t, index in zip(data['timestamps'], data['bins']):
+            calibrator.update_residual(calibrator._bin_value(int(index)), float(t))
+        if data['latest'] is not None:
+            calibrator.advance(data['latest'])
+        return calibrator
+
+
+class ConformalCalibratorRegistry:
+    """Um calibrador online por (modelo, mercado), persistido num único arquivo
+
+    `cursor` guarda a última predição liquidada já consumida
+    (settled_at, prediction_id), persistida junto com as janelas.
+    """
+
+    def __init__(self, **calibrator_params):
+        self.calibrator_params = calibrator_params
+        self.calibrators: Dict[Tuple[str, str], OnlineConformalCalibrator] = {}
+        self.cursor: Optional[Tuple[datetime, int]] = None
+
+    def get(self, model: str, market: str) -> OnlineConformalCalibrator:
+        key = (model, market)
+        if key not in self.calibrators:
+            self.calibrators[key] = OnlineConformalCalibrator(**self.calibrator_params)
+        return self.calibrators[key]
+
+    def update(self, model: str, market: str, prediction: float, actual: float,
+               timestamp: Timestamp = None):
+        self.get(model, market).update(prediction, actual, timestamp)
+
+    def interval(self, model: str, market: str, prediction: float,
+                 confidence_level: float = 0.95) -> Tuple[float, float]:
+        """Intervalo calibrado; chaves ainda sem histórico retornam [0, 1]"""
+        calibrator = self.calibrators.get((model, market))
+        if calibrator is None:
+            return 0.0, 1.0
+        return calibrator.interval(prediction, confidence_level)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'calibrator_params': self.calibrator_params,
+            'calibrators': {key: c.to_dict() for key, c in self.calibrators.items()},
+            'cursor': self.cursor
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ConformalCalibratorRegistry":
+        registry = cls(**data['calibrator_params'])
+        registry.calibrators = {
+            tuple(key): OnlineConformalCalibrator.from_dict(c) for key, c in data['calibrators'].items()
+        }
+        registry.cursor = data.get('cursor')
+        return registry
+
+    def save(self, filepath: str) -> None:
+        """Persiste as janelas (bins int32 + timestamps) de forma atômica"""
+        os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+        tmp_path = f"{filepath}.tmp"
+        joblib.dump(self.to_dict(), tmp_path, compress=3)
+        os.replace(tmp_path, filepath)
+
+    @classmethod
+    def load(cls, filepath: str, **calibrator_params) -> "ConformalCalibratorRegistry":
+        """Carrega o registro salvo ou cria um vazio se o arquivo não existir"""
+        if not os.path.exists(filepath):
+            return cls(**calibrator_params)
+        return cls.from_dict(joblib.load(filepath))
+
+
+class ReloadingCalibratorRegistry:
+    """Registro somente leitura para serviços de predição
+
+    Relê o arquivo gravado por settle_predictions quando ele muda, checando
+    o mtime no máximo a cada `reload_seconds`; cada processo do serviço
+    passa a usar as janelas atualizadas sem reiniciar.
+    """
+
+    def __init__(self, filepath: str, reload_seconds: float = 300.0, **calibrator_params):
+        self.filepath = filepath
+        self.reload_seconds = reload_seconds
+        self.calibrator_params = calibrator_params
+        self._registry: Optional[ConformalCalibratorRegistry] = None
+        self._mtime: Optional[float] = None
+        self._checked_at = -math.inf
+
+    @property
+    def registry(self) -> ConformalCalibratorRegistry:
+        now = time.monotonic()
+        if self._registry is None or now - self._checked_at >= self.reload_seconds:
+            self._checked_at = now
+            mtime = os.path.getmtime(self.filepath) if os.path.exists(self.filepath) else None
+            if self._registry is None or mtime != self._mtime:
+                try:
+                    self._registry = ConformalCalibratorRegistry.load(self.filepath, **self.calibrator_params)
+                    self._mtime = mtime
+                    logger.info(f"Calibração conformal carregada de {self.filepath}")
+                except Exception as e:
+                    # Mantém as janelas anteriores se o arquivo estiver indisponível
+                    logger.warning(f"Falha ao recarregar calibração conformal: {e}")
+                    if self._registry is None:
+                        self._registry = ConformalCalibratorRegistry(**self.calibrator_params)
+        return self._registry
+
+    def prediction_interval(self, model: str, market: str, prediction: float,
+                            confidence_level: float = 0.95) -> PredictionInterval:
+        """Intervalo conformal de `get(model, market)` para uma previsão"""
+        return self.registry.get(model, market).prediction_interval(prediction, confidence_level)
@@ -0,0 +1,148 @@
+"""
+Motor de Intervalos - MaraBet AI
+Estado compartilhado (amostras ordenadas, resíduos conformais, bootstrap)
+calculado uma vez por conjunto de previsões ou de erros
+"""
+
+import numpy as np
+import logging
+from typing import Optional, Tuple, Union, List
+import scipy.stats as stats
+
+logger = logging.getLogger(__name__)
+
+# Limite de índices sorteados por bloco no bootstrap vetorizado
+BOOTSTRAP_CHUNK_SIZE = 2_000_000
+
+ArrayLike = Union[List[float], np.ndarray]
+
+
+def sorted_quantile(sorted_values: np.ndarray, q: ArrayLike) -> np.ndarray:
+    """Quantis com interpolação linear (como np.quantile) sobre um array já ordenado"""
+    q = np.asarray(q, dtype=float)
+    position = q * (len(sorted_values) - 1)
+    lower = np.floor(position).astype(int)
+    upper = np.minimum(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+def critical_values(confidence_levels: ArrayLike, sample_size: int, use_t: Optional[bool] = None) -> np.ndarray:
+    """Valores críticos bicaudais (t de Student abaixo de 30 amostras, senão normal)"""
+    levels = np.asarray(confidence_levels, dtype=float)
+    if use_t is None:
+        use_t = sample_size < 30
+    if use_t:
+        return stats.t.ppf((1 + levels) / 2, sample_size - 1)
+    return stats.norm.ppf((1 + levels) / 2)
+
+
+def tail_levels(confidence_levels: ArrayLike) -> Tuple[np.ndarray, np.ndarray]:
+    """Quantis inferior e superior de cada nível de confiança"""
+    alpha = 1 - np.asarray(confidence_levels, dtype=float)
+    return alpha / 2, 1 - alpha / 2
+
+
+class IntervalEngine:
+    """
+    Estado caro de um conjunto de amostras, calculado uma única vez
+
+    Guarda média, desvios, amostras ordenadas, resíduos absolutos ordenados
+    (conformal) e a distribuição bootstrap da média já ordenada; qualquer
+    nível e método é respondido por buscas vetorizadas nesses arrays.
+    """
+
+    def __init__(self,
+                 samples: ArrayLike,
+                 bootstrap_samples: int = 1000,
+                 random_state: Optional[int] = None):
+        """
+        Args:
+            samples: Previsões ou erros históricos
+            bootstrap_samples: Número de reamostragens do bootstrap
+            random_state: Seed do bootstrap (None usa o estado global do numpy)
+        """
+        self.samples = np.asarray(samples, dtype=float).ravel()
+        if len(self.samples) == 0:
+            raise ValueError("IntervalEngine requer ao menos uma amostra")
+
+        self.bootstrap_samples = bootstrap_samples
+        self.random_state = random_state
+
+        self.n = len(self.samples)
+        self.mean = float(np.mean(self.samples))
+        self.std = float(np.std(self.samples))
+        self.sample_std = float(np.std(self.samples, ddof=1)) if self.n > 1 else 0.0
+        self.sorted_samples = np.sort(self.samples)
+
+        self._sorted_residuals = None
+        self._bootstrap_means = None
+
+    @property
+    def sorted_residuals(self) -> np.ndarray:
+        """Resíduos absolutos ordenados (scores de conformal prediction)"""
+        if self._sorted_residuals is None:
+            self._sorted_residuals = np.sort(np.abs(self.samples))
+        return self._sorted_residuals
+
+    @property
+    def bootstrap_means(self) -> np.ndarray:
+        """Médias bootstrap ordenadas, sorteadas uma única vez"""
+        if self._bootstrap_means is None:
+            rng = np.random.RandomState(self.random_state) if self.random_state is not None else np.random
+            rows_per_chunk = max(1, BOOTSTRAP_CHUNK_SIZE // self.n)
+            means = []
+            for start in range(0, self.bootstrap_samples, rows_per_chunk):
+                rows = min(rows_per_chunk, self.bootstrap_samples - start)
+                indices = rng.randint(0, self.n, size=(rows, self.n))
+                means.append(self.samples[indices].mean(axis=1))
+            self._bootstrap_means = np.sort(np.concatenate(means))
+        return self._bootstrap_means
+
+    def quantile(self, q: ArrayLike) -> np.ndarray:
+        """Quantis empíricos das amostras"""
+        return sorted_quantile(self.sorted_samples, q)
+
+    def residual_quantile(self, q: ArrayLike) -> np.ndarray:
+        """Quantis dos resíduos absolutos"""
+        return sorted_quantile(self.sorted_residuals, q)
+
+    def bootstrap_quantile(self, q: ArrayLike) -> np.ndarray:
+        """Quantis da distribuição bootstrap da média"""
+        return sorted_quantile(self.bootstrap_means, q)
+
+    def error_offsets(self, confidence_levels: ArrayLike, method: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Deslocamentos (inferior, superior) a somar a uma previsão pontual,
+        tratando as amostras como erros históricos do modelo
+
+        Args:
+            confidence_levels: Níveis de confiança
+            method: normal, quantile, bootstrap, conformal ou bayesian
+
+        Returns:
+            Tupla de arrays com um deslocamento por nível
+        """
+        levels = np.asarray(confidence_levels, dtype=float)
+
+        if method == 'quantile':
+            lower_q, upper_q = tail_levels(levels)
+            return self.quantile(lower_q), self.quantile(upper_q)
+
+        if method == 'bootstrap':
+            lower_q, upper_q = tail_levels(levels)
+            return self.bootstrap_quantile(lower_q), self.bootstrap_quantile(upper_q)
+
+        if method == 'conformal':
+            margin = self.residual_quantile(levels)
+            return -margin, margin
+
+        # Normal e bayesiano: desvio dos erros inflado pela incerteza da média
+        prediction_std = self.std * np.sqrt(1 + 1 / self.n)
+        if method == 'normal':
+            margin = critical_values(levels, self.n) * prediction_std
+        elif method == 'bayesian':
+            margin = critical_values(levels, self.n, use_t=False) * prediction_std
+        else:
+            raise ValueError(f"Método não suportado: {method}")
+        return -margin, margin
@@ -15,6 +15,8 @@ from sklearn.model_selection import cross_val_score
 from sklearn.metrics import mean_squared_error
 import warnings
 
+from .interval_engine import IntervalEngine, critical_values
+
 logger = logging.getLogger(__name__)
 
 class PredictionIntervalMethod(Enum):
@@ -58,7 +60,8 @@ class PredictionIntervals:
     def __init__(self, 
                  default_confidence_level: float = 0.95,
                  bootstrap_samples: int = 1000,
-                 random_state: int = 42):
+                 random_state: int = 42,
+                 conformal_calibrator=None):
         """
         Inicializa o sistema de intervalos de predição
         
@@ -66,10 +69,13 @@ class PredictionIntervals:
             default_confidence_level: Nível de confiança padrão
             bootstrap_samples: Número de amostras para bootstrap
             random_state: Seed para reprodutibilidade
+            conformal_calibrator: OnlineConformalCalibrator usado no método
+                conformal quando não há erros históricos (opcional)
         """
         self.default_confidence_level = default_confidence_level
         self.bootstrap_samples = bootstrap_samples
         self.random_state = random_state
+        self.conformal_calibrator = conformal_calibrator
         np.random.seed(random_state)
         
         logger.info(f"PredictionIntervals inicializado - Nível padrão: {default_confidence_level*100:.0f}%")
@@ -269,6 +275,12 @@ class PredictionIntervals:
                                                confidence_level: float) -> PredictionInterval:
         """Calcula intervalo de predição usando conformal prediction"""
         try:
+            if (historical_errors is None or len(historical_errors) == 0) and self.conformal_calibrator is not None:
+                # Janela online já calibrada: consulta O(1), sem reprocessar resíduos
+                interval = self.conformal_calibrator.prediction_interval(prediction, confidence_level, bounds=None)
+                if np.isfinite(interval.interval_width):
+                    return interval
+            
             if historical_errors is None or len(historical_errors) == 0:
                 # Usar distribuição normal como fallback
                 return self._calculate_normal_prediction_interval(
@@ -368,20 +380,31 @@ class PredictionIntervals:
             Dicionário com intervalos por nível de confiança
         """
         try:
-            results = {}
-            
-            for level in confidence_levels:
-                level_intervals = []
-                
-                for i, pred in enumerate(predictions):
-                    errors = historical_errors[i] if historical_errors and i < len(historical_errors) else None
-                    
-                    interval = self.calculate_prediction_interval(
-                        pred, errors, method, level
-                    )
-                    level_intervals.append(interval)
-                
-                results[level] = level_intervals
+            predictions = np.asarray(predictions, dtype=float)
+            results = {level: [None] * len(predictions) for level in confidence_levels}
+            
+            # Previsões que compartilham a mesma lista de erros usam o mesmo motor
+            groups = {}
+            for i in range(len(predictions)):
+                errors = historical_errors[i] if historical_errors and i < len(historical_errors) else None
+                if errors is None or len(errors) == 0:
+                    errors = None
+                groups.setdefault(id(errors), (errors, []))[1].append(i)
+            
+            for errors, indices in groups.values():
+                engine = IntervalEngine(errors, self.bootstrap_samples) if errors is not None else None
+                bounds = self._batch_bounds(predictions[indices], engine, confidence_levels, method)
+                for j, level in enumerate(confidence_levels):
+                    for row, i in enumerate(indices):
+                        results[level][i] = PredictionInterval(
+                            prediction=float(predictions[i]),
+                            lower_bound=float(bounds['lower'][row, j]),
+                            upper_bound=float(bounds['upper'][row, j]),
+                            confidence_level=level,
+                            interval_width=float(bounds['upper'][row, j] - bounds['lower'][row, j]),
+                            method=bounds['method'],
+                            sample_size=bounds['sample_size']
+                        )
             
             return results
             
@@ -389,6 +412,86 @@ class PredictionIntervals:
             logger.error(f"❌ Erro ao calcular múltiplos intervalos: {e}")
             return {}
     
+    def calculate_prediction_intervals_batch(self,
+                                            predictions: Union[List[float], np.ndarray],
+                                            historical_errors: Optional[List[float]] = None,
+                                            confidence_levels: List[float] = [0.68, 0.80, 0.90, 0.95, 0.99],
+                                            methods: Optional[List[PredictionIntervalMethod]] = None) -> Dict[str, Any]:
+        """
+        Intervalos de muitas previsões que compartilham os mesmos erros históricos
+        (ex.: todas as partidas de uma rodada para um modelo)
+        
+        Args:
+            predictions: Previsões pontuais (uma por partida)
+            historical_errors: Erros históricos do modelo
+            confidence_levels: Níveis de confiança
+            methods: Métodos a calcular (padrão: todos)
+            
+        Returns:
+            Dicionário com os níveis e, por método, arrays (previsões x níveis)
+            com os limites inferior e superior
+        """
+        predictions = np.asarray(predictions, dtype=float)
+        methods = methods or list(PredictionIntervalMethod)
+        engine = None
+        if historical_errors is not None and len(historical_errors) > 0:
+            engine = IntervalEngine(historical_errors, self.bootstrap_samples)
+        
+        return {
+            'predictions': predictions,
+            'confidence_levels': np.asarray(confidence_levels, dtype=float),
+            'intervals': {
+                method.value: self._batch_bounds(predictions, engine, confidence_levels, method)
+                for method in methods
+            }
+        }
+    
+    def _batch_bounds(self,
+                      predictions: np.ndarray,
+                      engine: Optional[IntervalEngine],
+                      confidence_levels: List[float],
+                      method: PredictionIntervalMethod) -> Dict[str, Any]:
+        """Limites (previsões x níveis) com os mesmos critérios de calculate_prediction_interval"""
+        levels = np.asarray(confidence_levels, dtype=float)
+        
+        if engine is not None:
+            lower_offset, upper_offset = engine.error_offsets(levels, method.value)
+            return {
+                'lower': predictions[:, None] + lower_offset[None, :],
+                'upper': predictions[:, None] + upper_offset[None, :],
+                'method': method.value,
+                'sample_size': engine.n
+            }
+        
+        if method == PredictionIntervalMethod.CONFORMAL and self.conformal_calibrator is not None:
+            # Janela online: um raio por nível, o mesmo para todas as previsões
+            radius = np.array([self.conformal_calibrator.quantile(level) for level in levels])
+            if np.all(np.isfinite(radius)):
+                return {
+                    'lower': predictions[:, None] - radius[None, :],
+                    'upper': predictions[:, None] + radius[None, :],
+                    'method': 'conformal_online',
+                    'sample_size': len(self.conformal_calibrator)
+                }
+        
+        # Sem erros históricos: incerteza padrão pelo tipo de previsão (n = 50)
+        sample_size = 50
+        if method == PredictionIntervalMethod.BAYESIAN:
+            error_std = predictions * 0.1
+            label = 'bayesian'
+        else:
+            error_std = np.where(predictions <= 1.0, 0.05, predictions * 0.1)
+            label = 'normal'
+        
+        prediction_std = error_std * np.sqrt(1 + 1/sample_size)
+        margin = prediction_std[:, None] * critical_values(levels, sample_size)[None, :]
+        return {
+            'lower': predictions[:, None] - margin,
+            'upper': predictions[:, None] + margin,
+            'method': label,
+            'sample_size': sample_size
+        }
+    
     def evaluate_prediction_intervals(self,
                                     intervals: List[PredictionInterval],
                                     actual_values: List[float]) -> PredictionIntervalMetrics:
@@ -16,7 +16,7 @@ from settings.settings import MIN_CONFIDENCE, MAX_CONFIDENCE, MIN_VALUE_EV
 # Importações de autenticação
 from auth.models import User, UserRole, UserStatus
 from auth.jwt_auth import (
-    get_current_user, get_current_active_user, require_role, require_superuser,
+    jwt_auth, get_current_user, get_current_active_user, require_role, require_superuser,
     authenticate_user, get_user_by_id, log_user_activity
 )
 from auth.endpoints import router as auth_router
@@ -63,18 +63,24 @@ def get_db():
 # Inicializar coletor automatizado
 collector = AutomatedCollector()
 
+def _user_from_request(request: Request) -> Optional[Dict]:
+    """Claims do token de acesso do pedido (header Authorization ou cookie), se válido"""
+    authorization = request.headers.get("authorization", "")
+    token = authorization[7:] if authorization.lower().startswith("bearer ") else request.cookies.get("access_token")
+    if not token:
+        return None
+    try:
+        return jwt_auth.verify_token(token, "access")
+    except HTTPException:
+        return None
+
 @app.get("/", response_class=HTMLResponse)
 async def dashboard(request: Request, db: Session = Depends(get_db)):
     """Página principal do dashboard"""
     
-    # Verificar se usuário está autenticado
-    try:
-        current_user = get_current_user(request)
-        user = get_user_by_id(db, current_user["user_id"])
-        is_authenticated = True
-    except:
-        is_authenticated = False
-        user = None
+    # Verificar se usuário está autenticado (dados do usuário vêm das claims do token)
+    user = _user_from_request(request)
+    is_authenticated = user is not None
     
     # Estatísticas gerais
     stats = {
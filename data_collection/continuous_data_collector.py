@@ -36,6 +36,8 @@ class CollectionConfig:
 class ContinuousDataCollector:
     """Coletor contínuo de dados"""
     
+    ODDS_COLUMNS = ('home_win', 'draw', 'away_win', 'over_2_5', 'under_2_5', 'btts_yes', 'btts_no')
+    
     def __init__(self, config: CollectionConfig):
         """Inicializa coletor contínuo"""
         self.config = config
@@ -56,6 +58,10 @@ class ContinuousDataCollector:
         self.db_path = "data/continuous_data.db"
         self._init_database()
         
+        # Detecção de mudanças: odds repetidas não geram novas linhas
+        from armazenamento.odds_delta import OddsChangeDetector
+        self.odds_detector = OddsChangeDetector()
+        
         # Importar API real
         from api.real_football_api import initialize_real_football_api
         self.api = initialize_real_football_api(config.api_key)
@@ -331,11 +337,32 @@ class ContinuousDataCollector:
         conn.close()
     
     def _save_odds(self, odds: List[Dict]):
-        """Salva odds no banco"""
+        """Salva no banco apenas as linhas de odds que mudaram desde a última coleta"""
+        changed = []
+        deltas = []
+        for odd in odds:
+            observations = [
+                {
+                    'fixture_id': odd['match_id'],
+                    'bookmaker': odd['bookmaker'],
+                    'market': 'live_odds',
+                    'selection': column,
+                    'odd': odd.get(column)
+                }
+                for column in self.ODDS_COLUMNS
+            ]
+            odd_deltas = self.odds_detector.find_changes(observations)
+            if odd_deltas:
+                changed.append(odd)
+                deltas.extend(odd_deltas)
+        
+        if not changed:
+            return
+        
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        for odd in odds:
+        for odd in changed:
             cursor.execute('''
                 INSERT INTO live_odds 
                 (match_id, bookmaker, home_win, draw, away_win, 
@@ -349,6 +376,9 @@ class ContinuousDataCollector:
         
         conn.commit()
         conn.close()
+        
+        # Preços só contam como vistos depois do commit
+        self.odds_detector.apply(deltas)
     
     def _save_statistics(self, stats: List[Dict]):
         """Salva estatísticas no banco"""
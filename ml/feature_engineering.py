@@ -174,6 +174,29 @@ class FeatureEngineer:
         
         return result_df
     
+    def load_archived_odds(self, df: pd.DataFrame, archive_dir: str,
+                           bookmaker: Optional[str] = None) -> pd.DataFrame:
+        """Preenche home_odd/draw_odd/away_odd com odds de fecho do OddsArchive"""
+        from armazenamento.odds_archive import OddsArchive
+        
+        logger.info("📦 Lendo odds de fecho do arquivo colunar...")
+        
+        closing = OddsArchive(archive_dir).closing_odds_frame(
+            bookmaker=bookmaker,
+            fixture_ids=df['fixture_id'].unique().tolist()
+        )
+        closing = closing.set_index('fixture_id')
+        
+        result_df = df.copy()
+        for column in ['home_odd', 'draw_odd', 'away_odd']:
+            archived = result_df['fixture_id'].map(closing[column])
+            if column in result_df.columns:
+                result_df[column] = result_df[column].fillna(archived)
+            else:
+                result_df[column] = archived
+        
+        return result_df
+    
     def create_temporal_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Cria features temporais"""
         logger.info("📅 Criando features temporais...")
@@ -93,68 +93,93 @@ class ModelEnsemble:
             logger.error(f"❌ Erro ao treinar ensemble: {e}")
             raise
     
-    def predict(self, X: np.ndarray) -> Dict[str, Any]:
-        """Faz predição com o ensemble"""
+    def _base_outputs(self, X: np.ndarray) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Avalia cada modelo base uma única vez sobre o lote inteiro
+
+        Returns:
+            Tupla (nomes, pesos, probabilidades com shape [modelos, linhas, classes])
+        """
+        voting = self.ensemble_model
+        n_classes = len(voting.classes_)
+        active = [(name, est) for name, est in voting.estimators if est != 'drop']
+        weights = np.ones(len(active)) if voting.weights is None else np.asarray(
+            [w for (_, est), w in zip(voting.estimators, voting.weights) if est != 'drop'], dtype=float
+        )
+
+        probas = np.empty((len(active), len(X), n_classes))
+        for i, ((name, _), fitted) in enumerate(zip(active, voting.estimators_)):
+            if hasattr(fitted, 'predict_proba'):
+                probas[i] = fitted.predict_proba(X)
+            else:
+                # Modelos sem probabilidade entram como one-hot do rótulo previsto
+                probas[i] = np.eye(n_classes)[np.asarray(fitted.predict(X), dtype=int)]
+
+        return [name for name, _ in active], weights, probas
+
+    def predict_batch(self, X: np.ndarray) -> Dict[str, Any]:
+        """
+        Predição vetorizada para todas as linhas de X (ex.: a rodada inteira)
+
+        Cada modelo base roda predict_proba uma única vez; rótulos individuais,
+        votação, média ponderada, confiança e acordo são derivados desses arrays.
+
+        Returns:
+            Dicionário de arrays com uma entrada por linha de X
+        """
         if not self.is_trained:
             raise ValueError("Ensemble não foi treinado ainda!")
-        
-        # Predição do ensemble
-        ensemble_pred = self.ensemble_model.predict(X)
-        ensemble_proba = self.ensemble_model.predict_proba(X)
-        
-        # Predições individuais
-        individual_predictions = {}
-        individual_probabilities = {}
-        
-        for name, model in self.models.items():
-            try:
-                pred = model.predict(X)
-                proba = model.predict_proba(X)
-                
-                individual_predictions[name] = pred[0]
-                individual_probabilities[name] = proba[0]
-            except Exception as e:
-                logger.error(f"❌ Erro na predição com {name}: {e}")
-        
-        # Calcular confiança
-        confidence = np.max(ensemble_proba[0]) if len(ensemble_proba[0]) > 0 else 0
-        
-        # Calcular acordo entre modelos
-        agreement = self._calculate_agreement(individual_predictions)
-        
+
+        X = np.asarray(X)
+        classes = self.ensemble_model.classes_
+        names, weights, probas = self._base_outputs(X)
+        individual_idx = probas.argmax(axis=2)
+
+        if self.ensemble_model.voting == 'soft':
+            probability = np.average(probas, axis=0, weights=weights)
+        else:
+            # Votação majoritária ponderada; a "probabilidade" é a fração dos votos
+            votes = np.zeros((len(X), len(classes)))
+            for idx, weight in zip(individual_idx, weights):
+                votes[np.arange(len(X)), idx] += weight
+            probability = votes / weights.sum()
+        ensemble_idx = probability.argmax(axis=1)
+
+        # Acordo: fração dos modelos que concordam com o rótulo mais votado
+        counts = np.zeros((len(X), len(classes)), dtype=int)
+        for idx in individual_idx:
+            counts[np.arange(len(X)), idx] += 1
+        agreement = counts.max(axis=1) / len(names) if names else np.zeros(len(X))
+
         return {
-            'prediction': ensemble_pred[0],
-            'probability': ensemble_proba[0],
-            'confidence': confidence,
+            'classes': classes,
+            'predictions': classes[ensemble_idx],
+            'probabilities': probability,
+            'confidence': probability.max(axis=1),
             'agreement': agreement,
-            'individual_predictions': individual_predictions,
-            'individual_probabilities': individual_probabilities,
-            'weights': self.weights
+            'individual_predictions': {name: classes[idx] for name, idx in zip(names, individual_idx)},
+            'individual_probabilities': {name: proba for name, proba in zip(names, probas)}
         }
-    
-    def _calculate_agreement(self, predictions: Dict[str, Any]) -> float:
-        """Calcula o acordo entre as predições dos modelos"""
-        if not predictions:
-            return 0.0
-        
-        pred_values = list(predictions.values())
-        if not pred_values:
-            return 0.0
-        
-        # Converter predições para valores hasháveis
-        hashable_values = []
-        for pred in pred_values:
-            if isinstance(pred, np.ndarray):
-                hashable_values.append(pred[0])
-            else:
-                hashable_values.append(pred)
-        
-        # Contar quantas predições são iguais à mais comum
-        from collections import Counter
-        most_common = Counter(hashable_values).most_common(1)[0][0]
-        agreement_count = sum(1 for pred in hashable_values if pred == most_common)
-        
-        return agreement_count / len(hashable_values)
+
+    def predict_rows(self, X: np.ndarray) -> List[Dict[str, Any]]:
+        """Predição por linha, no mesmo formato de predict, a partir de uma única passada"""
+        batch = self.predict_batch(X)
+        return [
+            {
+                'prediction': batch['predictions'][i],
+                'probability': batch['probabilities'][i],
+                'confidence': batch['confidence'][i],
+                'agreement': batch['agreement'][i],
+                'individual_predictions': {n: p[i] for n, p in batch['individual_predictions'].items()},
+                'individual_probabilities': {n: p[i] for n, p in batch['individual_probabilities'].items()},
+                'weights': self.weights
+            }
+            for i in range(len(batch['predictions']))
+        ]
+
+    def predict(self, X: np.ndarray) -> Dict[str, Any]:
+        """Faz predição com o ensemble para a primeira linha de X (ver predict_rows)"""
+        return self.predict_rows(np.asarray(X)[:1])[0]
     
     def evaluate_ensemble(self, X: np.ndarray, y: np.ndarray) -> Dict[str, float]:
         """Avalia o performance do ensemble"""
@@ -257,19 +282,28 @@ class AdvancedEnsemble:
         self.is_trained = True
         logger.info("✅ Meta-ensemble criado!")
     
-    def _create_meta_features(self, X: np.ndarray) -> np.ndarray:
-        """Cria features para o meta-modelo"""
-        meta_features_list = []
+    def _ensemble_batches(self, X: np.ndarray) -> Dict[str, Dict[str, Any]]:
+        """Uma passada de predict_batch por ensemble treinado"""
+        return {
+            name: ensemble.predict_batch(X)
+            for name, ensemble in self.ensembles.items()
+            if ensemble.is_trained
+        }
+    
+    def _create_meta_features(
+        self,
+        X: np.ndarray,
+        batches: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> np.ndarray:
+        """Cria features para o meta-modelo a partir das saídas já calculadas dos ensembles"""
+        if batches is None:
+            batches = self._ensemble_batches(X)
         
-        for name, ensemble in self.ensembles.items():
-            if ensemble.is_trained:
-                # Predições do ensemble
-                pred = ensemble.ensemble_model.predict(X)
-                proba = ensemble.ensemble_model.predict_proba(X)
-                
-                # Adicionar predições e probabilidades
-                meta_features_list.append(pred.reshape(-1, 1))
-                meta_features_list.append(proba)
+        meta_features_list = []
+        for batch in batches.values():
+            # Adicionar predições e probabilidades
+            meta_features_list.append(batch['predictions'].reshape(-1, 1))
+            meta_features_list.append(batch['probabilities'])
         
         # Combinar features
         if meta_features_list:
@@ -277,35 +311,117 @@ class AdvancedEnsemble:
         else:
             return X
     
-    def predict(self, X: np.ndarray) -> Dict[str, Any]:
-        """Faz predição com meta-ensemble"""
+    def predict_batch(self, X: np.ndarray) -> Dict[str, Any]:
+        """
+        Predição vetorizada do meta-ensemble para todas as linhas de X
+        
+        As saídas de cada ensemble são calculadas uma vez e reaproveitadas
+        tanto nas meta-features quanto no resultado por ensemble.
+        """
         if not self.is_trained:
             raise ValueError("Meta-ensemble não foi treinado ainda!")
         
-        # Features do meta-modelo
-        meta_features = self._create_meta_features(X)
-        
-        # Predição do meta-modelo
-        meta_pred = self.meta_model.predict(meta_features)
+        X = np.asarray(X)
+        batches = self._ensemble_batches(X)
+        meta_features = self._create_meta_features(X, batches)
         meta_proba = self.meta_model.predict_proba(meta_features)
         
-        # Predições dos ensembles individuais
-        ensemble_predictions = {}
-        ensemble_probabilities = {}
-        
-        for name, ensemble in self.ensembles.items():
-            if ensemble.is_trained:
-                pred = ensemble.predict(X)
-                ensemble_predictions[name] = pred
-                ensemble_probabilities[name] = pred['probability']
-        
         return {
-            'prediction': meta_pred[0],
-            'probability': meta_proba[0],
-            'confidence': np.max(meta_proba[0]),
-            'ensemble_predictions': ensemble_predictions,
-            'ensemble_probabilities': ensemble_probabilities
+            'predictions': self.meta_model.classes_[meta_proba.argmax(axis=1)],
+            'probabilities': meta_proba,
+            'confidence': meta_proba.max(axis=1),
+            'ensemble_batches': batches
         }
+    
+    def predict_rows(self, X: np.ndarray) -> List[Dict[str, Any]]:
+        """Predição por linha, no mesmo formato de predict, a partir de uma única passada"""
+        batch = self.predict_batch(X)
+        weights = {name: self.ensembles[name].weights for name in batch['ensemble_batches']}
+        
+        rows = []
+        for i in range(len(batch['predictions'])):
+            ensemble_predictions = {
+                name: {
+                    'prediction': b['predictions'][i],
+                    'probability': b['probabilities'][i],
+                    'confidence': b['confidence'][i],
+                    'agreement': b['agreement'][i],
+                    'individual_predictions': {n: p[i] for n, p in b['individual_predictions'].items()},
+                    'individual_probabilities': {n: p[i] for n, p in b['individual_probabilities'].items()},
+                    'weights': weights[name]
+                }
+                for name, b in batch['ensemble_batches'].items()
+            }
+            rows.append({
+                'prediction': batch['predictions'][i],
+                'probability': batch['probabilities'][i],
+                'confidence': batch['confidence'][i],
+                'ensemble_predictions': ensemble_predictions,
+                'ensemble_probabilities': {
+                    name: pred['probability'] for name, pred in ensemble_predictions.items()
+                }
+            })
+        return rows
+    
+    def predict(self, X: np.ndarray) -> Dict[str, Any]:
+        """Faz predição com meta-ensemble para a primeira linha de X (ver predict_rows)"""
+        return self.predict_rows(np.asarray(X)[:1])[0]
+
+
+def benchmark_ensemble_inference(
+    ensemble: Optional[ModelEnsemble] = None,
+    X: Optional[np.ndarray] = None,
+    n_fixtures: int = 1000
+) -> Dict[str, float]:
+    """
+    Mede a inferência de uma rodada de n_fixtures partidas
+    
+    Compara o caminho anterior (uma chamada por partida, com votação e cada
+    modelo base avaliados separadamente em predict e predict_proba) com uma
+    única passada de predict_rows sobre o lote. Sem ensemble, treina um
+    ensemble de exemplo sobre dados sintéticos.
+    
+    Args:
+        ensemble: Ensemble treinado
+        X: Features compatíveis com o ensemble (repetidas até n_fixtures linhas)
+        n_fixtures: Tamanho da rodada
+    """
+    import time
+    
+    if ensemble is None:
+        from sklearn.datasets import make_classification
+        X, y = make_classification(n_samples=max(n_fixtures, 600), n_features=20, n_informative=10,
+                                   n_classes=3, random_state=42)
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.linear_model import LogisticRegression
+        ensemble = ModelEnsemble()
+        ensemble.add_model('rf', RandomForestClassifier(n_estimators=50, random_state=42))
+        ensemble.add_model('lr', LogisticRegression(random_state=42, max_iter=1000))
+        ensemble.train_ensemble(X, y)
+    elif X is None:
+        raise ValueError("Informe X compatível com o ensemble")
+    matchday = np.resize(np.asarray(X), (n_fixtures, np.asarray(X).shape[1]))
+    
+    start = time.perf_counter()
+    for i in range(n_fixtures):
+        row = matchday[i:i + 1]
+        ensemble.ensemble_model.predict(row)
+        ensemble.ensemble_model.predict_proba(row)
+        for fitted in ensemble.ensemble_model.estimators_:
+            fitted.predict(row)
+            fitted.predict_proba(row)
+    per_fixture = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    ensemble.predict_rows(matchday)
+    batch = time.perf_counter() - start
+    
+    return {
+        'fixtures': n_fixtures,
+        'per_fixture_seconds': per_fixture,
+        'batch_seconds': batch,
+        'speedup': per_fixture / batch if batch > 0 else float('inf')
+    }
 
 def main():
     """Função principal para teste"""
@@ -343,6 +459,11 @@ def main():
     print(f"🎯 Confiança: {prediction['confidence']:.4f}")
     print(f"🤝 Acordo: {prediction['agreement']:.4f}")
     
+    # Benchmark de uma rodada inteira
+    bench = benchmark_ensemble_inference(ensemble, X, n_fixtures=1000)
+    print(f"⚡ 1000 partidas: {bench['per_fixture_seconds']:.2f}s por partida vs "
+          f"{bench['batch_seconds']:.3f}s em lote ({bench['speedup']:.0f}x)")
+    
     print("\n🎉 Teste do ensemble concluído!")
 
 if __name__ == "__main__":
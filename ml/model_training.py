@@ -13,10 +13,16 @@ from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.linear_model import LogisticRegression
 import xgboost as xgb
 import lightgbm as lgb
-import catboost as cb
+try:
+    import catboost as cb
+except ImportError:
+    cb = None
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
 import joblib
 import logging
+import os
+import time
 from typing import Dict, List, Tuple, Any, Optional
 import warnings
 warnings.filterwarnings('ignore')
@@ -57,7 +63,7 @@ class ModelTrainer:
         return X_scaled, y.values, feature_columns
     
     def train_single_model(self, model_name: str, model: Any, X: np.ndarray, y: np.ndarray, 
-                          use_grid_search: bool = False) -> Dict[str, Any]:
+                          use_grid_search: bool = False, n_jobs: int = -1) -> Dict[str, Any]:
         """Treina um modelo individual"""
         logger.info(f"🤖 Treinando {model_name}...")
         
@@ -66,7 +72,7 @@ class ModelTrainer:
         
         # Grid search se solicitado
         if use_grid_search:
-            model = self._get_grid_search_model(model_name, model)
+            model = self._get_grid_search_model(model_name, model, n_jobs)
         
         # Treinar modelo
         start_time = datetime.now()
@@ -85,8 +91,17 @@ class ModelTrainer:
         except:
             logloss = float('inf')
         
-        # Cross-validation
-        cv_scores = cross_val_score(model, X_train, y_train, cv=5, scoring='accuracy')
+        # Cross-validation: o grid search já validou o melhor candidato, não há por que refazer
+        best_params = None
+        if isinstance(model, GridSearchCV):
+            cv_mean = model.cv_results_['mean_test_score'][model.best_index_]
+            cv_std = model.cv_results_['std_test_score'][model.best_index_]
+            cv_folds = model.n_splits_
+            best_params = model.best_params_
+            model = model.best_estimator_
+        else:
+            cv_scores = cross_val_score(model, X_train, y_train, cv=5, scoring='accuracy')
+            cv_mean, cv_std, cv_folds = cv_scores.mean(), cv_scores.std(), len(cv_scores)
         
         # Feature importance
         feature_importance = {}
@@ -103,8 +118,10 @@ class ModelTrainer:
             'model': model,
             'accuracy': accuracy,
             'log_loss': logloss,
-            'cv_mean': cv_scores.mean(),
-            'cv_std': cv_scores.std(),
+            'cv_mean': cv_mean,
+            'cv_std': cv_std,
+            'cv_folds': cv_folds,
+            'best_params': best_params,
             'training_time': training_time,
             'feature_importance': feature_importance,
             'test_size': len(X_test)
@@ -112,10 +129,10 @@ class ModelTrainer:
         
         self.training_history[model_name] = results
         
-        logger.info(f"✅ {model_name}: Accuracy = {accuracy:.4f}, CV = {cv_scores.mean():.4f} ± {cv_scores.std():.4f}")
+        logger.info(f"✅ {model_name}: Accuracy = {accuracy:.4f}, CV = {cv_mean:.4f} ± {cv_std:.4f}")
         return results
     
-    def _get_grid_search_model(self, model_name: str, base_model: Any) -> Any:
+    def _get_grid_search_model(self, model_name: str, base_model: Any, n_jobs: int = -1) -> Any:
         """Retorna modelo com grid search"""
         param_grids = {
             'random_forest': {
@@ -141,16 +158,13 @@ class ModelTrainer:
                 param_grids[model_name],
                 cv=3,
                 scoring='accuracy',
-                n_jobs=-1
+                n_jobs=n_jobs
             )
         else:
             return base_model
     
-    def train_all_models(self, X: np.ndarray, y: np.ndarray, feature_names: List[str]):
-        """Treina todos os modelos"""
-        logger.info("🚀 Treinando todos os modelos...")
-        
-        # Modelos para treinar
+    def get_models_config(self) -> Dict[str, Dict[str, Any]]:
+        """Famílias de modelos treinadas por train_all_models"""
         models_config = {
             'random_forest': {
                 'model': RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1),
@@ -171,15 +185,25 @@ class ModelTrainer:
             'lightgbm': {
                 'model': lgb.LGBMClassifier(n_estimators=100, random_state=42, verbose=-1),
                 'use_grid_search': True
-            },
-            'catboost': {
+            }
+        }
+        
+        if cb is not None:
+            models_config['catboost'] = {
                 'model': cb.CatBoostClassifier(iterations=100, random_state=42, verbose=False),
                 'use_grid_search': False
             }
-        }
+        else:
+            logger.warning("⚠️ CatBoost não instalado, família ignorada")
+        
+        return models_config
+    
+    def train_all_models(self, X: np.ndarray, y: np.ndarray, feature_names: List[str]):
+        """Treina todos os modelos"""
+        logger.info("🚀 Treinando todos os modelos...")
         
         # Treinar cada modelo
-        for name, config in models_config.items():
+        for name, config in self.get_models_config().items():
             try:
                 self.train_single_model(
                     name, 
@@ -194,6 +218,13 @@ class ModelTrainer:
         self.is_trained = True
         logger.info("🎉 Treinamento de todos os modelos concluído!")
     
+    def train_all_models_parallel(self, X: np.ndarray, y: np.ndarray, feature_names: List[str],
+                                  n_workers: Optional[int] = None,
+                                  output_dir: str = 'models') -> Dict[str, Dict[str, Any]]:
+        """Treina todos os modelos em processos paralelos (ver ParallelTrainingOrchestrator)"""
+        orchestrator = ParallelTrainingOrchestrator(self, n_workers=n_workers, output_dir=output_dir)
+        return orchestrator.train(X, y)
+    
     def find_best_model(self) -> str:
         """Encontra o melhor modelo baseado na performance"""
         if not self.training_history:
@@ -286,6 +317,194 @@ class ModelTrainer:
         self.is_trained = model_data['is_trained']
         logger.info(f"📂 Modelos carregados de: {filepath}")
 
+# Parâmetros de paralelismo interno das famílias (sklearn/xgboost/lightgbm, catboost)
+THREAD_PARAMS = ('n_jobs', 'nthread', 'thread_count')
+
+
+def apply_thread_budget(model: Any, threads: int) -> Any:
+    """Fixa o paralelismo interno do modelo (e de estimadores aninhados) em threads"""
+    params = {
+        key: threads for key in model.get_params(deep=True)
+        if key.split('__')[-1] in THREAD_PARAMS
+    }
+    if params:
+        model.set_params(**params)
+    return model
+
+
+def plan_thread_budgets(models_config: Dict[str, Dict[str, Any]], total_threads: int,
+                        n_workers: int) -> Dict[str, int]:
+    """
+    Threads de cada família para que os processos simultâneos não disputem núcleos
+    
+    Cada processo recebe total_threads // n_workers; quando há menos famílias do
+    que processos, os núcleos que sobram vão primeiro para as famílias com grid search.
+    """
+    n_workers = max(1, min(n_workers, len(models_config)))
+    share = max(1, total_threads // n_workers)
+    budgets = {name: share for name in models_config}
+    
+    spare = total_threads - share * min(n_workers, len(models_config))
+    if len(models_config) <= n_workers:
+        ordered = sorted(models_config, key=lambda n: not models_config[n].get('use_grid_search'))
+        for name in ordered:
+            if spare <= 0:
+                break
+            extra = min(spare, share)
+            budgets[name] += extra
+            spare -= extra
+    return budgets
+
+
+def _persist_model(model: Any, output_dir: str, name: str) -> str:
+    """Grava o modelo de forma atômica (arquivo temporário + rename)"""
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"{name}.joblib")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _train_family(name: str, config: Dict[str, Any], X: np.ndarray, y: np.ndarray,
+                  threads: int, output_dir: Optional[str]) -> Dict[str, Any]:
+    """Processo worker: treina uma família dentro do seu orçamento de threads e persiste o modelo"""
+    from joblib import parallel_backend
+    from threadpoolctl import threadpool_limits
+    
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    
+    use_grid_search = config.get('use_grid_search', False)
+    # Com grid search o paralelismo fica nos candidatos; cada ajuste usa uma thread
+    model = apply_thread_budget(config['model'], 1 if use_grid_search else threads)
+    
+    # Backend de threads: todo o trabalho fica neste processo e dentro do orçamento
+    with threadpool_limits(limits=threads), parallel_backend('threading', n_jobs=threads):
+        results = ModelTrainer().train_single_model(name, model, X, y, use_grid_search, n_jobs=threads)
+    
+    results['model_path'] = _persist_model(results['model'], output_dir, name) if output_dir else None
+    results['threads'] = threads
+    results['cpu_seconds'] = time.process_time() - cpu_start
+    results['wall_seconds'] = time.perf_counter() - wall_start
+    return results
+
+
+class ParallelTrainingOrchestrator:
+    """
+    Treina as famílias de modelos em processos paralelos
+    
+    Cada família recebe um orçamento de threads (n_jobs, BLAS/OpenMP) para que
+    modelos configurados com n_jobs=-1 não disputem os mesmos núcleos, e é
+    persistida assim que termina, sem esperar pelas demais.
+    """
+    
+    def __init__(self, trainer: Optional[ModelTrainer] = None, n_workers: Optional[int] = None,
+                 total_threads: Optional[int] = None, output_dir: Optional[str] = 'models'):
+        self.trainer = trainer or ModelTrainer()
+        self.total_threads = total_threads or os.cpu_count() or 1
+        self.n_workers = n_workers or self.total_threads
+        self.output_dir = output_dir
+        self.stats = {}
+    
+    def train(self, X: np.ndarray, y: np.ndarray,
+              models_config: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Treina as famílias e preenche trainer.models / trainer.training_history
+        
+        Returns:
+            Resultados por família, na ordem em que terminaram
+        """
+        models_config = models_config or self.trainer.get_models_config()
+        if not models_config:
+            return {}
+        
+        n_workers = max(1, min(self.n_workers, len(models_config)))
+        budgets = plan_thread_budgets(models_config, self.total_threads, n_workers)
+        logger.info(f"🚀 Treinando {len(models_config)} famílias em {n_workers} processos: {budgets}")
+        
+        # Famílias com grid search são as mais longas: começam primeiro
+        order = sorted(models_config, key=lambda n: not models_config[n].get('use_grid_search'))
+        
+        finished = {}
+        wall_start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = {
+                pool.submit(_train_family, name, models_config[name], X, y, budgets[name], self.output_dir): name
+                for name in order
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.error(f"❌ Erro ao treinar {name}: {e}")
+                    continue
+                
+                self.trainer.models[name] = results['model']
+                self.trainer.training_history[name] = results
+                finished[name] = results
+                logger.info(f"✅ {name} concluído em {results['wall_seconds']:.1f}s "
+                            f"({results['threads']} threads) -> {results['model_path']}")
+        
+        wall_seconds = time.perf_counter() - wall_start
+        cpu_seconds = sum(r['cpu_seconds'] for r in finished.values())
+        self.stats = {
+            'families': len(finished),
+            'failed': len(models_config) - len(finished),
+            'workers': n_workers,
+            'total_threads': self.total_threads,
+            'thread_budgets': budgets,
+            'wall_seconds': wall_seconds,
+            'cpu_seconds': cpu_seconds,
+            'cpu_utilization': cpu_seconds / (wall_seconds * self.total_threads) if wall_seconds > 0 else 0.0
+        }
+        
+        self.trainer.is_trained = bool(finished) or self.trainer.is_trained
+        logger.info(f"🎉 Treinamento paralelo concluído em {wall_seconds:.1f}s "
+                    f"(CPU {self.stats['cpu_utilization']:.0%})")
+        return finished
+
+
+def benchmark_training(X: Optional[np.ndarray] = None, y: Optional[np.ndarray] = None,
+                       models_config: Optional[Dict[str, Dict[str, Any]]] = None,
+                       total_threads: Optional[int] = None) -> Dict[str, float]:
+    """
+    Compara tempo de parede e uso de CPU do treino sequencial e do paralelo
+    
+    O sequencial treina uma família por vez com todos os núcleos (como
+    train_all_models); o paralelo usa ParallelTrainingOrchestrator. Ambos são
+    medidos da mesma forma, no processo que treina cada família.
+    """
+    import copy
+    
+    if X is None or y is None:
+        trainer = ModelTrainer()
+        X, y, _ = trainer.prepare_data(create_sample_data())
+    total_threads = total_threads or os.cpu_count() or 1
+    models_config = models_config or ModelTrainer().get_models_config()
+    
+    wall_start = time.perf_counter()
+    sequential_cpu = 0.0
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        for name, config in models_config.items():
+            results = pool.submit(_train_family, name, copy.deepcopy(config), X, y, total_threads, None).result()
+            sequential_cpu += results['cpu_seconds']
+    sequential_wall = time.perf_counter() - wall_start
+    
+    orchestrator = ParallelTrainingOrchestrator(total_threads=total_threads, output_dir=None)
+    orchestrator.train(X, y, copy.deepcopy(models_config))
+    
+    return {
+        'families': len(models_config),
+        'total_threads': total_threads,
+        'sequential_seconds': sequential_wall,
+        'parallel_seconds': orchestrator.stats['wall_seconds'],
+        'speedup': sequential_wall / orchestrator.stats['wall_seconds'],
+        'sequential_cpu_utilization': sequential_cpu / (sequential_wall * total_threads),
+        'parallel_cpu_utilization': orchestrator.stats['cpu_utilization']
+    }
+
 class TimeSeriesValidator:
     """Validador para dados de séries temporais"""
     
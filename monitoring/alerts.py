@@ -308,7 +308,7 @@ Este é um alerta automático do sistema de monitoramento.
         """Verifica perdas consecutivas"""
         from monitoring.business_metrics import business_metrics
         
-        recent_bets = business_metrics.bet_results[-5:]  # Últimas 5 apostas
+        recent_bets = business_metrics.get_recent_bets(5)  # Últimas 5 apostas
         if len(recent_bets) < 5:
             return False
         
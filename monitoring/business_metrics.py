@@ -6,8 +6,9 @@ Monitoramento de ROI, lucro/prejuízo e performance financeira
 
 import time
 import json
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
 from dataclasses import dataclass
 from prometheus_client import Counter, Histogram, Gauge, CollectorRegistry
 import logging
@@ -43,13 +44,88 @@ class BusinessMetrics:
     period_start: datetime
     period_end: datetime
 
-class BusinessMetricsCollector:
-    """Coletor de métricas de negócio"""
+class _Aggregate:
+    """Somas e contagens acumuladas de um conjunto de apostas"""
+    
+    __slots__ = ('bets', 'stake', 'profit_loss', 'wins', 'odds_sum', 'best_bet', 'worst_bet')
     
     def __init__(self):
+        self.bets = 0
+        self.stake = 0.0
+        self.profit_loss = 0.0
+        self.wins = 0
+        self.odds_sum = 0.0
+        self.best_bet: Optional[BetResult] = None
+        self.worst_bet: Optional[BetResult] = None
+    
+    def add(self, bet: BetResult):
+        self.bets += 1
+        self.stake += bet.stake
+        self.profit_loss += bet.profit_loss
+        self.wins += bet.profit_loss > 0
+        self.odds_sum += bet.odds
+        if self.best_bet is None or bet.profit_loss > self.best_bet.profit_loss:
+            self.best_bet = bet
+        if self.worst_bet is None or bet.profit_loss < self.worst_bet.profit_loss:
+            self.worst_bet = bet
+    
+    def merge(self, other: '_Aggregate'):
+        self.bets += other.bets
+        self.stake += other.stake
+        self.profit_loss += other.profit_loss
+        self.wins += other.wins
+        self.odds_sum += other.odds_sum
+        if other.best_bet is not None and (self.best_bet is None or other.best_bet.profit_loss > self.best_bet.profit_loss):
+            self.best_bet = other.best_bet
+        if other.worst_bet is not None and (self.worst_bet is None or other.worst_bet.profit_loss < self.worst_bet.profit_loss):
+            self.worst_bet = other.worst_bet
+    
+    @classmethod
+    def combine(cls, aggregates: Iterable['_Aggregate']) -> '_Aggregate':
+        total = cls()
+        for aggregate in aggregates:
+            total.merge(aggregate)
+        return total
+    
+    @property
+    def roi(self) -> float:
+        return (self.profit_loss / self.stake) if self.stake > 0 else 0
+    
+    @property
+    def win_rate(self) -> float:
+        return (self.wins / self.bets) if self.bets else 0
+    
+    @property
+    def avg_odds(self) -> float:
+        return (self.odds_sum / self.bets) if self.bets else 0
+    
+    @property
+    def avg_stake(self) -> float:
+        return (self.stake / self.bets) if self.bets else 0
+
+class BusinessMetricsCollector:
+    """Coletor de métricas de negócio
+    
+    Os agregados são mantidos de forma incremental: somas por (bet_type, liga)
+    e rollups por hora e por dia. Registar uma aposta é O(1), independente do
+    histórico; apenas uma janela limitada de apostas individuais é retida.
+    
+    Args:
+        max_raw_results: Apostas individuais mantidas em memória
+        hourly_retention_hours: Horas de rollups horários (resolução de hora)
+        daily_retention_days: Dias de rollups diários (resolução de dia)
+    """
+    
+    def __init__(self, max_raw_results: int = 10000, hourly_retention_hours: int = 7 * 24,
+                 daily_retention_days: int = 400):
         """Inicializa coletor de métricas"""
         self.registry = CollectorRegistry()
-        self.bet_results: List[BetResult] = []
+        self.bet_results: deque = deque(maxlen=max_raw_results)
+        self.hourly_retention = timedelta(hours=hourly_retention_hours)
+        self.daily_retention = timedelta(days=daily_retention_days)
+        self._groups: Dict[Tuple[str, str], _Aggregate] = {}
+        self._hourly: Dict[datetime, _Aggregate] = {}
+        self._daily: Dict[date, _Aggregate] = {}
         
         # Métricas Prometheus
         self.total_bets = Counter(
@@ -118,25 +194,22 @@ class BusinessMetricsCollector:
         )
     
     def add_bet_result(self, bet_result: BetResult):
-        """Adiciona resultado de aposta"""
+        """Adiciona resultado de aposta (O(1))"""
         self.bet_results.append(bet_result)
+        league = self._get_league_from_match(bet_result.match_id)
         
-        # Atualizar métricas Prometheus
-        self.total_bets.labels(
-            bet_type=bet_result.bet_type,
-            league=self._get_league_from_match(bet_result.match_id)
-        ).inc()
+        group = self._groups.get((bet_result.bet_type, league))
+        if group is None:
+            group = self._groups[(bet_result.bet_type, league)] = _Aggregate()
+        group.add(bet_result)
+        self._add_to_rollups(bet_result)
         
-        self.total_stake.labels(
-            bet_type=bet_result.bet_type,
-            league=self._get_league_from_match(bet_result.match_id)
-        ).inc(bet_result.stake)
+        # Atualizar métricas Prometheus
+        self.total_bets.labels(bet_type=bet_result.bet_type, league=league).inc()
+        self.total_stake.labels(bet_type=bet_result.bet_type, league=league).inc(bet_result.stake)
         
         # Usar Gauge para profit/loss (pode ser negativo)
-        self.total_profit_loss.labels(
-            bet_type=bet_result.bet_type,
-            league=self._get_league_from_match(bet_result.match_id)
-        ).set(self._get_total_profit_loss(bet_result.bet_type, bet_result.match_id))
+        self.total_profit_loss.labels(bet_type=bet_result.bet_type, league=league).set(group.profit_loss)
         
         self.bet_value_distribution.labels(
             bet_type=bet_result.bet_type
@@ -146,16 +219,35 @@ class BusinessMetricsCollector:
             bet_type=bet_result.bet_type
         ).observe(bet_result.roi)
         
-        # Atualizar métricas calculadas
-        self._update_calculated_metrics()
+        # Atualizar métricas calculadas do grupo afetado
+        self._update_calculated_metrics(bet_result.bet_type, league, group)
+    
+    def _add_to_rollups(self, bet: BetResult):
+        """Acumula a aposta nos rollups horário e diário"""
+        hour = bet.timestamp.replace(minute=0, second=0, microsecond=0)
+        bucket = self._hourly.get(hour)
+        if bucket is None:
+            bucket = self._hourly[hour] = _Aggregate()
+            self._prune(self._hourly, hour - self.hourly_retention)
+        bucket.add(bet)
+        
+        day = bet.timestamp.date()
+        bucket = self._daily.get(day)
+        if bucket is None:
+            bucket = self._daily[day] = _Aggregate()
+            self._prune(self._daily, day - self.daily_retention)
+        bucket.add(bet)
+    
+    @staticmethod
+    def _prune(buckets: Dict, horizon):
+        """Remove rollups fora da retenção (só quando um bucket novo é criado)"""
+        for key in [k for k in buckets if k < horizon]:
+            del buckets[key]
     
     def _get_total_profit_loss(self, bet_type: str, match_id: str) -> float:
         """Obtém total de profit/loss para tipo de aposta e liga"""
-        league = self._get_league_from_match(match_id)
-        return sum(
-            bet.profit_loss for bet in self.bet_results
-            if bet.bet_type == bet_type and self._get_league_from_match(bet.match_id) == league
-        )
+        group = self._groups.get((bet_type, self._get_league_from_match(match_id)))
+        return group.profit_loss if group else 0.0
     
     def _get_league_from_match(self, match_id: str) -> str:
         """Obtém liga do match (simulado)"""
@@ -169,53 +261,38 @@ class BusinessMetricsCollector:
         }
         return leagues.get(match_id[:2], 'unknown')
     
-    def _update_calculated_metrics(self):
-        """Atualiza métricas calculadas"""
-        if not self.bet_results:
-            return
-        
-        # Agrupar por tipo de aposta e liga
-        grouped_results = {}
-        for bet in self.bet_results:
-            key = (bet.bet_type, self._get_league_from_match(bet.match_id))
-            if key not in grouped_results:
-                grouped_results[key] = []
-            grouped_results[key].append(bet)
+    def _update_calculated_metrics(self, bet_type: str, league: str, group: _Aggregate):
+        """Atualiza métricas calculadas de um grupo (tipo de aposta, liga)"""
+        self.current_roi.labels(bet_type=bet_type, league=league).set(group.roi)
+        self.win_rate.labels(bet_type=bet_type, league=league).set(group.win_rate)
+        self.avg_odds.labels(bet_type=bet_type, league=league).set(group.avg_odds)
+        self.avg_stake.labels(bet_type=bet_type, league=league).set(group.avg_stake)
+    
+    def _window_aggregate(self, start: datetime, end: datetime) -> _Aggregate:
+        """Agrega os rollups que cobrem [start, end]
         
-        # Calcular métricas para cada grupo
-        for (bet_type, league), bets in grouped_results.items():
-            total_stake = sum(b.stake for b in bets)
-            total_profit_loss = sum(b.profit_loss for b in bets)
-            wins = sum(1 for b in bets if b.profit_loss > 0)
-            
-            # ROI atual
-            roi = (total_profit_loss / total_stake) if total_stake > 0 else 0
-            self.current_roi.labels(bet_type=bet_type, league=league).set(roi)
-            
-            # Taxa de acerto
-            win_rate = (wins / len(bets)) if bets else 0
-            self.win_rate.labels(bet_type=bet_type, league=league).set(win_rate)
-            
-            # Odds média
-            avg_odds = sum(b.odds for b in bets) / len(bets) if bets else 0
-            self.avg_odds.labels(bet_type=bet_type, league=league).set(avg_odds)
-            
-            # Aposta média
-            avg_stake = total_stake / len(bets) if bets else 0
-            self.avg_stake.labels(bet_type=bet_type, league=league).set(avg_stake)
+        Usa os buckets horários quando a janela cabe na retenção horária e os
+        diários caso contrário; o custo depende do número de buckets, não de apostas.
+        """
+        hour = start.replace(minute=0, second=0, microsecond=0)
+        if hour >= end - self.hourly_retention:
+            return _Aggregate.combine(a for h, a in self._hourly.items() if hour <= h <= end)
+        return _Aggregate.combine(a for d, a in self._daily.items() if start.date() <= d <= end.date())
+    
+    def get_recent_bets(self, n: int) -> List[BetResult]:
+        """Últimas n apostas da janela de apostas individuais"""
+        if n <= 0:
+            return []
+        return list(self.bet_results)[-n:]
     
     def get_business_metrics(self, period_days: int = 30) -> BusinessMetrics:
         """Obtém métricas de negócio para um período"""
         end_date = datetime.now()
         start_date = end_date - timedelta(days=period_days)
         
-        # Filtrar apostas do período
-        period_bets = [
-            bet for bet in self.bet_results
-            if start_date <= bet.timestamp <= end_date
-        ]
+        period = self._window_aggregate(start_date, end_date)
         
-        if not period_bets:
+        if not period.bets:
             return BusinessMetrics(
                 total_bets=0,
                 total_stake=0.0,
@@ -230,29 +307,16 @@ class BusinessMetricsCollector:
                 period_end=end_date
             )
         
-        # Calcular métricas
-        total_bets = len(period_bets)
-        total_stake = sum(bet.stake for bet in period_bets)
-        total_profit_loss = sum(bet.profit_loss for bet in period_bets)
-        total_roi = (total_profit_loss / total_stake) if total_stake > 0 else 0
-        win_rate = sum(1 for bet in period_bets if bet.profit_loss > 0) / total_bets
-        avg_odds = sum(bet.odds for bet in period_bets) / total_bets
-        avg_stake = total_stake / total_bets
-        
-        # Melhor e pior aposta
-        best_bet = max(period_bets, key=lambda x: x.profit_loss) if period_bets else None
-        worst_bet = min(period_bets, key=lambda x: x.profit_loss) if period_bets else None
-        
         return BusinessMetrics(
-            total_bets=total_bets,
-            total_stake=total_stake,
-            total_profit_loss=total_profit_loss,
-            total_roi=total_roi,
-            win_rate=win_rate,
-            avg_odds=avg_odds,
-            avg_stake=avg_stake,
-            best_bet=best_bet,
-            worst_bet=worst_bet,
+            total_bets=period.bets,
+            total_stake=period.stake,
+            total_profit_loss=period.profit_loss,
+            total_roi=period.roi,
+            win_rate=period.win_rate,
+            avg_odds=period.avg_odds,
+            avg_stake=period.avg_stake,
+            best_bet=period.best_bet,
+            worst_bet=period.worst_bet,
             period_start=start_date,
             period_end=end_date
         )
@@ -264,19 +328,16 @@ class BusinessMetricsCollector:
         # Análise por tipo de aposta
         bet_type_analysis = {}
         for bet_type in ['home_win', 'draw', 'away_win', 'over_2_5', 'under_2_5']:
-            type_bets = [b for b in self.bet_results if b.bet_type == bet_type]
-            if type_bets:
-                total_stake = sum(b.stake for b in type_bets)
-                total_profit = sum(b.profit_loss for b in type_bets)
-                roi = (total_profit / total_stake) if total_stake > 0 else 0
-                win_rate = sum(1 for b in type_bets if b.profit_loss > 0) / len(type_bets)
-                
+            type_totals = _Aggregate.combine(
+                group for (group_type, _), group in self._groups.items() if group_type == bet_type
+            )
+            if type_totals.bets:
                 bet_type_analysis[bet_type] = {
-                    'total_bets': len(type_bets),
-                    'total_stake': total_stake,
-                    'total_profit': total_profit,
-                    'roi': roi,
-                    'win_rate': win_rate
+                    'total_bets': type_totals.bets,
+                    'total_stake': type_totals.stake,
+                    'total_profit': type_totals.profit_loss,
+                    'roi': type_totals.roi,
+                    'win_rate': type_totals.win_rate
                 }
         
         return {
@@ -306,30 +367,16 @@ class BusinessMetricsCollector:
         trends = []
         
         for i in range(days):
-            date = datetime.now() - timedelta(days=i)
-            day_bets = [
-                bet for bet in self.bet_results
-                if bet.timestamp.date() == date.date()
-            ]
-            
-            if day_bets:
-                total_stake = sum(bet.stake for bet in day_bets)
-                total_profit = sum(bet.profit_loss for bet in day_bets)
-                roi = (total_profit / total_stake) if total_stake > 0 else 0
-                win_rate = sum(1 for bet in day_bets if bet.profit_loss > 0) / len(day_bets)
-            else:
-                total_stake = 0
-                total_profit = 0
-                roi = 0
-                win_rate = 0
+            day = datetime.now() - timedelta(days=i)
+            day_totals = self._daily.get(day.date()) or _Aggregate()
             
             trends.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'total_bets': len(day_bets),
-                'total_stake': total_stake,
-                'total_profit': total_profit,
-                'roi': roi,
-                'win_rate': win_rate
+                'date': day.strftime('%Y-%m-%d'),
+                'total_bets': day_totals.bets,
+                'total_stake': day_totals.stake,
+                'total_profit': day_totals.profit_loss,
+                'roi': day_totals.roi,
+                'win_rate': day_totals.win_rate
             })
         
         return {
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Detecção de drift em streaming com sketches compactos
+MaraBet AI - PSI, KS e Jensen-Shannon com memória limitada e mergeável entre workers
+"""
+
+import copy
+import logging
+import math
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Suavização das probabilidades por bin (evita log(0) no PSI/JS)
+_EPS = 1e-6
+
+
+class KLLSketch:
+    """
+    Sketch de quantis KLL (Karnin, Lang & Liberty)
+
+    Mantém O(k) itens em níveis de compactadores; itens do nível h pesam 2^h.
+    Dois sketches com o mesmo k podem ser mesclados sem perda de garantia.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        self.k = k
+        self.c = 2.0 / 3.0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * self.c ** depth)))
+
+    def _compress(self) -> None:
+        compacted = True
+        while compacted:
+            compacted = False
+            for level in range(len(self.levels)):
+                if len(self.levels[level]) < self._capacity(level):
+                    continue
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+
+                items = np.sort(self.levels[level])
+                # Com número ímpar de itens, um fica no nível para manter o peso exato
+                leftover, items = (items[-1:], items[:-1]) if len(items) % 2 else (items[:0], items)
+                promoted = items[int(self._rng.integers(2))::2]
+
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = leftover
+                compacted = True
+
+    def update(self, values: Union[float, Sequence[float], np.ndarray]) -> None:
+        """Adiciona um valor ou um lote de valores (NaN/inf são ignorados)"""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """Incorpora outro sketch (ex.: de outro worker)"""
+        if other.k != self.k:
+            # Os pesos 2^h de cada nível só são comparáveis com a mesma capacidade
+            raise ValueError(f"Sketches KLL com k diferentes: {self.k} != {other.k}")
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _weighted_items(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(l), 2.0 ** h) for h, l in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], weights[order]
+
+    @property
+    def size(self) -> int:
+        """Número de itens retidos"""
+        return sum(len(l) for l in self.levels)
+
+    def cdf(self, x: Union[float, np.ndarray]) -> np.ndarray:
+        """Fração estimada dos valores <= x"""
+        x = np.asarray(x, dtype=float)
+        if self.n == 0:
+            return np.zeros_like(x)
+        items, weights = self._weighted_items()
+        cumulative = np.concatenate([[0.0], np.cumsum(weights)])
+        return cumulative[np.searchsorted(items, x, side='right')] / cumulative[-1]
+
+    def quantile(self, q: Union[float, np.ndarray]) -> np.ndarray:
+        """Quantil(is) estimado(s) para q em [0, 1]"""
+        q = np.asarray(q, dtype=float)
+        if self.n == 0:
+            return np.full_like(q, np.nan)
+        items, weights = self._weighted_items()
+        cumulative = np.cumsum(weights) / weights.sum()
+        index = np.minimum(np.searchsorted(cumulative, q, side='left'), len(items) - 1)
+        return items[index]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'k': self.k,
+            'n': self.n,
+            'min': self.min,
+            'max': self.max,
+            'levels': [l.astype(np.float32) for l in self.levels]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "KLLSketch":
+        sketch = cls(k=data['k'])
+        sketch.n = data['n']
+        sketch.min = data['min']
+        sketch.max = data['max']
+        sketch.levels = [np.asarray(l, dtype=float) for l in data['levels']]
+        return sketch
+
+
+def population_stability_index(expected: np.ndarray, actual: np.ndarray) -> float:
+    """PSI entre duas distribuições por bin"""
+    p = _normalize(expected)
+    q = _normalize(actual)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def jensen_shannon(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Divergência de Jensen-Shannon (base 2, entre 0 e 1)"""
+    p = _normalize(expected)
+    q = _normalize(actual)
+    m = (p + q) / 2
+    return float(0.5 * np.sum(p * np.log2(p / m)) + 0.5 * np.sum(q * np.log2(q / m)))
+
+
+def _normalize(counts: np.ndarray) -> np.ndarray:
+    counts = np.asarray(counts, dtype=float) + _EPS
+    return counts / counts.sum()
+
+
+class _Window:
+    """Sketches e histogramas de um bucket de tempo da janela ao vivo"""
+
+    def __init__(self, n_features: int, n_bins: int, k: int):
+        self.sketches = [KLLSketch(k) for _ in range(n_features)]
+        self.counts = np.zeros((n_features, n_bins), dtype=np.int64)
+
+    def merge(self, other: "_Window") -> "_Window":
+        for mine, theirs in zip(self.sketches, other.sketches):
+            mine.merge(theirs)
+        self.counts += other.counts
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'sketches': [s.to_dict() for s in self.sketches], 'counts': self.counts}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], k: int) -> "_Window":
+        window = cls(0, 0, k)
+        window.sketches = [KLLSketch.from_dict(s) for s in data['sketches']]
+        window.counts = np.asarray(data['counts'], dtype=np.int64)
+        return window
+
+
+class StreamingDriftMonitor:
+    """
+    Drift por feature em streaming contra uma baseline congelada
+
+    A baseline é acumulada num sketch KLL por feature e, ao ser congelada,
+    define bins fixos pelos seus quantis. O tráfego ao vivo alimenta, por
+    bucket de tempo, um sketch e um histograma exato nesses bins; a janela
+    ao vivo é a união dos últimos window_buckets buckets. PSI, KS e JS são
+    calculados a partir desses resumos, sem reter os dados brutos.
+    """
+
+    def __init__(
+        self,
+        feature_names: List[str],
+        n_bins: int = 10,
+        k: int = 200,
+        bucket_seconds: int = 3600,
+        window_buckets: int = 24
+    ):
+        """
+        Inicializa o monitor
+
+        Args:
+            feature_names: Nomes das colunas observadas
+            n_bins: Número de bins (quantis da baseline)
+            k: Precisão dos sketches KLL
+            bucket_seconds: Duração de cada bucket da janela ao vivo
+            window_buckets: Buckets que compõem a janela ao vivo
+        """
+        self.feature_names = list(feature_names)
+        self.n_bins = n_bins
+        self.k = k
+        self.bucket_seconds = bucket_seconds
+        self.window_buckets = window_buckets
+
+        self.baseline = [KLLSketch(k) for _ in self.feature_names]
+        self.edges: Optional[List[np.ndarray]] = None
+        self.baseline_probs: Optional[List[np.ndarray]] = None
+        self.buckets: Dict[int, _Window] = {}
+
+    @property
+    def is_frozen(self) -> bool:
+        return self.edges is not None
+
+    def _as_matrix(self, X: Any) -> np.ndarray:
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1) if len(self.feature_names) > 1 else X.reshape(-1, 1)
+        if X.shape[1] != len(self.feature_names):
+            raise ValueError(f"Esperadas {len(self.feature_names)} features, recebidas {X.shape[1]}")
+        return X
+
+    def update_baseline(self, X: Any) -> None:
+        """Acumula um lote de dados de referência"""
+        if self.is_frozen:
+            raise ValueError("Baseline já congelada")
+        X = self._as_matrix(X)
+        for i, sketch in enumerate(self.baseline):
+            sketch.update(X[:, i])
+
+    def freeze_baseline(self) -> None:
+        """Fixa os bins pelos quantis da baseline e a distribuição de referência por bin"""
+        quantiles = np.linspace(0, 1, self.n_bins + 1)[1:-1]
+        self.edges, self.baseline_probs = [], []
+        for sketch in self.baseline:
+            edges = np.unique(sketch.quantile(quantiles)) if sketch.n else np.empty(0)
+            cdf = np.concatenate([[0.0], sketch.cdf(edges), [1.0]]) if sketch.n else np.array([0.0, 1.0])
+            probs = np.zeros(self.n_bins)
+            probs[:len(edges) + 1] = np.diff(cdf)
+            self.edges.append(edges)
+            self.baseline_probs.append(probs)
+        logger.info(f"✅ Baseline de drift congelada: {len(self.feature_names)} features, {self.n_bins} bins")
+
+    def fit_baseline(self, X: Any) -> None:
+        """Atalho para update_baseline + freeze_baseline"""
+        self.update_baseline(X)
+        self.freeze_baseline()
+
+    def _bucket_key(self, timestamp: Optional[Union[float, datetime]]) -> int:
+        if timestamp is None:
+            timestamp = time.time()
+        elif isinstance(timestamp, datetime):
+            timestamp = timestamp.timestamp()
+        return int(timestamp // self.bucket_seconds)
+
+    def _prune(self, latest: int) -> None:
+        for key in [key for key in self.buckets if key <= latest - self.window_buckets]:
+            del self.buckets[key]
+
+    def observe(self, X: Any, timestamp: Optional[Union[float, datetime]] = None) -> None:
+        """
+        Registra um lote do tráfego ao vivo
+
+        Args:
+            X: Linhas com as features (uma linha ou matriz)
+            timestamp: Momento do lote (padrão: agora)
+        """
+        if not self.is_frozen:
+            raise ValueError("Congele a baseline antes de observar o tráfego")
+        X = self._as_matrix(X)
+        key = self._bucket_key(timestamp)
+
+        window = self.buckets.get(key)
+        if window is None:
+            window = self.buckets[key] = _Window(len(self.feature_names), self.n_bins, self.k)
+            self._prune(max(self.buckets))
+
+        for i, edges in enumerate(self.edges):
+            column = X[:, i]
+            column = column[np.isfinite(column)]
+            window.sketches[i].update(column)
+            window.counts[i] += np.bincount(
+                np.searchsorted(edges, column, side='left'), minlength=self.n_bins
+            )[:self.n_bins]
+
+    def live_window(self, now: Optional[Union[float, datetime]] = None) -> Optional[_Window]:
+        """União dos buckets da janela ao vivo (None se vazia)"""
+        if now is not None:
+            self._prune(self._bucket_key(now))
+        merged = None
+        for window in self.buckets.values():
+            if merged is None:
+                merged = _Window(len(self.feature_names), self.n_bins, self.k)
+            merged.merge(window)
+        return merged
+
+    def compute_drift(self, now: Optional[Union[float, datetime]] = None) -> Dict[str, Dict[str, float]]:
+        """
+        PSI, KS e Jensen-Shannon de cada feature: baseline vs janela ao vivo
+
+        Returns:
+            {feature: {'psi', 'ks', 'js', 'n_baseline', 'n_live'}}
+        """
+        if not self.is_frozen:
+            return {}
+        live = self.live_window(now)
+        if live is None:
+            return {}
+
+        report = {}
+        for i, name in enumerate(self.feature_names):
+            n_bins = len(self.edges[i]) + 1
+            expected = self.baseline_probs[i][:n_bins]
+            actual = live.counts[i][:n_bins]
+            if live.sketches[i].n == 0 or self.baseline[i].n == 0:
+                continue
+
+            # KS sobre a união dos itens retidos pelos dois sketches
+            grid = np.concatenate(self.baseline[i].levels + live.sketches[i].levels)
+            ks = float(np.max(np.abs(self.baseline[i].cdf(grid) - live.sketches[i].cdf(grid))))
+
+            report[name] = {
+                'psi': population_stability_index(expected, actual),
+                'ks': ks,
+                'js': jensen_shannon(expected, actual),
+                'n_baseline': self.baseline[i].n,
+                'n_live': live.sketches[i].n
+            }
+        return report
+
+    def merge(self, other: "StreamingDriftMonitor") -> "StreamingDriftMonitor":
+        """Mescla o estado de outro worker com a mesma configuração e baseline"""
+        if other.feature_names != self.feature_names or other.n_bins != self.n_bins:
+            raise ValueError("Monitores de drift com features ou bins diferentes")
+        if other.k != self.k or other.bucket_seconds != self.bucket_seconds:
+            raise ValueError("Monitores de drift com k ou buckets diferentes")
+        if self.is_frozen != other.is_frozen or (
+            self.is_frozen and not all(
+                len(a) == len(b) and np.allclose(a, b) for a, b in zip(self.edges, other.edges)
+            )
+        ):
+            raise ValueError("Monitores de drift com baselines diferentes")
+
+        if not self.is_frozen:
+            for mine, theirs in zip(self.baseline, other.baseline):
+                mine.merge(theirs)
+        for key, window in other.buckets.items():
+            if key in self.buckets:
+                self.buckets[key].merge(window)
+            else:
+                self.buckets[key] = copy.deepcopy(window)
+        if self.buckets:
+            self._prune(max(self.buckets))
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'feature_names': self.feature_names,
+            'n_bins': self.n_bins,
+            'k': self.k,
+            'bucket_seconds': self.bucket_seconds,
+            'window_buckets': self.window_buckets,
+            'baseline': [s.to_dict() for s in self.baseline],
+            'edges': self.edges,
+            'baseline_probs': self.baseline_probs,
+            'buckets': {key: window.to_dict() for key, window in self.buckets.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamingDriftMonitor":
+        monitor = cls(
+            data['feature_names'], n_bins=data['n_bins'], k=data['k'],
+            bucket_seconds=data['bucket_seconds'], window_buckets=data['window_buckets']
+        )
+        monitor.baseline = [KLLSketch.from_dict(s) for s in data['baseline']]
+        monitor.edges = data['edges']
+        monitor.baseline_probs = data['baseline_probs']
+        monitor.buckets = {key: _Window.from_dict(w, monitor.k) for key, w in data['buckets'].items()}
+        return monitor
+
+    def save(self, filepath: str) -> None:
+        """Persiste os sketches de forma compacta (float32 + compressão)"""
+        os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+        tmp_path = f"{filepath}.tmp"
+        joblib.dump(self.to_dict(), tmp_path, compress=3)
+        os.replace(tmp_path, filepath)
+
+    @classmethod
+    def load(cls, filepath: str) -> "StreamingDriftMonitor":
+        return cls.from_dict(joblib.load(filepath))
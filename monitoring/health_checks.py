@@ -5,24 +5,60 @@ Monitoramento completo da saúde do sistema
 """
 
 import time
+import threading
 import psutil
 import redis
 import sqlite3
 import requests
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
 from flask import Blueprint, jsonify, request
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Configuração de cada probe: (TTL do resultado em cache, timeout em segundos)
+PROBE_CONFIG = {
+    'database': (10.0, 2.0),
+    'redis': (10.0, 1.0),
+    'api_football': (60.0, 5.0),
+    'telegram': (120.0, 5.0),
+    'system_resources': (15.0, 3.0),
+    'uptime': (0.0, 1.0)
+}
+
+# Conjuntos de probes por tipo de verificação
+LIVENESS_PROBES = ('uptime',)
+READINESS_PROBES = ('database', 'api_football')
+DEEP_PROBES = tuple(PROBE_CONFIG)
+
 class HealthChecker:
-    """Sistema de verificação de saúde do sistema"""
+    """Sistema de verificação de saúde do sistema
+    
+    Os probes correm em paralelo num pool de threads, cada um com o seu
+    timeout. Cada resultado fica em cache com TTL próprio e é renovado em
+    segundo plano, de modo que os endpoints respondem a partir do snapshot.
+    """
     
-    def __init__(self):
+    def __init__(self, max_workers: int = 8, refresh_interval: float = 5.0):
         """Inicializa o health checker"""
         self.start_time = datetime.now()
         self.checks = {}
         self.last_check = None
+        self.overall_status = 'unknown'
+        self.refresh_interval = refresh_interval
+        
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='health-probe')
+        self._lock = threading.Lock()
+        self._results: Dict[str, Tuple[Dict, float]] = {}
+        self._inflight: Dict[str, object] = {}
+        self._refresher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        
+        # Clientes reutilizados entre execuções dos probes
+        self._http = requests.Session()
+        self._redis = None
     
     def check_database(self):
         """Verifica saúde do banco de dados"""
@@ -49,9 +85,12 @@ class HealthChecker:
     def check_redis(self):
         """Verifica saúde do Redis"""
         try:
-            r = redis.Redis(host='localhost', port=6379, decode_responses=True)
+            if self._redis is None:
+                self._redis = redis.Redis(host='localhost', port=6379, decode_responses=True,
+                                          socket_connect_timeout=PROBE_CONFIG['redis'][1],
+                                          socket_timeout=PROBE_CONFIG['redis'][1])
             start_time = time.time()
-            r.ping()
+            self._redis.ping()
             response_time = time.time() - start_time
             
             return {
@@ -82,7 +121,7 @@ class HealthChecker:
             headers = {"X-API-Key": API_FOOTBALL_KEY}
             
             start_time = time.time()
-            response = requests.get(url, headers=headers, timeout=10)
+            response = self._http.get(url, headers=headers, timeout=PROBE_CONFIG['api_football'][1])
             response_time = time.time() - start_time
             
             if response.status_code == 200:
@@ -119,7 +158,7 @@ class HealthChecker:
             url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getMe"
             
             start_time = time.time()
-            response = requests.get(url, timeout=10)
+            response = self._http.get(url, timeout=PROBE_CONFIG['telegram'][1])
             response_time = time.time() - start_time
             
             if response.status_code == 200:
@@ -196,22 +235,127 @@ class HealthChecker:
                 'message': 'Uptime calculation failed'
             }
     
-    def run_all_checks(self):
-        """Executa todos os checks"""
-        self.last_check = datetime.now()
+    # Execução concorrente e cache
+    
+    def _probe(self, name: str):
+        return getattr(self, f'check_{name}')
+    
+    def _run_probe(self, name: str) -> Dict:
+        try:
+            result = self._probe(name)()
+        except Exception as e:
+            result = {'status': 'unhealthy', 'error': str(e), 'message': f'{name} check raised'}
+        result['checked_at'] = datetime.now().isoformat()
+        with self._lock:
+            self._results[name] = (result, time.monotonic())
+            self._inflight.pop(name, None)
+        return result
+    
+    def _submit(self, name: str):
+        """Submete o probe se ainda não houver uma execução em curso"""
+        with self._lock:
+            future = self._inflight.get(name)
+            if future is None:
+                future = self._inflight[name] = self._executor.submit(self._run_probe, name)
+        return future
+    
+    def _cached(self, name: str, max_age: Optional[float] = None) -> Tuple[Optional[Dict], bool]:
+        """Resultado em cache e se ainda está dentro do TTL"""
+        with self._lock:
+            entry = self._results.get(name)
+        if entry is None:
+            return None, False
+        result, checked_at = entry
+        ttl = PROBE_CONFIG[name][0] if max_age is None else max_age
+        return result, (time.monotonic() - checked_at) <= ttl
+    
+    def run_checks(self, names: Iterable[str], max_age: Optional[float] = None) -> Dict[str, Dict]:
+        """Executa os probes em paralelo, reaproveitando resultados dentro do TTL
         
-        checks = {
-            'database': self.check_database(),
-            'redis': self.check_redis(),
-            'api_football': self.check_api_football(),
-            'telegram': self.check_telegram(),
-            'system_resources': self.check_system_resources(),
-            'uptime': self.check_uptime()
-        }
+        Probes que excedem o timeout são reportados como unhealthy; quando
+        terminam, o resultado real atualiza a cache.
+        """
+        checks = {}
+        pending = {}
+        for name in names:
+            result, fresh = self._cached(name, max_age)
+            if fresh:
+                checks[name] = result
+            else:
+                pending[name] = self._submit(name)
         
-        self.checks = checks
+        started = time.monotonic()
+        for name in sorted(pending, key=lambda n: PROBE_CONFIG[n][1]):
+            remaining = PROBE_CONFIG[name][1] - (time.monotonic() - started)
+            try:
+                checks[name] = pending[name].result(timeout=max(remaining, 0))
+            except FutureTimeoutError:
+                checks[name] = {
+                    'status': 'unhealthy',
+                    'error': f'timeout after {PROBE_CONFIG[name][1]}s',
+                    'message': f'{name} check timed out'
+                }
         
-        # Determinar status geral
+        return {name: checks[name] for name in names}
+    
+    def snapshot(self, names: Iterable[str] = DEEP_PROBES) -> Dict[str, Dict]:
+        """Resultados a partir da cache, sem esperar pela rede
+        
+        Resultados expirados são devolvidos e renovados em segundo plano; só
+        probes nunca executados são aguardados (uma vez, em paralelo).
+        """
+        self.start_background_refresh()
+        names = tuple(names)
+        checks, missing = {}, []
+        for name in names:
+            if PROBE_CONFIG[name][0] == 0:
+                # Probes sem cache (uptime) são baratos e refletem o instante atual
+                checks[name] = self._probe(name)()
+                continue
+            result, fresh = self._cached(name)
+            if result is None:
+                missing.append(name)
+                continue
+            if not fresh:
+                self._submit(name)
+            checks[name] = result
+        if missing:
+            checks.update(self.run_checks(missing))
+        return {name: checks[name] for name in names}
+    
+    def refresh_expired(self, names: Iterable[str] = DEEP_PROBES):
+        """Submete os probes expirados sem aguardar"""
+        for name in names:
+            if PROBE_CONFIG[name][0] == 0:
+                continue
+            _, fresh = self._cached(name)
+            if not fresh:
+                self._submit(name)
+    
+    def start_background_refresh(self):
+        """Inicia (uma vez) a thread que mantém a cache aquecida"""
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._stop.clear()
+            self._refresher = threading.Thread(target=self._refresh_loop, name='health-refresh', daemon=True)
+            self._refresher.start()
+    
+    def stop_background_refresh(self):
+        self._stop.set()
+    
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh_expired()
+            except Exception as e:
+                logger.error(f"Erro ao renovar health checks: {e}")
+    
+    @staticmethod
+    def _overall_status(checks: Dict[str, Dict]) -> str:
+        """Determina o status geral a partir dos probes"""
         overall_status = 'healthy'
         for check_name, check_result in checks.items():
             if check_result['status'] == 'unhealthy':
@@ -221,23 +365,36 @@ class HealthChecker:
                 overall_status = 'warning'
             elif check_result['status'] == 'critical':
                 overall_status = 'critical'
-        
+        return overall_status
+    
+    def _report(self, checks: Dict[str, Dict]) -> Dict:
+        self.last_check = datetime.now()
+        self.checks = checks
+        self.overall_status = self._overall_status(checks)
         return {
-            'overall_status': overall_status,
+            'overall_status': self.overall_status,
             'timestamp': self.last_check.isoformat(),
             'checks': checks
         }
     
+    def run_all_checks(self):
+        """Executa todos os checks (em paralelo, ignorando a cache)"""
+        return self._report(self.run_checks(DEEP_PROBES, max_age=0))
+    
+    def get_cached_report(self, names: Iterable[str] = DEEP_PROBES) -> Dict:
+        """Relatório de saúde servido a partir do snapshot em cache"""
+        return self._report(self.snapshot(names))
+    
     def get_health_summary(self):
         """Retorna resumo da saúde do sistema"""
         if not self.checks:
-            self.run_all_checks()
+            self.get_cached_report()
         
         healthy_count = sum(1 for check in self.checks.values() if check['status'] == 'healthy')
         total_count = len(self.checks)
         
         return {
-            'overall_status': self.checks.get('overall_status', 'unknown'),
+            'overall_status': self.overall_status,
             'healthy_checks': healthy_count,
             'total_checks': total_count,
             'health_percentage': (healthy_count / total_count) * 100,
@@ -254,7 +411,7 @@ health_bp = Blueprint('health', __name__, url_prefix='/health')
 def health_check():
     """Endpoint principal de health check"""
     try:
-        result = health_checker.run_all_checks()
+        result = health_checker.get_cached_report(DEEP_PROBES)
         
         # Determinar código de status HTTP
         status_code = 200
@@ -289,17 +446,10 @@ def health_summary():
 def readiness_check():
     """Endpoint de readiness check (Kubernetes)"""
     try:
-        # Verificar apenas componentes críticos
-        critical_checks = ['database', 'api_football']
+        # Verificar apenas componentes críticos (a partir da cache)
+        checks = health_checker.snapshot(READINESS_PROBES)
         
-        for check_name in critical_checks:
-            if check_name == 'database':
-                result = health_checker.check_database()
-            elif check_name == 'api_football':
-                result = health_checker.check_api_football()
-            else:
-                continue
-            
+        for check_name, result in checks.items():
             if result['status'] != 'healthy':
                 return jsonify({
                     'status': 'not_ready',
@@ -323,7 +473,7 @@ def liveness_check():
     """Endpoint de liveness check (Kubernetes)"""
     try:
         # Verificar se a aplicação está respondendo
-        uptime_result = health_checker.check_uptime()
+        uptime_result = health_checker.snapshot(LIVENESS_PROBES)['uptime']
         
         if uptime_result['status'] == 'healthy':
             return jsonify({
@@ -347,11 +497,10 @@ def liveness_check():
 def health_metrics():
     """Endpoint de métricas de saúde"""
     try:
-        if not health_checker.checks:
-            health_checker.run_all_checks()
+        health_checker.get_cached_report(DEEP_PROBES)
         
         metrics = {
-            'mara_bet_health_status': 1 if health_checker.checks.get('overall_status') == 'healthy' else 0,
+            'mara_bet_health_status': 1 if health_checker.overall_status == 'healthy' else 0,
             'mara_bet_uptime_seconds': health_checker.checks.get('uptime', {}).get('uptime_seconds', 0),
             'mara_bet_cpu_percent': health_checker.checks.get('system_resources', {}).get('cpu_percent', 0),
             'mara_bet_memory_percent': health_checker.checks.get('system_resources', {}).get('memory_percent', 0),
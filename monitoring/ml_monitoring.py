@@ -11,9 +11,15 @@ from typing import Dict, List, Tuple, Any, Optional
 import logging
 import json
 import joblib
+import glob
+import os
+import socket
+import time
 from dataclasses import dataclass
 from enum import Enum
 import warnings
+
+from monitoring.drift_sketches import StreamingDriftMonitor
 warnings.filterwarnings('ignore')
 
 # Configurar logging
@@ -92,6 +98,7 @@ class MLModelMonitor:
         self.drift_threshold = 0.1
         self.anomaly_threshold = 0.8
         self.alert_history = []
+        self.drift_monitor: Optional[StreamingDriftMonitor] = None
         
         # Configurar logging
         self._setup_logging()
@@ -99,10 +106,13 @@ class MLModelMonitor:
     def _setup_logging(self):
         """Configura logging para monitoramento de ML"""
         log_dir = "logs/ml_monitoring"
-        import os
         os.makedirs(log_dir, exist_ok=True)
         
         log_file = f"{log_dir}/ml_monitoring_{datetime.now().strftime('%Y%m%d')}.log"
+        # Workers mantêm um monitor por modelo; um único handler por arquivo evita linhas duplicadas
+        if any(isinstance(h, logging.FileHandler) and h.baseFilename == os.path.abspath(log_file)
+               for h in logger.handlers):
+            return
         
         handler = logging.FileHandler(log_file)
         formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -123,6 +133,100 @@ class MLModelMonitor:
         except Exception as e:
             logger.error(f"❌ Erro ao carregar métricas baseline: {e}")
     
+    def enable_streaming_drift(self, feature_names: List[str], baseline_data: np.ndarray = None,
+                               **kwargs) -> StreamingDriftMonitor:
+        """
+        Ativa o drift em streaming por sketches (ver StreamingDriftMonitor)
+        
+        Args:
+            feature_names: Nomes das features na ordem das colunas
+            baseline_data: Dados de referência; se informados, a baseline é congelada
+            **kwargs: n_bins, k, bucket_seconds, window_buckets
+        """
+        self.drift_monitor = StreamingDriftMonitor(feature_names, **kwargs)
+        if baseline_data is not None:
+            self.drift_monitor.fit_baseline(baseline_data)
+        return self.drift_monitor
+    
+    def observe_features(self, features: np.ndarray, timestamp: Optional[datetime] = None):
+        """Alimenta o drift em streaming com as features de um lote de predições"""
+        if self.drift_monitor is not None and self.drift_monitor.is_frozen:
+            self.drift_monitor.observe(features, timestamp)
+    
+    def get_streaming_drift(self) -> Dict[str, Dict[str, float]]:
+        """PSI, KS e JS por feature da janela ao vivo contra a baseline"""
+        if self.drift_monitor is None:
+            return {}
+        return self.drift_monitor.compute_drift()
+    
+    def save_drift_state(self, filepath: str = "models/drift_state.joblib"):
+        """Persiste os sketches de drift"""
+        if self.drift_monitor is not None:
+            self.drift_monitor.save(filepath)
+            logger.info(f"💾 Estado de drift salvo em {filepath}")
+    
+    def load_drift_state(self, filepath: str = "models/drift_state.joblib", merge: bool = False):
+        """Carrega (ou mescla, vindo de outro worker) os sketches de drift"""
+        state = StreamingDriftMonitor.load(filepath)
+        if merge and self.drift_monitor is not None:
+            self.drift_monitor.merge(state)
+        else:
+            self.drift_monitor = state
+        logger.info(f"📂 Estado de drift carregado de {filepath}")
+    
+    def persist_worker_drift(self, state_dir: str, worker_id: Optional[str] = None) -> Optional[str]:
+        """
+        Persiste os sketches deste processo em state_dir, um arquivo por worker
+        
+        Args:
+            state_dir: Diretório compartilhado pelos workers do mesmo modelo
+            worker_id: Identificador do worker (padrão: host_pid)
+        
+        Returns:
+            Caminho do arquivo gravado (None sem drift ativo)
+        """
+        if self.drift_monitor is None:
+            return None
+        worker_id = worker_id or f"{socket.gethostname()}_{os.getpid()}"
+        filepath = os.path.join(state_dir, f"worker_{worker_id}.joblib")
+        self.drift_monitor.save(filepath)
+        return filepath
+    
+    def merge_worker_drift(self, state_dir: str, max_age_seconds: Optional[float] = None) -> int:
+        """
+        Mescla no monitor os sketches gravados por persist_worker_drift
+        
+        O monitor deve partir só da baseline de treino, senão o tráfego deste
+        processo é contado duas vezes. Arquivos sem atualização há mais que a
+        janela ao vivo (workers reiniciados) são removidos; os de outra
+        baseline (modelo retreinado) são ignorados até o worker regravá-los.
+        
+        Args:
+            state_dir: Diretório com os arquivos dos workers
+            max_age_seconds: Idade máxima de um arquivo (padrão: duração da janela ao vivo)
+        
+        Returns:
+            Número de workers mesclados
+        """
+        if self.drift_monitor is None:
+            return 0
+        if max_age_seconds is None:
+            max_age_seconds = self.drift_monitor.bucket_seconds * self.drift_monitor.window_buckets
+        
+        merged = 0
+        now = time.time()
+        for filepath in sorted(glob.glob(os.path.join(state_dir, 'worker_*.joblib'))):
+            if now - os.path.getmtime(filepath) > max_age_seconds:
+                os.remove(filepath)
+                logger.info(f"🗑️ Estado de drift expirado removido: {filepath}")
+                continue
+            try:
+                self.drift_monitor.merge(StreamingDriftMonitor.load(filepath))
+                merged += 1
+            except ValueError as e:
+                logger.warning(f"⚠️ Estado de drift ignorado ({filepath}): {e}")
+        return merged
+    
     def calculate_model_metrics(self, y_true: np.ndarray, y_pred: np.ndarray, 
                                y_proba: np.ndarray = None) -> ModelMetrics:
         """Calcula métricas do modelo"""
@@ -195,7 +299,11 @@ class MLModelMonitor:
     def detect_model_drift(self, current_metrics: ModelMetrics, 
                           current_data: np.ndarray = None) -> DriftMetrics:
         """Detecta drift no modelo"""
-        if self.baseline_metrics is None:
+        streaming = self.drift_monitor is not None and self.drift_monitor.is_frozen
+        if streaming and current_data is not None:
+            self.drift_monitor.observe(current_data)
+        
+        if self.baseline_metrics is None and not streaming:
             logger.warning("⚠️ Métricas baseline não disponíveis para detecção de drift")
             return DriftMetrics(
                 statistical_drift=0.0,
@@ -258,6 +366,13 @@ class MLModelMonitor:
     
     def _calculate_feature_drift(self, current_data: np.ndarray) -> Dict[str, float]:
         """Calcula drift de features"""
+        if self.drift_monitor is not None and self.drift_monitor.is_frozen:
+            # PSI da janela ao vivo contra a baseline (0.1 moderado, 0.25 significativo)
+            return {
+                feature: min(metrics['psi'], 1.0)
+                for feature, metrics in self.drift_monitor.compute_drift().items()
+            }
+        
         if current_data is None or not self.baseline_metrics:
             return {}
         
@@ -291,6 +406,11 @@ class MLModelMonitor:
     
     def _calculate_data_drift(self, current_data: np.ndarray) -> float:
         """Calcula drift de dados"""
+        if self.drift_monitor is not None and self.drift_monitor.is_frozen:
+            # Maior distância de Jensen-Shannon entre as features
+            drift = self.drift_monitor.compute_drift()
+            return min(max((m['js'] for m in drift.values()), default=0.0), 1.0)
+        
         if current_data is None or not self.baseline_metrics:
             return 0.0
         
@@ -4,15 +4,31 @@ Sistema de Logs Estruturados para o MaraBet AI
 Logs em formato JSON para melhor análise e monitoramento
 """
 
+import atexit
+import gzip
 import json
 import logging
+import os
+import queue
+import shutil
 import sys
+import threading
+import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Any, List, Optional
 from pathlib import Path
 import traceback
 from enum import Enum
 
+try:
+    import orjson
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj, default=str).decode('utf-8')
+except ImportError:
+    _dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str).encode
+
 class LogLevel(Enum):
     """Níveis de log"""
     DEBUG = "DEBUG"
@@ -21,13 +37,19 @@ class LogLevel(Enum):
     ERROR = "ERROR"
     CRITICAL = "CRITICAL"
 
+# Campos extras reconhecidos quando passados via `extra=` do logging padrão
+EXTRA_FIELDS = (
+    'user_id', 'request_id', 'bet_id', 'match_id', 'roi', 'profit_loss',
+    'duration_ms', 'status_code', 'error_code'
+)
+
 class JSONFormatter(logging.Formatter):
     """Formatador JSON para logs"""
     
-    def format(self, record):
-        """Formata log em JSON"""
+    def to_dict(self, record) -> Dict[str, Any]:
+        """Converte o registo num dicionário serializável"""
         log_entry = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": datetime.utcfromtimestamp(record.created).isoformat() + "Z",
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -39,42 +61,247 @@ class JSONFormatter(logging.Formatter):
         }
         
         # Adicionar campos extras se existirem
-        if hasattr(record, 'user_id'):
-            log_entry['user_id'] = record.user_id
-        if hasattr(record, 'request_id'):
-            log_entry['request_id'] = record.request_id
-        if hasattr(record, 'bet_id'):
-            log_entry['bet_id'] = record.bet_id
-        if hasattr(record, 'match_id'):
-            log_entry['match_id'] = record.match_id
-        if hasattr(record, 'roi'):
-            log_entry['roi'] = record.roi
-        if hasattr(record, 'profit_loss'):
-            log_entry['profit_loss'] = record.profit_loss
-        if hasattr(record, 'duration_ms'):
-            log_entry['duration_ms'] = record.duration_ms
-        if hasattr(record, 'status_code'):
-            log_entry['status_code'] = record.status_code
-        if hasattr(record, 'error_code'):
-            log_entry['error_code'] = record.error_code
+        for field in EXTRA_FIELDS:
+            if hasattr(record, field):
+                log_entry[field] = getattr(record, field)
+        
+        # Contexto passado pelo StructuredLogger
+        context = getattr(record, 'context', None)
+        if context:
+            for key, value in context.items():
+                log_entry.setdefault(key, value)
         
         # Adicionar stack trace para erros
-        if record.exc_info:
-            log_entry['exception'] = {
-                'type': record.exc_info[0].__name__,
-                'message': str(record.exc_info[1]),
-                'traceback': traceback.format_exception(*record.exc_info)
-            }
+        exception = getattr(record, 'exception', None)
+        if exception is not None:
+            log_entry['exception'] = exception
+        elif record.exc_info:
+            log_entry['exception'] = _exception_info(record.exc_info)
+        
+        return log_entry
+    
+    def format(self, record):
+        """Formata log em JSON"""
+        return _dumps(self.to_dict(record))
+
+def _exception_info(exc_info) -> Dict[str, Any]:
+    return {
+        'type': exc_info[0].__name__,
+        'message': str(exc_info[1]),
+        'traceback': traceback.format_exception(*exc_info)
+    }
+
+class LogSink:
+    """Destino de logs que recebe linhas já formatadas em lote
+    
+    Ficheiros são rodados por tamanho e as cópias antigas comprimidas com
+    gzip (arquivo.json.1.gz, arquivo.json.2.gz, ...).
+    """
+    
+    def __init__(self, path: Optional[str] = None, stream=None, level: int = logging.DEBUG,
+                 max_bytes: int = 50 * 1024 * 1024, backup_count: int = 5):
+        self.path = Path(path) if path else None
+        self.stream = stream
+        self.level = level
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._file = None
+        self._size = 0
+        if self.path is not None:
+            self._open()
+    
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'ab')
+        self._size = self._file.tell()
+    
+    def write(self, lines: List[str]):
+        """Escreve um lote de linhas com uma única chamada de escrita"""
+        data = '\n'.join(lines) + '\n'
+        if self._file is None:
+            self.stream.write(data)
+            self.stream.flush()
+            return
         
-        return json.dumps(log_entry, ensure_ascii=False)
+        encoded = data.encode('utf-8')
+        self._file.write(encoded)
+        self._file.flush()
+        self._size += len(encoded)
+        if self.max_bytes and self._size >= self.max_bytes:
+            self.rotate()
+    
+    def rotate(self):
+        """Roda o ficheiro atual para .1.gz, deslocando as cópias antigas"""
+        self._file.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = Path(f"{self.path}.{i}.gz")
+                if source.exists():
+                    os.replace(source, f"{self.path}.{i + 1}.gz")
+            with open(self.path, 'rb') as source, gzip.open(f"{self.path}.1.gz", 'wb') as target:
+                shutil.copyfileobj(source, target)
+        os.remove(self.path)
+        self._open()
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class BackpressureQueueHandler(QueueHandler):
+    """QueueHandler que não bloqueia o chamador
+    
+    O registo é apenas preparado (mensagem resolvida, exceção serializada) no
+    thread do pedido; o JSON é gerado uma única vez no listener. Com a fila
+    acima de `high_watermark`, apenas 1 em cada `debug_sample_every` registos
+    DEBUG é mantido; com a fila cheia, registos abaixo de ERROR são descartados
+    e ERROR/CRITICAL esperam até `block_timeout` segundos.
+    """
+    
+    def __init__(self, log_queue: queue.Queue, high_watermark: float = 0.8,
+                 debug_sample_every: int = 10, block_timeout: float = 0.1):
+        super().__init__(log_queue)
+        self.high_watermark = int(log_queue.maxsize * high_watermark) if log_queue.maxsize else 0
+        self.debug_sample_every = max(1, debug_sample_every)
+        self.block_timeout = block_timeout
+        self._debug_counter = 0
+        self.stats = {'enqueued': 0, 'dropped': 0, 'sampled_out': 0}
+    
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exception = _exception_info(record.exc_info)
+            record.exc_info = None
+            record.exc_text = None
+        return record
+    
+    def emit(self, record):
+        if record.levelno <= logging.DEBUG and self.high_watermark and \
+                self.queue.qsize() >= self.high_watermark:
+            self._debug_counter += 1
+            if self._debug_counter % self.debug_sample_every:
+                self.stats['sampled_out'] += 1
+                return
+        try:
+            self.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno >= logging.ERROR:
+                try:
+                    self.queue.put(record, timeout=self.block_timeout)
+                    self.stats['enqueued'] += 1
+                    return
+                except queue.Full:
+                    pass
+            self.stats['dropped'] += 1
+            return
+        self.stats['enqueued'] += 1
+
+class BatchingQueueListener(QueueListener):
+    """Consome a fila num thread de fundo, formata cada registo uma vez e
+    escreve em lote em todos os sinks cujo nível o aceita"""
+    
+    def __init__(self, log_queue: queue.Queue, sinks: List[LogSink],
+                 formatter: Optional[JSONFormatter] = None, batch_size: int = 500,
+                 flush_interval: float = 0.05):
+        super().__init__(log_queue)
+        self.sinks = sinks
+        self.formatter = formatter or JSONFormatter()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+    
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+    
+    def _monitor(self):
+        log_queue = self.queue
+        while True:
+            batch = [log_queue.get()]
+            while batch[-1] is not self._sentinel and len(batch) < self.batch_size:
+                try:
+                    batch.append(log_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            stop = batch[-1] is self._sentinel
+            records = batch[:-1] if stop else batch
+            if records:
+                write_records(self.sinks, self.formatter, records)
+            for _ in batch:
+                log_queue.task_done()
+            if stop:
+                break
+            # Acumula o próximo lote sem acordar a cada registo
+            if len(batch) < self.batch_size and self.flush_interval:
+                time.sleep(self.flush_interval)
+
+def write_records(sinks: List[LogSink], formatter: JSONFormatter, records: List[logging.LogRecord]):
+    """Formata os registos uma vez e distribui-os pelos sinks"""
+    formatted = [(record.levelno, formatter.format(record)) for record in records]
+    for sink in sinks:
+        lines = [line for levelno, line in formatted if levelno >= sink.level]
+        if not lines:
+            continue
+        try:
+            sink.write(lines)
+        except Exception as e:
+            sys.stderr.write(f"Erro ao escrever logs em {sink.path or sink.stream}: {e}\n")
+
+class FanOutHandler(logging.Handler):
+    """Handler síncrono: formata uma vez e escreve em todos os sinks"""
+    
+    def __init__(self, sinks: List[LogSink], formatter: Optional[JSONFormatter] = None):
+        super().__init__()
+        self.sinks = sinks
+        self.json_formatter = formatter or JSONFormatter()
+    
+    def emit(self, record):
+        try:
+            write_records(self.sinks, self.json_formatter, [record])
+        except Exception:
+            self.handleError(record)
 
 class StructuredLogger:
-    """Logger estruturado para o MaraBet AI"""
+    """Logger estruturado para o MaraBet AI
+    
+    Por omissão os registos passam por uma fila (QueueHandler) e são escritos
+    por um thread de fundo, mantendo o custo no thread do pedido mínimo.
     
-    def __init__(self, name: str = "marabet"):
+    Args:
+        name: Nome do logger
+        log_dir: Diretório dos ficheiros de log
+        async_logging: Usar a fila e o thread de fundo
+        console: Escrever também em stdout
+        queue_size: Capacidade da fila
+        max_bytes: Tamanho a partir do qual cada ficheiro é rodado
+        backup_count: Cópias comprimidas mantidas por ficheiro
+        debug_sample_every: Amostragem de DEBUG quando a fila está congestionada
+    """
+    
+    def __init__(self, name: str = "marabet", log_dir: str = "logs", async_logging: bool = True,
+                 console: bool = True, queue_size: int = 10000,
+                 max_bytes: int = 50 * 1024 * 1024, backup_count: int = 5,
+                 debug_sample_every: int = 10):
         """Inicializa logger estruturado"""
         self.logger = logging.getLogger(name)
         self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        self.log_dir = Path(log_dir)
+        self.async_logging = async_logging
+        self.console = console
+        self.queue_size = queue_size
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.debug_sample_every = debug_sample_every
+        self.sinks: List[LogSink] = []
+        self.handler: Optional[logging.Handler] = None
+        self.listener: Optional[BatchingQueueListener] = None
         
         # Remover handlers existentes
         for handler in self.logger.handlers[:]:
@@ -85,37 +312,50 @@ class StructuredLogger:
     
     def _setup_handlers(self):
         """Configura handlers de log"""
-        # Handler para console
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.INFO)
-        console_handler.setFormatter(JSONFormatter())
-        self.logger.addHandler(console_handler)
-        
-        # Handler para arquivo de logs gerais
-        file_handler = logging.FileHandler('logs/mara_bet.json', encoding='utf-8')
-        file_handler.setLevel(logging.DEBUG)
-        file_handler.setFormatter(JSONFormatter())
-        self.logger.addHandler(file_handler)
+        file_options = {'max_bytes': self.max_bytes, 'backup_count': self.backup_count}
         
-        # Handler para logs de erro
-        error_handler = logging.FileHandler('logs/mara_bet_errors.json', encoding='utf-8')
-        error_handler.setLevel(logging.ERROR)
-        error_handler.setFormatter(JSONFormatter())
-        self.logger.addHandler(error_handler)
+        # Console, logs gerais, logs de erro e logs de negócio
+        if self.console:
+            self.sinks.append(LogSink(stream=sys.stdout, level=logging.INFO))
+        self.sinks.append(LogSink(self.log_dir / 'mara_bet.json', level=logging.DEBUG, **file_options))
+        self.sinks.append(LogSink(self.log_dir / 'mara_bet_errors.json', level=logging.ERROR, **file_options))
+        self.sinks.append(LogSink(self.log_dir / 'mara_bet_business.json', level=logging.INFO, **file_options))
         
-        # Handler para logs de negócio
-        business_handler = logging.FileHandler('logs/mara_bet_business.json', encoding='utf-8')
-        business_handler.setLevel(logging.INFO)
-        business_handler.setFormatter(JSONFormatter())
-        self.logger.addHandler(business_handler)
+        if self.async_logging:
+            log_queue = queue.Queue(maxsize=self.queue_size)
+            self.handler = BackpressureQueueHandler(log_queue, debug_sample_every=self.debug_sample_every)
+            self.listener = BatchingQueueListener(log_queue, self.sinks)
+            self.listener.start()
+            atexit.register(self.close)
+        else:
+            self.handler = FanOutHandler(self.sinks)
+        self.logger.addHandler(self.handler)
+    
+    def flush(self):
+        """Aguarda a escrita de todos os registos enfileirados"""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.queue.join()
+    
+    def close(self):
+        """Esvazia a fila, para o thread de fundo e fecha os ficheiros"""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+        if self.handler is not None:
+            self.logger.removeHandler(self.handler)
+            self.handler = None
+        for sink in self.sinks:
+            sink.close()
+    
+    def get_stats(self) -> Dict[str, int]:
+        stats = dict(getattr(self.handler, 'stats', {}))
+        if self.listener is not None:
+            stats['queued'] = self.listener.queue.qsize()
+        return stats
     
     def _log_with_context(self, level: LogLevel, message: str, **kwargs):
         """Log com contexto adicional"""
-        extra = {}
-        for key, value in kwargs.items():
-            extra[key] = value
-        
-        getattr(self.logger, level.value.lower())(message, extra=extra)
+        # O contexto vai num único atributo para não colidir com os do LogRecord
+        getattr(self.logger, level.value.lower())(message, extra={'context': kwargs})
     
     def debug(self, message: str, **kwargs):
         """Log de debug"""
@@ -202,7 +442,7 @@ class StructuredLogger:
             alert_id=alert_id,
             rule_name=rule_name,
             severity=severity,
-            message=message,
+            alert_message=message,
             metadata=metadata or {},
             event_type="alert"
         )
@@ -296,6 +536,31 @@ def log_function_call(func):
     
     return wrapper
 
+def benchmark_logging(n: int = 10000, burst: int = 200, log_dir: Optional[str] = None) -> Dict[str, float]:
+    """Mede o custo por chamada (µs) no thread do chamador: escrita síncrona vs. fila
+    
+    Os logs são emitidos em rajadas de `burst` (como num pedido) e a fila é
+    esvaziada entre rajadas fora da medição.
+    """
+    import tempfile
+    
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for mode, async_logging in (('sync', False), ('async', True)):
+            bench = StructuredLogger(f"marabet.benchmark.{mode}", log_dir=log_dir or tmp_dir,
+                                     async_logging=async_logging, console=False)
+            elapsed = 0.0
+            for offset in range(0, n, burst):
+                start = time.perf_counter()
+                for i in range(offset, min(offset + burst, n)):
+                    bench.info("Aposta realizada", bet_id=f"bet_{i}", match_id="39_12345",
+                               stake=100.0, odds=1.85, event_type="bet_placed")
+                elapsed += time.perf_counter() - start
+                bench.flush()
+            results[f'{mode}_us_per_call'] = elapsed / n * 1e6
+            bench.close()
+    return results
+
 if __name__ == "__main__":
     # Teste do sistema de logs estruturados
     print("🧪 TESTANDO LOGS ESTRUTURADOS")
@@ -356,4 +621,10 @@ if __name__ == "__main__":
     print("  - mara_bet_errors.json (apenas erros)")
     print("  - mara_bet_business.json (métricas de negócio)")
     
+    structured_logger.flush()
+    
+    # Benchmark do custo no thread do pedido
+    bench = benchmark_logging(10000)
+    print(f"\n⏱️  Síncrono: {bench['sync_us_per_call']:.1f} µs/log | Fila: {bench['async_us_per_call']:.1f} µs/log")
+    
     print("\n🎉 TESTES DE LOGS CONCLUÍDOS!")
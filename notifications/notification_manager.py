@@ -7,7 +7,6 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
-import requests
 import json
 from dataclasses import dataclass
 from enum import Enum
@@ -17,6 +16,7 @@ from settings.settings import (
     SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD,
     NOTIFICATION_EMAIL, ADMIN_EMAIL
 )
+from notifications.telegram_delivery import get_telegram_delivery
 
 logger = logging.getLogger(__name__)
 
@@ -95,28 +95,21 @@ class NotificationManager:
         return results
     
     async def _send_telegram(self, notification: Notification) -> bool:
-        """Envia notificação via Telegram"""
+        """Envia notificação via Telegram (pipeline assíncrono com pool e rate limit)"""
         try:
-            url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+            delivery = get_telegram_delivery(TELEGRAM_BOT_TOKEN)
             
             # Formatar mensagem
             message = self._format_telegram_message(notification)
             
-            payload = {
-                'chat_id': TELEGRAM_CHAT_ID,
-                'text': message,
-                'parse_mode': 'HTML',
-                'disable_web_page_preview': True
-            }
-            
-            response = requests.post(url, json=payload, timeout=10)
-            
-            if response.status_code == 200:
-                logger.info(f"✅ Telegram enviado: {notification.title}")
-                return True
+            # Alertas de predição em rajada são agrupados num digest
+            if notification.type == NotificationType.PREDICTION:
+                await delivery.send_value_bet(TELEGRAM_CHAT_ID, message)
             else:
-                logger.error(f"❌ Erro Telegram: {response.status_code} - {response.text}")
-                return False
+                await delivery.send_message(TELEGRAM_CHAT_ID, message)
+            
+            logger.info(f"✅ Telegram enviado: {notification.title}")
+            return True
                 
         except Exception as e:
             logger.error(f"Erro ao enviar Telegram: {e}")
@@ -0,0 +1,124 @@
+# Fila assíncrona de notificações do MaraBet AI
+#
+# Código síncrono (coletores, ValueFinder, agendador) não pode chamar
+# asyncio.create_task sem um event loop em execução. A NotificationQueue
+# mantém o seu próprio loop numa thread de fundo e recebe as corotinas de
+# notificação de qualquer thread, de forma thread-safe.
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationQueue:
+    """Fila de notificações consumida por workers assíncronos numa thread própria"""
+
+    def __init__(self, workers: int = 2, maxsize: int = 1000):
+        self.workers = workers
+        self.maxsize = maxsize
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._workers = []
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self.stats = {'submitted': 0, 'sent': 0, 'failed': 0, 'dropped': 0}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Inicia a thread com o event loop e os workers"""
+        with self._lock:
+            if self.running:
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run, name='notification-queue', daemon=True)
+            self._thread.start()
+        self._ready.wait(timeout=5)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._workers = [self._loop.create_task(self._worker()) for _ in range(self.workers)]
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    async def _worker(self):
+        while True:
+            func, args, kwargs = await self._queue.get()
+            try:
+                await func(*args, **kwargs)
+                self.stats['sent'] += 1
+            except Exception as e:
+                self.stats['failed'] += 1
+                logger.error(f"Erro ao enviar notificação: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+            logger.warning("Fila de notificações cheia - notificação descartada")
+
+    def submit(self, func: Callable[..., Awaitable[Any]], *args, **kwargs):
+        """Agenda `await func(*args, **kwargs)` a partir de qualquer thread"""
+        if not self.running:
+            self.start()
+        self.stats['submitted'] += 1
+        self._loop.call_soon_threadsafe(self._put, (func, args, kwargs))
+
+    def call(self, func: Callable[..., Awaitable[Any]], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Executa `await func(*args, **kwargs)` no loop da fila e devolve o resultado"""
+        if not self.running:
+            self.start()
+        future = asyncio.run_coroutine_threadsafe(func(*args, **kwargs), self._loop)
+        return future.result(timeout)
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Aguarda o esvaziamento da fila (útil em testes e no encerramento)"""
+        if not self.running:
+            return True
+        future = asyncio.run_coroutine_threadsafe(self._queue.join(), self._loop)
+        try:
+            future.result(timeout)
+            return True
+        except Exception:
+            return False
+
+    def stop(self, timeout: float = 5.0):
+        """Esvazia a fila e encerra o loop"""
+        if not self.running:
+            return
+        self.join(timeout)
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+        self._thread.join(timeout)
+
+    async def _shutdown(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._loop.stop()
+
+    def get_stats(self) -> Dict[str, int]:
+        stats = dict(self.stats)
+        stats['pending'] = self._queue.qsize() if self._queue is not None else 0
+        return stats
+
+
+# Instância global da fila
+notification_queue = NotificationQueue()
+
+
+def enqueue_notification(func: Callable[..., Awaitable[Any]], *args, **kwargs):
+    """Envia uma notificação assíncrona a partir de código síncrono"""
+    notification_queue.submit(func, *args, **kwargs)
@@ -0,0 +1,543 @@
+# Pipeline assíncrono de entrega para o Telegram do MaraBet AI
+#
+# Um único cliente HTTP (aiohttp) com pool de conexões por event loop, uma
+# fila ordenada por chat e token buckets que respeitam os limites da Bot API
+# (~30 msg/s no total e ~1 msg/s por chat). Alertas de value bet que chegam em
+# rajada são agrupados num digest e respostas 429 são repetidas após o
+# `retry_after` indicado pelo Telegram.
+#
+# Com vários processos (workers prefork do Celery) os limites e os digests
+# precisam de um ponto central: RedisTokenBucket partilha os buckets entre
+# processos e RedisDigestBuffer acumula os alertas de cada chat no Redis até
+# uma única tarefa de flush enviá-los.
+import asyncio
+import json
+import logging
+import os
+import time
+import weakref
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_URL = 'https://api.telegram.org'
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+DIGEST_SEPARATOR = '\n\n➖➖➖➖➖\n\n'
+
+
+class TelegramAPIError(Exception):
+    """Erro devolvido pela Bot API (ou falha de rede após as tentativas)"""
+
+    def __init__(self, description: str, error_code: Optional[int] = None,
+                 retry_after: Optional[float] = None):
+        super().__init__(description)
+        self.description = description
+        self.error_code = error_code
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket com reserva: o chamador espera o atraso devolvido"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1.0))
+        self.tokens = self.capacity
+        self.updated: Optional[float] = None
+
+    def _refill(self, now: float):
+        if self.updated is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now: Optional[float] = None) -> float:
+        """Consome um token e devolve quantos segundos esperar até ele existir"""
+        self._refill(time.monotonic() if now is None else now)
+        self.tokens -= 1.0
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def penalize(self, seconds: float, now: Optional[float] = None):
+        """Adia o próximo token em `seconds` (usado com o retry_after do Telegram)"""
+        self._refill(time.monotonic() if now is None else now)
+        self.tokens = min(self.tokens, 1.0 - seconds * self.rate)
+
+
+# Token bucket atômico no Redis; o relógio é o do próprio Redis (TIME), comum
+# a todos os processos. ARGV: taxa, capacidade, penalidade (s) e TTL da chave.
+# Sem penalidade consome um token e devolve a espera (string: o Lua trunca números).
+_REDIS_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local penalty = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local delay = 0
+if penalty > 0 then
+  tokens = math.min(tokens, 1 - penalty * rate)
+else
+  tokens = tokens - 1
+  if tokens < 0 then delay = -tokens / rate end
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return tostring(delay)
+"""
+
+
+class RedisTokenBucket:
+    """Token bucket partilhado entre processos através do Redis
+
+    Mesma interface de TokenBucket. Se o Redis falhar, usa um bucket local
+    para não travar a entrega (os limites voltam a ser por processo).
+    """
+
+    shared = True
+
+    def __init__(self, redis_client, key: str, rate: float, capacity: Optional[float] = None,
+                 ttl: int = 3600):
+        self.key = key
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1.0))
+        self.ttl = ttl
+        self.fallback = TokenBucket(rate, self.capacity)
+        self._script = redis_client.register_script(_REDIS_BUCKET_SCRIPT)
+
+    def _call(self, penalty: float) -> float:
+        return float(self._script(keys=[self.key],
+                                  args=[self.rate, self.capacity, penalty, self.ttl]))
+
+    def reserve(self, now: Optional[float] = None) -> float:
+        try:
+            return self._call(0.0)
+        except Exception as e:
+            logger.warning(f"Rate limit do Telegram no Redis indisponível, usando limite local: {e}")
+            return self.fallback.reserve(now)
+
+    def penalize(self, seconds: float, now: Optional[float] = None):
+        try:
+            self._call(max(float(seconds), 1e-3))
+        except Exception as e:
+            logger.warning(f"Rate limit do Telegram no Redis indisponível, usando limite local: {e}")
+            self.fallback.penalize(seconds, now)
+
+
+def build_digest_texts(texts: List[str], header: str) -> List[Tuple[str, int]]:
+    """Junta alertas em mensagens que cabem no limite do Telegram
+
+    Returns:
+        Lista de (texto, número de alertas agrupados)
+    """
+    overhead = len(header.format(count=len(texts))) + len(DIGEST_SEPARATOR)
+    groups, current, size = [], [], overhead
+    for text in texts:
+        added = len(text) + len(DIGEST_SEPARATOR)
+        if current and size + added > TELEGRAM_MAX_MESSAGE_LENGTH:
+            groups.append(current)
+            current, size = [], overhead
+        current.append(text)
+        size += added
+    if current:
+        groups.append(current)
+
+    messages = []
+    for group in groups:
+        if len(group) == 1:
+            messages.append((group[0], 1))
+        else:
+            messages.append((header.format(count=len(group)) + DIGEST_SEPARATOR +
+                             DIGEST_SEPARATOR.join(group), len(group)))
+    return messages
+
+
+class RedisDigestBuffer:
+    """Buffer de alertas por chat no Redis, partilhado por todos os workers
+
+    `push` acrescenta um alerta e indica se o chamador deve agendar o flush
+    (só o primeiro alerta de cada janela o faz); `drain` retira todos os
+    alertas do chat de forma atômica e libera o agendamento da janela seguinte.
+    """
+
+    KEY_PREFIX = 'marabet:telegram:digest:'
+
+    def __init__(self, redis_client, window: float = 2.0, max_items: int = 20):
+        self.redis_client = redis_client
+        self.window = window
+        self.max_items = max_items
+
+    def _keys(self, chat_id) -> Tuple[str, str]:
+        key = f"{self.KEY_PREFIX}{chat_id}"
+        return key, f"{key}:scheduled"
+
+    def push(self, chat_id, text: str, parse_mode: Optional[str] = 'HTML') -> Tuple[int, bool]:
+        """Guarda um alerta
+
+        Returns:
+            (alertas pendentes no chat, True se esta chamada abriu a janela)
+        """
+        key, scheduled_key = self._keys(chat_id)
+        item = json.dumps({'text': text, 'parse_mode': parse_mode})
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.rpush(key, item)
+        # A marca expira sozinha se o flush agendado se perder
+        pipe.set(scheduled_key, 1, nx=True, ex=max(int(self.window * 10), 60))
+        pending, opened = pipe.execute()
+        return int(pending), bool(opened)
+
+    def drain(self, chat_id) -> List[Dict[str, Any]]:
+        """Retira todos os alertas pendentes do chat"""
+        key, scheduled_key = self._keys(chat_id)
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.lrange(key, 0, -1)
+        pipe.delete(key, scheduled_key)
+        items, _ = pipe.execute()
+        return [json.loads(item) for item in items]
+
+    def restore(self, chat_id, items: List[Dict[str, Any]]):
+        """Devolve alertas não enviados ao início da fila do chat"""
+        if not items:
+            return
+        key, _ = self._keys(chat_id)
+        self.redis_client.lpush(key, *[json.dumps(item) for item in reversed(items)])
+
+
+@dataclass
+class _OutgoingMessage:
+    chat_id: str
+    payload: Dict[str, Any]
+    future: asyncio.Future
+    attempts: int = 0
+
+
+@dataclass
+class _Digest:
+    items: List[Tuple[str, asyncio.Future]] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+class TelegramDelivery:
+    """Entrega de mensagens do Telegram com pool, rate limiting e digests
+
+    Deve ser usado sempre dentro do mesmo event loop (ver get_telegram_delivery).
+
+    Args:
+        bot_token: Token do bot
+        api_base: URL base da Bot API (permite um servidor falso em testes)
+        global_rate: Mensagens/s no total do bot
+        chat_rate: Mensagens/s por chat
+        digest_window: Segundos de espera para agrupar alertas de value bet
+        digest_max_items: Alertas por digest antes de enviar imediatamente
+        max_retries: Novas tentativas em 429, 5xx e erros de rede
+        retry_backoff: Espera base (exponencial) para 5xx e erros de rede
+        timeout: Timeout total de cada pedido HTTP
+        pool_size: Conexões simultâneas no pool
+        session: aiohttp.ClientSession já existente (não é fechada por nós)
+        redis_client: Cliente Redis para partilhar os limites entre processos
+        max_chat_buckets: Buckets por chat mantidos em memória (LRU)
+    """
+
+    def __init__(self, bot_token: str, api_base: str = TELEGRAM_API_URL,
+                 global_rate: float = 30.0, chat_rate: float = 1.0,
+                 digest_window: float = 2.0, digest_max_items: int = 20,
+                 max_retries: int = 3, retry_backoff: float = 0.5,
+                 timeout: float = 10.0, pool_size: int = 20, session=None,
+                 redis_client=None, max_chat_buckets: int = 10_000):
+        if not AIOHTTP_AVAILABLE:
+            raise ImportError("aiohttp é necessário para o TelegramDelivery")
+        self.bot_token = bot_token
+        self.api_base = api_base.rstrip('/')
+        self.chat_rate = chat_rate
+        self.digest_window = digest_window
+        self.digest_max_items = digest_max_items
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.redis_client = redis_client
+        self.max_chat_buckets = max_chat_buckets
+        # Chaves pelo id do bot (prefixo do token), nunca pelo token inteiro
+        self._bucket_prefix = f"marabet:telegram:bucket:{bot_token.split(':')[0]}:"
+
+        self._session = session
+        self._owns_session = session is None
+        if redis_client is not None:
+            self._global_bucket = RedisTokenBucket(redis_client, f"{self._bucket_prefix}global", global_rate)
+        else:
+            self._global_bucket = TokenBucket(global_rate)
+        self._chat_buckets: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lanes: Dict[str, Deque[_OutgoingMessage]] = {}
+        self._lane_tasks: Dict[str, asyncio.Task] = {}
+        self._digests: Dict[str, _Digest] = {}
+        self._digest_tasks: set = set()
+        self.stats = {'sent': 0, 'failed': 0, 'retries': 0, 'rate_limited': 0,
+                      'digests': 0, 'coalesced': 0}
+
+    @property
+    def url(self) -> str:
+        return f"{self.api_base}/bot{self.bot_token}/sendMessage"
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._owns_session = True
+        return self._session
+
+    # ------------------------------------------------------------------
+    # API pública
+
+    async def send_message(self, chat_id, text: str, parse_mode: Optional[str] = 'HTML',
+                           disable_notification: bool = False, **extra) -> Dict[str, Any]:
+        """Envia uma mensagem respeitando a ordem e os limites do chat
+
+        Returns:
+            O campo `result` da resposta do Telegram (Message)
+        """
+        payload = {'chat_id': chat_id, 'text': text, 'disable_web_page_preview': True,
+                   'disable_notification': disable_notification, **extra}
+        if parse_mode:
+            payload['parse_mode'] = parse_mode
+        return await self._enqueue(str(chat_id), payload)
+
+    async def send_value_bet(self, chat_id, text: str, parse_mode: Optional[str] = 'HTML',
+                             header: str = '🚨 <b>{count} Value Bets encontrados</b>') -> Dict[str, Any]:
+        """Envia um alerta de value bet, agrupado com outros do mesmo chat
+
+        Alertas que chegam dentro de `digest_window` segundos saem numa única
+        mensagem (dividida se ultrapassar o limite de tamanho do Telegram).
+        """
+        loop = asyncio.get_running_loop()
+        chat_key = str(chat_id)
+        future = loop.create_future()
+
+        digest = self._digests.get(chat_key)
+        if digest is None:
+            digest = self._digests[chat_key] = _Digest(params={
+                'chat_id': chat_id, 'parse_mode': parse_mode, 'header': header
+            })
+            digest.timer = loop.call_later(self.digest_window, self._flush_digest, chat_key)
+        digest.items.append((text, future))
+
+        if len(digest.items) >= self.digest_max_items:
+            self._flush_digest(chat_key)
+        return await future
+
+    async def flush(self):
+        """Envia os digests pendentes e aguarda o esvaziamento de todas as filas"""
+        for chat_key in list(self._digests):
+            self._flush_digest(chat_key)
+        while self._lane_tasks or self._digest_tasks:
+            pending = list(self._lane_tasks.values()) + list(self._digest_tasks)
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def close(self):
+        await self.flush()
+        if self._owns_session and self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def get_stats(self) -> Dict[str, int]:
+        stats = dict(self.stats)
+        stats['queued'] = sum(len(lane) for lane in self._lanes.values())
+        stats['pending_digest_items'] = sum(len(d.items) for d in self._digests.values())
+        return stats
+
+    # ------------------------------------------------------------------
+    # Digests
+
+    def _flush_digest(self, chat_key: str):
+        digest = self._digests.pop(chat_key, None)
+        if digest is None or not digest.items:
+            return
+        if digest.timer is not None:
+            digest.timer.cancel()
+
+        params = digest.params
+        texts = [text for text, _ in digest.items]
+        futures = [future for _, future in digest.items]
+        start = 0
+        for text, count in build_digest_texts(texts, params['header']):
+            if count > 1:
+                self.stats['digests'] += 1
+                self.stats['coalesced'] += count
+            group = futures[start:start + count]
+            start += count
+
+            payload = {'chat_id': params['chat_id'], 'text': text, 'disable_web_page_preview': True}
+            if params['parse_mode']:
+                payload['parse_mode'] = params['parse_mode']
+            task = asyncio.ensure_future(self._enqueue(chat_key, payload))
+            self._digest_tasks.add(task)
+            task.add_done_callback(self._digest_tasks.discard)
+            task.add_done_callback(lambda t, group=group: self._resolve(group, t))
+
+    @staticmethod
+    def _resolve(futures: List[asyncio.Future], task: asyncio.Future):
+        for future in futures:
+            if future.done():
+                continue
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+
+    # ------------------------------------------------------------------
+    # Filas por chat
+
+    async def _enqueue(self, chat_key: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        message = _OutgoingMessage(chat_key, payload, asyncio.get_running_loop().create_future())
+        self._lanes.setdefault(chat_key, deque()).append(message)
+        if chat_key not in self._lane_tasks:
+            self._lane_tasks[chat_key] = asyncio.ensure_future(self._drain(chat_key))
+        return await message.future
+
+    async def _drain(self, chat_key: str):
+        """Envia as mensagens de um chat em ordem; termina quando a fila esvazia"""
+        lane = self._lanes[chat_key]
+        try:
+            while lane:
+                message = lane.popleft()
+                try:
+                    result = await self._deliver(message)
+                    if not message.future.done():
+                        message.future.set_result(result)
+                except Exception as e:
+                    if not message.future.done():
+                        message.future.set_exception(e)
+        finally:
+            del self._lane_tasks[chat_key]
+            if not lane:
+                self._lanes.pop(chat_key, None)
+
+    async def _wait(self, bucket):
+        if getattr(bucket, 'shared', False):
+            # Ida ao Redis fora do event loop
+            delay = await asyncio.get_running_loop().run_in_executor(None, bucket.reserve)
+        else:
+            delay = bucket.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _chat_bucket(self, chat_key: str):
+        bucket = self._chat_buckets.get(chat_key)
+        if bucket is not None:
+            self._chat_buckets.move_to_end(chat_key)
+            return bucket
+
+        if self.redis_client is not None:
+            bucket = RedisTokenBucket(self.redis_client, f"{self._bucket_prefix}chat:{chat_key}",
+                                      self.chat_rate, capacity=1.0)
+        else:
+            bucket = TokenBucket(self.chat_rate, capacity=1.0)
+        self._chat_buckets[chat_key] = bucket
+        # Chats sem envio recente: o bucket já teria reposto os tokens
+        while len(self._chat_buckets) > self.max_chat_buckets:
+            self._chat_buckets.popitem(last=False)
+        return bucket
+
+    async def _deliver(self, message: _OutgoingMessage) -> Dict[str, Any]:
+        chat_bucket = self._chat_bucket(message.chat_id)
+        while True:
+            await self._wait(chat_bucket)
+            await self._wait(self._global_bucket)
+            message.attempts += 1
+            try:
+                session = await self._get_session()
+                async with session.post(self.url, json=message.payload) as response:
+                    body = await response.json(content_type=None)
+                    status = response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                error = TelegramAPIError(f"Falha de rede: {e}")
+                retry_delay = self.retry_backoff * 2 ** (message.attempts - 1)
+            else:
+                if status == 200 and body.get('ok'):
+                    self.stats['sent'] += 1
+                    return body.get('result', {})
+
+                parameters = body.get('parameters') or {}
+                error = TelegramAPIError(body.get('description', f'HTTP {status}'),
+                                         error_code=body.get('error_code', status),
+                                         retry_after=parameters.get('retry_after'))
+                if status == 429:
+                    self.stats['rate_limited'] += 1
+                    retry_delay = float(error.retry_after or 1)
+                    if getattr(chat_bucket, 'shared', False):
+                        await asyncio.get_running_loop().run_in_executor(
+                            None, chat_bucket.penalize, retry_delay)
+                    else:
+                        chat_bucket.penalize(retry_delay)
+                elif status >= 500:
+                    retry_delay = self.retry_backoff * 2 ** (message.attempts - 1)
+                else:
+                    self.stats['failed'] += 1
+                    logger.error(f"❌ Erro Telegram {status}: {error.description}")
+                    raise error
+
+            if message.attempts > self.max_retries:
+                self.stats['failed'] += 1
+                logger.error(f"❌ Telegram: desistindo após {message.attempts} tentativas: {error}")
+                raise error
+
+            self.stats['retries'] += 1
+            logger.warning(f"Telegram: nova tentativa em {retry_delay:.1f}s ({error})")
+            # Para 429 o bucket do chat já garante a espera
+            if error.error_code != 429:
+                await asyncio.sleep(retry_delay)
+
+
+# Uma instância por (event loop, token): as sessões aiohttp pertencem a um loop
+_deliveries: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, TelegramDelivery]]' = \
+    weakref.WeakKeyDictionary()
+
+
+def get_telegram_delivery(bot_token: Optional[str] = None, **kwargs) -> TelegramDelivery:
+    """Obtém o TelegramDelivery partilhado do event loop em execução"""
+    bot_token = bot_token or os.getenv('TELEGRAM_BOT_TOKEN')
+    if not bot_token:
+        raise ValueError("TELEGRAM_BOT_TOKEN não configurado")
+    per_loop = _deliveries.setdefault(asyncio.get_running_loop(), {})
+    delivery = per_loop.get(bot_token)
+    if delivery is None:
+        delivery = per_loop[bot_token] = TelegramDelivery(bot_token, **kwargs)
+    return delivery
+
+
+def send_telegram_sync(text: str, chat_id=None, bot_token: Optional[str] = None,
+                       coalesce: bool = False, timeout: float = 60.0, redis_client=None,
+                       **kwargs) -> Dict[str, Any]:
+    """Envia uma mensagem a partir de código síncrono (Celery, scripts)
+
+    A entrega corre no event loop da NotificationQueue, partilhando o mesmo
+    pool de conexões entre todas as chamadas do processo. Com `redis_client`
+    os limites de envio são partilhados com os outros processos. `coalesce`
+    agrupa apenas alertas deste processo (para digests entre workers do
+    Celery ver RedisDigestBuffer).
+    """
+    from notifications.notification_queue import notification_queue
+
+    chat_id = chat_id or os.getenv('TELEGRAM_CHAT_ID')
+    if not chat_id:
+        raise ValueError("TELEGRAM_CHAT_ID não configurado")
+
+    async def _send():
+        delivery = get_telegram_delivery(bot_token, redis_client=redis_client)
+        if coalesce:
+            return await delivery.send_value_bet(chat_id, text, **kwargs)
+        return await delivery.send_message(chat_id, text, **kwargs)
+
+    return notification_queue.call(_send, timeout=timeout)
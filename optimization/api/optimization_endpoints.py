@@ -16,6 +16,7 @@ import os
 from tasks.optimization_tasks import (
     optimize_single_model,
     optimize_multiple_models,
+    optimize_models_concurrent,
     optimize_with_custom_objective,
     resume_optimization,
     export_optimization_results,
@@ -63,6 +64,9 @@ class MultiModelOptimizationRequest(BaseModel):
     cv_params: Optional[Dict[str, Any]] = Field(None, description="Parâmetros da validação cruzada")
     scoring: str = Field("accuracy", description="Métrica de avaliação")
     random_state: Optional[int] = Field(None, description="Seed para reprodutibilidade")
+    schedule: str = Field("sequential", description="Escalonamento (sequential, successive_halving)")
+    eta: int = Field(3, ge=2, le=10, description="Fator de redução do successive halving")
+    n_workers: Optional[int] = Field(None, ge=1, le=64, description="Processos do successive halving")
 
 class CustomObjectiveRequest(BaseModel):
     model_name: str = Field(..., description="Nome do modelo")
@@ -164,24 +168,47 @@ async def start_multi_optimization(
         y_data = np.random.randint(0, 3, 1000).tolist()
         
         # Iniciar tarefa assíncrona
-        task = optimize_multiple_models.delay(
-            model_names=request.model_names,
-            X_data=X_data,
-            y_data=y_data,
-            study_name=request.study_name,
-            n_trials=request.n_trials,
-            timeout=request.timeout,
-            cv_strategy=request.cv_strategy,
-            cv_params=request.cv_params,
-            scoring=request.scoring,
-            random_state=request.random_state
-        )
+        if request.schedule == "successive_halving":
+            # Mesmo orçamento total do modo sequencial, redistribuído entre as famílias
+            task = optimize_models_concurrent.delay(
+                model_names=request.model_names,
+                X_data=X_data,
+                y_data=y_data,
+                study_name=request.study_name,
+                total_trials=request.n_trials * len(request.model_names),
+                eta=request.eta,
+                n_workers=request.n_workers,
+                timeout=request.timeout * len(request.model_names) if request.timeout else None,
+                cv_strategy=request.cv_strategy,
+                cv_params=request.cv_params,
+                scoring=request.scoring,
+                random_state=request.random_state
+            )
+        elif request.schedule == "sequential":
+            task = optimize_multiple_models.delay(
+                model_names=request.model_names,
+                X_data=X_data,
+                y_data=y_data,
+                study_name=request.study_name,
+                n_trials=request.n_trials,
+                timeout=request.timeout,
+                cv_strategy=request.cv_strategy,
+                cv_params=request.cv_params,
+                scoring=request.scoring,
+                random_state=request.random_state
+            )
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Escalonamento {request.schedule} não suportado"
+            )
         
         return {
             "message": "Otimização multi-modelo iniciada com sucesso",
             "task_id": task.id,
             "model_names": request.model_names,
             "study_name": request.study_name,
+            "schedule": request.schedule,
             "status": "started"
         }
         
@@ -356,13 +383,21 @@ async def get_optimization_status(
         # Obter resultado da tarefa
         result = AsyncResult(task_id)
         
-        return {
+        response = {
             "task_id": task_id,
             "status": result.status,
             "result": result.result if result.ready() else None,
             "info": result.info if not result.ready() else None
         }
         
+        # Escalonamento concorrente: rodada atual, orçamento consumido e estado de cada família
+        if result.status == "PROGRESS" and isinstance(result.info, dict):
+            response["progress"] = result.info
+        elif result.ready() and isinstance(result.result, dict) and "schedule" in result.result:
+            response["progress"] = result.result["schedule"]
+        
+        return response
+        
     except Exception as e:
         logger.error(f"Erro ao obter status: {str(e)}")
         raise HTTPException(
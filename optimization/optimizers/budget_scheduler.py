@@ -0,0 +1,293 @@
+"""
+Escalonador multi-modelo com orçamento compartilhado
+Roda as famílias de modelos em paralelo num pool de processos e distribui
+trials/tempo por successive halving (estilo Hyperband): famílias perdedoras
+param cedo e o orçamento restante vai para as líderes
+"""
+
+import logging
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import optuna
+
+from optimization.optimizers.hyperparameter_optimizer import (
+    MODEL_OPTIMIZERS,
+    HyperparameterOptimizer,
+    _optimize_worker,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def plan_rungs(n_families: int, total_trials: int, eta: int = 3) -> List[Dict[str, int]]:
+    """
+    Plano de successive halving: famílias sobreviventes e trials por família em cada rodada
+
+    A cada rodada sobrevivem ceil(n / eta^r) famílias e cada uma recebe eta vezes
+    mais trials que na rodada anterior, até restar uma única família.
+
+    Args:
+        n_families: Número de famílias de modelos
+        total_trials: Orçamento total de trials somando todas as famílias
+        eta: Fator de redução entre rodadas
+
+    Returns:
+        Lista de {'survivors', 'trials_per_family'} por rodada
+    """
+    if n_families < 1:
+        return []
+    n_rungs = math.ceil(math.log(n_families, eta) - 1e-9) + 1 if n_families > 1 else 1
+    survivors = [max(1, math.ceil(n_families / eta ** r)) for r in range(n_rungs)]
+    unit = total_trials / sum(n * eta ** r for r, n in enumerate(survivors))
+    return [
+        {'survivors': n, 'trials_per_family': max(1, int(unit * eta ** r))}
+        for r, n in enumerate(survivors)
+    ]
+
+
+class SuccessiveHalvingScheduler:
+    """
+    Otimiza várias famílias de modelos em paralelo com orçamento compartilhado
+
+    Cada família mantém seu próprio estudo no storage RDB; as rodadas apenas
+    acrescentam trials a esses estudos. Ao fim de cada rodada as famílias são
+    ordenadas pelo melhor score e só as 1/eta melhores continuam. O orçamento
+    não consumido (famílias que falharam ou pararam por timeout) é redistribuído
+    entre as rodadas seguintes.
+    """
+
+    def __init__(
+        self,
+        optimizers: Dict[str, HyperparameterOptimizer],
+        total_trials: int,
+        eta: int = 3,
+        timeout: Optional[float] = None,
+        n_workers: Optional[int] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        """
+        Inicializa o escalonador
+
+        Args:
+            optimizers: Otimizador de cada família (ex.: MultiModelOptimizer.optimizers)
+            total_trials: Orçamento total de trials somando todas as famílias
+            eta: Fator de redução entre rodadas
+            timeout: Orçamento total de tempo em segundos
+            n_workers: Processos do pool (padrão: número de CPUs)
+            progress_callback: Chamado com get_progress() a cada mudança de estado
+        """
+        if eta < 2:
+            raise ValueError("eta deve ser pelo menos 2")
+
+        self.optimizers = {}
+        for model_name, optimizer in optimizers.items():
+            if model_name not in MODEL_OPTIMIZERS:
+                logger.warning(f"Modelo {model_name} não suportado")
+                continue
+            if ":memory:" in optimizer.storage_url or optimizer.storage_url == "sqlite://":
+                raise ValueError("Escalonamento em processos exige um storage compartilhado (arquivo ou servidor)")
+            self.optimizers[model_name] = optimizer
+
+        self.total_trials = total_trials
+        self.eta = eta
+        self.timeout = timeout
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.progress_callback = progress_callback
+
+        self.rung = 0
+        self.n_rungs = len(plan_rungs(len(self.optimizers), total_trials, eta))
+        self.trials_used = 0
+        self.started_at: Optional[float] = None
+        self._baseline: Dict[str, int] = {}
+        self.families = {
+            model_name: {
+                'status': 'pending',
+                'trials': 0,
+                'best_score': None,
+                'eliminated_at_rung': None,
+                'error': None
+            }
+            for model_name in self.optimizers
+        }
+
+    def _maximize(self) -> bool:
+        return next(iter(self.optimizers.values())).direction == "maximize"
+
+    def _alive(self) -> List[str]:
+        return [m for m, f in self.families.items() if f['status'] in ('pending', 'running')]
+
+    def _ranked(self, model_names: List[str]) -> List[str]:
+        """Ordena do melhor para o pior; famílias sem trial completo ficam por último"""
+        sign = 1 if self._maximize() else -1
+        return sorted(
+            model_names,
+            key=lambda m: (
+                self.families[m]['best_score'] is not None,
+                sign * (self.families[m]['best_score'] or 0.0)
+            ),
+            reverse=True
+        )
+
+    def _refresh(self, model_name: str) -> None:
+        """Recarrega o estudo da família do storage e atualiza trials e melhor score"""
+        optimizer = self.optimizers[model_name]
+        optimizer.study = optimizer._create_study()
+        family = self.families[model_name]
+        # Trials acrescentados nesta execução (o estudo pode ter sido retomado)
+        family['trials'] = len(optimizer.study.trials) - self._baseline.get(model_name, 0)
+        self.trials_used = sum(f['trials'] for f in self.families.values())
+        complete = optimizer.study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.COMPLETE,))
+        if complete:
+            family['best_score'] = float(optimizer.study.best_value)
+
+    def _notify(self) -> None:
+        if self.progress_callback is not None:
+            try:
+                self.progress_callback(self.get_progress())
+            except Exception as e:
+                logger.warning(f"Erro ao publicar progresso: {e}")
+
+    def _rung_budget(self, alive: int, remaining: int) -> int:
+        """Trials por família na rodada atual, repartindo o saldo entre as rodadas restantes"""
+        rungs = plan_rungs(alive, remaining, self.eta)
+        if len(rungs) == 1:
+            # Última rodada: o líder fica com todo o saldo
+            return max(1, remaining // alive)
+        return rungs[0]['trials_per_family']
+
+    def _rung_timeout(self, rung_trials: int, remaining: int) -> Optional[float]:
+        if self.timeout is None:
+            return None
+        left = self.timeout - (time.monotonic() - self.started_at)
+        return max(1.0, left * rung_trials / max(remaining, 1))
+
+    def run(self, X: np.ndarray, y: np.ndarray) -> Dict[str, optuna.Study]:
+        """
+        Executa todas as rodadas
+
+        Args:
+            X: Features
+            y: Target
+
+        Returns:
+            Dicionário com o estudo de cada família
+        """
+        if multiprocessing.current_process().daemon:
+            # Filhos prefork do Celery são daemon e não podem criar processos
+            raise RuntimeError(
+                "SuccessiveHalvingScheduler requer um processo não-daemon: execute a tarefa "
+                "na optimization_queue (worker com --pool=threads ou --pool=solo)"
+            )
+
+        self.started_at = time.monotonic()
+        for model_name in self.optimizers:
+            self._refresh(model_name)
+            self._baseline[model_name] = self.families[model_name]['trials']
+            self.families[model_name]['trials'] = 0
+        self.trials_used = 0
+
+        with ProcessPoolExecutor(max_workers=self.n_workers) as pool:
+            while self._alive():
+                alive = self._alive()
+                remaining = self.total_trials - self.trials_used
+                if remaining < len(alive):
+                    break
+                if self.timeout is not None and time.monotonic() - self.started_at >= self.timeout:
+                    logger.info("Orçamento de tempo esgotado")
+                    break
+
+                per_family = self._rung_budget(len(alive), remaining)
+                timeout = self._rung_timeout(per_family * len(alive), remaining)
+                self._run_rung(pool, alive, per_family, timeout, X, y)
+                self._promote()
+                self.rung += 1
+
+        for model_name in self._alive():
+            self.families[model_name]['status'] = 'winner' if model_name == self.get_leader() else 'stopped'
+        self._notify()
+
+        logger.info(
+            f"Successive halving concluído em {self.rung} rodadas: "
+            f"{self.trials_used}/{self.total_trials} trials, líder {self.get_leader()}"
+        )
+        return {m: opt.study for m, opt in self.optimizers.items()}
+
+    def _run_rung(
+        self,
+        pool: ProcessPoolExecutor,
+        alive: List[str],
+        per_family: int,
+        timeout: Optional[float],
+        X: np.ndarray,
+        y: np.ndarray
+    ) -> None:
+        """Dispara os trials da rodada; os workers livres são divididos entre as famílias vivas"""
+        chunks = max(1, self.n_workers // len(alive))
+        futures = {}
+        for model_name in alive:
+            config = self.optimizers[model_name].get_worker_config()
+            config['timeout'] = timeout
+            self.families[model_name]['status'] = 'running'
+            for chunk in range(chunks):
+                share = per_family // chunks + (1 if chunk < per_family % chunks else 0)
+                if share:
+                    # Seeds distintos por rodada: o TPE não repete os trials aleatórios iniciais
+                    worker = self.rung * self.n_workers + chunk
+                    future = pool.submit(_optimize_worker, config, worker, model_name, X, y, share)
+                    futures[future] = model_name
+
+        logger.info(f"Rodada {self.rung}: {len(alive)} famílias, {per_family} trials cada")
+        self._notify()
+
+        for future in as_completed(futures):
+            model_name = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"Erro na otimização de {model_name}: {e}")
+                self.families[model_name].update(
+                    status='failed', error=str(e), eliminated_at_rung=self.rung
+                )
+            self._refresh(model_name)
+            self._notify()
+
+    def _promote(self) -> None:
+        """Mantém as 1/eta melhores famílias vivas e elimina as demais"""
+        alive = self._ranked(self._alive())
+        if len(alive) <= 1:
+            return
+        keep = max(1, math.ceil(len(alive) / self.eta))
+        for model_name in alive[keep:]:
+            self.families[model_name].update(status='eliminated', eliminated_at_rung=self.rung)
+            logger.info(f"{model_name} eliminado na rodada {self.rung}")
+        self._notify()
+
+    def get_leader(self) -> Optional[str]:
+        """Família com o melhor score até o momento"""
+        ranked = self._ranked([m for m, f in self.families.items() if f['best_score'] is not None])
+        return ranked[0] if ranked else None
+
+    def get_progress(self) -> Dict[str, Any]:
+        """Estado serializável do escalonamento (exposto via Celery/API)"""
+        return {
+            'strategy': 'successive_halving',
+            'eta': self.eta,
+            'rung': self.rung,
+            'n_rungs': self.n_rungs,
+            'total_trials': self.total_trials,
+            'trials_used': self.trials_used,
+            'timeout': self.timeout,
+            'elapsed_seconds': (
+                round(time.monotonic() - self.started_at, 1) if self.started_at is not None else 0.0
+            ),
+            'leader': self.get_leader(),
+            'families': {m: dict(f) for m, f in self.families.items()},
+            'updated_at': datetime.now().isoformat()
+        }
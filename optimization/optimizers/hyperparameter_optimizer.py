@@ -15,11 +15,24 @@ import json
 from datetime import datetime
 import os
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 
 from optimization.validation.time_series_cv import CrossValidationManager, create_time_series_cv
+from optimization.validation.fold_cache import NATIVE_SCORERS, clear_fold_caches
 
 logger = logging.getLogger(__name__)
 
+# Modelo -> método de otimização do HyperparameterOptimizer
+MODEL_OPTIMIZERS = {
+    "random_forest": "optimize_random_forest",
+    "xgboost": "optimize_xgboost",
+    "lightgbm": "optimize_lightgbm",
+    "catboost": "optimize_catboost",
+    "logistic_regression": "optimize_logistic_regression",
+    "bayesian_neural_network": "optimize_bayesian_neural_network",
+    "poisson_model": "optimize_poisson_model",
+}
+
 class HyperparameterOptimizer:
     """
     Otimizador de hiperparâmetros principal usando Optuna
@@ -35,7 +48,9 @@ class HyperparameterOptimizer:
         cv_strategy: str = "time_series",
         cv_params: Optional[Dict[str, Any]] = None,
         scoring: str = "accuracy",
-        random_state: Optional[int] = None
+        random_state: Optional[int] = None,
+        warmup_folds: int = 1,
+        native_boosters: bool = True
     ):
         """
         Inicializa o otimizador de hiperparâmetros
@@ -50,16 +65,27 @@ class HyperparameterOptimizer:
             cv_params: Parâmetros da validação cruzada
             scoring: Métrica de avaliação
             random_state: Seed para reprodutibilidade
+            warmup_folds: Folds avaliados antes que o pruner possa interromper um trial
+            native_boosters: XGBoost/LightGBM treinam o booster nativo sobre folds
+                pré-binados em cache quando a métrica é suportada (NATIVE_SCORERS);
+                False usa sempre os estimadores sklearn
         """
         self.study_name = study_name
-        self.storage_url = storage_url or f"sqlite:///optimization/{study_name}.db"
+        self.storage_url = (
+            storage_url
+            or os.getenv("OPTUNA_STORAGE_URL")
+            or f"sqlite:///optimization/{study_name}.db"
+        )
         self.direction = direction
         self.n_trials = n_trials
         self.timeout = timeout
         self.scoring = scoring
         self.random_state = random_state
+        self.warmup_folds = warmup_folds
+        self.native_boosters = native_boosters
         
         # Configurar validação cruzada
+        self.cv_strategy = cv_strategy
         self.cv_params = cv_params or {}
         self.cv_manager = create_time_series_cv(
             strategy=cv_strategy,
@@ -75,15 +101,23 @@ class HyperparameterOptimizer:
     def _create_study(self) -> optuna.Study:
         """Cria o estudo Optuna"""
         sampler = optuna.samplers.TPESampler(seed=self.random_state)
+        # Um passo por fold: a poda pode ocorrer logo após os folds de aquecimento
         pruner = optuna.pruners.MedianPruner(
             n_startup_trials=5,
-            n_warmup_steps=10,
+            n_warmup_steps=self.warmup_folds,
             interval_steps=1
         )
         
+        storage = self.storage_url
+        if storage.startswith("sqlite"):
+            # Vários processos gravam no mesmo arquivo: espera o lock em vez de falhar
+            storage = optuna.storages.RDBStorage(
+                storage, engine_kwargs={"connect_args": {"timeout": 60}}
+            )
+        
         study = optuna.create_study(
             study_name=self.study_name,
-            storage=self.storage_url,
+            storage=storage,
             direction=self.direction,
             sampler=sampler,
             pruner=pruner,
@@ -92,6 +126,145 @@ class HyperparameterOptimizer:
         
         return study
     
+    def _evaluate(
+        self,
+        trial: optuna.Trial,
+        estimator: Any,
+        X: np.ndarray,
+        y: np.ndarray
+    ) -> float:
+        """
+        Validação cruzada fold a fold com relatório intermediário ao pruner
+        
+        A média acumulada é reportada após cada fold; se o pruner considerar o
+        trial pior que a mediana no mesmo passo, os folds restantes não são treinados.
+        """
+        return self._report_folds(
+            trial, self.cv_manager.iter_fold_scores(estimator, X, y, scoring=self.scoring)
+        )
+    
+    def _use_native(self) -> bool:
+        return self.native_boosters and self.scoring in NATIVE_SCORERS
+    
+    def _evaluate_native(
+        self,
+        trial: optuna.Trial,
+        kind: str,
+        params: Dict[str, Any],
+        num_boost_round: int,
+        X: np.ndarray,
+        y: np.ndarray
+    ) -> float:
+        """
+        Como _evaluate, mas treina o booster nativo sobre datasets pré-binados em cache
+        
+        A binagem do histograma de cada fold é feita uma vez e reaproveitada por
+        todos os trials (e pelos demais modelos do MultiModelOptimizer).
+        """
+        folds = self.cv_manager.get_fold_cache(X, y)
+        return self._report_folds(
+            trial, folds.iter_native_scores(kind, params, num_boost_round, scoring=self.scoring)
+        )
+    
+    def _report_folds(self, trial: optuna.Trial, fold_scores) -> float:
+        scores = []
+        for fold, score in fold_scores:
+            scores.append(score)
+            trial.set_user_attr("folds_evaluated", fold + 1)
+            trial.report(float(np.mean(scores)), step=fold)
+            
+            if trial.should_prune():
+                raise optuna.TrialPruned(f"Podado após {fold + 1} folds")
+        
+        return float(np.mean(scores))
+    
+    def optimize_model(
+        self,
+        model_name: str,
+        X: np.ndarray,
+        y: np.ndarray,
+        **kwargs
+    ) -> optuna.Study:
+        """Otimiza o modelo pelo nome (chaves de MODEL_OPTIMIZERS)"""
+        method = MODEL_OPTIMIZERS.get(model_name)
+        if method is None:
+            raise ValueError(f"Modelo {model_name} não suportado")
+        return getattr(self, method)(X, y, **kwargs)
+    
+    def optimize_parallel(
+        self,
+        model_name: str,
+        X: np.ndarray,
+        y: np.ndarray,
+        n_workers: int = 4
+    ) -> optuna.Study:
+        """
+        Executa os trials em vários processos que compartilham o estudo via storage RDB
+        
+        Args:
+            model_name: Nome do modelo (chaves de MODEL_OPTIMIZERS)
+            X: Features
+            y: Target
+            n_workers: Número de processos
+            
+        Returns:
+            Estudo Optuna recarregado do storage
+        """
+        if ":memory:" in self.storage_url or self.storage_url == "sqlite://":
+            raise ValueError("Otimização paralela exige um storage compartilhado (arquivo ou servidor)")
+        
+        shares = [
+            self.n_trials // n_workers + (1 if i < self.n_trials % n_workers else 0)
+            for i in range(n_workers)
+        ]
+        config = self.get_worker_config()
+        
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = [
+                pool.submit(_optimize_worker, config, worker, model_name, X, y, share)
+                for worker, share in enumerate(shares)
+                if share
+            ]
+            for future in futures:
+                future.result()
+        
+        self.study = self._create_study()
+        return self.study
+    
+    def get_worker_config(self) -> Dict[str, Any]:
+        """Parâmetros para recriar este otimizador num worker (processo ou tarefa Celery)"""
+        return {
+            'study_name': self.study_name,
+            'storage_url': self.storage_url,
+            'direction': self.direction,
+            'timeout': self.timeout,
+            'cv_strategy': self.cv_strategy,
+            'cv_params': self.cv_params,
+            'scoring': self.scoring,
+            'random_state': self.random_state,
+            'warmup_folds': self.warmup_folds,
+            'native_boosters': self.native_boosters
+        }
+    
+    def get_pruning_stats(self) -> Dict[str, Any]:
+        """Trials podados e folds efetivamente treinados em relação à CV completa"""
+        finished = [
+            t for t in self.study.trials
+            if t.state in (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+        ]
+        n_splits = max(
+            (t.user_attrs.get('folds_evaluated', 0) for t in finished
+             if t.state == optuna.trial.TrialState.COMPLETE),
+            default=0
+        ) or getattr(self.cv_manager.cv, 'n_splits', 1)
+        folds = sum(t.user_attrs.get('folds_evaluated', n_splits) for t in finished)
+        return {
+            'completed': sum(t.state == optuna.trial.TrialState.COMPLETE for t in finished),
+            'pruned': sum(t.state == optuna.trial.TrialState.PRUNED for t in finished),
+            'folds_evaluated': folds,
+            'fold_budget_fraction': folds / (len(finished) * n_splits) if finished else None
+        }
+    
     def optimize_random_forest(
         self,
         X: np.ndarray,
@@ -126,15 +299,8 @@ class HyperparameterOptimizer:
             # Criar modelo
             model = RandomForestClassifier(**params)
             
-            # Validação cruzada
-            cv_results = self.cv_manager.cross_validate(
-                estimator=model,
-                X=X,
-                y=y,
-                scoring=self.scoring
-            )
-            
-            return cv_results['test_score'].mean()
+            # Validação fold a fold com poda
+            return self._evaluate(trial, model, X, y)
         
         # Executar otimização
         self.study.optimize(
@@ -177,18 +343,26 @@ class HyperparameterOptimizer:
                 'random_state': self.random_state
             }
             
+            if self._use_native():
+                # Booster nativo sobre DMatrix pré-binadas em cache
+                native_params = {
+                    'max_depth': params['max_depth'],
+                    'eta': params['learning_rate'],
+                    'subsample': params['subsample'],
+                    'colsample_bytree': params['colsample_bytree'],
+                    'alpha': params['reg_alpha'],
+                    'lambda': params['reg_lambda'],
+                    'seed': self.random_state or 0
+                }
+                return self._evaluate_native(
+                    trial, 'xgboost', native_params, params['n_estimators'], X, y
+                )
+            
             # Criar modelo
             model = xgb.XGBClassifier(**params)
             
-            # Validação cruzada
-            cv_results = self.cv_manager.cross_validate(
-                estimator=model,
-                X=X,
-                y=y,
-                scoring=self.scoring
-            )
-            
-            return cv_results['test_score'].mean()
+            # Validação fold a fold com poda
+            return self._evaluate(trial, model, X, y)
         
         # Executar otimização
         self.study.optimize(
@@ -230,21 +404,36 @@ class HyperparameterOptimizer:
                 'reg_lambda': trial.suggest_float('reg_lambda', 0, 10),
                 'num_leaves': trial.suggest_int('num_leaves', 10, 100),
                 'min_child_samples': trial.suggest_int('min_child_samples', 5, 50),
+                # Sem frequência > 0 o LightGBM ignora subsample/bagging_fraction
+                'subsample_freq': 1,
                 'random_state': self.random_state
             }
+            # Fixo (não sugerido): segue com os melhores parâmetros para o deploy
+            trial.set_user_attr('fixed_params', {'subsample_freq': params['subsample_freq']})
+            
+            if self._use_native():
+                # Booster nativo sobre lgb.Dataset pré-binados em cache
+                native_params = {
+                    'max_depth': params['max_depth'],
+                    'learning_rate': params['learning_rate'],
+                    'bagging_fraction': params['subsample'],
+                    'bagging_freq': params['subsample_freq'],
+                    'feature_fraction': params['colsample_bytree'],
+                    'lambda_l1': params['reg_alpha'],
+                    'lambda_l2': params['reg_lambda'],
+                    'num_leaves': params['num_leaves'],
+                    'min_data_in_leaf': params['min_child_samples'],
+                    'seed': self.random_state or 0
+                }
+                return self._evaluate_native(
+                    trial, 'lightgbm', native_params, params['n_estimators'], X, y
+                )
             
             # Criar modelo
             model = lgb.LGBMClassifier(**params)
             
-            # Validação cruzada
-            cv_results = self.cv_manager.cross_validate(
-                estimator=model,
-                X=X,
-                y=y,
-                scoring=self.scoring
-            )
-            
-            return cv_results['test_score'].mean()
+            # Validação fold a fold com poda
+            return self._evaluate(trial, model, X, y)
         
         # Executar otimização
         self.study.optimize(
@@ -290,15 +479,8 @@ class HyperparameterOptimizer:
             # Criar modelo
             model = CatBoostClassifier(**params)
             
-            # Validação cruzada
-            cv_results = self.cv_manager.cross_validate(
-                estimator=model,
-                X=X,
-                y=y,
-                scoring=self.scoring
-            )
-            
-            return cv_results['test_score'].mean()
+            # Validação fold a fold com poda
+            return self._evaluate(trial, model, X, y)
         
         # Executar otimização
         self.study.optimize(
@@ -341,21 +523,15 @@ class HyperparameterOptimizer:
             # Ajustar solver baseado na penalidade
             if params['penalty'] == 'elasticnet':
                 params['l1_ratio'] = trial.suggest_float('l1_ratio', 0, 1)
+                params['solver'] = 'saga'
             elif params['penalty'] == 'l1':
                 params['solver'] = 'liblinear'
             
             # Criar modelo
             model = LogisticRegression(**params)
             
-            # Validação cruzada
-            cv_results = self.cv_manager.cross_validate(
-                estimator=model,
-                X=X,
-                y=y,
-                scoring=self.scoring
-            )
-            
-            return cv_results['test_score'].mean()
+            # Validação fold a fold com poda
+            return self._evaluate(trial, model, X, y)
         
         # Executar otimização
         self.study.optimize(
@@ -403,15 +579,8 @@ class HyperparameterOptimizer:
             # Criar modelo
             model = MLPClassifier(**params)
             
-            # Validação cruzada
-            cv_results = self.cv_manager.cross_validate(
-                estimator=model,
-                X=X,
-                y=y,
-                scoring=self.scoring
-            )
-            
-            return cv_results['test_score'].mean()
+            # Validação fold a fold com poda
+            return self._evaluate(trial, model, X, y)
         
         # Executar otimização
         self.study.optimize(
@@ -453,15 +622,8 @@ class HyperparameterOptimizer:
             # Criar modelo
             model = PoissonRegressor(**params)
             
-            # Validação cruzada
-            cv_results = self.cv_manager.cross_validate(
-                estimator=model,
-                X=X,
-                y=y,
-                scoring=self.scoring
-            )
-            
-            return cv_results['test_score'].mean()
+            # Validação fold a fold com poda
+            return self._evaluate(trial, model, X, y)
         
         # Executar otimização
         self.study.optimize(
@@ -473,8 +635,11 @@ class HyperparameterOptimizer:
         return self.study
     
     def get_best_params(self) -> Dict[str, Any]:
-        """Retorna os melhores parâmetros encontrados"""
-        return self.study.best_params
+        """Retorna os melhores parâmetros encontrados (incluindo os fixos do trial)"""
+        best_trial = self.study.best_trial
+        fixed = getattr(best_trial, 'user_attrs', {})
+        fixed = fixed.get('fixed_params') if isinstance(fixed, dict) else None
+        return {**best_trial.params, **(fixed or {})}
     
     def get_best_score(self) -> float:
         """Retorna o melhor score encontrado"""
@@ -490,6 +655,7 @@ class HyperparameterOptimizer:
             {
                 'trial_number': trial.number,
                 'value': trial.value,
+                'state': trial.state.name,
                 'params': trial.params,
                 'datetime': trial.datetime_start
             }
@@ -526,6 +692,29 @@ class HyperparameterOptimizer:
         logger.info(f"Resultados exportados para: {filepath}")
 
 
+def _optimize_worker(
+    config: Dict[str, Any],
+    worker: int,
+    model_name: str,
+    X: np.ndarray,
+    y: np.ndarray,
+    n_trials: int
+) -> int:
+    """Processo worker de optimize_parallel: carrega o estudo compartilhado e roda sua cota"""
+    config = dict(config)
+    if config.get('random_state') is not None:
+        # Seeds distintos evitam que os workers amostrem os mesmos parâmetros
+        config['random_state'] += worker
+    
+    optimizer = HyperparameterOptimizer(n_trials=n_trials, **config)
+    try:
+        optimizer.optimize_model(model_name, X, y)
+    finally:
+        # Processos do pool não executam finalizadores atexit: remove os memmaps aqui
+        clear_fold_caches()
+    return n_trials
+
+
 class MultiModelOptimizer:
     """
     Otimizador para múltiplos modelos simultaneamente
@@ -598,7 +787,47 @@ class MultiModelOptimizer:
             logger.info(f"{model_name} otimizado. Melhor score: {study.best_value:.4f}")
         
         return results
-    
+
+    def optimize_concurrent(
+        self,
+        X: np.ndarray,
+        y: np.ndarray,
+        total_trials: Optional[int] = None,
+        eta: int = 3,
+        timeout: Optional[float] = None,
+        n_workers: Optional[int] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, optuna.Study]:
+        """
+        Otimiza os modelos em paralelo com orçamento compartilhado (successive halving)
+
+        Args:
+            X: Features
+            y: Target
+            total_trials: Orçamento total (padrão: n_trials de cada modelo somados)
+            eta: Fator de redução entre rodadas
+            timeout: Orçamento total de tempo em segundos
+            n_workers: Processos do pool
+            progress_callback: Recebe o progresso a cada mudança de estado
+
+        Returns:
+            Dicionário com estudos otimizados
+        """
+        from optimization.optimizers.budget_scheduler import SuccessiveHalvingScheduler
+
+        if total_trials is None:
+            total_trials = sum(optimizer.n_trials for optimizer in self.optimizers.values())
+
+        self.scheduler = SuccessiveHalvingScheduler(
+            self.optimizers,
+            total_trials=total_trials,
+            eta=eta,
+            timeout=timeout,
+            n_workers=n_workers,
+            progress_callback=progress_callback
+        )
+        return self.scheduler.run(X, y)
+
     def get_best_model(self) -> Tuple[str, Dict[str, Any], float]:
         """
         Retorna o melhor modelo e seus parâmetros
@@ -52,9 +52,9 @@ class TestHyperparameterOptimizer:
             mock_model = Mock()
             mock_rf.return_value = mock_model
             
-            # Mock do cross_validate
-            with patch.object(optimizer.cv_manager, 'cross_validate') as mock_cv:
-                mock_cv.return_value = {'test_score': np.array([0.8, 0.85, 0.82])}
+            # Mock da validação fold a fold
+            with patch.object(optimizer.cv_manager, 'iter_fold_scores') as mock_cv:
+                mock_cv.side_effect = lambda *args, **kwargs: enumerate([0.8, 0.85, 0.82])
                 
                 study = optimizer.optimize_random_forest(X, y)
                 
@@ -64,15 +64,16 @@ class TestHyperparameterOptimizer:
                 mock_cv.assert_called()
     
     def test_optimize_xgboost(self, optimizer, sample_data):
-        """Testa otimização do XGBoost"""
+        """Testa otimização do XGBoost com o estimador sklearn"""
         X, y = sample_data
+        optimizer.native_boosters = False
         
         with patch('xgboost.XGBClassifier') as mock_xgb:
             mock_model = Mock()
             mock_xgb.return_value = mock_model
             
-            with patch.object(optimizer.cv_manager, 'cross_validate') as mock_cv:
-                mock_cv.return_value = {'test_score': np.array([0.8, 0.85, 0.82])}
+            with patch.object(optimizer.cv_manager, 'iter_fold_scores') as mock_cv:
+                mock_cv.side_effect = lambda *args, **kwargs: enumerate([0.8, 0.85, 0.82])
                 
                 study = optimizer.optimize_xgboost(X, y)
                 
@@ -82,15 +83,16 @@ class TestHyperparameterOptimizer:
                 mock_cv.assert_called()
     
     def test_optimize_lightgbm(self, optimizer, sample_data):
-        """Testa otimização do LightGBM"""
+        """Testa otimização do LightGBM com o estimador sklearn"""
         X, y = sample_data
+        optimizer.native_boosters = False
         
         with patch('lightgbm.LGBMClassifier') as mock_lgb:
             mock_model = Mock()
             mock_lgb.return_value = mock_model
             
-            with patch.object(optimizer.cv_manager, 'cross_validate') as mock_cv:
-                mock_cv.return_value = {'test_score': np.array([0.8, 0.85, 0.82])}
+            with patch.object(optimizer.cv_manager, 'iter_fold_scores') as mock_cv:
+                mock_cv.side_effect = lambda *args, **kwargs: enumerate([0.8, 0.85, 0.82])
                 
                 study = optimizer.optimize_lightgbm(X, y)
                 
@@ -98,6 +100,40 @@ class TestHyperparameterOptimizer:
                 assert len(study.trials) == 5
                 mock_lgb.assert_called()
                 mock_cv.assert_called()
+                assert mock_lgb.call_args.kwargs['subsample_freq'] == 1
+    
+    @pytest.mark.parametrize("kind", ["xgboost", "lightgbm"])
+    def test_optimize_native_booster(self, sample_data, kind, tmp_path):
+        """Com métrica suportada, o booster nativo treina sobre os folds em cache"""
+        X, y = sample_data
+        optimizer = HyperparameterOptimizer(
+            study_name=f"test_native_{kind}",
+            storage_url=f"sqlite:///{tmp_path / 'native.db'}",
+            n_trials=5,
+            cv_params={"n_splits": 3, "gap": 1},
+            random_state=42
+        )
+        folds = Mock()
+        folds.iter_native_scores.side_effect = lambda *args, **kwargs: enumerate([0.8, 0.85, 0.82])
+        
+        with patch.object(optimizer.cv_manager, 'get_fold_cache', return_value=folds), \
+             patch.object(optimizer.cv_manager, 'iter_fold_scores') as mock_cv:
+            study = getattr(optimizer, f'optimize_{kind}')(X, y)
+        
+        assert len(study.trials) == 5
+        mock_cv.assert_not_called()
+        args, kwargs = folds.iter_native_scores.call_args
+        assert args[0] == kind and kwargs['scoring'] == 'accuracy'
+        if kind == 'lightgbm':
+            import lightgbm as lgb
+            # O modelo do deploy (sklearn) é o mesmo que o booster nativo avaliou
+            native = folds.iter_native_scores.call_args_list[study.best_trial.number].args[1]
+            deployed = lgb.LGBMClassifier(**optimizer.get_best_params()).get_params()
+            assert native['bagging_freq'] > 0
+            assert deployed['subsample_freq'] == native['bagging_freq']
+            assert deployed['subsample'] == native['bagging_fraction']
+            assert deployed['colsample_bytree'] == native['feature_fraction']
+            assert deployed['min_child_samples'] == native['min_data_in_leaf']
     
     def test_optimize_catboost(self, optimizer, sample_data):
         """Testa otimização do CatBoost"""
@@ -107,8 +143,8 @@ class TestHyperparameterOptimizer:
             mock_model = Mock()
             mock_cat.return_value = mock_model
             
-            with patch.object(optimizer.cv_manager, 'cross_validate') as mock_cv:
-                mock_cv.return_value = {'test_score': np.array([0.8, 0.85, 0.82])}
+            with patch.object(optimizer.cv_manager, 'iter_fold_scores') as mock_cv:
+                mock_cv.side_effect = lambda *args, **kwargs: enumerate([0.8, 0.85, 0.82])
                 
                 study = optimizer.optimize_catboost(X, y)
                 
@@ -125,8 +161,8 @@ class TestHyperparameterOptimizer:
             mock_model = Mock()
             mock_lr.return_value = mock_model
             
-            with patch.object(optimizer.cv_manager, 'cross_validate') as mock_cv:
-                mock_cv.return_value = {'test_score': np.array([0.8, 0.85, 0.82])}
+            with patch.object(optimizer.cv_manager, 'iter_fold_scores') as mock_cv:
+                mock_cv.side_effect = lambda *args, **kwargs: enumerate([0.8, 0.85, 0.82])
                 
                 study = optimizer.optimize_logistic_regression(X, y)
                 
@@ -143,8 +179,8 @@ class TestHyperparameterOptimizer:
             mock_model = Mock()
             mock_mlp.return_value = mock_model
             
-            with patch.object(optimizer.cv_manager, 'cross_validate') as mock_cv:
-                mock_cv.return_value = {'test_score': np.array([0.8, 0.85, 0.82])}
+            with patch.object(optimizer.cv_manager, 'iter_fold_scores') as mock_cv:
+                mock_cv.side_effect = lambda *args, **kwargs: enumerate([0.8, 0.85, 0.82])
                 
                 study = optimizer.optimize_bayesian_neural_network(X, y)
                 
@@ -161,8 +197,8 @@ class TestHyperparameterOptimizer:
             mock_model = Mock()
             mock_poisson.return_value = mock_model
             
-            with patch.object(optimizer.cv_manager, 'cross_validate') as mock_cv:
-                mock_cv.return_value = {'test_score': np.array([0.8, 0.85, 0.82])}
+            with patch.object(optimizer.cv_manager, 'iter_fold_scores') as mock_cv:
+                mock_cv.side_effect = lambda *args, **kwargs: enumerate([0.8, 0.85, 0.82])
                 
                 study = optimizer.optimize_poisson_model(X, y)
                 
@@ -194,8 +230,8 @@ class TestHyperparameterOptimizer:
         """Testa exportação de resultados"""
         X, y = sample_data
         
-        with patch.object(optimizer.cv_manager, 'cross_validate') as mock_cv:
-            mock_cv.return_value = {'test_score': np.array([0.8, 0.85, 0.82])}
+        with patch.object(optimizer.cv_manager, 'iter_fold_scores') as mock_cv:
+            mock_cv.side_effect = lambda *args, **kwargs: enumerate([0.8, 0.85, 0.82])
             
             # Executar uma otimização simples
             optimizer.optimize_random_forest(X, y)
@@ -264,10 +300,10 @@ class TestMultiModelOptimizer:
             mock_rf.return_value = mock_rf_model
             mock_xgb.return_value = mock_xgb_model
             
-            # Mock do cross_validate para ambos os otimizadores
+            # Mock da validação fold a fold para ambos os otimizadores
             for optimizer in multi_optimizer.optimizers.values():
-                with patch.object(optimizer.cv_manager, 'cross_validate') as mock_cv:
-                    mock_cv.return_value = {'test_score': np.array([0.8, 0.85, 0.82])}
+                with patch.object(optimizer.cv_manager, 'iter_fold_scores') as mock_cv:
+                    mock_cv.side_effect = lambda *args, **kwargs: enumerate([0.8, 0.85, 0.82])
             
             results = multi_optimizer.optimize_all(X, y)
             
@@ -431,8 +467,8 @@ class TestOptimizationIntegration:
             mock_model = Mock()
             mock_rf.return_value = mock_model
             
-            with patch.object(optimizer.cv_manager, 'cross_validate') as mock_cv:
-                mock_cv.return_value = {'test_score': np.array([0.8, 0.85, 0.82])}
+            with patch.object(optimizer.cv_manager, 'iter_fold_scores') as mock_cv:
+                mock_cv.side_effect = lambda *args, **kwargs: enumerate([0.8, 0.85, 0.82])
                 
                 # Executar otimização
                 study = optimizer.optimize_random_forest(X, y)
@@ -466,8 +502,8 @@ class TestOptimizationIntegration:
                 mock_model = Mock()
                 mock_rf.return_value = mock_model
                 
-                with patch.object(optimizer.cv_manager, 'cross_validate') as mock_cv:
-                    mock_cv.return_value = {'test_score': np.array([0.8, 0.85])}
+                with patch.object(optimizer.cv_manager, 'iter_fold_scores') as mock_cv:
+                    mock_cv.side_effect = lambda *args, **kwargs: enumerate([0.8, 0.85])
                     
                     study = optimizer.optimize_random_forest(X, y)
                     
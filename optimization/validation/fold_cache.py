@@ -0,0 +1,282 @@
+"""
+Cache de folds para validação cruzada temporal
+Materializa os índices e as fatias de cada fold uma única vez e reaproveita
+datasets nativos pré-binados (DMatrix / lgb.Dataset) entre trials e modelos
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Generator, List, Optional, Tuple
+
+import numpy as np
+from sklearn.base import BaseEstimator, clone
+from sklearn.metrics import accuracy_score, balanced_accuracy_score, f1_score, get_scorer, log_loss, roc_auc_score
+
+logger = logging.getLogger(__name__)
+
+# Métricas que podem ser calculadas direto das probabilidades dos boosters nativos
+NATIVE_SCORERS = {
+    "accuracy": lambda y, proba: accuracy_score(y, proba.argmax(axis=1)),
+    "balanced_accuracy": lambda y, proba: balanced_accuracy_score(y, proba.argmax(axis=1)),
+    "f1_macro": lambda y, proba: f1_score(y, proba.argmax(axis=1), average="macro"),
+    "neg_log_loss": lambda y, proba: -log_loss(y, proba, labels=np.arange(proba.shape[1])),
+    "roc_auc": lambda y, proba: roc_auc_score(y, proba[:, 1]),
+}
+
+
+def data_fingerprint(X: Any, y: Any) -> str:
+    """Hash do conteúdo de X/y usado para reaproveitar o cache entre otimizadores"""
+    digest = hashlib.blake2b(digest_size=16)
+    for array in (np.ascontiguousarray(X), np.ascontiguousarray(y)):
+        digest.update(str((array.shape, array.dtype.str)).encode())
+        digest.update(array.data)
+    return digest.hexdigest()
+
+
+def _as_slice(indices: np.ndarray):
+    """Converte índices contíguos em slice, para que a fatia do memmap seja uma view"""
+    if len(indices) and indices[-1] - indices[0] + 1 == len(indices) and np.all(np.diff(indices) == 1):
+        return slice(int(indices[0]), int(indices[-1]) + 1)
+    return None
+
+
+class FoldCache:
+    """
+    Folds de um conjunto (X, y) para uma estratégia de CV, construídos uma vez
+
+    X e y ficam em arrays memory-mapped no disco; folds contíguos (janelas
+    temporais) são views desses arrays, os demais são materializados num
+    memmap próprio. Datasets nativos de gradient boosting são construídos
+    sob demanda e mantidos por fold e parâmetros de binagem.
+    """
+
+    def __init__(self, cv, X: Any, y: Any, cache_dir: Optional[str] = None):
+        """
+        Inicializa o cache
+
+        Args:
+            cv: Splitter com método split(X, y) (ex.: CrossValidationManager.cv)
+            X: Features
+            y: Target
+            cache_dir: Diretório dos memmaps (temporário se None)
+        """
+        X = np.asarray(X)
+        y = np.asarray(y)
+
+        self._owns_dir = cache_dir is None
+        self.cache_dir = cache_dir or tempfile.mkdtemp(prefix="marabet_folds_")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if self._owns_dir:
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self.cache_dir, True)
+
+        self.X = self._memmap("X", X)
+        self.y = self._memmap("y", y)
+        self.classes = np.unique(y)
+        self.y_encoded = np.searchsorted(self.classes, self.y)
+
+        self.splits: List[Tuple[np.ndarray, np.ndarray]] = [
+            (np.asarray(train, dtype=np.int64), np.asarray(test, dtype=np.int64))
+            for train, test in cv.split(self.X, self.y)
+        ]
+        self._folds: List[Dict[str, np.ndarray]] = [
+            self._materialize(i, train, test) for i, (train, test) in enumerate(self.splits)
+        ]
+
+        self._native: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+        self.stats = {"native_builds": 0, "native_hits": 0}
+
+    def _memmap(self, name: str, array: np.ndarray) -> np.memmap:
+        path = os.path.join(self.cache_dir, f"{name}.npy")
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=array.dtype, shape=array.shape)
+        out[...] = array
+        out.flush()
+        del out
+        return np.load(path, mmap_mode="r")
+
+    def _materialize(self, fold: int, train: np.ndarray, test: np.ndarray) -> Dict[str, np.ndarray]:
+        data = {}
+        for part, indices in (("train", train), ("test", test)):
+            window = _as_slice(indices)
+            if window is not None:
+                data[f"X_{part}"] = self.X[window]
+                data[f"y_{part}"] = self.y[window]
+                data[f"yenc_{part}"] = self.y_encoded[window]
+            else:
+                data[f"X_{part}"] = self._memmap(f"fold{fold}_X_{part}", self.X[indices])
+                data[f"y_{part}"] = self._memmap(f"fold{fold}_y_{part}", self.y[indices])
+                data[f"yenc_{part}"] = self.y_encoded[indices]
+        return data
+
+    @property
+    def n_splits(self) -> int:
+        return len(self.splits)
+
+    def fold(self, i: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Retorna (X_train, X_test, y_train, y_test) do fold i"""
+        data = self._folds[i]
+        return data["X_train"], data["X_test"], data["y_train"], data["y_test"]
+
+    def iter_fold_scores(
+        self,
+        estimator: BaseEstimator,
+        scoring: str = "accuracy"
+    ) -> Generator[Tuple[int, float], None, None]:
+        """
+        Equivalente a CrossValidationManager.iter_fold_scores sobre as fatias em cache
+        """
+        scorer = get_scorer(scoring)
+        for i in range(self.n_splits):
+            X_train, X_test, y_train, y_test = self.fold(i)
+            model = clone(estimator)
+            model.fit(X_train, y_train)
+            score = scorer(model, X_test, y_test)
+            del model
+            yield i, float(score)
+
+    def native_dataset(self, kind: str, fold: int, max_bin: int = 256):
+        """
+        Datasets nativos (treino, teste) do fold, binados uma única vez por max_bin
+
+        Args:
+            kind: "xgboost" ou "lightgbm"
+            fold: Índice do fold
+            max_bin: Número de bins do histograma
+        """
+        key = (kind, fold, max_bin)
+        with self._lock:
+            cached = self._native.get(key)
+            if cached is not None:
+                self.stats["native_hits"] += 1
+                return cached
+
+        data = self._folds[fold]
+        if kind == "xgboost":
+            import xgboost as xgb
+            train = xgb.QuantileDMatrix(data["X_train"], data["yenc_train"], max_bin=max_bin)
+            test = xgb.QuantileDMatrix(data["X_test"], data["yenc_test"], ref=train)
+        elif kind == "lightgbm":
+            import lightgbm as lgb
+            # feature_pre_filter desligado: o mesmo Dataset serve a qualquer min_data_in_leaf
+            train = lgb.Dataset(
+                data["X_train"], data["yenc_train"],
+                params={"max_bin": max_bin, "feature_pre_filter": False, "verbose": -1},
+                free_raw_data=False
+            ).construct()
+            test = data["X_test"]
+        else:
+            raise ValueError(f"Dataset nativo não suportado: {kind}")
+
+        with self._lock:
+            cached = self._native.setdefault(key, (train, test))
+            self.stats["native_builds"] += 1
+        return cached
+
+    def iter_native_scores(
+        self,
+        kind: str,
+        params: Dict[str, Any],
+        num_boost_round: int,
+        scoring: str = "accuracy",
+        max_bin: int = 256
+    ) -> Generator[Tuple[int, float], None, None]:
+        """
+        Treina o booster nativo fold a fold sobre os datasets em cache
+
+        Args:
+            kind: "xgboost" ou "lightgbm"
+            params: Parâmetros nativos do booster (sem objetivo/num_class)
+            num_boost_round: Número de árvores
+            scoring: Métrica (chaves de NATIVE_SCORERS)
+            max_bin: Número de bins do histograma
+        """
+        if scoring not in NATIVE_SCORERS:
+            raise ValueError(f"Métrica {scoring} não suportada no caminho nativo")
+        scorer = NATIVE_SCORERS[scoring]
+        n_classes = len(self.classes)
+
+        for i in range(self.n_splits):
+            train, test = self.native_dataset(kind, i, max_bin)
+            y_test = self._folds[i]["yenc_test"]
+
+            if kind == "xgboost":
+                import xgboost as xgb
+                booster_params = dict(params, tree_method="hist", max_bin=max_bin)
+                if n_classes > 2:
+                    booster_params.update(objective="multi:softprob", num_class=n_classes)
+                else:
+                    booster_params.update(objective="binary:logistic")
+                booster = xgb.train(booster_params, train, num_boost_round=num_boost_round)
+                proba = booster.predict(test)
+            else:
+                import lightgbm as lgb
+                booster_params = dict(params, max_bin=max_bin, verbose=-1)
+                if n_classes > 2:
+                    booster_params.update(objective="multiclass", num_class=n_classes)
+                else:
+                    booster_params.update(objective="binary")
+                booster = lgb.train(booster_params, train, num_boost_round=num_boost_round)
+                proba = booster.predict(test)
+
+            if proba.ndim == 1:
+                proba = np.column_stack([1 - proba, proba])
+            del booster
+
+            yield i, float(scorer(y_test, proba))
+
+    def close(self):
+        """Libera os datasets nativos e remove os memmaps temporários"""
+        with self._lock:
+            self._native.clear()
+        if self._owns_dir:
+            self._finalizer()
+
+
+_fold_caches: "OrderedDict[Tuple, FoldCache]" = OrderedDict()
+_fold_caches_lock = threading.Lock()
+
+
+def get_fold_cache(cv_manager, X: Any, y: Any, max_entries: int = 4) -> FoldCache:
+    """
+    Cache de folds compartilhado por todos os otimizadores do processo
+
+    A chave combina o conteúdo de X/y com a estratégia e os parâmetros da CV,
+    então MultiModelOptimizer reaproveita os mesmos folds em todos os modelos.
+    """
+    key = (
+        data_fingerprint(X, y),
+        cv_manager.strategy,
+        tuple(sorted((k, repr(v)) for k, v in cv_manager.kwargs.items()))
+    )
+    with _fold_caches_lock:
+        cache = _fold_caches.get(key)
+        if cache is not None:
+            _fold_caches.move_to_end(key)
+            return cache
+
+    built = FoldCache(cv_manager.cv, X, y)
+    with _fold_caches_lock:
+        cache = _fold_caches.setdefault(key, built)
+        _fold_caches.move_to_end(key)
+        while len(_fold_caches) > max_entries:
+            _, evicted = _fold_caches.popitem(last=False)
+            evicted.close()
+    if cache is not built:
+        built.close()
+
+    logger.info(f"Cache de folds criado: {cache.n_splits} folds")
+    return cache
+
+
+def clear_fold_caches():
+    """Descarta todos os caches de folds do processo"""
+    with _fold_caches_lock:
+        while _fold_caches:
+            _, cache = _fold_caches.popitem()
+            cache.close()
@@ -319,6 +319,7 @@ class CrossValidationManager:
         self.strategy = strategy
         self.kwargs = kwargs
         self.cv = self._create_cv()
+        self._active_folds = None
         
     def _create_cv(self):
         """Cria o objeto de validação cruzada baseado na estratégia"""
@@ -360,14 +361,62 @@ class CrossValidationManager:
             estimator=estimator,
             X=X,
             y=y,
-            cv=self.cv,
+            cv=self.get_fold_cache(X, y).splits,
             scoring=scoring,
-            return_train_score=return_train_score,
-            return_estimator=True
+            return_train_score=return_train_score
         )
         
         return cv_results
     
+    def iter_fold_scores(
+        self,
+        estimator: BaseEstimator,
+        X: np.ndarray,
+        y: np.ndarray,
+        scoring: str = "accuracy"
+    ) -> Generator[Tuple[int, float], None, None]:
+        """
+        Avalia o modelo fold a fold, permitindo interromper a validação no meio
+        
+        Cada fold ajusta um clone do estimador, que é descartado logo após o
+        score; nenhum modelo ajustado fica retido em memória. As fatias de
+        cada fold vêm do cache de folds, construído uma vez por (X, y).
+        
+        Args:
+            estimator: Modelo para validação
+            X: Features
+            y: Target
+            scoring: Métrica de avaliação
+            
+        Yields:
+            Tuplas (índice_do_fold, score)
+        """
+        yield from self.get_fold_cache(X, y).iter_fold_scores(estimator, scoring=scoring)
+    
+    def get_fold_cache(self, X: np.ndarray, y: np.ndarray):
+        """
+        Cache de folds de (X, y) para esta estratégia
+        
+        Chamadas repetidas com os mesmos objetos X/y (todos os trials de um
+        estudo) não recalculam nem o hash dos dados.
+        
+        Args:
+            X: Features
+            y: Target
+            
+        Returns:
+            FoldCache compartilhado
+        """
+        from optimization.validation.fold_cache import get_fold_cache
+        
+        active = self._active_folds
+        if active is not None and active[0] is X and active[1] is y:
+            return active[2]
+        
+        cache = get_fold_cache(self, X, y)
+        self._active_folds = (X, y, cache)
+        return cache
+    
     def get_splits(self, X: np.ndarray, y: Optional[np.ndarray] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
         """
         Retorna todos os splits
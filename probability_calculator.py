@@ -60,6 +60,10 @@ class ProbabilityCalculator:
         self.weights = weights or ProbabilityWeights()
         self.calculation_history = []
         
+        # Memo por sessão: dados e scores de cada time e de cada confronto
+        self._team_cache: Dict[str, Dict] = {}
+        self._h2h_cache: Dict[Tuple[str, str], Dict] = {}
+        
     def calculate_probabilities(self, match_data: Dict) -> ProbabilityResult:
         """
         Calcula probabilidades usando a estrutura de pesos definida
@@ -135,13 +139,14 @@ class ProbabilityCalculator:
             home_team = match_data.get('home_team', '')
             away_team = match_data.get('away_team', '')
             
-            # Simula dados do histórico recente
-            home_recent = self._simulate_team_recent_form(home_team)
-            away_recent = self._simulate_team_recent_form(away_team)
+            # Histórico recente e força de cada time (memoizados por sessão)
+            home_profile = self._team_profile(home_team)
+            away_profile = self._team_profile(away_team)
+            home_recent = home_profile['recent_form']
+            away_recent = away_profile['recent_form']
             
-            # Calcula probabilidades baseadas na forma recente
-            home_strength = self._calculate_team_strength(home_recent)
-            away_strength = self._calculate_team_strength(away_recent)
+            home_strength = home_profile['strength']
+            away_strength = away_profile['strength']
             
             # Aplica fator casa
             home_advantage = 0.1  # 10% de vantagem em casa
@@ -179,8 +184,8 @@ class ProbabilityCalculator:
             home_team = match_data.get('home_team', '')
             away_team = match_data.get('away_team', '')
             
-            # Simula dados de confrontos diretos
-            h2h_data = self._simulate_h2h_data(home_team, away_team)
+            # Dados de confrontos diretos (memoizados por confronto)
+            h2h_data = self._h2h_profile(home_team, away_team)
             
             # Calcula probabilidades baseadas no H2H
             total_matches = h2h_data['total_matches']
@@ -230,9 +235,9 @@ class ProbabilityCalculator:
             home_team = match_data.get('home_team', '')
             away_team = match_data.get('away_team', '')
             
-            # Simula estatísticas avançadas
-            home_advanced = self._simulate_advanced_stats(home_team)
-            away_advanced = self._simulate_advanced_stats(away_team)
+            # Estatísticas avançadas (memoizadas por time)
+            home_advanced = self._team_profile(home_team)['advanced']
+            away_advanced = self._team_profile(away_team)['advanced']
             
             # Calcula diferenças nas estatísticas
             xg_diff = home_advanced['xg_for'] - away_advanced['xg_for']
@@ -328,9 +333,9 @@ class ProbabilityCalculator:
             home_team = match_data.get('home_team', '')
             away_team = match_data.get('away_team', '')
             
-            # Simula dados de momentum
-            home_momentum = self._simulate_team_momentum(home_team)
-            away_momentum = self._simulate_team_momentum(away_team)
+            # Momentum (memoizado por time)
+            home_momentum = self._team_profile(home_team)['momentum']
+            away_momentum = self._team_profile(away_team)['momentum']
             
             # Calcula diferença de momentum
             momentum_diff = home_momentum['momentum'] - away_momentum['momentum']
@@ -512,6 +517,211 @@ class ProbabilityCalculator:
             }
         }
     
+    def calculate_probabilities_many(self, fixtures: List[Dict]) -> List[ProbabilityResult]:
+        """
+        Calcula probabilidades de uma rodada inteira
+        
+        Os scores de cada time são calculados uma única vez (memo da sessão)
+        e os cinco componentes são combinados como arrays para todas as
+        partidas. Retorna os mesmos ProbabilityResult de calculate_probabilities,
+        na ordem de `fixtures`.
+        """
+        if not fixtures:
+            return []
+        
+        logger.info(f"Calculando probabilidades em lote para {len(fixtures)} partidas")
+        
+        try:
+            # Dados sorteados na mesma ordem do caminho por partida
+            home_profiles, away_profiles, h2h_rows, context_rows, quality = [], [], [], [], []
+            for match_data in fixtures:
+                home_team = match_data.get('home_team', '')
+                away_team = match_data.get('away_team', '')
+                home_profiles.append(self._team_profile(home_team))
+                away_profiles.append(self._team_profile(away_team))
+                h2h_rows.append(self._h2h_profile(home_team, away_team))
+                context_rows.append(self._simulate_contextual_factors(match_data))
+                quality.append((self._assess_data_consistency(match_data), self._assess_data_recency(match_data)))
+            
+            components = {
+                'historico_recente': self._historico_recente_batch(home_profiles, away_profiles),
+                'confrontos_diretos': self._confrontos_diretos_batch(h2h_rows),
+                'estatisticas_avancadas': self._estatisticas_avancadas_batch(home_profiles, away_profiles),
+                'fatores_contextuais': self._fatores_contextuais_batch(context_rows),
+                'analise_momentum': self._analise_momentum_batch(home_profiles, away_profiles),
+            }
+            final = self._combine_probabilities_batch(components)
+            
+            # Confiança: clareza da predição + consistência e recência dos dados
+            consistency, recency = (np.array(q, dtype=float) for q in zip(*quality))
+            clarity = (np.max(np.column_stack([final['home_win'], final['draw'], final['away_win']]), axis=1)
+                       - 0.33) / 0.67
+            confidence = np.clip(clarity * 0.5 + consistency * 0.3 + recency * 0.2, 0.0, 1.0)
+        
+        except Exception as e:
+            logger.error(f"Erro no cálculo em lote, usando cálculo por partida: {e}")
+            return [self.calculate_probabilities(match_data) for match_data in fixtures]
+        
+        # Colunas como listas de float para montar os resultados por partida
+        columns = {
+            name: {key: values.tolist() for key, values in component.items()}
+            for name, component in components.items()
+        }
+        home_win, draw, away_win = (final[key].tolist() for key in ('home_win', 'draw', 'away_win'))
+        confidence = confidence.tolist()
+        
+        results = []
+        for i, match_data in enumerate(fixtures):
+            row = {
+                name: {key: values[i] for key, values in component.items()}
+                for name, component in columns.items()
+            }
+            result = ProbabilityResult(
+                home_win=home_win[i],
+                draw=draw[i],
+                away_win=away_win[i],
+                confidence=confidence[i],
+                breakdown=self._create_breakdown(
+                    row['historico_recente'], row['confrontos_diretos'], row['estatisticas_avancadas'],
+                    row['fatores_contextuais'], row['analise_momentum']
+                ),
+                weights_used=self.weights,
+                calculation_method='weighted_combination'
+            )
+            self.calculation_history.append({
+                'timestamp': datetime.now(),
+                'match': f"{match_data.get('home_team', '')} vs {match_data.get('away_team', '')}",
+                'result': result
+            })
+            results.append(result)
+        
+        return results
+    
+    def _historico_recente_batch(self, home_profiles: List[Dict], away_profiles: List[Dict]) -> Dict[str, np.ndarray]:
+        """Histórico recente (40%) para todas as partidas"""
+        home_strength = np.array([p['strength'] for p in home_profiles]) + 0.1  # Vantagem em casa
+        away_strength = np.array([p['strength'] for p in away_profiles])
+        
+        home_win = 1 / (1 + np.exp(-(home_strength - away_strength)))
+        away_win = 1 / (1 + np.exp(-(away_strength - home_strength)))
+        probs = self._normalize_batch(home_win, 1 - home_win - away_win, away_win)
+        
+        home_consistency = np.array([p['form_consistency'] for p in home_profiles])
+        away_consistency = np.array([p['form_consistency'] for p in away_profiles])
+        probs['confidence'] = (home_consistency + away_consistency) / 2
+        return probs
+    
+    def _confrontos_diretos_batch(self, h2h_rows: List[Dict]) -> Dict[str, np.ndarray]:
+        """Confrontos diretos (25%) para todas as partidas"""
+        total_matches = np.array([h['total_matches'] for h in h2h_rows], dtype=float)
+        recency = np.array([self._calculate_recency_factor(h) for h in h2h_rows])
+        has_h2h = total_matches > 0
+        safe_total = np.where(has_h2h, total_matches, 1.0)
+        
+        probs = self._normalize_batch(
+            np.array([h['home_wins'] for h in h2h_rows]) / safe_total * recency,
+            np.array([h['draws'] for h in h2h_rows]) / safe_total * recency,
+            np.array([h['away_wins'] for h in h2h_rows]) / safe_total * recency
+        )
+        
+        # Sem confrontos: probabilidades neutras e confiança zero
+        for key, neutral in (('home_win', 0.33), ('draw', 0.34), ('away_win', 0.33)):
+            probs[key] = np.where(has_h2h, probs[key], neutral)
+        probs['confidence'] = np.minimum(total_matches / 10, 1.0)
+        return probs
+    
+    def _estatisticas_avancadas_batch(self, home_profiles: List[Dict], away_profiles: List[Dict]) -> Dict[str, np.ndarray]:
+        """Estatísticas avançadas (15%) para todas as partidas"""
+        def stat(profiles, name):
+            return np.array([p['advanced'][name] for p in profiles])
+        
+        xg_diff = stat(home_profiles, 'xg_for') - stat(away_profiles, 'xg_for')
+        possession_diff = stat(home_profiles, 'possession') - stat(away_profiles, 'possession')
+        shots_diff = stat(home_profiles, 'shots_per_game') - stat(away_profiles, 'shots_per_game')
+        defense_diff = stat(away_profiles, 'xg_against') - stat(home_profiles, 'xg_against')
+        
+        score = xg_diff * 0.4 + possession_diff * 0.2 + shots_diff * 0.2 + defense_diff * 0.2
+        home_win = 1 / (1 + np.exp(-score))
+        away_win = 1 / (1 + np.exp(score))
+        probs = self._normalize_batch(home_win, 1 - home_win - away_win, away_win)
+        probs['confidence'] = np.minimum((np.abs(xg_diff) + np.abs(possession_diff) / 10) / 2, 1.0)
+        return probs
+    
+    def _fatores_contextuais_batch(self, context_rows: List[Dict]) -> Dict[str, np.ndarray]:
+        """Fatores contextuais (10%) para todas as partidas"""
+        keys = ['home_advantage', 'weather_impact', 'injury_impact', 'referee_impact', 'pressure_impact']
+        context = np.array([[row[key] for key in keys] for row in context_rows], dtype=float)
+        
+        score = (context[:, 0] * 0.3 + context[:, 1] * 0.2 + context[:, 2] * 0.2 +
+                 context[:, 3] * 0.15 + context[:, 4] * 0.15)
+        home_win = 1 / (1 + np.exp(-score))
+        away_win = 1 / (1 + np.exp(score))
+        probs = self._normalize_batch(home_win, 1 - home_win - away_win, away_win)
+        probs['confidence'] = np.minimum(np.mean(np.abs(context), axis=1) * 2, 1.0)
+        return probs
+    
+    def _analise_momentum_batch(self, home_profiles: List[Dict], away_profiles: List[Dict]) -> Dict[str, np.ndarray]:
+        """Análise de momentum (10%) para todas as partidas"""
+        def diff(name):
+            return (np.array([p['momentum'][name] for p in home_profiles]) -
+                    np.array([p['momentum'][name] for p in away_profiles]))
+        
+        momentum_diff = diff('momentum')
+        total_momentum = momentum_diff * 0.5 + diff('form_trend') * 0.3 + diff('goals_momentum') * 0.2
+        home_win = 1 / (1 + np.exp(-total_momentum))
+        away_win = 1 / (1 + np.exp(total_momentum))
+        probs = self._normalize_batch(home_win, 1 - home_win - away_win, away_win)
+        probs['confidence'] = np.minimum(np.abs(momentum_diff) * 2, 1.0)
+        return probs
+    
+    def _normalize_batch(self, home_win: np.ndarray, draw: np.ndarray, away_win: np.ndarray) -> Dict[str, np.ndarray]:
+        """Normaliza as três probabilidades de cada partida para somar 1"""
+        total = home_win + draw + away_win
+        return {'home_win': home_win / total, 'draw': draw / total, 'away_win': away_win / total}
+    
+    def _combine_probabilities_batch(self, components: Dict[str, Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        """Combina os componentes de todas as partidas com os pesos definidos"""
+        combined = {}
+        for key in ('home_win', 'draw', 'away_win'):
+            combined[key] = sum(
+                components[name][key] * getattr(self.weights, name)
+                for name in ('historico_recente', 'confrontos_diretos', 'estatisticas_avancadas',
+                             'fatores_contextuais', 'analise_momentum')
+            )
+        
+        total = combined['home_win'] + combined['draw'] + combined['away_win']
+        total = np.where(total > 0, total, 1.0)
+        return {key: values / total for key, values in combined.items()}
+    
+    def _team_profile(self, team_name: str) -> Dict:
+        """Dados e scores de um time, calculados uma vez por sessão"""
+        profile = self._team_cache.get(team_name)
+        if profile is None:
+            recent_form = self._simulate_team_recent_form(team_name)
+            profile = {
+                'recent_form': recent_form,
+                'strength': self._calculate_team_strength(recent_form),
+                'form_consistency': min(recent_form['wins'] + recent_form['draws'] + recent_form['losses'], 10) / 10,
+                'advanced': self._simulate_advanced_stats(team_name),
+                'momentum': self._simulate_team_momentum(team_name),
+            }
+            self._team_cache[team_name] = profile
+        return profile
+    
+    def _h2h_profile(self, home_team: str, away_team: str) -> Dict:
+        """Dados de confrontos diretos, calculados uma vez por sessão"""
+        key = (home_team, away_team)
+        h2h_data = self._h2h_cache.get(key)
+        if h2h_data is None:
+            h2h_data = self._simulate_h2h_data(home_team, away_team)
+            self._h2h_cache[key] = h2h_data
+        return h2h_data
+    
+    def clear_cache(self):
+        """Descarta os dados memoizados (ex.: nova rodada com dados atualizados)"""
+        self._team_cache.clear()
+        self._h2h_cache.clear()
+    
     # Métodos auxiliares para simulação de dados
     def _simulate_team_recent_form(self, team_name: str) -> Dict:
         """Simula forma recente de um time"""
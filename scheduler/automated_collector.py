@@ -1,5 +1,3 @@
-import schedule
-import time
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, List
@@ -9,24 +7,42 @@ from concurrent.futures import ThreadPoolExecutor
 from coletores.football_collector import FootballCollector
 from coletores.odds_collector import OddsCollector
 from análise.value_finder import ValueFinder
-from armazenamento.banco_de_dados import SessionLocal, Match, Odds, Prediction
+from análise.best_price_index import best_price_index
+from análise.line_movement import LineMovementEngine
+from armazenamento.banco_de_dados import SessionLocal, Match, Odds, OddsMovement, Prediction
+from armazenamento.odds_delta import OddsDeltaStore, flatten_bookmaker_odds
 from settings.settings import COLLECTION_INTERVAL, MONITORED_LEAGUES
 from notifications.notification_integrator import (
     notify_system_status, notify_error, notify_daily_report
 )
+from notifications.notification_queue import enqueue_notification
+from scheduler.job_scheduler import JobScheduler
+from scheduler.polling_planner import FINISHED_STATUSES
 
 logger = logging.getLogger(__name__)
 
 class AutomatedCollector:
     """Sistema de coleta automatizada com agendamento"""
     
+    # Partidas com movimento recente são recarregadas no line movement ao iniciar;
+    # sem atualização há mais tempo que isso o estado é descartado
+    LINE_MOVEMENT_HORIZON = timedelta(days=14)
+    
     def __init__(self):
         self.football_collector = FootballCollector()
         self.odds_collector = OddsCollector()
-        self.value_finder = ValueFinder()
+        self.line_movement = LineMovementEngine()
+        self.value_finder = ValueFinder(line_movement=self.line_movement)
         self.db = SessionLocal()
+        self.odds_store = OddsDeltaStore(self.db, best_price_index=best_price_index)
+        self.odds_store.warm_up()
+        self._warm_line_movement()
         self.running = False
+        # Pool das tarefas agendadas e pool da coleta por liga
+        self.job_scheduler = JobScheduler(max_workers=4)
         self.executor = ThreadPoolExecutor(max_workers=3)
+        # A sessão do banco é compartilhada entre tarefas concorrentes
+        self._db_lock = threading.RLock()
         
         # Configurar logging
         logging.basicConfig(
@@ -48,22 +64,20 @@ class AutomatedCollector:
         self.running = True
         
         # Executar em thread separada
-        scheduler_thread = threading.Thread(target=self._run_scheduler)
-        scheduler_thread.daemon = True
-        scheduler_thread.start()
+        scheduler_thread = self.job_scheduler.start()
         
         logger.info("✅ Sistema de coleta automatizada iniciado!")
         
         # Notificar sobre início do sistema
         try:
-            import asyncio
-            status_data = {
-                'running': True,
-                'total_matches': self.db.query(Match).count(),
-                'total_predictions': self.db.query(Prediction).count(),
-                'next_execution': 'Sistema iniciado'
-            }
-            asyncio.create_task(notify_system_status(status_data))
+            with self._db_lock:
+                status_data = {
+                    'running': True,
+                    'total_matches': self.db.query(Match).count(),
+                    'total_predictions': self.db.query(Prediction).count(),
+                    'next_execution': 'Sistema iniciado'
+                }
+            enqueue_notification(notify_system_status, status_data)
         except Exception as e:
             logger.error(f"Erro ao notificar início do sistema: {e}")
         
@@ -72,20 +86,22 @@ class AutomatedCollector:
     def _setup_schedule(self):
         """Configura as tarefas agendadas"""
         
+        jobs = self.job_scheduler
+        
         # Coleta de dados de futebol - a cada 30 minutos
-        schedule.every(30).minutes.do(self._collect_football_data)
+        jobs.add_job('_collect_football_data', self._collect_football_data, every=30 * 60, jitter=60)
         
         # Coleta de odds - a cada 15 minutos
-        schedule.every(15).minutes.do(self._collect_odds_data)
+        jobs.add_job('_collect_odds_data', self._collect_odds_data, every=15 * 60, jitter=30)
         
         # Análise de valor - a cada 10 minutos
-        schedule.every(10).minutes.do(self._analyze_matches)
+        jobs.add_job('_analyze_matches', self._analyze_matches, every=10 * 60, jitter=15)
         
         # Limpeza de dados antigos - diariamente às 2:00
-        schedule.every().day.at("02:00").do(self._cleanup_old_data)
+        jobs.add_job('_cleanup_old_data', self._cleanup_old_data, at="02:00", jitter=300)
         
         # Relatório de status - diariamente às 8:00
-        schedule.every().day.at("08:00").do(self._generate_status_report)
+        jobs.add_job('_generate_status_report', self._generate_status_report, at="08:00")
         
         logger.info("📅 Tarefas agendadas configuradas:")
         logger.info("   - Coleta de futebol: a cada 30 minutos")
@@ -94,16 +110,6 @@ class AutomatedCollector:
         logger.info("   - Limpeza de dados: diariamente às 2:00")
         logger.info("   - Relatório de status: diariamente às 8:00")
     
-    def _run_scheduler(self):
-        """Executa o loop do agendador"""
-        while self.running:
-            try:
-                schedule.run_pending()
-                time.sleep(60)  # Verificar a cada minuto
-            except Exception as e:
-                logger.error(f"Erro no agendador: {e}")
-                time.sleep(60)
-    
     def _collect_football_data(self):
         """Coleta dados de futebol"""
         logger.info("⚽ Iniciando coleta de dados de futebol...")
@@ -113,21 +119,33 @@ class AutomatedCollector:
             today_matches = self.football_collector.collect(mode='today')
             logger.info(f"   Partidas de hoje: {len(today_matches)}")
             
-            # Coletar partidas das ligas monitoradas
-            for league_id in MONITORED_LEAGUES:
-                league_matches = self.football_collector.collect(
-                    mode='league', 
-                    league_id=league_id, 
-                    season=datetime.now().year
+            # Coletar partidas das ligas monitoradas em paralelo
+            season = datetime.now().year
+            futures = {
+                league_id: self.executor.submit(
+                    self.football_collector.collect,
+                    mode='league',
+                    league_id=league_id,
+                    season=season
                 )
+                for league_id in MONITORED_LEAGUES
+            }
+            for league_id, future in futures.items():
+                try:
+                    league_matches = future.result()
+                except Exception as e:
+                    logger.error(f"   Liga {league_id}: erro na coleta: {e}")
+                    continue
                 logger.info(f"   Liga {league_id}: {len(league_matches)} partidas")
                 
                 # Salvar no banco
                 self._save_matches_to_db(league_matches)
+                self._forget_finished_fixtures(league_matches)
             
             # Coletar partidas ao vivo
             live_matches = self.football_collector.collect(mode='live')
             logger.info(f"   Partidas ao vivo: {len(live_matches)}")
+            self._forget_finished_fixtures(today_matches + live_matches)
             
             logger.info("✅ Coleta de dados de futebol concluída!")
             
@@ -135,10 +153,9 @@ class AutomatedCollector:
             logger.error(f"❌ Erro na coleta de futebol: {e}")
             # Notificar sobre erro
             try:
-                import asyncio
-                asyncio.create_task(notify_error(f"Erro na coleta de futebol: {e}"))
-            except Exception as notify_error:
-                logger.error(f"Erro ao notificar erro: {notify_error}")
+                enqueue_notification(notify_error, f"Erro na coleta de futebol: {e}")
+            except Exception as notify_exc:
+                logger.error(f"Erro ao notificar erro: {notify_exc}")
     
     def _collect_odds_data(self):
         """Coleta dados de odds"""
@@ -162,32 +179,32 @@ class AutomatedCollector:
             logger.error(f"❌ Erro na coleta de odds: {e}")
             # Notificar sobre erro
             try:
-                import asyncio
-                asyncio.create_task(notify_error(f"Erro na coleta de odds: {e}"))
-            except Exception as notify_error:
-                logger.error(f"Erro ao notificar erro: {notify_error}")
+                enqueue_notification(notify_error, f"Erro na coleta de odds: {e}")
+            except Exception as notify_exc:
+                logger.error(f"Erro ao notificar erro: {notify_exc}")
     
     def _analyze_matches(self):
         """Analisa partidas e busca valor"""
         logger.info("🔍 Iniciando análise de partidas...")
         
         try:
-            # Buscar partidas não analisadas
-            unanalyzed_matches = self._get_unanalyzed_matches()
-            logger.info(f"   Partidas para analisar: {len(unanalyzed_matches)}")
-            
-            predictions_found = 0
-            for match in unanalyzed_matches:
-                # Buscar odds para a partida
-                odds_data = self._get_odds_for_match(match['fixture_id'])
+            with self._db_lock:
+                # Buscar partidas não analisadas
+                unanalyzed_matches = self._get_unanalyzed_matches()
+                logger.info(f"   Partidas para analisar: {len(unanalyzed_matches)}")
                 
-                if odds_data:
-                    # Analisar partida
-                    prediction = self.value_finder.analyze_match(match, odds_data)
-                    
-                    if prediction:
-                        predictions_found += 1
-                        logger.info(f"   ✅ Valor encontrado: {prediction.market} - EV: {prediction.expected_value:.2%}")
+                # Odds de todas as partidas numa única consulta
+                fixture_ids = [match['fixture']['id'] for match in unanalyzed_matches]
+                odds_by_fixture = self._get_odds_for_matches(fixture_ids)
+                
+                # Análise em lote: uma transação para toda a rodada
+                predictions = self.value_finder.analyze_matches(
+                    [m for m in unanalyzed_matches if m['fixture']['id'] in odds_by_fixture],
+                    odds_by_fixture
+                )
+            predictions_found = len(predictions)
+            for prediction in predictions:
+                logger.info(f"   ✅ Valor encontrado: {prediction.market} - EV: {prediction.expected_value:.2%}")
             
             logger.info(f"✅ Análise concluída! {predictions_found} predições encontradas")
             
@@ -195,38 +212,39 @@ class AutomatedCollector:
             logger.error(f"❌ Erro na análise: {e}")
             # Notificar sobre erro
             try:
-                import asyncio
-                asyncio.create_task(notify_error(f"Erro na análise de partidas: {e}"))
-            except Exception as notify_error:
-                logger.error(f"Erro ao notificar erro: {notify_error}")
+                enqueue_notification(notify_error, f"Erro na análise de partidas: {e}")
+            except Exception as notify_exc:
+                logger.error(f"Erro ao notificar erro: {notify_exc}")
     
     def _cleanup_old_data(self):
         """Limpa dados antigos do banco"""
-        logger.info("🧹 Iniciando limpeza de dados antigos...")
+        with self._db_lock:
+            logger.info("🧹 Iniciando limpeza de dados antigos...")
         
-        try:
-            # Remover dados com mais de 30 dias
-            cutoff_date = datetime.now() - timedelta(days=30)
+            try:
+                # Remover dados com mais de 30 dias
+                cutoff_date = datetime.now() - timedelta(days=30)
             
-            # Limpar odds antigas
-            old_odds = self.db.query(Odds).filter(Odds.timestamp < cutoff_date).delete()
-            logger.info(f"   Odds removidas: {old_odds}")
+                # Limpar odds antigas
+                old_odds = self.db.query(Odds).filter(Odds.timestamp < cutoff_date).delete()
+                old_odds += self.db.query(OddsMovement).filter(OddsMovement.timestamp < cutoff_date).delete()
+                logger.info(f"   Odds removidas: {old_odds}")
             
-            # Limpar partidas antigas (exceto as que têm predições)
-            old_matches = self.db.query(Match).filter(
-                Match.created_at < cutoff_date,
-                ~Match.fixture_id.in_(
-                    self.db.query(Prediction.fixture_id).distinct()
-                )
-            ).delete()
-            logger.info(f"   Partidas removidas: {old_matches}")
+                # Limpar partidas antigas (exceto as que têm predições)
+                old_matches = self.db.query(Match).filter(
+                    Match.created_at < cutoff_date,
+                    ~Match.fixture_id.in_(
+                        self.db.query(Prediction.fixture_id).distinct()
+                    )
+                ).delete()
+                logger.info(f"   Partidas removidas: {old_matches}")
             
-            self.db.commit()
-            logger.info("✅ Limpeza de dados concluída!")
+                self.db.commit()
+                logger.info("✅ Limpeza de dados concluída!")
             
-        except Exception as e:
-            logger.error(f"❌ Erro na limpeza: {e}")
-            self.db.rollback()
+            except Exception as e:
+                logger.error(f"❌ Erro na limpeza: {e}")
+                self.db.rollback()
     
     def _generate_status_report(self):
         """Gera relatório de status do sistema"""
@@ -234,10 +252,11 @@ class AutomatedCollector:
         
         try:
             # Estatísticas do banco
-            total_matches = self.db.query(Match).count()
-            total_odds = self.db.query(Odds).count()
-            total_predictions = self.db.query(Prediction).count()
-            recommended_predictions = self.db.query(Prediction).filter(Prediction.recommended == True).count()
+            with self._db_lock:
+                total_matches = self.db.query(Match).count()
+                total_odds = self.db.query(OddsMovement).count()
+                total_predictions = self.db.query(Prediction).count()
+                recommended_predictions = self.db.query(Prediction).filter(Prediction.recommended == True).count()
             
             # Estatísticas dos coletores
             football_stats = self.football_collector.get_stats()
@@ -257,9 +276,9 @@ class AutomatedCollector:
    Odds: {odds_stats['total_requests']} requisições
 
 ⏰ PRÓXIMAS EXECUÇÕES:
-   Futebol: {schedule.next_run('_collect_football_data')}
-   Odds: {schedule.next_run('_collect_odds_data')}
-   Análise: {schedule.next_run('_analyze_matches')}
+   Futebol: {self.job_scheduler.next_run('_collect_football_data')}
+   Odds: {self.job_scheduler.next_run('_collect_odds_data')}
+   Análise: {self.job_scheduler.next_run('_analyze_matches')}
             """
             
             logger.info(report)
@@ -270,7 +289,6 @@ class AutomatedCollector:
             
             # Enviar relatório diário por notificação
             try:
-                import asyncio
                 report_data = {
                     'date': datetime.now().strftime('%Y-%m-%d'),
                     'total_matches': total_matches,
@@ -280,78 +298,136 @@ class AutomatedCollector:
                     'football_requests': football_stats['total_requests'],
                     'odds_requests': odds_stats['total_requests']
                 }
-                asyncio.create_task(notify_daily_report(report_data))
-            except Exception as notify_error:
-                logger.error(f"Erro ao notificar relatório diário: {notify_error}")
+                enqueue_notification(notify_daily_report, report_data)
+            except Exception as notify_exc:
+                logger.error(f"Erro ao notificar relatório diário: {notify_exc}")
             
         except Exception as e:
             logger.error(f"❌ Erro no relatório: {e}")
             # Notificar sobre erro
             try:
-                import asyncio
-                asyncio.create_task(notify_error(f"Erro no relatório de status: {e}"))
-            except Exception as notify_error:
-                logger.error(f"Erro ao notificar erro: {notify_error}")
+                enqueue_notification(notify_error, f"Erro no relatório de status: {e}")
+            except Exception as notify_exc:
+                logger.error(f"Erro ao notificar erro: {notify_exc}")
     
     def _save_matches_to_db(self, matches: List[Dict]):
         """Salva partidas no banco de dados"""
-        try:
-            for match_data in matches:
-                fixture = match_data.get('fixture', {})
-                teams = match_data.get('teams', {})
+        with self._db_lock:
+            try:
+                for match_data in matches:
+                    fixture = match_data.get('fixture', {})
+                    teams = match_data.get('teams', {})
                 
-                match = Match(
-                    fixture_id=fixture.get('id'),
-                    league_id=match_data.get('league', {}).get('id'),
-                    league_name=match_data.get('league', {}).get('name'),
-                    date=datetime.fromisoformat(fixture.get('date', '').replace('Z', '+00:00')),
-                    home_team_id=teams.get('home', {}).get('id'),
-                    home_team_name=teams.get('home', {}).get('name'),
-                    away_team_id=teams.get('away', {}).get('id'),
-                    away_team_name=teams.get('away', {}).get('name'),
-                    status=fixture.get('status', {}).get('short'),
-                    elapsed_time=fixture.get('status', {}).get('elapsed'),
-                    home_score=fixture.get('goals', {}).get('home'),
-                    away_score=fixture.get('goals', {}).get('away'),
-                    statistics=match_data.get('statistics'),
-                    events=match_data.get('events')
-                )
+                    match = Match(
+                        fixture_id=fixture.get('id'),
+                        league_id=match_data.get('league', {}).get('id'),
+                        league_name=match_data.get('league', {}).get('name'),
+                        date=datetime.fromisoformat(fixture.get('date', '').replace('Z', '+00:00')),
+                        home_team_id=teams.get('home', {}).get('id'),
+                        home_team_name=teams.get('home', {}).get('name'),
+                        away_team_id=teams.get('away', {}).get('id'),
+                        away_team_name=teams.get('away', {}).get('name'),
+                        status=fixture.get('status', {}).get('short'),
+                        elapsed_time=fixture.get('status', {}).get('elapsed'),
+                        home_score=fixture.get('goals', {}).get('home'),
+                        away_score=fixture.get('goals', {}).get('away'),
+                        statistics=match_data.get('statistics'),
+                        events=match_data.get('events')
+                    )
                 
-                # Verificar se já existe
-                existing = self.db.query(Match).filter(Match.fixture_id == match.fixture_id).first()
-                if not existing:
-                    self.db.add(match)
+                    # Verificar se já existe
+                    existing = self.db.query(Match).filter(Match.fixture_id == match.fixture_id).first()
+                    if not existing:
+                        self.db.add(match)
             
-            self.db.commit()
+                self.db.commit()
             
-        except Exception as e:
-            logger.error(f"Erro ao salvar partidas: {e}")
-            self.db.rollback()
+            except Exception as e:
+                logger.error(f"Erro ao salvar partidas: {e}")
+                self.db.rollback()
     
     def _save_odds_to_db(self, odds_list: List[Dict]):
-        """Salva odds no banco de dados"""
-        try:
-            for odds_data in odds_list:
-                fixture_id = odds_data.get('fixture_id')
+        """Salva no banco apenas as odds que mudaram desde a última coleta"""
+        with self._db_lock:
+            try:
+                observations = flatten_bookmaker_odds(odds_list)
+                self.line_movement.update_many(observations)
+                saved = self.odds_store.record(observations)
+                logger.info(f"   Movimentos de odds gravados: {saved}")
+            
+            except Exception as e:
+                logger.error(f"Erro ao salvar odds: {e}")
+                self.db.rollback()
+    
+    def _warm_line_movement(self) -> int:
+        """Reconstrói o line movement a partir do histórico em odds_movements
+        
+        Sem isto a "abertura" seria o primeiro preço visto desde o último
+        reinício. Carrega o histórico completo das partidas ainda não
+        encerradas que tiveram movimento dentro de LINE_MOVEMENT_HORIZON.
+        
+        Returns:
+            Número de observações carregadas
+        """
+        with self._db_lock:
+            try:
+                since = datetime.utcnow() - self.LINE_MOVEMENT_HORIZON
+                finished = self.db.query(Match.fixture_id).filter(
+                    Match.status.in_(FINISHED_STATUSES), Match.fixture_id.isnot(None)
+                )
+                active = self.db.query(OddsMovement.fixture_id).filter(
+                    OddsMovement.timestamp >= since,
+                    ~OddsMovement.fixture_id.in_(finished)
+                ).distinct()
+                rows = self.db.query(
+                    OddsMovement.fixture_id, OddsMovement.bookmaker, OddsMovement.market,
+                    OddsMovement.selection, OddsMovement.odd, OddsMovement.timestamp
+                ).filter(
+                    OddsMovement.fixture_id.in_(active)
+                ).order_by(OddsMovement.timestamp, OddsMovement.id).yield_per(5000)
                 
-                for bookmaker in odds_data.get('bookmakers', []):
-                    for market in bookmaker.get('markets', []):
-                        for outcome in market.get('outcomes', []):
-                            odd = Odds(
-                                fixture_id=fixture_id,
-                                bookmaker=bookmaker.get('title'),
-                                market=market.get('key'),
-                                selection=outcome.get('name'),
-                                odd=outcome.get('price')
-                            )
-                            
-                            self.db.add(odd)
+                loaded = self.line_movement.update_many(row._asdict() for row in rows)
+                logger.info(f"   Line movement: {loaded} movimentos carregados "
+                            f"({len(self.line_movement.fixture_ids())} partidas)")
+                return loaded
             
-            self.db.commit()
+            except Exception as e:
+                logger.error(f"Erro ao carregar histórico de line movement: {e}")
+                self.db.rollback()
+                return 0
+    
+    def _forget_finished_fixtures(self, matches: List[Dict]) -> int:
+        """Descarta do line movement as partidas encerradas ou sem atualização recente
+        
+        O estado de cada partida só é necessário até ao fim do jogo; o
+        encerramento vem dos dados coletados ou do status gravado no banco.
+        
+        Returns:
+            Número de partidas removidas
+        """
+        finished = {
+            match.get('fixture', {}).get('id') for match in matches
+            if match.get('fixture', {}).get('status', {}).get('short') in FINISHED_STATUSES
+        }
+        known = self.line_movement.fixture_ids()
+        with self._db_lock:
+            try:
+                finished.update(fixture_id for fixture_id, in self.db.query(Match.fixture_id).filter(
+                    Match.fixture_id.in_(known), Match.status.in_(FINISHED_STATUSES)
+                ))
+            except Exception as e:
+                logger.error(f"Erro ao consultar partidas encerradas: {e}")
+                self.db.rollback()
             
-        except Exception as e:
-            logger.error(f"Erro ao salvar odds: {e}")
-            self.db.rollback()
+            for fixture_id in finished - {None}:
+                best_price_index.forget_fixture(fixture_id)
+            removed = sum(1 for fixture_id in finished & set(known)
+                          if self.line_movement.forget_fixture(fixture_id))
+            removed += self.line_movement.forget_stale(datetime.utcnow() - self.LINE_MOVEMENT_HORIZON)
+        
+        if removed:
+            logger.info(f"   Line movement: {removed} partidas encerradas descartadas")
+        return removed
     
     def _get_unanalyzed_matches(self) -> List[Dict]:
         """Busca partidas não analisadas"""
@@ -381,65 +457,70 @@ class AutomatedCollector:
     
     def _get_odds_for_match(self, fixture_id: int) -> List[Dict]:
         """Busca odds para uma partida específica"""
+        return self._get_odds_for_matches([fixture_id]).get(fixture_id, [])
+    
+    def _get_odds_for_matches(self, fixture_ids: List[int]) -> Dict[int, List[Dict]]:
+        """Busca o snapshot atual de odds de várias partidas numa única consulta"""
+        if not fixture_ids:
+            return {}
+        
         try:
-            odds = self.db.query(Odds).filter(Odds.fixture_id == fixture_id).all()
-            
-            if not odds:
-                return []
-            
-            # Agrupar por bookmaker
-            bookmakers = {}
-            for odd in odds:
-                bookmaker = odd.bookmaker
-                if bookmaker not in bookmakers:
-                    bookmakers[bookmaker] = {'markets': {}}
-                
-                market = odd.market
-                if market not in bookmakers[bookmaker]['markets']:
-                    bookmakers[bookmaker]['markets'][market] = {'outcomes': []}
-                
-                bookmakers[bookmaker]['markets'][market]['outcomes'].append({
-                    'name': odd.selection,
-                    'price': odd.odd
-                })
-            
-            # Converter para formato esperado
-            result = [{
-                'fixture_id': fixture_id,
-                'bookmakers': [{
-                    'title': bookmaker,
-                    'markets': [
-                        {
-                            'key': market,
-                            'outcomes': data['outcomes']
-                        }
-                        for market, data in markets.items()
-                    ]
-                }]
-            } for bookmaker, markets in bookmakers.items()]
-            
-            return result
+            snapshots = self.odds_store.snapshots_at(fixture_ids)
+            return {
+                fixture_id: self._format_odds(fixture_id, odds)
+                for fixture_id, odds in snapshots.items()
+            }
             
         except Exception as e:
             logger.error(f"Erro ao buscar odds: {e}")
-            return []
+            return {}
+    
+    def _format_odds(self, fixture_id: int, odds: List[Dict]) -> List[Dict]:
+        """Agrupa o snapshot no formato bookmakers/markets/outcomes"""
+        bookmakers = {}
+        for odd in odds:
+            markets = bookmakers.setdefault(odd['bookmaker'], {})
+            markets.setdefault(odd['market'], []).append({
+                'name': odd['selection'],
+                'price': odd['odd']
+            })
+        
+        return [{
+            'fixture_id': fixture_id,
+            'bookmakers': [{
+                'title': bookmaker,
+                'markets': [
+                    {
+                        'key': market,
+                        'outcomes': outcomes
+                    }
+                    for market, outcomes in markets.items()
+                ]
+            }]
+        } for bookmaker, markets in bookmakers.items()]
     
     def stop_scheduler(self):
         """Para o agendador"""
         logger.info("🛑 Parando sistema de coleta automatizada...")
         self.running = False
+        self.job_scheduler.stop(wait=True)
         self.executor.shutdown(wait=True)
         self.db.close()
         logger.info("✅ Sistema parado!")
     
     def get_status(self) -> Dict:
         """Retorna status do sistema"""
+        with self._db_lock:
+            totals = {
+                'total_matches': self.db.query(Match).count(),
+                'total_odds': self.db.query(OddsMovement).count(),
+                'total_predictions': self.db.query(Prediction).count()
+            }
         return {
             'running': self.running,
-            'next_football': schedule.next_run('_collect_football_data'),
-            'next_odds': schedule.next_run('_collect_odds_data'),
-            'next_analysis': schedule.next_run('_analyze_matches'),
-            'total_matches': self.db.query(Match).count(),
-            'total_odds': self.db.query(Odds).count(),
-            'total_predictions': self.db.query(Prediction).count()
+            'next_football': self.job_scheduler.next_run('_collect_football_data'),
+            'next_odds': self.job_scheduler.next_run('_collect_odds_data'),
+            'next_analysis': self.job_scheduler.next_run('_analyze_matches'),
+            **totals,
+            'jobs': self.job_scheduler.get_stats()
         }
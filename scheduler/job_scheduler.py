@@ -0,0 +1,261 @@
+"""
+Agendador orientado a eventos para o MaraBet AI
+
+Mantém os próximos disparos num heap e dorme até o mais próximo (sem polling),
+despacha as tarefas para um pool limitado de threads e respeita um limite de
+execuções simultâneas por tarefa: um disparo que encontra a tarefa ainda em
+execução no limite é descartado em vez de enfileirado.
+"""
+
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+if PROMETHEUS_AVAILABLE:
+    JOB_DURATION = Histogram(
+        'marabet_scheduler_job_duration_seconds',
+        'Duração das execuções das tarefas agendadas',
+        ['job'],
+        buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600, 1800)
+    )
+    JOB_LAG = Histogram(
+        'marabet_scheduler_job_lag_seconds',
+        'Atraso entre o disparo previsto e o início da execução',
+        ['job'],
+        buckets=(0.001, 0.01, 0.1, 0.5, 1, 5, 15, 60, 300)
+    )
+    JOB_RUNS = Counter(
+        'marabet_scheduler_job_runs_total',
+        'Execuções das tarefas agendadas por resultado',
+        ['job', 'result']
+    )
+    JOB_RUNNING = Gauge(
+        'marabet_scheduler_jobs_running',
+        'Execuções em andamento por tarefa',
+        ['job']
+    )
+
+
+@dataclass
+class ScheduledJob:
+    """Tarefa agendada por intervalo fixo ou horário diário"""
+    name: str
+    func: Callable
+    interval: Optional[float] = None      # segundos
+    at: Optional[str] = None              # "HH:MM", horário local
+    jitter: float = 0.0                   # segundos, somados ao disparo
+    max_concurrency: int = 1
+    nominal_run: float = 0.0              # disparo previsto sem jitter
+    next_run: float = 0.0                 # disparo efetivo (com jitter)
+    running: int = 0
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+    total_duration: float = 0.0
+    last_duration: Optional[float] = None
+    last_lag: Optional[float] = None
+    max_lag: float = 0.0
+    last_error: Optional[str] = None
+    durations: List[float] = field(default_factory=list, repr=False)
+
+    def following(self, after: float) -> float:
+        """Próximo disparo nominal estritamente depois de ``after``"""
+        if self.interval is not None:
+            nominal = self.nominal_run + self.interval
+            if nominal <= after:
+                # Disparos perdidos (ex.: suspensão da máquina) não se acumulam
+                missed = int((after - nominal) // self.interval) + 1
+                nominal += missed * self.interval
+            return nominal
+
+        hour, minute = (int(part) for part in self.at.split(':'))
+        moment = datetime.fromtimestamp(after)
+        candidate = moment.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if candidate.timestamp() <= after:
+            candidate += timedelta(days=1)
+        return candidate.timestamp()
+
+
+class JobScheduler:
+    """Agendador com heap de disparos e pool limitado de workers"""
+
+    def __init__(self, max_workers: int = 4, clock: Callable[[], float] = time.time):
+        self.max_workers = max_workers
+        self.clock = clock
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._heap: List[tuple] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def add_job(self, name: str, func: Callable, every: Optional[float] = None,
+                at: Optional[str] = None, jitter: float = 0.0, max_concurrency: int = 1,
+                run_immediately: bool = False) -> ScheduledJob:
+        """Registra uma tarefa com ``every`` segundos de intervalo ou diária ``at`` "HH:MM\""""
+        if (every is None) == (at is None):
+            raise ValueError("Informe exatamente um de 'every' ou 'at'")
+        if every is not None and every <= 0:
+            raise ValueError("'every' deve ser positivo")
+        if max_concurrency < 1:
+            raise ValueError("'max_concurrency' deve ser pelo menos 1")
+
+        job = ScheduledJob(name=name, func=func, interval=every, at=at,
+                           jitter=jitter, max_concurrency=max_concurrency)
+        now = self.clock()
+        if run_immediately:
+            job.nominal_run = now
+        elif every is not None:
+            job.nominal_run = now + every
+        else:
+            job.nominal_run = job.following(now)
+
+        with self._condition:
+            if name in self.jobs:
+                raise ValueError(f"Tarefa já registrada: {name}")
+            self.jobs[name] = job
+            self._push(job)
+            self._condition.notify()
+        return job
+
+    def get_jobs(self) -> List[ScheduledJob]:
+        """Tarefas registradas"""
+        return list(self.jobs.values())
+
+    def next_run(self, name: str) -> Optional[datetime]:
+        """Próximo disparo previsto da tarefa"""
+        job = self.jobs.get(name)
+        return datetime.fromtimestamp(job.next_run) if job else None
+
+    def start(self) -> threading.Thread:
+        """Inicia o loop de disparo numa thread própria"""
+        with self._condition:
+            if self._running:
+                return self._thread
+            self._running = True
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='marabet-job')
+            self._thread = threading.Thread(target=self._loop, name='marabet-scheduler', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self, wait: bool = True):
+        """Para o loop; com ``wait`` aguarda as execuções em andamento"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        if self._executor:
+            self._executor.shutdown(wait=wait)
+
+    def run_now(self, name: str) -> bool:
+        """Dispara a tarefa imediatamente, respeitando o limite de concorrência"""
+        job = self.jobs[name]
+        with self._condition:
+            return self._dispatch(job, self.clock())
+
+    def _push(self, job: ScheduledJob):
+        job.next_run = job.nominal_run + (random.uniform(0, job.jitter) if job.jitter else 0.0)
+        heapq.heappush(self._heap, (job.next_run, next(self._sequence), job.name))
+
+    def _loop(self):
+        with self._condition:
+            while self._running:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+
+                fire_at, _, name = self._heap[0]
+                delay = fire_at - self.clock()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+
+                heapq.heappop(self._heap)
+                job = self.jobs[name]
+                self._dispatch(job, fire_at)
+                job.nominal_run = job.following(max(self.clock(), job.nominal_run))
+                self._push(job)
+
+    def _dispatch(self, job: ScheduledJob, fire_at: float) -> bool:
+        # Chamado com self._condition adquirido
+        if job.running >= job.max_concurrency:
+            job.skipped += 1
+            if PROMETHEUS_AVAILABLE:
+                JOB_RUNS.labels(job=job.name, result='skipped').inc()
+            logger.warning(f"⏭️  {job.name} ainda em execução; disparo ignorado")
+            return False
+        if self._executor is None:
+            return False
+
+        job.running += 1
+        if PROMETHEUS_AVAILABLE:
+            JOB_RUNNING.labels(job=job.name).inc()
+        self._executor.submit(self._execute, job, fire_at)
+        return True
+
+    def _execute(self, job: ScheduledJob, fire_at: float):
+        started = self.clock()
+        lag = max(0.0, started - fire_at)
+        error = None
+        try:
+            job.func()
+        except Exception as e:
+            error = e
+            logger.error(f"❌ Erro na tarefa {job.name}: {e}")
+        duration = self.clock() - started
+
+        with self._condition:
+            job.running -= 1
+            job.runs += 1
+            job.total_duration += duration
+            job.last_duration = duration
+            job.last_lag = lag
+            job.max_lag = max(job.max_lag, lag)
+            job.durations = (job.durations + [duration])[-100:]
+            if error is not None:
+                job.failures += 1
+                job.last_error = str(error)
+
+        if PROMETHEUS_AVAILABLE:
+            JOB_RUNNING.labels(job=job.name).dec()
+            JOB_DURATION.labels(job=job.name).observe(duration)
+            JOB_LAG.labels(job=job.name).observe(lag)
+            JOB_RUNS.labels(job=job.name, result='failure' if error else 'success').inc()
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Duração, atraso e contadores por tarefa"""
+        with self._condition:
+            return {
+                job.name: {
+                    'runs': job.runs,
+                    'failures': job.failures,
+                    'skipped': job.skipped,
+                    'running': job.running,
+                    'last_duration': job.last_duration,
+                    'avg_duration': job.total_duration / job.runs if job.runs else None,
+                    'max_duration': max(job.durations) if job.durations else None,
+                    'last_lag': job.last_lag,
+                    'max_lag': job.max_lag,
+                    'last_error': job.last_error,
+                    'next_run': datetime.fromtimestamp(job.next_run),
+                }
+                for job in self.jobs.values()
+            }
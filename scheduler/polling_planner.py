@@ -0,0 +1,374 @@
+"""
+Planejador adaptativo de polling do MaraBet AI
+
+Gera, a partir do calendário de partidas, um plano de atualização por partida:
+esparso longe do kickoff, denso na última hora e vazio depois do apito final;
+durante o jogo só as estatísticas são atualizadas, já que o endpoint de odds
+cobre apenas o mercado pré-jogo. O plano respeita uma cota global de requisições por janela,
+descartando primeiro as atualizações de menor prioridade, e é despachado como
+tarefas Celery com ETA por partida.
+"""
+
+import logging
+import math
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Adiadas (PST) seguem no calendário: voltam com nova data ou saem por forget_stale
+FINISHED_STATUSES = frozenset({'FT', 'AET', 'PEN', 'CANC', 'ABD', 'AWD', 'WO'})
+LIVE_STATUSES = frozenset({'1H', 'HT', '2H', 'ET', 'BT', 'P', 'SUSP', 'INT', 'LIVE'})
+
+EPOCH = datetime(1970, 1, 1)
+
+
+@dataclass(frozen=True)
+class PollingPhase:
+    """Faixa de tempo relativa ao kickoff com intervalo fixo de atualização"""
+    name: str
+    start: timedelta
+    end: timedelta
+    interval: timedelta
+    priority: int
+
+    @property
+    def in_play(self) -> bool:
+        return self.start >= timedelta(0)
+
+
+# Odds param no kickoff: o endpoint de odds pré-jogo não muda durante a partida
+ODDS_PHASES = (
+    PollingPhase('far', -timedelta(days=7), -timedelta(hours=24), timedelta(hours=6), 0),
+    PollingPhase('matchday', -timedelta(hours=24), -timedelta(hours=6), timedelta(hours=2), 1),
+    PollingPhase('approach', -timedelta(hours=6), -timedelta(hours=1), timedelta(minutes=30), 2),
+    PollingPhase('final_hour', -timedelta(hours=1), timedelta(0), timedelta(minutes=5), 3),
+)
+
+STATS_PHASES = (
+    # Escalações saem cerca de uma hora antes do jogo
+    PollingPhase('lineups', -timedelta(hours=1), timedelta(0), timedelta(minutes=30), 3),
+    PollingPhase('in_play', timedelta(0), timedelta(minutes=130), timedelta(minutes=5), 4),
+)
+
+DEFAULT_PROFILES = {'odds': ODDS_PHASES, 'stats': STATS_PHASES}
+
+# Chamadas à API por atualização: 'stats' busca a partida e as estatísticas
+REQUEST_COSTS = {'odds': 1, 'stats': 2}
+
+
+@dataclass
+class Fixture:
+    """Partida do calendário vista pelo planejador"""
+    fixture_id: int
+    kickoff: datetime
+    league_id: Optional[int] = None
+    status: Optional[str] = 'NS'
+    finished_at: Optional[datetime] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def live(self) -> bool:
+        return self.status in LIVE_STATUSES
+
+
+@dataclass(frozen=True)
+class PlannedRefresh:
+    """Uma atualização agendada de uma partida"""
+    eta: datetime
+    fixture_id: int
+    kind: str
+    phase: str
+    priority: int
+    level: int          # granularidade na grade da fase; maior = mantida primeiro
+    expires: datetime
+
+
+def _grid_level(step: int) -> int:
+    """Número de zeros à direita do passo: ao reduzir pela metade, os ímpares saem primeiro"""
+    if step == 0:
+        return 64
+    return (step & -step).bit_length() - 1
+
+
+class PollingPlanner:
+    """Planejador de atualizações por partida sob uma cota global"""
+
+    def __init__(self, profiles: Optional[Dict[str, Sequence[PollingPhase]]] = None,
+                 requests_per_hour: int = 300, bucket: timedelta = timedelta(minutes=15),
+                 request_costs: Optional[Dict[str, int]] = None):
+        self.profiles = profiles or DEFAULT_PROFILES
+        self.requests_per_hour = requests_per_hour
+        self.bucket = bucket
+        self.request_costs = request_costs or REQUEST_COSTS
+        self.last_dropped: List[PlannedRefresh] = []
+
+    def cost(self, refresh: PlannedRefresh) -> int:
+        """Requisições à API consumidas por uma atualização"""
+        return self.request_costs.get(refresh.kind, 1)
+
+    @property
+    def bucket_quota(self) -> int:
+        return max(1, int(self.requests_per_hour * (self.bucket / timedelta(hours=1))))
+
+    @property
+    def lookahead(self) -> timedelta:
+        """Maior antecedência com que alguma fase começa antes do kickoff"""
+        return max(-phase.start for phases in self.profiles.values() for phase in phases)
+
+    @property
+    def lookbehind(self) -> timedelta:
+        """Maior duração de fase depois do kickoff"""
+        return max(phase.end for phases in self.profiles.values() for phase in phases)
+
+    def fixture_refreshes(self, fixture: Fixture, start: datetime, end: datetime) -> List[PlannedRefresh]:
+        """Atualizações de uma partida com ETA em [start, end), antes da cota"""
+        if fixture.finished or fixture.kickoff is None:
+            return []
+
+        refreshes = []
+        for kind, phases in self.profiles.items():
+            for phase in phases:
+                first = fixture.kickoff + phase.start
+                phase_end = fixture.kickoff + phase.end
+                if phase.in_play:
+                    if fixture.finished_at is not None:
+                        phase_end = min(phase_end, fixture.finished_at)
+                    elif fixture.live:
+                        # Prorrogação/atrasos: continua até o status indicar o fim
+                        phase_end = max(phase_end, end)
+
+                stop = min(end, phase_end)
+                if stop <= first:
+                    continue
+
+                step = max(0, math.ceil((start - first) / phase.interval))
+                eta = first + step * phase.interval
+                while eta < stop:
+                    refreshes.append(PlannedRefresh(
+                        eta=eta, fixture_id=fixture.fixture_id, kind=kind, phase=phase.name,
+                        priority=phase.priority, level=_grid_level(step),
+                        expires=eta + phase.interval
+                    ))
+                    step += 1
+                    eta += phase.interval
+        return refreshes
+
+    def plan(self, fixtures: Iterable[Fixture], start: datetime, end: datetime) -> List[PlannedRefresh]:
+        """Plano de [start, end) para todas as partidas, respeitando a cota por janela"""
+        candidates = [
+            refresh
+            for fixture in fixtures
+            for refresh in self.fixture_refreshes(fixture, start, end)
+        ]
+        kept, self.last_dropped = self._apply_budget(candidates)
+        if self.last_dropped:
+            logger.warning(f"Cota de polling excedida: {len(self.last_dropped)} atualizações descartadas")
+        return sorted(kept, key=lambda r: (r.eta, r.fixture_id, r.kind))
+
+    def _apply_budget(self, refreshes: List[PlannedRefresh]) -> Tuple[List[PlannedRefresh], List[PlannedRefresh]]:
+        buckets = defaultdict(list)
+        for refresh in refreshes:
+            buckets[(refresh.eta - EPOCH) // self.bucket].append(refresh)
+
+        quota = self.bucket_quota
+        kept, dropped = [], []
+        for bucket in buckets.values():
+            bucket.sort(key=lambda r: (-r.priority, -r.level, r.eta, r.fixture_id, r.kind))
+            remaining = quota
+            for refresh in bucket:
+                cost = self.cost(refresh)
+                if cost <= remaining:
+                    kept.append(refresh)
+                    remaining -= cost
+                else:
+                    dropped.append(refresh)
+        return kept, dropped
+
+
+def load_fixtures(db, start: datetime, end: datetime, lookahead: timedelta,
+                  lookbehind: timedelta) -> List[Fixture]:
+    """Partidas não encerradas cujo plano pode cair em [start, end)"""
+    from armazenamento.banco_de_dados import Match
+
+    rows = db.query(
+        Match.fixture_id, Match.league_id, Match.date, Match.status
+    ).filter(
+        (Match.date >= start - lookbehind) | Match.status.in_(LIVE_STATUSES),
+        Match.date < end + lookahead,
+        (Match.status.is_(None)) | (~Match.status.in_(FINISHED_STATUSES))
+    ).all()
+
+    return [
+        Fixture(fixture_id=row.fixture_id, league_id=row.league_id,
+                kickoff=row.date.replace(tzinfo=None), status=row.status)
+        for row in rows
+        if row.date is not None
+    ]
+
+
+def load_historical_fixtures(db, start: datetime, end: datetime,
+                             match_duration: timedelta = timedelta(minutes=115)) -> List[Fixture]:
+    """Partidas já disputadas em [start, end), para replay no simulador"""
+    from armazenamento.banco_de_dados import Match
+
+    rows = db.query(Match.fixture_id, Match.league_id, Match.date).filter(
+        Match.date >= start, Match.date < end
+    ).all()
+    return [
+        Fixture(fixture_id=row.fixture_id, league_id=row.league_id,
+                kickoff=row.date.replace(tzinfo=None), status='NS',
+                finished_at=row.date.replace(tzinfo=None) + match_duration)
+        for row in rows
+        if row.date is not None
+    ]
+
+
+def plan_window(now: datetime, window: timedelta) -> Tuple[datetime, datetime]:
+    """Janela alinhada ao relógio que contém ``now``; janelas consecutivas não se sobrepõem"""
+    start = EPOCH + ((now - EPOCH) // window) * window
+    return start, start + window
+
+
+def dispatch_plan(refreshes: Iterable[PlannedRefresh], task, queue: str = 'data_queue') -> int:
+    """Envia cada atualização como tarefa com ETA; expira se não rodar antes da próxima"""
+    sent = 0
+    for refresh in refreshes:
+        task.apply_async(
+            args=[refresh.fixture_id, refresh.kind],
+            eta=refresh.eta,
+            expires=refresh.expires,
+            queue=queue
+        )
+        sent += 1
+    return sent
+
+
+class PollingSimulator:
+    """Reproduz uma semana histórica comparando cota e frescor dos dados"""
+
+    def __init__(self, planner: PollingPlanner, replan_every: timedelta = timedelta(minutes=30),
+                 baseline_odds_interval: timedelta = timedelta(minutes=15),
+                 baseline_stats_interval: timedelta = timedelta(hours=1)):
+        self.planner = planner
+        self.replan_every = replan_every
+        self.baseline_odds_interval = baseline_odds_interval
+        self.baseline_stats_interval = baseline_stats_interval
+
+    def run(self, fixtures: List[Fixture], start: datetime, days: int = 7) -> Dict[str, Dict]:
+        """Executa o plano adaptativo e o polling fixo por liga sobre o mesmo calendário"""
+        end = start + timedelta(days=days)
+        return {
+            'adaptive': self._adaptive(fixtures, start, end),
+            'fixed': self._fixed(fixtures, start, end),
+        }
+
+    def _view(self, fixture: Fixture, now: datetime) -> Fixture:
+        # O planejador só conhece o status no momento do replanejamento
+        if fixture.finished_at is not None and fixture.finished_at <= now:
+            status = 'FT'
+        elif fixture.kickoff <= now:
+            status = '1H'
+        else:
+            status = 'NS'
+        return replace(fixture, status=status, finished_at=None)
+
+    def _adaptive(self, fixtures: List[Fixture], start: datetime, end: datetime) -> Dict:
+        refreshes, dropped = [], 0
+        window_start = start
+        while window_start < end:
+            window_end = min(window_start + self.replan_every, end)
+            view = [self._view(f, window_start) for f in fixtures]
+            refreshes.extend(self.planner.plan(view, window_start, window_end))
+            dropped += len(self.planner.last_dropped)
+            window_start = window_end
+
+        by_fixture = defaultdict(lambda: defaultdict(list))
+        for refresh in refreshes:
+            by_fixture[refresh.fixture_id][refresh.kind].append(refresh.eta)
+
+        used = []
+        odds_times, stats_times = {}, {}
+        for fixture in fixtures:
+            kinds = by_fixture.get(fixture.fixture_id, {})
+            stats = sorted(kinds.get('stats', []))
+            # O fim do jogo é detectado na primeira atualização de estatísticas após o apito
+            detected = next((t for t in stats if fixture.finished_at and t >= fixture.finished_at), None)
+            for kind, times in kinds.items():
+                cost = self.planner.request_costs.get(kind, 1)
+                used.extend(t for t in times if detected is None or t <= detected for _ in range(cost))
+            odds_times[fixture.fixture_id] = sorted(
+                t for t in kinds.get('odds', []) if detected is None or t <= detected
+            )
+            stats_times[fixture.fixture_id] = [t for t in stats if detected is None or t <= detected]
+
+        return self._summary(fixtures, used, odds_times, stats_times, start, end, dropped)
+
+    def _fixed(self, fixtures: List[Fixture], start: datetime, end: datetime) -> Dict:
+        leagues = {f.league_id for f in fixtures}
+        odds_ticks = self._ticks(start, end, self.baseline_odds_interval)
+        stats_ticks = self._ticks(start, end, self.baseline_stats_interval)
+        used = [t for t in odds_ticks + stats_ticks for _ in leagues]
+        odds_times = {f.fixture_id: odds_ticks for f in fixtures}
+        stats_times = {f.fixture_id: stats_ticks for f in fixtures}
+        return self._summary(fixtures, used, odds_times, stats_times, start, end, 0)
+
+    @staticmethod
+    def _ticks(start: datetime, end: datetime, interval: timedelta) -> List[datetime]:
+        count = int(math.ceil((end - start) / interval))
+        return [start + i * interval for i in range(count)]
+
+    def _summary(self, fixtures: List[Fixture], used: List[datetime], odds_times: Dict[int, List[datetime]],
+                 stats_times: Dict[int, List[datetime]], start: datetime, end: datetime, dropped: int) -> Dict:
+        hours = defaultdict(int)
+        for t in used:
+            hours[(t - EPOCH) // timedelta(hours=1)] += 1
+
+        final_hour, in_play, at_kickoff = [], [], []
+        for fixture in fixtures:
+            times = np.array([(t - EPOCH).total_seconds() for t in odds_times.get(fixture.fixture_id, [])])
+            stats = np.array([(t - EPOCH).total_seconds() for t in stats_times.get(fixture.fixture_id, [])])
+            kickoff = (fixture.kickoff - EPOCH).total_seconds()
+            finish = ((fixture.finished_at or fixture.kickoff + timedelta(minutes=115)) - EPOCH).total_seconds()
+            final_hour.append(self._staleness(times, kickoff - 3600, kickoff))
+            in_play.append(self._staleness(stats, kickoff, finish))
+            at_kickoff.append(self._staleness(times, kickoff, kickoff + 1))
+
+        def mean(values):
+            values = np.concatenate(values) if values else np.array([])
+            values = values[np.isfinite(values)]
+            return float(values.mean() / 60) if values.size else None
+
+        return {
+            'requests': len(used),
+            'requests_per_day': len(used) / max((end - start) / timedelta(days=1), 1e-9),
+            'peak_requests_per_hour': max(hours.values(), default=0),
+            'dropped_by_quota': dropped,
+            'odds_staleness_final_hour_minutes': mean(final_hour),
+            'stats_staleness_in_play_minutes': mean(in_play),
+            'odds_staleness_at_kickoff_minutes': mean(at_kickoff),
+        }
+
+    @staticmethod
+    def _staleness(times: np.ndarray, start: float, end: float) -> np.ndarray:
+        """Idade do último dado, amostrada a cada minuto em [start, end)"""
+        samples = np.arange(start, end, 60.0)
+        if samples.size == 0:
+            return samples
+        if times.size == 0:
+            return np.full(samples.size, np.inf)
+        idx = np.searchsorted(times, samples, side='right') - 1
+        age = samples - times[np.maximum(idx, 0)]
+        age[idx < 0] = np.inf
+        return age
+
+
+# Instância global
+polling_planner = PollingPlanner()
@@ -7,11 +7,12 @@ MaraBet AI - Envia predições em partes menores para evitar limite do Telegram
 import os
 import sys
 import json
-import requests
 import logging
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
+from notifications.telegram_delivery import TelegramAPIError, send_telegram_sync
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -32,27 +33,13 @@ def load_telegram_config():
 def send_telegram_message(token, chat_id, message):
     """Envia mensagem para o Telegram"""
     try:
-        url = f"https://api.telegram.org/bot{token}/sendMessage"
-        data = {
-            'chat_id': chat_id,
-            'text': message,
-            'parse_mode': 'HTML'
-        }
-        
-        response = requests.post(url, data=data, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('ok'):
-                logger.info("✅ Mensagem enviada com sucesso!")
-                return True
-            else:
-                logger.error(f"❌ Erro na API: {data.get('description', 'Erro desconhecido')}")
-                return False
-        else:
-            logger.error(f"❌ Erro HTTP {response.status_code}")
-            return False
-            
+        # Pipeline partilhado: reutiliza conexões e respeita o limite por chat
+        send_telegram_sync(message, chat_id=chat_id, bot_token=token)
+        logger.info("✅ Mensagem enviada com sucesso!")
+        return True
+    except TelegramAPIError as e:
+        logger.error(f"❌ Erro na API: {e.description}")
+        return False
     except Exception as e:
         logger.error(f"❌ Erro ao enviar mensagem: {e}")
         return False
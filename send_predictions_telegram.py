@@ -14,6 +14,8 @@ import sys
 import logging
 import time
 
+from notifications.telegram_delivery import send_telegram_sync
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -63,20 +65,9 @@ class TelegramPredictionsSender:
     def send_telegram_message(self, message):
         """Envia mensagem via Telegram"""
         try:
-            url = f"{self.telegram_api_url}/sendMessage"
-            data = {
-                'chat_id': self.telegram_chat_id,
-                'text': message,
-                'parse_mode': 'HTML'
-            }
-            
-            response = requests.post(url, data=data)
-            if response.status_code == 200:
-                logger.info("   Mensagem enviada com sucesso")
-                return True
-            else:
-                logger.error(f"   Erro ao enviar mensagem: {response.status_code}")
-                return False
+            send_telegram_sync(message, chat_id=self.telegram_chat_id, bot_token=self.telegram_bot_token)
+            logger.info("   Mensagem enviada com sucesso")
+            return True
                 
         except Exception as e:
             logger.error(f"   Erro ao enviar mensagem: {e}")
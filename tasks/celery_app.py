@@ -32,7 +32,8 @@ celery_app = Celery(
         'tasks.backtesting_tasks',
         'tasks.data_collection_tasks',
         'tasks.notification_tasks',
-        'tasks.maintenance_tasks'
+        'tasks.maintenance_tasks',
+        'tasks.optimization_tasks'
     ]
 )
 
@@ -75,6 +76,8 @@ celery_app.conf.update(
         'tasks.data_collection_tasks.*': {'queue': 'data_queue'},
         'tasks.notification_tasks.*': {'queue': 'notification_queue'},
         'tasks.maintenance_tasks.*': {'queue': 'maintenance_queue'},
+        # Otimização abre pools de processos: worker dedicado com --pool=threads
+        'optimization.*': {'queue': 'optimization_queue'},
     },
     
     # Definição de filas
@@ -84,6 +87,7 @@ celery_app.conf.update(
         Queue('data_queue', Exchange('data_exchange'), routing_key='data'),
         Queue('notification_queue', Exchange('notification_exchange'), routing_key='notification'),
         Queue('maintenance_queue', Exchange('maintenance_exchange'), routing_key='maintenance'),
+        Queue('optimization_queue', Exchange('optimization_exchange'), routing_key='optimization'),
         Queue('default', Exchange('default'), routing_key='default'),
     ),
     
@@ -100,17 +104,25 @@ celery_app.conf.update(
             'options': {'queue': 'ml_queue'}
         },
         
-        # Coleta de dados a cada 15 minutos
-        'collect-odds-data': {
-            'task': 'tasks.data_collection_tasks.collect_odds_data',
-            'schedule': crontab(minute='*/15'),  # A cada 15 minutos
+        # Mescla do drift em streaming gravado por cada worker de predição
+        'merge-drift-states': {
+            'task': 'tasks.ml_tasks.merge_drift_states',
+            'schedule': crontab(minute='*/30'),
+            'options': {'queue': 'ml_queue'}
+        },
+        
+        # Plano adaptativo de odds/estatísticas por partida, 5 minutos antes de cada janela de 30
+        'plan-fixture-polling': {
+            'task': 'tasks.data_collection_tasks.plan_fixture_polling',
+            'schedule': crontab(minute='25,55'),
+            'kwargs': {'window_minutes': 30, 'lead_minutes': 5},
             'options': {'queue': 'data_queue'}
         },
         
-        # Coleta de estatísticas a cada hora
-        'collect-stats-data': {
-            'task': 'tasks.data_collection_tasks.collect_stats_data',
-            'schedule': crontab(minute=0),  # A cada hora
+        # Cruzamento de predições com resultados para a calibração online
+        'settle-predictions': {
+            'task': 'tasks.data_collection_tasks.settle_predictions',
+            'schedule': crontab(minute='*/15'),
             'options': {'queue': 'data_queue'}
         },
         
@@ -135,6 +147,27 @@ celery_app.conf.update(
             'options': {'queue': 'maintenance_queue'}
         },
         
+        # Backup incremental do banco a cada 15 minutos
+        'incremental-database-backup': {
+            'task': 'tasks.maintenance_tasks.backup_database',
+            'schedule': crontab(minute='*/15'),
+            'options': {'queue': 'maintenance_queue'}
+        },
+        
+        # Retenção e verificação diária dos backups (fora da grade de 15 minutos do backup)
+        'prune-database-backups': {
+            'task': 'tasks.maintenance_tasks.prune_database_backups',
+            'schedule': crontab(hour=4, minute=37),  # 4:37 AM UTC
+            'options': {'queue': 'maintenance_queue'}
+        },
+        
+        # Exportação diária do histórico de odds para o arquivo Parquet
+        'export-odds-archive': {
+            'task': 'tasks.maintenance_tasks.export_odds_archive',
+            'schedule': crontab(hour=4, minute=0),  # 4:00 AM UTC
+            'options': {'queue': 'maintenance_queue'}
+        },
+        
         # Relatório de performance semanal
         'weekly-performance-report': {
             'task': 'tasks.notification_tasks.send_weekly_report',
@@ -16,6 +16,21 @@ import time
 
 logger = logging.getLogger(__name__)
 
+ODDS_COLUMNS = (
+    'home_odds', 'draw_odds', 'away_odds', 'over_odds', 'under_odds',
+    'btts_yes_odds', 'btts_no_odds', 'handicap_home_odds', 'handicap_away_odds'
+)
+
+_odds_detector = None
+
+def _get_odds_detector():
+    """Detector de mudanças de odds partilhado entre workers via Redis"""
+    global _odds_detector
+    if _odds_detector is None:
+        from armazenamento.odds_delta import OddsChangeDetector
+        _odds_detector = OddsChangeDetector(redis_client=cache.redis_client)
+    return _odds_detector
+
 @celery_app.task(bind=True, name='tasks.data_collection_tasks.collect_odds_data')
 def collect_odds_data(self):
     """
@@ -126,7 +141,7 @@ def collect_odds_data(self):
 
 def _save_odds_to_db(self, db: DatabaseManager, league_id: int, odds_data: List[Dict]) -> int:
     """
-    Salva odds no banco de dados
+    Salva no banco de dados apenas as odds que mudaram
     
     Args:
         db: Instância do banco de dados
@@ -159,6 +174,22 @@ def _save_odds_to_db(self, db: DatabaseManager, league_id: int, odds_data: List[
             else:
                 match_id = match_data[0]['id']
             
+            # Ignora odds sem movimento desde a última coleta
+            observations = [
+                {
+                    'fixture_id': match_id,
+                    'bookmaker': odds.get('bookmaker', 'unknown'),
+                    'market': 'odds',
+                    'selection': column,
+                    'odd': odds.get(column)
+                }
+                for column in ODDS_COLUMNS
+            ]
+            detector = _get_odds_detector()
+            deltas = detector.find_changes(observations)
+            if not deltas:
+                continue
+            
             # Salva odds
             db.execute_query("""
                 INSERT OR REPLACE INTO odds 
@@ -180,6 +211,8 @@ def _save_odds_to_db(self, db: DatabaseManager, league_id: int, odds_data: List[
                 odds.get('bookmaker', 'unknown'),
                 datetime.now()
             ))
+            # Preços só contam como vistos depois de gravados
+            detector.apply(deltas)
             
             saved_count += 1
             
@@ -744,3 +777,156 @@ def collect_live_data(self):
         )
         
         raise
+
+@celery_app.task(bind=True, name='tasks.data_collection_tasks.plan_fixture_polling')
+def plan_fixture_polling(self, window_minutes: int = 30, lead_minutes: int = 5):
+    """
+    Planeja as atualizações por partida da próxima janela e as despacha com ETA
+    
+    Args:
+        window_minutes: Tamanho da janela alinhada ao relógio (igual ao intervalo do beat)
+        lead_minutes: Antecedência com que a janela é planejada
+        
+    Returns:
+        Dict com resumo do plano
+    """
+    try:
+        from armazenamento.banco_de_dados import SessionLocal
+        from scheduler.polling_planner import polling_planner, load_fixtures, plan_window, dispatch_plan
+        
+        start, end = plan_window(
+            datetime.utcnow() + timedelta(minutes=lead_minutes), timedelta(minutes=window_minutes)
+        )
+        
+        db = SessionLocal()
+        try:
+            fixtures = load_fixtures(db, start, end, polling_planner.lookahead, polling_planner.lookbehind)
+        finally:
+            db.close()
+        
+        plan = polling_planner.plan(fixtures, start, end)
+        dispatched = dispatch_plan(plan, refresh_fixture_data)
+        
+        by_kind = {}
+        for refresh in plan:
+            by_kind[refresh.kind] = by_kind.get(refresh.kind, 0) + 1
+        
+        logger.info(f"Plano de polling {start:%H:%M}-{end:%H:%M}: {dispatched} atualizações para {len(fixtures)} partidas")
+        
+        return {
+            'status': 'success',
+            'window_start': start.isoformat(),
+            'window_end': end.isoformat(),
+            'fixtures': len(fixtures),
+            'dispatched': dispatched,
+            'by_kind': by_kind,
+            'dropped_by_quota': len(polling_planner.last_dropped)
+        }
+        
+    except Exception as e:
+        logger.error(f"Erro no planejamento do polling: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+@celery_app.task(bind=True, name='tasks.data_collection_tasks.refresh_fixture_data')
+def refresh_fixture_data(self, fixture_id: int, kind: str):
+    """
+    Atualiza odds ou estatísticas de uma partida agendada pelo planejador de polling
+    
+    Args:
+        fixture_id: ID da partida na API-Football
+        kind: 'odds' ou 'stats'
+        
+    Returns:
+        Dict com resumo da atualização
+    """
+    try:
+        from armazenamento.banco_de_dados import SessionLocal, Match
+        from armazenamento.odds_delta import OddsDeltaStore, flatten_bookmaker_odds
+        from coletores.football_collector import FootballCollector
+        from scheduler.polling_planner import FINISHED_STATUSES
+        from análise.best_price_index import best_price_index
+        
+        db = SessionLocal()
+        try:
+            match = db.query(Match).filter(Match.fixture_id == fixture_id).first()
+            
+            # Partida já encerrada: não gasta cota da API
+            if match is None or match.status in FINISHED_STATUSES:
+                return {'status': 'skipped', 'fixture_id': fixture_id, 'kind': kind}
+            
+            collector = FootballCollector()
+            
+            if kind == 'odds':
+                odds_list = collector.collect_fixture_odds(fixture_id)
+                store = OddsDeltaStore(db, detector=_get_odds_detector(), best_price_index=best_price_index)
+                saved = store.record(flatten_bookmaker_odds(odds_list))
+                return {'status': 'success', 'fixture_id': fixture_id, 'kind': kind, 'saved': saved}
+            
+            fixture = collector.collect_fixture(fixture_id)
+            if fixture:
+                status = fixture.get('fixture', {}).get('status', {})
+                match.status = status.get('short', match.status)
+                match.elapsed_time = status.get('elapsed')
+                match.home_score = fixture.get('goals', {}).get('home')
+                match.away_score = fixture.get('goals', {}).get('away')
+            statistics = collector.collect_fixture_statistics(fixture_id)
+            if statistics:
+                match.statistics = statistics
+            db.commit()
+            
+            # Resultado final: cruza as predições da partida com o placar
+            settled = None
+            if match.status in FINISHED_STATUSES:
+                _get_odds_detector().forget_fixture(fixture_id)
+                best_price_index.forget_fixture(fixture_id)
+                from armazenamento.calibration_join import CalibrationJoinService
+                try:
+                    settled = CalibrationJoinService(db).settle(fixture_ids=[fixture_id])
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Erro ao liquidar predições da partida {fixture_id}: {e}")
+            
+            return {'status': 'success', 'fixture_id': fixture_id, 'kind': kind,
+                    'match_status': match.status, 'settled': settled}
+        finally:
+            db.close()
+        
+    except Exception as e:
+        logger.error(f"Erro ao atualizar partida {fixture_id} ({kind}): {str(e)}")
+        raise self.retry(exc=e, countdown=30, max_retries=1)
+
+@celery_app.task(bind=True, name='tasks.data_collection_tasks.settle_predictions')
+def settle_predictions(self, batch_size: int = 5000,
+                       conformal_state_path: str = 'models/conformal_calibration.joblib'):
+    """
+    Liquida em lote as predições de partidas encerradas e atualiza a calibração
+    
+    Args:
+        batch_size: Predições por transação
+        conformal_state_path: Arquivo com as janelas conformais online
+        
+    Returns:
+        Dict com o resumo da liquidação
+    """
+    try:
+        from armazenamento.banco_de_dados import SessionLocal
+        from armazenamento.calibration_join import CalibrationJoinService
+        from confidence.conformal_calibrator import ConformalCalibratorRegistry
+        
+        db = SessionLocal()
+        try:
+            calibrators = ConformalCalibratorRegistry.load(conformal_state_path)
+            service = CalibrationJoinService(db, calibrators=calibrators)
+            summary = service.settle(batch_size=batch_size)
+            # Inclui as predições liquidadas por refresh_fixture_data desde a última execução
+            summary['calibrated'] = service.feed_calibrators(batch_size=batch_size)
+            if summary['calibrated']:
+                calibrators.save(conformal_state_path)
+            return {'status': 'success', **summary, 'timestamp': datetime.now().isoformat()}
+        finally:
+            db.close()
+        
+    except Exception as e:
+        logger.error(f"Erro ao liquidar predições: {str(e)}")
+        raise self.retry(exc=e, countdown=60, max_retries=2)
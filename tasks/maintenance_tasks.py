@@ -297,9 +297,19 @@ def _compress_old_logs(self) -> Dict:
     }
 
 @celery_app.task(bind=True, name='tasks.maintenance_tasks.optimize_database')
-def optimize_database(self):
+def optimize_database(self, batch_size: int = 2000, pause: float = 0.05, convert_auto_vacuum: bool = False):
     """
-    Otimiza banco de dados SQLite
+    Manutenção online do banco de dados
+    
+    Aplica as políticas de retenção em lotes curtos (arquivando odds e
+    partidas antes de apagar) e devolve espaço com incremental_vacuum, em vez
+    de um VACUUM completo que bloqueia os coletores.
+    
+    Args:
+        batch_size: Linhas apagadas por transação
+        pause: Pausa entre lotes em segundos
+        convert_auto_vacuum: Executa o VACUUM único que ativa
+            auto_vacuum=INCREMENTAL num banco SQLite existente
     
     Returns:
         Dict com resumo da otimização
@@ -312,55 +322,51 @@ def optimize_database(self):
         
         logger.info("Iniciando otimização do banco de dados")
         
-        from armazenamento.banco_de_dados import DatabaseManager
+        from armazenamento.banco_de_dados import engine
+        from armazenamento.retention import RetentionEngine
         
-        db = DatabaseManager()
-        
-        # Atualiza progresso
-        self.update_state(
-            state='PROGRESS',
-            meta={'status': 'Analisando banco de dados', 'progress': 20}
-        )
+        retention = RetentionEngine(engine, batch_size=batch_size, pause=pause)
         
         # Obtém tamanho antes da otimização
-        db_path = db.get_database_path()
-        size_before = os.path.getsize(db_path) if os.path.exists(db_path) else 0
+        db_path = engine.url.database if engine.dialect.name == 'sqlite' else None
+        size_before = os.path.getsize(db_path) if db_path and os.path.exists(db_path) else 0
         
         # Atualiza progresso
         self.update_state(
             state='PROGRESS',
-            meta={'status': 'Executando VACUUM', 'progress': 40}
+            meta={'status': 'Verificando auto_vacuum incremental', 'progress': 10}
         )
         
-        # Executa VACUUM para reorganizar banco
-        db.execute_query("VACUUM")
+        vacuum_mode = retention.enable_incremental_vacuum(convert=convert_auto_vacuum)
         
         # Atualiza progresso
         self.update_state(
             state='PROGRESS',
-            meta={'status': 'Executando ANALYZE', 'progress': 60}
-        )
-        
-        # Executa ANALYZE para atualizar estatísticas
-        db.execute_query("ANALYZE")
-        
-        # Atualiza progresso
-        self.update_state(
-            state='PROGRESS',
-            meta={'status': 'Limpando dados antigos', 'progress': 80}
+            meta={'status': 'Aplicando políticas de retenção', 'progress': 30}
         )
         
         # Remove dados antigos
-        cleanup_results = self._cleanup_old_data(db)
+        cleanup_results = _cleanup_old_data(retention)
+        
+        # Últimos preços de partidas encerradas não servem mais ao detector
+        odds_state_cleared = _forget_finished_odds()
         
         # Atualiza progresso
         self.update_state(
             state='PROGRESS',
-            meta={'status': 'Finalizando otimização', 'progress': 90}
+            meta={'status': 'Atualizando estatísticas', 'progress': 90}
         )
         
+        # Estatísticas do planeador apenas onde mudaram (limitado no SQLite)
+        with engine.connect() as conn:
+            if engine.dialect.name == 'sqlite':
+                conn.exec_driver_sql("PRAGMA analysis_limit = 1000")
+                conn.exec_driver_sql("PRAGMA optimize")
+            else:
+                conn.exec_driver_sql("ANALYZE")
+        
         # Obtém tamanho após otimização
-        size_after = os.path.getsize(db_path) if os.path.exists(db_path) else 0
+        size_after = os.path.getsize(db_path) if db_path and os.path.exists(db_path) else 0
         space_freed = size_before - size_after
         
         self.update_state(
@@ -375,7 +381,9 @@ def optimize_database(self):
             'size_before': size_before,
             'size_after': size_after,
             'space_freed': space_freed,
-            'cleanup_results': cleanup_results
+            'auto_vacuum': vacuum_mode,
+            'cleanup_results': cleanup_results,
+            'odds_state_cleared': odds_state_cleared
         }
         
     except Exception as e:
@@ -389,54 +397,63 @@ def optimize_database(self):
         
         raise
 
-def _cleanup_old_data(self, db: DatabaseManager) -> Dict:
+def _cleanup_old_data(retention) -> Dict:
     """
-    Remove dados antigos do banco
+    Remove dados antigos do banco em lotes
     
     Args:
-        db: Instância do banco de dados
+        retention: RetentionEngine do banco operacional
     
     Returns:
-        Dict com resultados da limpeza
+        Dict com linhas apagadas, linhas/s e espera por locks por tabela
     """
     cleanup_results = {}
     
     try:
-        # Remove logs antigos (mais de 30 dias)
-        cutoff_date = datetime.now() - timedelta(days=30)
-        
-        # Limpa logs de aplicação
-        logs_query = "DELETE FROM application_logs WHERE created_at < ?"
-        logs_result = db.execute_query(logs_query, (cutoff_date,))
-        cleanup_results['application_logs'] = db.cursor.rowcount if hasattr(db, 'cursor') else 0
-        
-        # Limpa sessões antigas (mais de 7 dias)
-        sessions_cutoff = datetime.now() - timedelta(days=7)
-        sessions_query = "DELETE FROM user_sessions WHERE last_activity < ?"
-        sessions_result = db.execute_query(sessions_query, (sessions_cutoff,))
-        cleanup_results['user_sessions'] = db.cursor.rowcount if hasattr(db, 'cursor') else 0
-        
-        # Limpa cache antigo (mais de 1 dia)
-        cache_cutoff = datetime.now() - timedelta(days=1)
-        cache_query = "DELETE FROM cache_data WHERE expires_at < ?"
-        cache_result = db.execute_query(cache_query, (cache_cutoff,))
-        cleanup_results['cache_data'] = db.cursor.rowcount if hasattr(db, 'cursor') else 0
-        
-        # Limpa métricas antigas (mais de 90 dias)
-        metrics_cutoff = datetime.now() - timedelta(days=90)
-        metrics_query = "DELETE FROM performance_metrics WHERE created_at < ?"
-        metrics_result = db.execute_query(metrics_query, (metrics_cutoff,))
-        cleanup_results['performance_metrics'] = db.cursor.rowcount if hasattr(db, 'cursor') else 0
-        
+        cleanup_results = retention.run()
     except Exception as e:
         logger.error(f"Erro na limpeza de dados antigos: {e}")
     
     return cleanup_results
 
+def _forget_finished_odds() -> int:
+    """
+    Remove do detector de odds (memória e hash Redis partilhado) o último
+    preço de partidas já encerradas e de adiadas que não voltaram ao
+    calendário em duas semanas
+    
+    Returns:
+        Número de entradas removidas
+    """
+    try:
+        from sqlalchemy import and_, or_
+        from armazenamento.banco_de_dados import SessionLocal, Match
+        from scheduler.polling_planner import FINISHED_STATUSES
+        from tasks.data_collection_tasks import _get_odds_detector
+        
+        db = SessionLocal()
+        try:
+            postponed_before = datetime.utcnow() - timedelta(days=14)
+            finished = [row.fixture_id for row in db.query(Match.fixture_id).filter(
+                or_(Match.status.in_(FINISHED_STATUSES),
+                    and_(Match.status == 'PST', Match.date < postponed_before)),
+                Match.fixture_id.isnot(None)
+            )]
+        finally:
+            db.close()
+        
+        return _get_odds_detector().forget_fixtures(finished)
+    except Exception as e:
+        logger.error(f"Erro ao limpar estado do detector de odds: {e}")
+        return 0
+
 @celery_app.task(bind=True, name='tasks.maintenance_tasks.backup_database')
-def backup_database(self):
+def backup_database(self, store_dir: str = 'backups/incremental'):
     """
-    Cria backup do banco de dados
+    Cria backup incremental e deduplicado do banco de dados
+    
+    Args:
+        store_dir: Diretório do store de backups incrementais
     
     Returns:
         Dict com informações do backup
@@ -447,80 +464,133 @@ def backup_database(self):
             meta={'status': 'Iniciando backup do banco', 'progress': 0}
         )
         
-        logger.info("Iniciando backup do banco de dados")
+        logger.info("Iniciando backup incremental do banco de dados")
         
-        from armazenamento.banco_de_dados import DatabaseManager
+        from armazenamento.banco_de_dados import engine
+        from backup.incremental_backup import IncrementalBackup
         
-        db = DatabaseManager()
+        if engine.dialect.name != 'sqlite':
+            raise ValueError("Backup incremental disponível apenas para SQLite; use pg_dump/PITR no Postgres")
         
         # Atualiza progresso
         self.update_state(
             state='PROGRESS',
-            meta={'status': 'Criando diretório de backup', 'progress': 20}
+            meta={'status': 'Executando backup', 'progress': 20}
         )
         
-        # Cria diretório de backup
-        backup_dir = 'backups'
-        os.makedirs(backup_dir, exist_ok=True)
+        manifest = IncrementalBackup(store_dir).backup(engine.url.database)
         
-        # Atualiza progresso
         self.update_state(
             state='PROGRESS',
-            meta={'status': 'Executando backup', 'progress': 50}
+            meta={'status': 'Backup concluído', 'progress': 100}
         )
         
-        # Gera nome do arquivo de backup
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_filename = f"marabet_backup_{timestamp}.db"
-        backup_path = os.path.join(backup_dir, backup_filename)
+        logger.info(f"Backup do banco concluído: {manifest.backup_id}")
         
-        # Executa backup
-        db.backup_database(backup_path)
+        return {
+            'status': 'success',
+            'backup_id': manifest.backup_id,
+            'parent': manifest.parent,
+            'size': manifest.size,
+            'new_chunks': manifest.new_chunks,
+            'new_bytes': manifest.new_bytes,
+            'duration_seconds': manifest.duration_seconds,
+            'created_at': manifest.created_at
+        }
+        
+    except Exception as e:
+        logger.error(f"Erro no backup do banco: {str(e)}")
+        logger.error(traceback.format_exc())
         
-        # Atualiza progresso
         self.update_state(
-            state='PROGRESS',
-            meta={'status': 'Comprimindo backup', 'progress': 80}
+            state='FAILURE',
+            meta={'status': 'Erro no backup', 'error': str(e)}
         )
         
-        # Comprime backup
-        import gzip
-        compressed_filename = f"{backup_filename}.gz"
-        compressed_path = os.path.join(backup_dir, compressed_filename)
+        raise
+
+@celery_app.task(bind=True, name='tasks.maintenance_tasks.prune_database_backups')
+def prune_database_backups(self, store_dir: str = 'backups/incremental', keep_days: int = 7, keep_last: int = 4):
+    """
+    Aplica a retenção aos backups incrementais e verifica os restantes
+    
+    Returns:
+        Dict com backups removidos e resultado da verificação
+    """
+    try:
+        from backup.incremental_backup import IncrementalBackup
         
-        with open(backup_path, 'rb') as f_in:
-            with gzip.open(compressed_path, 'wb') as f_out:
-                shutil.copyfileobj(f_in, f_out)
+        backups = IncrementalBackup(store_dir)
+        pruned = backups.prune(keep_within=timedelta(days=keep_days), keep_last=keep_last)
+        verification = backups.verify()
         
-        # Remove arquivo não comprimido
-        os.remove(backup_path)
+        if not verification['valid']:
+            logger.error(
+                f"Backups com chunks inválidos: {len(verification['missing'])} em falta, "
+                f"{len(verification['corrupt'])} corrompidos"
+            )
         
-        # Obtém tamanho do backup
-        backup_size = os.path.getsize(compressed_path)
+        return {
+            'status': 'success' if verification['valid'] else 'corrupt',
+            'pruned': pruned,
+            'verification': verification,
+            'stats': backups.get_stats()
+        }
         
-        # Atualiza progresso
+    except Exception as e:
+        logger.error(f"Erro na retenção de backups: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+@celery_app.task(bind=True, name='tasks.maintenance_tasks.export_odds_archive')
+def export_odds_archive(self, archive_dir: str = 'data/odds_archive'):
+    """
+    Exporta incrementalmente o histórico de odds para o arquivo Parquet
+    
+    Args:
+        archive_dir: Diretório raiz do OddsArchive
+    
+    Returns:
+        Dict com linhas exportadas por tabela
+    """
+    try:
         self.update_state(
             state='PROGRESS',
-            meta={'status': 'Backup concluído', 'progress': 100}
+            meta={'status': 'Exportando odds para o arquivo colunar', 'progress': 0}
         )
         
-        logger.info(f"Backup do banco concluído: {compressed_path}")
+        logger.info("Iniciando exportação do arquivo de odds")
+        
+        from armazenamento.banco_de_dados import SessionLocal
+        from armazenamento.odds_archive import OddsArchive
+        
+        db = SessionLocal()
+        try:
+            summary = OddsArchive(archive_dir).export_from_db(db)
+        finally:
+            db.close()
+        
+        self.update_state(
+            state='PROGRESS',
+            meta={'status': 'Exportação concluída', 'progress': 100}
+        )
+        
+        logger.info(f"Exportação do arquivo de odds concluída: {summary}")
         
         return {
             'status': 'success',
-            'backup_path': compressed_path,
-            'backup_size': backup_size,
-            'backup_filename': compressed_filename,
-            'created_at': datetime.now()
+            'archive_dir': archive_dir,
+            'exported': summary,
+            'exported_at': datetime.now()
         }
         
     except Exception as e:
-        logger.error(f"Erro no backup do banco: {str(e)}")
+        logger.error(f"Erro na exportação do arquivo de odds: {str(e)}")
         logger.error(traceback.format_exc())
         
         self.update_state(
             state='FAILURE',
-            meta={'status': 'Erro no backup', 'error': str(e)}
+            meta={'status': 'Erro na exportação', 'error': str(e)}
         )
         
         raise
@@ -12,11 +12,66 @@ import numpy as np
 from datetime import datetime, timedelta
 import joblib
 import os
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
+import glob
+import time
 import traceback
 
 logger = logging.getLogger(__name__)
 
+# Drift em streaming: baseline de treino por modelo e um estado por worker, mesclados pelo beat
+DRIFT_STATE_DIR = os.path.join('models', 'drift')
+DRIFT_PERSIST_SECONDS = 300
+
+# Monitores deste processo: (model_type, league_id) -> (mtime da baseline, MLModelMonitor)
+_drift_monitors: Dict[Tuple[str, int], Tuple[float, Any]] = {}
+_drift_persisted_at: Dict[Tuple[str, int], float] = {}
+
+def _drift_baseline_path(model_type: str, league_id: int) -> str:
+    return os.path.join(DRIFT_STATE_DIR, f"{model_type}_league_{league_id}_baseline.joblib")
+
+def _drift_workers_dir(model_type: str, league_id: int) -> str:
+    return os.path.join(DRIFT_STATE_DIR, f"{model_type}_league_{league_id}")
+
+def _get_drift_monitor(model_type: str, league_id: int):
+    """
+    Monitor de drift do modelo carregado, ativado com a baseline do treino
+    
+    Recarrega quando a baseline muda (modelo retreinado); None se o modelo
+    foi treinado antes de a baseline ser gravada.
+    """
+    from monitoring.ml_monitoring import MLModelMonitor
+    
+    key = (model_type, league_id)
+    baseline_path = _drift_baseline_path(model_type, league_id)
+    if not os.path.exists(baseline_path):
+        return None
+    mtime = os.path.getmtime(baseline_path)
+    cached = _drift_monitors.get(key)
+    if cached is None or cached[0] != mtime:
+        monitor = MLModelMonitor()
+        monitor.load_drift_state(baseline_path)
+        _drift_monitors[key] = (mtime, monitor)
+        _drift_persisted_at[key] = time.time()
+    return _drift_monitors[key][1]
+
+def _observe_prediction_features(model_type: str, league_id: int, features: Dict[str, float]):
+    """Registra as features de uma predição no drift e persiste o estado do worker periodicamente"""
+    try:
+        monitor = _get_drift_monitor(model_type, league_id)
+        if monitor is None:
+            return
+        row = [features.get(name, np.nan) for name in monitor.drift_monitor.feature_names]
+        monitor.observe_features(np.array([row], dtype=float))
+        
+        key = (model_type, league_id)
+        if time.time() - _drift_persisted_at.get(key, 0.0) >= DRIFT_PERSIST_SECONDS:
+            monitor.persist_worker_drift(_drift_workers_dir(model_type, league_id))
+            _drift_persisted_at[key] = time.time()
+    except Exception as e:
+        # O monitoramento nunca bloqueia a predição
+        logger.warning(f"Falha ao registrar drift de {model_type}/{league_id}: {e}")
+
 @celery_app.task(bind=True, name='tasks.ml_tasks.train_model')
 def train_model(self, model_type: str, league_id: int, features: List[str], 
                 target: str, test_size: float = 0.2, random_state: int = 42):
@@ -120,6 +175,12 @@ def train_model(self, model_type: str, league_id: int, features: List[str],
         model.fit(X_train, y_train)
         y_pred = model.predict(X_test)
         
+        # Baseline do drift em streaming: distribuição das features vistas no treino
+        from monitoring.drift_sketches import StreamingDriftMonitor
+        drift_baseline = StreamingDriftMonitor(features)
+        drift_baseline.fit_baseline(X_train.to_numpy(dtype=float))
+        drift_baseline.save(_drift_baseline_path(model_type, league_id))
+        
         # Calcula métricas
         metrics = {
             'accuracy': accuracy_score(y_test, y_pred),
@@ -377,6 +438,7 @@ def predict_match(self, match_id: int, model_type: str = 'ensemble'):
         # Faz predição
         prediction = model.predict([features])[0]
         prediction_proba = model.predict_proba([features])[0] if hasattr(model, 'predict_proba') else None
+        _observe_prediction_features(model_type, match['league_id'], features)
         
         # Atualiza progresso
         self.update_state(
@@ -483,6 +545,42 @@ def _prepare_match_features(self, match: Dict, db: DatabaseManager) -> Dict[str,
         logger.error(f"Erro ao preparar features da partida: {e}")
         return {}
 
+@celery_app.task(bind=True, name='tasks.ml_tasks.merge_drift_states')
+def merge_drift_states(self, psi_threshold: float = 0.2):
+    """
+    Mescla os estados de drift gravados pelos workers e reporta o drift por modelo
+    
+    Args:
+        psi_threshold: PSI a partir do qual uma feature é considerada em drift
+    
+    Returns:
+        Dict com o relatório de cada modelo
+    """
+    try:
+        from monitoring.ml_monitoring import MLModelMonitor
+        
+        reports = {}
+        for baseline_path in sorted(glob.glob(os.path.join(DRIFT_STATE_DIR, '*_baseline.joblib'))):
+            name = os.path.basename(baseline_path)[:-len('_baseline.joblib')]
+            monitor = MLModelMonitor()
+            monitor.load_drift_state(baseline_path)
+            workers = monitor.merge_worker_drift(os.path.join(DRIFT_STATE_DIR, name))
+            if not workers:
+                continue
+            
+            report = monitor.get_streaming_drift()
+            drifted = sorted(feature for feature, metrics in report.items() if metrics['psi'] >= psi_threshold)
+            if drifted:
+                logger.warning(f"Drift detectado em {name}: {', '.join(drifted)}")
+            monitor.save_drift_state(os.path.join(DRIFT_STATE_DIR, f"{name}_live.joblib"))
+            reports[name] = {'workers': workers, 'drifted_features': drifted, 'features': report}
+        
+        return {'status': 'success', 'models': reports, 'timestamp': datetime.now().isoformat()}
+        
+    except Exception as e:
+        logger.error(f"Erro ao mesclar estados de drift: {str(e)}")
+        raise
+
 @celery_app.task(bind=True, name='tasks.ml_tasks.update_model_performance')
 def update_model_performance(self, model_id: int):
     """
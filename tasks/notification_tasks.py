@@ -6,8 +6,8 @@ Processamento assíncrono de notificações via Telegram e Email
 from celery import current_task
 from tasks.celery_app import celery_app
 from cache.redis_cache import cache
+from notifications.telegram_delivery import RedisDigestBuffer, build_digest_texts, send_telegram_sync
 import logging
-import requests
 import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
@@ -18,9 +18,35 @@ from email.mime.multipart import MimeMultipart
 
 logger = logging.getLogger(__name__)
 
+# Janela de agrupamento dos alertas de value bet (segundos)
+DIGEST_WINDOW = 2.0
+DIGEST_HEADER = '🚨 <b>{count} Value Bets encontrados</b>'
+
+
+def _digest_buffer() -> RedisDigestBuffer:
+    return RedisDigestBuffer(cache.redis_client, window=DIGEST_WINDOW)
+
+
+def _queue_for_digest(message: str, chat_id: str, parse_mode: str) -> Optional[Dict]:
+    """Coloca o alerta no digest partilhado do chat; None se o Redis falhar"""
+    buffer = _digest_buffer()
+    try:
+        pending, opened = buffer.push(chat_id, message, parse_mode)
+    except Exception as e:
+        logger.warning(f"Digest do Telegram indisponível, enviando alerta isolado: {e}")
+        return None
+
+    if pending >= buffer.max_items:
+        flush_telegram_digest.delay(chat_id)
+    elif opened:
+        flush_telegram_digest.apply_async(args=[chat_id], countdown=buffer.window)
+    return {'status': 'queued', 'chat_id': chat_id, 'pending': pending}
+
+
 @celery_app.task(bind=True, name='tasks.notification_tasks.send_telegram_message')
 def send_telegram_message(self, message: str, chat_id: Optional[str] = None, 
-                         parse_mode: str = 'HTML', disable_notification: bool = False):
+                         parse_mode: str = 'HTML', disable_notification: bool = False,
+                         coalesce: bool = False):
     """
     Envia mensagem via Telegram
     
@@ -29,6 +55,7 @@ def send_telegram_message(self, message: str, chat_id: Optional[str] = None,
         chat_id: ID do chat (opcional, usa padrão se não fornecido)
         parse_mode: Modo de parsing (HTML ou Markdown)
         disable_notification: Desabilitar notificação
+        coalesce: Agrupar com outros alertas do mesmo chat num digest
     
     Returns:
         Dict com resultado do envio
@@ -41,47 +68,36 @@ def send_telegram_message(self, message: str, chat_id: Optional[str] = None,
         
         import os
         
-        bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
-        if not bot_token:
-            raise ValueError("TELEGRAM_BOT_TOKEN não configurado")
-        
         if not chat_id:
             chat_id = os.getenv('TELEGRAM_CHAT_ID')
             if not chat_id:
                 raise ValueError("TELEGRAM_CHAT_ID não configurado")
         
-        # URL da API do Telegram
-        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        
-        # Dados da mensagem
-        data = {
-            'chat_id': chat_id,
-            'text': message,
-            'parse_mode': parse_mode,
-            'disable_notification': disable_notification
-        }
+        # Alertas agrupáveis vão para o buffer no Redis e o worker fica livre;
+        # um único flush por chat e janela envia o digest
+        if coalesce:
+            queued = _queue_for_digest(message, chat_id, parse_mode)
+            if queued is not None:
+                return queued
+
+        # Pool de conexões do processo, limites partilhados via Redis e novas
+        # tentativas com retry_after
+        result = send_telegram_sync(message, chat_id=chat_id, parse_mode=parse_mode,
+                                    disable_notification=disable_notification,
+                                    redis_client=cache.redis_client)
         
-        # Envia mensagem
-        response = requests.post(url, json=data, timeout=30)
-        response.raise_for_status()
+        logger.info(f"Mensagem Telegram enviada com sucesso para chat {chat_id}")
         
-        result = response.json()
+        self.update_state(
+            state='PROGRESS',
+            meta={'status': 'Mensagem enviada com sucesso', 'progress': 100}
+        )
         
-        if result.get('ok'):
-            logger.info(f"Mensagem Telegram enviada com sucesso para chat {chat_id}")
-            
-            self.update_state(
-                state='PROGRESS',
-                meta={'status': 'Mensagem enviada com sucesso', 'progress': 100}
-            )
-            
-            return {
-                'status': 'success',
-                'message_id': result['result']['message_id'],
-                'chat_id': chat_id
-            }
-        else:
-            raise Exception(f"Erro na API do Telegram: {result.get('description', 'Erro desconhecido')}")
+        return {
+            'status': 'success',
+            'message_id': result.get('message_id'),
+            'chat_id': chat_id
+        }
         
     except Exception as e:
         logger.error(f"Erro ao enviar mensagem Telegram: {str(e)}")
@@ -94,6 +110,49 @@ def send_telegram_message(self, message: str, chat_id: Optional[str] = None,
         
         raise
 
+@celery_app.task(bind=True, name='tasks.notification_tasks.flush_telegram_digest',
+                 max_retries=3, default_retry_delay=30)
+def flush_telegram_digest(self, chat_id: str):
+    """
+    Envia os alertas acumulados de um chat como digest
+
+    Args:
+        chat_id: ID do chat
+
+    Returns:
+        Dict com o número de alertas e mensagens enviadas
+    """
+    buffer = _digest_buffer()
+    items = buffer.drain(chat_id)
+    if not items:
+        return {'status': 'empty', 'chat_id': chat_id, 'alerts': 0, 'messages': 0}
+
+    # Agrupa por parse_mode mantendo a ordem de chegada
+    groups: Dict[Optional[str], List[Dict]] = {}
+    for item in items:
+        groups.setdefault(item.get('parse_mode'), []).append(item)
+
+    outgoing = []  # (parse_mode, texto, alertas incluídos)
+    for parse_mode, group in groups.items():
+        start = 0
+        for text, count in build_digest_texts([item['text'] for item in group], DIGEST_HEADER):
+            outgoing.append((parse_mode, text, group[start:start + count]))
+            start += count
+
+    for index, (parse_mode, text, _) in enumerate(outgoing):
+        try:
+            send_telegram_sync(text, chat_id=chat_id, parse_mode=parse_mode,
+                               redis_client=cache.redis_client)
+        except Exception as e:
+            # Alertas ainda não enviados voltam ao buffer para a nova tentativa
+            buffer.restore(chat_id, [item for *_, batch in outgoing[index:] for item in batch])
+            logger.error(f"Erro ao enviar digest Telegram para chat {chat_id}: {e}")
+            raise self.retry(exc=e)
+    sent = len(outgoing)
+
+    logger.info(f"Digest Telegram: {len(items)} alertas em {sent} mensagens para chat {chat_id}")
+    return {'status': 'success', 'chat_id': chat_id, 'alerts': len(items), 'messages': sent}
+
 @celery_app.task(bind=True, name='tasks.notification_tasks.send_email')
 def send_email(self, subject: str, body: str, to_emails: List[str], 
                is_html: bool = True, attachments: Optional[List[Dict]] = None):
@@ -205,7 +264,8 @@ def send_value_bet_alert(self, value_bet: Dict):
         # Envia via Telegram
         telegram_result = send_telegram_message.delay(
             message=message,
-            parse_mode='HTML'
+            parse_mode='HTML',
+            coalesce=True
         )
         
         # Envia via Email se configurado
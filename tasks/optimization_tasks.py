@@ -34,11 +34,15 @@ def optimize_single_model(
     cv_strategy: str = "time_series",
     cv_params: Optional[Dict[str, Any]] = None,
     scoring: str = "accuracy",
-    random_state: Optional[int] = None
+    random_state: Optional[int] = None,
+    storage_url: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Otimiza hiperparâmetros de um único modelo
     
+    Várias tarefas com o mesmo study_name e storage_url trabalham no mesmo
+    estudo em paralelo (ver optimize_model_distributed).
+    
     Args:
         model_name: Nome do modelo para otimizar
         X_data: Dados de features (lista de listas)
@@ -50,6 +54,7 @@ def optimize_single_model(
         cv_params: Parâmetros da validação cruzada
         scoring: Métrica de avaliação
         random_state: Seed para reprodutibilidade
+        storage_url: Storage RDB compartilhado do estudo
         
     Returns:
         Dicionário com resultados da otimização
@@ -62,6 +67,7 @@ def optimize_single_model(
         # Criar otimizador
         optimizer = HyperparameterOptimizer(
             study_name=study_name,
+            storage_url=storage_url,
             direction="maximize",
             n_trials=n_trials,
             timeout=timeout,
@@ -72,22 +78,7 @@ def optimize_single_model(
         )
         
         # Otimizar modelo específico
-        if model_name == "random_forest":
-            study = optimizer.optimize_random_forest(X, y)
-        elif model_name == "xgboost":
-            study = optimizer.optimize_xgboost(X, y)
-        elif model_name == "lightgbm":
-            study = optimizer.optimize_lightgbm(X, y)
-        elif model_name == "catboost":
-            study = optimizer.optimize_catboost(X, y)
-        elif model_name == "logistic_regression":
-            study = optimizer.optimize_logistic_regression(X, y)
-        elif model_name == "bayesian_neural_network":
-            study = optimizer.optimize_bayesian_neural_network(X, y)
-        elif model_name == "poisson_model":
-            study = optimizer.optimize_poisson_model(X, y)
-        else:
-            raise ValueError(f"Modelo {model_name} não suportado")
+        study = optimizer.optimize_model(model_name, X, y)
         
         # Preparar resultados
         results = {
@@ -98,6 +89,7 @@ def optimize_single_model(
             'best_score': optimizer.get_best_score(),
             'best_params': optimizer.get_best_params(),
             'n_trials': len(study.trials),
+            'pruning': optimizer.get_pruning_stats(),
             'cv_strategy': cv_strategy,
             'scoring': scoring,
             'completed_at': datetime.now().isoformat(),
@@ -127,6 +119,96 @@ def optimize_single_model(
         }
 
 
+@celery_app.task(bind=True, name='optimization.optimize_model_distributed')
+def optimize_model_distributed(
+    self,
+    model_name: str,
+    X_data: List[List[float]],
+    y_data: List[int],
+    study_name: str,
+    storage_url: str,
+    n_trials: int = 100,
+    n_workers: int = 4,
+    timeout: Optional[int] = None,
+    cv_strategy: str = "time_series",
+    cv_params: Optional[Dict[str, Any]] = None,
+    scoring: str = "accuracy",
+    random_state: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Divide os trials de um estudo entre várias tarefas optimize_single_model
+    
+    Todas as tarefas usam o mesmo estudo no storage RDB compartilhado
+    (ex.: PostgreSQL), então o sampler e o pruner enxergam os trials umas das outras.
+    
+    Args:
+        model_name: Nome do modelo para otimizar
+        X_data: Dados de features (lista de listas)
+        y_data: Dados de target (lista)
+        study_name: Nome do estudo
+        storage_url: URL do storage compartilhado
+        n_trials: Total de tentativas somando todas as tarefas
+        n_workers: Número de tarefas paralelas
+        timeout: Timeout em segundos por tarefa
+        cv_strategy: Estratégia de validação cruzada
+        cv_params: Parâmetros da validação cruzada
+        scoring: Métrica de avaliação
+        random_state: Seed base; cada tarefa usa seed + índice
+        
+    Returns:
+        Dicionário com os IDs das tarefas disparadas
+    """
+    from celery import group
+    
+    try:
+        shares = [
+            n_trials // n_workers + (1 if i < n_trials % n_workers else 0)
+            for i in range(n_workers)
+        ]
+        
+        job = group(
+            optimize_single_model.s(
+                model_name=model_name,
+                X_data=X_data,
+                y_data=y_data,
+                study_name=study_name,
+                n_trials=share,
+                timeout=timeout,
+                cv_strategy=cv_strategy,
+                cv_params=cv_params,
+                scoring=scoring,
+                random_state=None if random_state is None else random_state + worker,
+                storage_url=storage_url
+            )
+            for worker, share in enumerate(shares)
+            if share
+        )
+        group_result = job.apply_async()
+        
+        logger.info(f"Estudo {study_name}: {len(job.tasks)} tarefas com {n_trials} trials no total")
+        
+        return {
+            'task_id': self.request.id,
+            'model_name': model_name,
+            'study_name': study_name,
+            'status': 'dispatched',
+            'group_id': group_result.id,
+            'worker_task_ids': [r.id for r in group_result.results],
+            'dispatched_at': datetime.now().isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f"Erro ao distribuir otimização de {model_name}: {str(e)}")
+        return {
+            'task_id': self.request.id,
+            'model_name': model_name,
+            'study_name': study_name,
+            'status': 'failed',
+            'error': str(e),
+            'failed_at': datetime.now().isoformat()
+        }
+
+
 @celery_app.task(bind=True, name='optimization.optimize_multiple_models')
 def optimize_multiple_models(
     self,
@@ -232,6 +314,119 @@ def optimize_multiple_models(
         }
 
 
+@celery_app.task(bind=True, name='optimization.optimize_models_concurrent')
+def optimize_models_concurrent(
+    self,
+    model_names: List[str],
+    X_data: List[List[float]],
+    y_data: List[int],
+    study_name: str,
+    total_trials: int = 300,
+    eta: int = 3,
+    n_workers: Optional[int] = None,
+    timeout: Optional[int] = None,
+    cv_strategy: str = "time_series",
+    cv_params: Optional[Dict[str, Any]] = None,
+    scoring: str = "accuracy",
+    random_state: Optional[int] = None,
+    storage_url: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Otimiza múltiplos modelos em paralelo com orçamento compartilhado
+
+    As famílias rodam num pool de processos e o orçamento é distribuído por
+    successive halving; o progresso de cada rodada é publicado no estado
+    PROGRESS da tarefa (ver get_optimization_status). A tarefa é roteada para
+    a optimization_queue, servida por um worker com --pool=threads (filhos
+    prefork são daemon e não podem abrir o pool de processos).
+
+    Args:
+        model_names: Lista de nomes dos modelos
+        X_data: Dados de features (lista de listas)
+        y_data: Dados de target (lista)
+        study_name: Nome do estudo
+        total_trials: Orçamento total de trials somando todos os modelos
+        eta: Fator de redução entre rodadas
+        n_workers: Processos do pool
+        timeout: Orçamento total de tempo em segundos
+        cv_strategy: Estratégia de validação cruzada
+        cv_params: Parâmetros da validação cruzada
+        scoring: Métrica de avaliação
+        random_state: Seed para reprodutibilidade
+        storage_url: Storage RDB compartilhado dos estudos
+
+    Returns:
+        Dicionário com resultados de todas as otimizações
+    """
+    try:
+        X = np.array(X_data)
+        y = np.array(y_data)
+
+        multi_optimizer = MultiModelOptimizer(
+            models=model_names,
+            study_name=study_name,
+            storage_url=storage_url,
+            direction="maximize",
+            cv_strategy=cv_strategy,
+            cv_params=cv_params or {},
+            scoring=scoring,
+            random_state=random_state
+        )
+
+        def publish(progress):
+            self.update_state(state='PROGRESS', meta=progress)
+
+        multi_optimizer.optimize_concurrent(
+            X, y,
+            total_trials=total_trials,
+            eta=eta,
+            timeout=timeout,
+            n_workers=n_workers,
+            progress_callback=publish
+        )
+        progress = multi_optimizer.scheduler.get_progress()
+
+        results = {
+            'task_id': self.request.id,
+            'study_name': study_name,
+            'status': 'completed',
+            'schedule': progress,
+            'models': {},
+            'best_model': progress['leader'],
+            'best_score': None,
+            'completed_at': datetime.now().isoformat()
+        }
+
+        for model_name, family in progress['families'].items():
+            model_results = dict(family, cv_strategy=cv_strategy, scoring=scoring)
+            if family['best_score'] is not None:
+                model_results['best_params'] = multi_optimizer.optimizers[model_name].get_best_params()
+            results['models'][model_name] = model_results
+
+        if results['best_model'] is not None:
+            results['best_score'] = results['models'][results['best_model']]['best_score']
+
+        results_file = f"optimization/results/{study_name}_concurrent_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        os.makedirs(os.path.dirname(results_file), exist_ok=True)
+
+        with open(results_file, 'w') as f:
+            json.dump(results, f, indent=2, default=str)
+
+        logger.info(f"Otimização concorrente concluída. Melhor: {results['best_model']} ({results['best_score']})")
+
+        return results
+
+    except Exception as e:
+        logger.error(f"Erro na otimização concorrente: {str(e)}")
+        return {
+            'task_id': self.request.id,
+            'study_name': study_name,
+            'status': 'failed',
+            'error': str(e),
+            'failed_at': datetime.now().isoformat()
+        }
+
+
 @celery_app.task(bind=True, name='optimization.optimize_with_custom_objective')
 def optimize_with_custom_objective(
     self,
@@ -52,15 +52,14 @@ def test_schedule_setup():
         collector._setup_schedule()
         
         # Verificar se as tarefas foram agendadas
-        import schedule
-        jobs = schedule.get_jobs()
+        jobs = collector.job_scheduler.get_jobs()
         print(f"✅ Tarefas agendadas: {len(jobs)}")
         
         for job in jobs:
-            print(f"   - {job.job_func.__name__}: {job.next_run}")
+            print(f"   - {job.name}: {collector.job_scheduler.next_run(job.name)}")
         
         # Verificar se as tarefas principais estão agendadas
-        job_names = [job.job_func.__name__ for job in jobs]
+        job_names = [job.name for job in jobs]
         expected_jobs = [
             '_collect_football_data',
             '_collect_odds_data', 
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para o escritor em lote de atividades e sessões de autenticação
+"""
+
+import pytest
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from auth.models import Base, UserActivity, UserSession
+from auth.activity_writer import AuditWriter
+from auth import jwt_auth
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'auth.db'}")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def writer(tmp_path):
+    writer = AuditWriter(flush_interval=3600, spill_path=str(tmp_path / 'spill.jsonl'))
+    with patch.object(jwt_auth, 'audit_writer', writer):
+        yield writer
+    writer.close()
+
+
+class TestActivityBatching:
+    def test_activity_is_buffered_and_bulk_inserted(self, session_factory, writer):
+        db = session_factory()
+        with patch.object(db, 'commit') as request_commit:
+            for i in range(10):
+                jwt_auth.log_user_activity(db, i, 'api_call', f'chamada {i}', '127.0.0.1', metadata='{"a": 1}')
+        request_commit.assert_not_called()
+        assert writer.pending('activity') == 10
+        assert db.query(UserActivity).count() == 0
+
+        assert writer.flush() == 10
+        assert db.query(UserActivity).count() == 10
+        assert db.query(UserActivity).first().to_dict()['metadata'] == '{"a": 1}'
+
+    def test_size_threshold_triggers_background_flush(self, session_factory, writer):
+        writer.max_batch = 5
+        db = session_factory()
+        for i in range(5):
+            jwt_auth.log_user_activity(db, 1, 'login')
+
+        deadline = time.time() + 5
+        while writer.pending() and time.time() < deadline:
+            time.sleep(0.01)
+        # pending() conta o lote em gravação: chegar a 0 implica commit feito
+        assert db.query(UserActivity).count() == 5
+
+    def test_pending_counts_rows_being_written(self, session_factory, writer):
+        db = session_factory()
+        writer.bind(db)
+        jwt_auth.create_user_session(db, 4, '10.0.0.2', 'pytest')
+        seen = []
+        original = writer._write
+
+        def slow_write(kind, rows):
+            seen.append(writer.pending('session'))
+            original(kind, rows)
+
+        with patch.object(writer, '_write', side_effect=slow_write):
+            writer.flush(['session'])
+        assert seen == [1]
+        assert writer.pending('session') == 0
+
+    def test_invalid_row_is_quarantined_without_blocking_batch(self, session_factory, tmp_path):
+        quarantine = tmp_path / 'quarantine.jsonl'
+        writer = AuditWriter(flush_interval=3600, spill_path=str(tmp_path / 'spill.jsonl'),
+                             quarantine_path=str(quarantine))
+        db = session_factory()
+        writer.bind(db)
+        for i in range(3):
+            writer.add_activity(user_id=i, activity_type='login')
+        writer.add_activity(user_id=9, activity_type=None)
+
+        assert writer.flush() == 3
+        assert writer.pending() == 0
+        assert writer.stats['quarantined'] == 1
+        assert '"user_id": 9' in quarantine.read_text()
+        assert db.query(UserActivity).count() == 3
+        writer.close()
+
+    def test_unwritable_rows_are_spilled_and_recovered(self, session_factory, tmp_path):
+        spill = tmp_path / 'spill.jsonl'
+
+        def broken():
+            raise RuntimeError('db down')
+
+        failing = AuditWriter(session_factory=broken, flush_interval=3600, spill_path=str(spill))
+        failing.add_activity(user_id=7, activity_type='login')
+        failing.add_session(user_id=7, session_token='tok', refresh_token='ref',
+                            expires_at=datetime.utcnow() + timedelta(days=1))
+        failing.close()
+        assert failing.stats['spilled'] == 2 and spill.exists()
+
+        recovering = AuditWriter(flush_interval=3600, spill_path=str(spill))
+        db = session_factory()
+        recovering.bind(db)
+        assert recovering.flush() == 2
+        recovering.close()
+        assert not spill.exists()
+        assert db.query(UserActivity).one().user_id == 7
+        assert db.query(UserSession).one().session_token == 'tok'
+
+
+class TestSessions:
+    def test_new_session_is_visible_immediately(self, session_factory, writer):
+        db = session_factory()
+        session = jwt_auth.create_user_session(db, 3, '10.0.0.1', 'pytest')
+        assert writer.pending('session') == 1
+
+        found = jwt_auth.get_active_session(db, session.session_token)
+        assert found is not None and found.user_id == 3
+        assert jwt_auth.deactivate_all_user_sessions(db, 3) == 1
+        assert jwt_auth.get_active_session(db, session.session_token) is None
+
+    def test_cleanup_sweeps_in_batches(self, session_factory):
+        db = session_factory()
+        now = datetime.utcnow()
+        db.bulk_insert_mappings(UserSession, [
+            {'user_id': 1, 'session_token': f'expired{i}', 'expires_at': now - timedelta(hours=i + 1)}
+            for i in range(25)
+        ] + [
+            {'user_id': 1, 'session_token': f'valid{i}', 'expires_at': now + timedelta(days=1)}
+            for i in range(5)
+        ])
+        db.commit()
+
+        assert jwt_auth.cleanup_expired_sessions(db, batch_size=10, max_batches=1) == 10
+        # Os mais antigos saem primeiro
+        assert db.query(UserSession).filter(UserSession.session_token == 'expired24').count() == 0
+        assert jwt_auth.cleanup_expired_sessions(db, batch_size=10) == 15
+        assert db.query(UserSession).count() == 5
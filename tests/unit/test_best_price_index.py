@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para o índice de melhor preço e o scanner de arbitragem
+"""
+
+import pytest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from análise.best_price_index import BestPriceIndex, ArbitrageScanner
+from value_identification import ValueIdentifier
+
+
+@pytest.fixture
+def index():
+    index = BestPriceIndex()
+    # Fixture 1: mercado normal (overround > 1)
+    index.update_many([
+        {'fixture_id': 1, 'bookmaker': 'A', 'market': 'h2h', 'selection': 'Home', 'odd': 2.00},
+        {'fixture_id': 1, 'bookmaker': 'A', 'market': 'h2h', 'selection': 'Draw', 'odd': 3.20},
+        {'fixture_id': 1, 'bookmaker': 'A', 'market': 'h2h', 'selection': 'Away', 'odd': 3.60},
+        {'fixture_id': 1, 'bookmaker': 'B', 'market': 'h2h', 'selection': 'Home', 'odd': 2.10},
+        {'fixture_id': 1, 'bookmaker': 'B', 'market': 'h2h', 'selection': 'Draw', 'odd': 3.10},
+        {'fixture_id': 1, 'bookmaker': 'B', 'market': 'h2h', 'selection': 'Away', 'odd': 3.40},
+    ])
+    # Fixture 2: arbitragem em totals entre duas casas
+    index.update(2, 'A', 'totals', 'Over', 2.10)
+    index.update(2, 'A', 'totals', 'Under', 1.75)
+    index.update(2, 'B', 'totals', 'Over', 1.80)
+    index.update(2, 'B', 'totals', 'Under', 2.05)
+    return index
+
+
+class TestBestPriceIndex:
+    def test_best_price_and_bookmaker(self, index):
+        assert index.best_price(1, 'h2h', 'Home') == (2.10, 'B')
+        assert index.best_price(1, 'h2h', 'Away') == (3.60, 'A')
+        assert index.best_price(3, 'h2h', 'Home') is None
+
+    def test_best_recomputed_when_leader_drops(self, index):
+        index.update(1, 'B', 'h2h', 'Home', 1.90)
+        assert index.best_price(1, 'h2h', 'Home') == (2.00, 'A')
+
+    def test_remove_bookmaker(self, index):
+        index.remove_bookmaker(1, 'h2h', 'A')
+        assert index.best_price(1, 'h2h', 'Away') == (3.40, 'B')
+
+    def test_overround_across_books(self, index):
+        assert index.overround(1, 'h2h') == pytest.approx(1 / 2.10 + 1 / 3.20 + 1 / 3.60)
+
+    def test_collector_format(self):
+        index = BestPriceIndex()
+        index.add_collector_odds(5, [
+            {'bookmaker': 'bet365', 'odds': {'h2h': {'home': 1.9, 'away': 2.0}}},
+            {'bookmaker': 'pinnacle', 'odds': {'h2h': {'home': 1.95, 'away': 1.98}}},
+        ])
+        assert index.best_prices(5, 'h2h') == {'home': (1.95, 'pinnacle'), 'away': (2.0, 'bet365')}
+
+
+class TestArbitrageScanner:
+    def test_detects_arbitrage(self, index):
+        result = ArbitrageScanner(surebet_margin=0.01).scan(index)
+
+        assert len(result['arbitrages']) == 1
+        arb = result['arbitrages'][0]
+        assert (arb.fixture_id, arb.market) == (2, 'totals')
+        assert arb.overround == pytest.approx(1 / 2.10 + 1 / 2.05)
+        assert arb.profit_margin == pytest.approx(1 / arb.overround - 1)
+        assert arb.is_surebet
+        legs = {leg['selection']: leg for leg in arb.legs}
+        assert legs['Over']['bookmaker'] == 'A' and legs['Under']['bookmaker'] == 'B'
+        assert sum(leg['stake_fraction'] for leg in arb.legs) == pytest.approx(1.0)
+
+    def test_consensus_probabilities_are_margin_free(self, index):
+        consensus = ArbitrageScanner().scan(index)['consensus'][(1, 'h2h')]
+
+        assert sum(consensus.values()) == pytest.approx(1.0)
+        book_a = [1 / 2.00, 1 / 3.20, 1 / 3.60]
+        book_b = [1 / 2.10, 1 / 3.10, 1 / 3.40]
+        expected_home = (book_a[0] / sum(book_a) + book_b[0] / sum(book_b)) / 2
+        assert consensus['Home'] == pytest.approx(expected_home)
+
+    def test_incomplete_books_excluded_from_consensus(self):
+        index = BestPriceIndex()
+        index.update(1, 'A', 'h2h', 'Home', 3.0)
+        index.update(1, 'A', 'h2h', 'Draw', 3.0)
+        index.update(1, 'A', 'h2h', 'Away', 3.0)
+        index.update(1, 'B', 'h2h', 'Home', 1.5)
+        consensus = ArbitrageScanner().scan(index)['consensus'][(1, 'h2h')]
+        assert consensus == {s: pytest.approx(1 / 3) for s in ('Home', 'Draw', 'Away')}
+
+    def test_markets_missing_a_selection_are_not_arbitrage(self):
+        index = BestPriceIndex()
+        # h2h sem Draw: soma 0.95 < 1, mas não é um livro completo
+        index.update(1, 'A', 'h2h', 'Home', 2.1)
+        index.update(1, 'B', 'h2h', 'Away', 2.1)
+        # Linhas diferentes de totals não se combinam
+        index.update(2, 'A', 'totals', 'Over', 2.1)
+        index.update(2, 'B', 'totals', 'Under 1.5', 2.1)
+
+        result = ArbitrageScanner().scan(index)
+        assert result == {'arbitrages': [], 'overround': {}, 'consensus': {}}
+
+    def test_totals_are_evaluated_per_line(self):
+        index = BestPriceIndex()
+        index.update(2, 'A', 'totals', 'Over', 1.9)
+        index.update(2, 'A', 'totals', 'Under', 1.9)
+        index.update(2, 'A', 'totals', 'Over 1.5', 2.1)
+        index.update(2, 'B', 'totals', 'Under 1.5', 2.1)
+
+        result = ArbitrageScanner().scan(index)
+        assert result['overround'] == {(2, 'totals'): pytest.approx(2 / 1.9), (2, 'totals 1.5'): pytest.approx(2 / 2.1)}
+        assert [(a.fixture_id, a.market) for a in result['arbitrages']] == [(2, 'totals 1.5')]
+        assert result['consensus'][(2, 'totals')] == {'Over': pytest.approx(0.5), 'Under': pytest.approx(0.5)}
+
+    def test_empty_index(self):
+        assert ArbitrageScanner().scan(BestPriceIndex()) == {'arbitrages': [], 'overround': {}, 'consensus': {}}
+
+
+def test_value_identifier_uses_best_line(index):
+    identifier = ValueIdentifier(best_price_index=index)
+    opportunities = identifier.identify_value_opportunities(
+        {'id': 1, 'home_team': 'A', 'away_team': 'B'},
+        {'home_win': 0.55, 'draw': 0.25, 'away_win': 0.20},
+        {'home_win': 2.00, 'draw': 3.20, 'away_win': 3.40}
+    )
+    home = next(o for o in opportunities if o.outcome == 'home_win')
+
+    assert home.market_odds == 2.10
+    assert home.additional_metrics['best_bookmaker'] == 'B'
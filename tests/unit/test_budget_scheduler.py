@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para o escalonador multi-modelo por successive halving
+"""
+
+import pytest
+import sys
+import os
+import numpy as np
+import optuna
+from sklearn.dummy import DummyClassifier
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from optimization.optimizers import hyperparameter_optimizer
+from optimization.optimizers.budget_scheduler import SuccessiveHalvingScheduler, plan_rungs
+from optimization.optimizers.hyperparameter_optimizer import HyperparameterOptimizer, MultiModelOptimizer
+
+optuna.logging.set_verbosity(optuna.logging.WARNING)
+
+
+@pytest.fixture
+def data():
+    rng = np.random.RandomState(0)
+    X = rng.randn(300, 4)
+    y = (X[:, 0] + 0.3 * rng.randn(300) > 0).astype(int)
+    return X, y
+
+
+def _optimize_dummy(self, X, y, **kwargs):
+    """Família perdedora: classificador constante"""
+    def objective(trial):
+        trial.suggest_int('unused', 0, 10)
+        return self._evaluate(trial, DummyClassifier(strategy='constant', constant=0), X, y)
+    self.study.optimize(objective, n_trials=self.n_trials, timeout=self.timeout)
+    return self.study
+
+
+@pytest.fixture
+def families(monkeypatch):
+    # Os workers são criados por fork, então herdam as famílias registradas aqui
+    monkeypatch.setattr(HyperparameterOptimizer, 'optimize_dummy', _optimize_dummy, raising=False)
+    monkeypatch.setitem(hyperparameter_optimizer.MODEL_OPTIMIZERS, 'dummy', 'optimize_dummy')
+    monkeypatch.setitem(hyperparameter_optimizer.MODEL_OPTIMIZERS, 'broken', 'optimize_missing')
+
+
+def _multi(tmp_path, models):
+    return MultiModelOptimizer(
+        models=models,
+        study_name='sh',
+        storage_url=f"sqlite:///{tmp_path / 'studies.db'}",
+        n_trials=10,
+        cv_params={'n_splits': 3},
+        random_state=0
+    )
+
+
+class TestPlan:
+    def test_survivors_shrink_by_eta_and_trials_grow(self):
+        rungs = plan_rungs(7, 130, eta=3)
+        assert [r['survivors'] for r in rungs] == [7, 3, 1]
+        assert [r['trials_per_family'] for r in rungs] == [5, 15, 46]
+        assert sum(r['survivors'] * r['trials_per_family'] for r in rungs) <= 130
+
+    def test_single_family_gets_everything(self):
+        assert plan_rungs(1, 40) == [{'survivors': 1, 'trials_per_family': 40}]
+        assert [r['survivors'] for r in plan_rungs(3, 30)] == [3, 1]
+        assert [r['survivors'] for r in plan_rungs(2, 30, eta=2)] == [2, 1]
+
+
+class TestScheduler:
+    def test_losing_family_stops_early_and_budget_flows_to_leader(self, data, tmp_path, families):
+        X, y = data
+        multi = _multi(tmp_path, ['logistic_regression', 'dummy'])
+        progress = []
+
+        studies = multi.optimize_concurrent(X, y, total_trials=12, eta=2, n_workers=2,
+                                            progress_callback=progress.append)
+        final = multi.scheduler.get_progress()
+
+        assert final['leader'] == 'logistic_regression'
+        assert final['families']['dummy']['status'] == 'eliminated'
+        assert final['families']['dummy']['eliminated_at_rung'] == 0
+        assert final['families']['logistic_regression']['status'] == 'winner'
+        assert final['trials_used'] == 12
+        assert len(studies['dummy'].trials) < len(studies['logistic_regression'].trials)
+        assert progress[0]['rung'] == 0 and progress[-1] == {**final, 'updated_at': progress[-1]['updated_at']}
+
+    def test_failed_family_is_dropped_and_its_budget_reused(self, data, tmp_path, families):
+        X, y = data
+        multi = _multi(tmp_path, ['logistic_regression', 'broken', 'dummy'])
+
+        multi.optimize_concurrent(X, y, total_trials=10, eta=3, n_workers=3)
+        final = multi.scheduler.get_progress()
+
+        assert final['families']['broken']['status'] == 'failed'
+        assert final['families']['broken']['error']
+        assert final['leader'] == 'logistic_regression'
+        assert final['trials_used'] == 10
+
+    def test_resumed_studies_only_count_new_trials(self, data, tmp_path):
+        X, y = data
+        _multi(tmp_path, ['logistic_regression']).optimize_concurrent(X, y, total_trials=3, n_workers=1)
+
+        multi = _multi(tmp_path, ['logistic_regression'])
+        studies = multi.optimize_concurrent(X, y, total_trials=4, n_workers=2)
+        assert multi.scheduler.get_progress()['trials_used'] == 4
+        assert len(studies['logistic_regression'].trials) == 7
+
+    def test_in_memory_storage_is_rejected(self):
+        optimizer = HyperparameterOptimizer(study_name='mem', storage_url='sqlite://')
+        with pytest.raises(ValueError):
+            SuccessiveHalvingScheduler({'logistic_regression': optimizer}, total_trials=4)
+
+    def test_daemonic_worker_fails_fast(self, data, tmp_path):
+        from unittest.mock import patch
+        X, y = data
+        multi = _multi(tmp_path, ['logistic_regression'])
+        with patch('multiprocessing.current_process') as current:
+            current.return_value.daemon = True
+            with pytest.raises(RuntimeError, match='optimization_queue'):
+                multi.optimize_concurrent(X, y, total_trials=3, n_workers=1)
+
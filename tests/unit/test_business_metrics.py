@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para os agregados incrementais do BusinessMetricsCollector
+"""
+
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from monitoring.business_metrics import BusinessMetricsCollector, BetResult
+
+
+def _bet(i, profit_loss, hours_ago=1.0, bet_type='home_win', stake=100.0, odds=2.0, match_id='39_1'):
+    return BetResult(
+        bet_id=f'bet_{i}', match_id=match_id, bet_type=bet_type, stake=stake, odds=odds,
+        predicted_outcome=bet_type, actual_outcome=bet_type if profit_loss > 0 else 'other',
+        profit_loss=profit_loss, roi=profit_loss / stake,
+        timestamp=datetime.now() - timedelta(hours=hours_ago)
+    )
+
+
+@pytest.fixture
+def collector():
+    return BusinessMetricsCollector(max_raw_results=5)
+
+
+class TestIncrementalAggregates:
+    def test_period_metrics(self, collector):
+        bets = [_bet(1, 100.0, hours_ago=2), _bet(2, -100.0, hours_ago=3, odds=3.0),
+                _bet(3, 50.0, hours_ago=30, stake=50.0)]
+        for bet in bets:
+            collector.add_bet_result(bet)
+
+        day = collector.get_business_metrics(1)
+        assert day.total_bets == 2
+        assert day.total_stake == pytest.approx(200.0)
+        assert day.total_profit_loss == pytest.approx(0.0)
+        assert day.win_rate == pytest.approx(0.5)
+        assert day.avg_odds == pytest.approx(2.5)
+        assert day.best_bet.bet_id == 'bet_1' and day.worst_bet.bet_id == 'bet_2'
+
+        week = collector.get_business_metrics(7)
+        assert week.total_bets == 3
+        assert week.total_roi == pytest.approx(50.0 / 250.0)
+
+    def test_raw_window_is_bounded_but_totals_are_not(self, collector):
+        for i in range(20):
+            collector.add_bet_result(_bet(i, 10.0))
+
+        assert len(collector.bet_results) == 5
+        assert [b.bet_id for b in collector.get_recent_bets(2)] == ['bet_18', 'bet_19']
+        assert collector.get_business_metrics(1).total_bets == 20
+        assert collector._get_total_profit_loss('home_win', '39_1') == pytest.approx(200.0)
+
+    def test_prometheus_gauges_per_group(self, collector):
+        collector.add_bet_result(_bet(1, 100.0))
+        collector.add_bet_result(_bet(2, -100.0))
+        collector.add_bet_result(_bet(3, 50.0, bet_type='draw'))
+
+        labels = {'bet_type': 'home_win', 'league': 'premier_league'}
+        assert collector.registry.get_sample_value('marabet_win_rate', labels) == pytest.approx(0.5)
+        assert collector.registry.get_sample_value('marabet_total_profit_loss', labels) == pytest.approx(0.0)
+        assert collector.registry.get_sample_value('marabet_total_bets_total', labels) == 2
+
+    def test_daily_trends_and_roi_analysis(self, collector):
+        collector.add_bet_result(_bet(1, 100.0, hours_ago=0))
+        collector.add_bet_result(_bet(2, -50.0, hours_ago=48, bet_type='draw', stake=50.0))
+
+        trends = collector.get_performance_trends(3)['trends']
+        assert trends[0]['total_bets'] == 1 and trends[0]['roi'] == pytest.approx(1.0)
+        assert trends[1]['total_bets'] == 0
+        assert trends[2]['total_bets'] == 1 and trends[2]['win_rate'] == 0
+
+        analysis = collector.get_roi_analysis(30)['bet_type_analysis']
+        assert analysis['draw']['total_profit'] == pytest.approx(-50.0)
+        assert set(analysis) == {'home_win', 'draw'}
+
+    def test_old_rollups_are_pruned(self):
+        collector = BusinessMetricsCollector(hourly_retention_hours=24, daily_retention_days=10)
+        collector.add_bet_result(_bet(1, 10.0, hours_ago=24 * 20))
+        collector.add_bet_result(_bet(2, 10.0, hours_ago=1))
+
+        assert len(collector._hourly) == 1
+        assert len(collector._daily) == 1
+        # Janela maior que a retenção horária usa os rollups diários
+        assert collector.get_business_metrics(5).total_bets == 1
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para o cruzamento de predições com resultados (calibração online)
+"""
+
+import pytest
+import sys
+import os
+import numpy as np
+from datetime import datetime, timedelta
+from sklearn.metrics import brier_score_loss, log_loss
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from armazenamento.banco_de_dados import Base, CalibrationAggregate, Match, Prediction, SettledPrediction
+from armazenamento.calibration_join import CalibrationJoinService, resolve_outcome
+
+
+@pytest.fixture
+def db():
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _match(db, fixture_id, home, away, status='FT', league_id=39):
+    db.add(Match(fixture_id=fixture_id, league_id=league_id, status=status,
+                 home_score=home, away_score=away))
+
+
+def _prediction(db, fixture_id, market, selection, probability, odd=2.0, stake=0.02, model=None):
+    factors = {'model_probability': probability}
+    if model:
+        factors['model'] = model
+    db.add(Prediction(fixture_id=fixture_id, market=market, selection=selection,
+                      predicted_probability=probability, current_odd=odd,
+                      stake_percentage=stake, factors=factors))
+
+
+class TestResolveOutcome:
+    def test_markets(self):
+        assert resolve_outcome('h2h', 'Home', 2, 1) == 1
+        assert resolve_outcome('h2h', 'Draw', 2, 1) == 0
+        assert resolve_outcome('h2h', 'Draw', 1, 1) == 1
+        assert resolve_outcome('totals', 'Over', 2, 1) == 1
+        assert resolve_outcome('totals', 'Under 3.5', 2, 1) == 1
+        assert resolve_outcome('totals', 'Over 3', 2, 1) is None  # push
+        assert resolve_outcome('btts', 'Yes', 1, 0) == 0
+        assert resolve_outcome('corners', 'Over', 1, 0) is None
+        assert resolve_outcome('h2h', 'Home', None, 0) is None
+
+
+class TestCalibrationJoin:
+    def test_metrics_match_sklearn(self, db):
+        rng = np.random.default_rng(0)
+        probabilities, outcomes = [], []
+        for fixture_id in range(1, 61):
+            home, away = rng.integers(0, 4, size=2)
+            _match(db, fixture_id, int(home), int(away))
+            p = float(rng.uniform(0.2, 0.8))
+            _prediction(db, fixture_id, 'h2h', 'Home', p, odd=1.9)
+            probabilities.append(p)
+            outcomes.append(int(home > away))
+        db.commit()
+
+        summary = CalibrationJoinService(db).settle(batch_size=25)
+        metrics = CalibrationJoinService(db).get_metrics('value_finder', 'h2h', league_id=39)
+
+        assert summary == {'settled': 60, 'void': 0, 'keys': 1}
+        assert metrics['n'] == 60
+        assert metrics['brier'] == pytest.approx(brier_score_loss(outcomes, probabilities))
+        assert metrics['log_loss'] == pytest.approx(log_loss(outcomes, probabilities))
+        assert metrics['roi'] == pytest.approx((sum(outcomes) * 1.9 - 60) / 60)
+        assert sum(b['count'] for b in metrics['reliability']) == 60
+        # Três lotes de 25 + 25 + 10: três linhas acumuladas para a mesma chave
+        assert db.query(CalibrationAggregate).count() == 3
+
+    def test_each_prediction_is_counted_once(self, db):
+        _match(db, 1, 2, 0)
+        _match(db, 2, 0, 0, status='NS')
+        _prediction(db, 1, 'h2h', 'Home', 0.6)
+        _prediction(db, 2, 'h2h', 'Home', 0.6)
+        db.commit()
+        service = CalibrationJoinService(db)
+
+        assert service.settle()['settled'] == 1
+        assert service.settle() == {'settled': 0, 'void': 0, 'keys': 0}
+
+        match = db.query(Match).filter(Match.fixture_id == 2).one()
+        match.status = 'FT'
+        db.commit()
+        assert service.settle(fixture_ids=[2])['settled'] == 1
+        assert service.get_metrics('value_finder', 'h2h')['n'] == 2
+
+    def test_void_and_unresolvable_predictions_are_marked_not_scored(self, db):
+        _match(db, 1, 1, 1, status='CANC')
+        _match(db, 2, 2, 1)
+        _prediction(db, 1, 'h2h', 'Home', 0.5)
+        _prediction(db, 2, 'corners', 'Over', 0.5)
+        _prediction(db, 2, 'totals', 'Over', 0.55, odd=1.8)
+        db.commit()
+
+        summary = CalibrationJoinService(db).settle()
+
+        assert summary['settled'] == 1 and summary['void'] == 2
+        assert db.query(SettledPrediction).filter(SettledPrediction.outcome.is_(None)).count() == 2
+        assert CalibrationJoinService(db).get_metrics('value_finder', 'totals')['roi'] == pytest.approx(0.8)
+
+    def test_keys_per_model_league_market(self, db):
+        _match(db, 1, 2, 1, league_id=39)
+        _match(db, 2, 0, 1, league_id=140)
+        _prediction(db, 1, 'h2h', 'Home', 0.7, model='poisson')
+        _prediction(db, 1, 'totals', 'Over', 0.6, model='poisson')
+        _prediction(db, 2, 'h2h', 'Home', 0.7, model='poisson')
+        _prediction(db, 2, 'h2h', 'Home', 0.4, model='ensemble')
+        db.commit()
+        service = CalibrationJoinService(db)
+        service.settle()
+
+        report = service.current(model='poisson')
+        assert [(r['model'], r['league_id'], r['market']) for r in report] == [
+            ('poisson', 39, 'h2h'), ('poisson', 39, 'totals'), ('poisson', 140, 'h2h')
+        ]
+        all_leagues = service.get_metrics('poisson', 'h2h')
+        assert all_leagues['n'] == 2 and all_leagues['hit_rate'] == 0.5
+        assert service.get_metrics('ensemble', 'h2h')['brier'] == pytest.approx(0.16)
+
+    def test_rolling_window_is_a_difference_of_snapshots(self, db):
+        service = CalibrationJoinService(db)
+        _match(db, 1, 0, 2)
+        _prediction(db, 1, 'h2h', 'Home', 0.9, odd=1.2, stake=0.05)
+        db.commit()
+        service.settle()
+        db.query(CalibrationAggregate).update({'created_at': datetime.utcnow() - timedelta(days=10)})
+        db.commit()
+
+        _match(db, 2, 3, 0)
+        _prediction(db, 2, 'h2h', 'Home', 0.8, odd=1.5, stake=0.04)
+        db.commit()
+        service.settle()
+
+        window = service.get_metrics('value_finder', 'h2h', since=datetime.utcnow() - timedelta(days=7))
+        total = service.get_metrics('value_finder', 'h2h')
+        assert window['n'] == 1 and window['brier'] == pytest.approx(0.04)
+        assert window['staked_roi'] == pytest.approx(0.5)
+        assert total['n'] == 2 and total['staked_roi'] == pytest.approx((0.04 * 0.5 - 0.05) / 0.09)
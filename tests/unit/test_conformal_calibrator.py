@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para a calibração conformal online
+"""
+
+import pytest
+import sys
+import os
+import math
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from confidence.conformal_calibrator import (
+    ConformalCalibratorRegistry, OnlineConformalCalibrator, ReloadingCalibratorRegistry
+)
+from confidence.prediction_intervals import PredictionIntervalMethod, PredictionIntervals
+from armazenamento.banco_de_dados import Base, Match, Prediction
+from armazenamento.calibration_join import CalibrationJoinService
+
+DAY = 86400
+T0 = 1_700_000_000.0
+
+
+class TestOnlineConformalCalibrator:
+    def test_matches_split_conformal_quantile(self):
+        rng = np.random.default_rng(0)
+        residuals = rng.uniform(0, 0.5, 999)
+        calibrator = OnlineConformalCalibrator(half_life_days=None, max_age_days=None, max_size=10_000)
+        for r in residuals:
+            calibrator.update_residual(r, T0)
+
+        for level in (0.8, 0.9, 0.95):
+            k = math.ceil((len(residuals) + 1) * level)
+            expected = np.sort(residuals)[k - 1]
+            assert calibrator.quantile(level) == pytest.approx(expected, abs=calibrator.resolution)
+            assert calibrator.quantile(level) >= expected  # grade arredonda para cima
+
+    def test_coverage_on_fresh_data(self):
+        rng = np.random.default_rng(1)
+        calibrator = OnlineConformalCalibrator(half_life_days=None)
+        p = rng.uniform(0.1, 0.9, 3000)
+        y = np.clip(p + rng.normal(0, 0.1, 3000), 0, 1)
+        calibrator.update_many(p[:2000], y[:2000], [T0] * 2000)
+
+        covered = [calibrator.interval(pi, 0.9)[0] <= yi <= calibrator.interval(pi, 0.9)[1]
+                   for pi, yi in zip(p[2000:], y[2000:])]
+        assert np.mean(covered) == pytest.approx(0.9, abs=0.03)
+
+    def test_window_expires_by_size_and_age(self):
+        calibrator = OnlineConformalCalibrator(half_life_days=None, max_age_days=10, max_size=100, min_samples=1)
+        for i in range(150):
+            calibrator.update_residual(0.3, T0 + i * 60)
+        assert len(calibrator) == 100
+
+        calibrator.update_residual(0.01, T0 + 11 * DAY)
+        assert len(calibrator) == 1
+        assert calibrator.quantile(0.5) == pytest.approx(0.01)
+
+    def test_decay_follows_recent_regime(self):
+        calibrator = OnlineConformalCalibrator(half_life_days=7, max_age_days=None, max_size=10_000)
+        for day in range(60):
+            residual = 0.3 if day < 40 else 0.05
+            for _ in range(20):
+                calibrator.update_residual(residual, T0 + day * DAY)
+
+        # 400 resíduos recentes pequenos contra 800 antigos grandes
+        assert calibrator.quantile(0.8) == pytest.approx(0.05)
+        flat = OnlineConformalCalibrator(half_life_days=None, max_size=10_000, max_age_days=None)
+        for t, index, _ in calibrator._window:
+            flat.update_residual(calibrator._bin_value(index), t)
+        assert flat.quantile(0.8) == pytest.approx(0.3)
+
+    def test_long_streams_rebase_weights(self):
+        calibrator = OnlineConformalCalibrator(half_life_days=1, max_age_days=5, min_samples=1)
+        for day in range(400):
+            calibrator.update_residual(0.1 + (day % 3) * 0.05, T0 + day * DAY)
+        assert math.isfinite(calibrator._total) and calibrator._total > 0
+        assert len(calibrator) == 6
+        assert calibrator.quantile(0.5) in (pytest.approx(0.1), pytest.approx(0.15), pytest.approx(0.2))
+
+    def test_small_window_gives_unbounded_interval(self):
+        calibrator = OnlineConformalCalibrator(min_samples=30)
+        calibrator.update(0.5, 1.0, T0)
+        assert calibrator.quantile(0.9) == math.inf
+        assert calibrator.interval(0.4, 0.9) == (0.0, 1.0)
+
+    def test_queries_are_cached_and_fast(self):
+        rng = np.random.default_rng(2)
+        calibrator = OnlineConformalCalibrator()
+        start = time.perf_counter()
+        for r in rng.uniform(0, 0.4, 5000):
+            calibrator.update_residual(r)
+        insert_us = (time.perf_counter() - start) / 5000 * 1e6
+
+        calibrator.quantile(0.95)
+        start = time.perf_counter()
+        for p in rng.uniform(0, 1, 10_000):
+            calibrator.interval(p, 0.95)
+        query_us = (time.perf_counter() - start) / 10_000 * 1e6
+        assert insert_us < 200 and query_us < 20
+
+
+class TestRegistryAndIntegration:
+    def test_registry_persists_windows(self, tmp_path):
+        registry = ConformalCalibratorRegistry(half_life_days=None, min_samples=5)
+        rng = np.random.default_rng(3)
+        for p in rng.uniform(0.2, 0.8, 200):
+            registry.update('poisson', 'h2h', p, float(p > 0.5), T0)
+        path = str(tmp_path / 'conformal.joblib')
+        registry.save(path)
+
+        restored = ConformalCalibratorRegistry.load(path)
+        assert restored.interval('poisson', 'h2h', 0.6, 0.9) == registry.interval('poisson', 'h2h', 0.6, 0.9)
+        assert restored.interval('poisson', 'btts', 0.6) == (0.0, 1.0)
+        assert len(ConformalCalibratorRegistry.load(str(tmp_path / 'missing.joblib')).calibrators) == 0
+
+    def test_serving_registry_reloads_when_the_file_changes(self, tmp_path):
+        path = str(tmp_path / 'conformal.joblib')
+        serving = ReloadingCalibratorRegistry(path, reload_seconds=0)
+        empty = serving.prediction_interval('poisson', 'h2h', 0.6, 0.9)
+        assert (empty.lower_bound, empty.upper_bound, empty.sample_size) == (0.0, 1.0, 0)
+
+        registry = ConformalCalibratorRegistry(half_life_days=None, min_samples=5)
+        for p in np.random.default_rng(4).uniform(0.2, 0.8, 200):
+            registry.update('poisson', 'h2h', p, float(p > 0.5), T0)
+        registry.save(path)
+        os.utime(path, (T0, T0))
+
+        interval = serving.prediction_interval('poisson', 'h2h', 0.6, 0.9)
+        assert (interval.lower_bound, interval.upper_bound) == registry.interval('poisson', 'h2h', 0.6, 0.9)
+        assert interval.method == 'conformal_online' and interval.sample_size == 200
+
+        cached = ReloadingCalibratorRegistry(path, reload_seconds=3600)
+        cached.registry
+        os.remove(path)
+        assert cached.prediction_interval('poisson', 'h2h', 0.6, 0.9).sample_size == 200
+
+    def test_prediction_intervals_use_online_calibrator(self):
+        calibrator = OnlineConformalCalibrator(half_life_days=None, min_samples=10)
+        for r in np.linspace(0, 0.2, 99):
+            calibrator.update_residual(r, T0)
+        system = PredictionIntervals(conformal_calibrator=calibrator)
+
+        online = system.calculate_prediction_interval(0.5, None, PredictionIntervalMethod.CONFORMAL, 0.9)
+        assert online.method == 'conformal_online'
+        assert online.upper_bound - 0.5 == pytest.approx(calibrator.quantile(0.9))
+
+        offline = system.calculate_prediction_interval(0.5, [0.1, -0.1], PredictionIntervalMethod.CONFORMAL, 0.9)
+        assert offline.method == 'conformal'
+
+    def test_batch_apis_use_online_calibrator(self):
+        calibrator = OnlineConformalCalibrator(half_life_days=None, min_samples=10)
+        for r in np.linspace(0, 0.2, 99):
+            calibrator.update_residual(r, T0)
+        system = PredictionIntervals(conformal_calibrator=calibrator)
+        predictions = [0.3, 0.5, 0.7]
+        levels = [0.8, 0.9]
+
+        multiple = system.calculate_multiple_prediction_intervals(
+            predictions, None, levels, PredictionIntervalMethod.CONFORMAL)
+        for level in levels:
+            for prediction, got in zip(predictions, multiple[level]):
+                expected = system.calculate_prediction_interval(prediction, None, PredictionIntervalMethod.CONFORMAL, level)
+                assert got.method == expected.method == 'conformal_online'
+                assert got.lower_bound == pytest.approx(expected.lower_bound)
+                assert got.upper_bound == pytest.approx(expected.upper_bound)
+
+        batch = system.calculate_prediction_intervals_batch(predictions, None, levels,
+                                                            [PredictionIntervalMethod.CONFORMAL])
+        conformal = batch['intervals']['conformal']
+        assert conformal['method'] == 'conformal_online'
+        assert np.allclose(conformal['upper'][:, 1], np.array(predictions) + calibrator.quantile(0.9))
+
+        # Janela pequena demais: mantém o fallback normal
+        empty = PredictionIntervals(conformal_calibrator=OnlineConformalCalibrator())
+        assert empty.calculate_prediction_intervals_batch(
+            predictions, None, levels, [PredictionIntervalMethod.CONFORMAL])['intervals']['conformal']['method'] == 'normal'
+
+    def test_settled_predictions_feed_the_calibrators(self, tmp_path):
+        engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        for fixture_id in range(1, 41):
+            db.add(Match(fixture_id=fixture_id, league_id=39, status='FT',
+                         home_score=fixture_id % 3, away_score=1))
+            db.add(Prediction(fixture_id=fixture_id, market='h2h', selection='Home',
+                              predicted_probability=0.55, current_odd=1.9, factors={}))
+        db.commit()
+
+        # Metade liquidada pelo caminho por partida (sem calibradores)
+        CalibrationJoinService(db).settle(fixture_ids=list(range(1, 21)))
+        registry = ConformalCalibratorRegistry(min_samples=10)
+        service = CalibrationJoinService(db, calibrators=registry)
+        service.settle()
+
+        # Marcas recentes esperam o atraso de segurança
+        assert service.feed_calibrators() == 0
+        later = datetime.utcnow() + timedelta(minutes=10)
+        assert service.feed_calibrators(now=later) == 40
+        assert service.feed_calibrators(now=later) == 0
+
+        calibrator = registry.get('value_finder', 'h2h')
+        assert len(calibrator) == 40
+        # 13 vitórias do mandante (resíduo 0.45) e 27 derrotas (0.55)
+        assert calibrator.quantile(0.3) == pytest.approx(0.45)
+        assert calibrator.quantile(0.5) == pytest.approx(0.55)
+
+        path = str(tmp_path / 'conformal.joblib')
+        registry.save(path)
+        restored = ConformalCalibratorRegistry.load(path)
+        assert restored.cursor == registry.cursor
+        assert CalibrationJoinService(db, calibrators=restored).feed_calibrators(now=later) == 0
+        db.close()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para a detecção de drift em streaming por sketches
+"""
+
+import pytest
+import sys
+import os
+import numpy as np
+from datetime import datetime, timedelta
+from scipy.stats import ks_2samp
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from monitoring.drift_sketches import KLLSketch, StreamingDriftMonitor
+from monitoring.ml_monitoring import AlertSeverity, MLModelMonitor, ModelMetrics
+
+T0 = datetime(2024, 5, 18, 12, 0).timestamp()
+FEATURES = ['home_strength', 'away_strength', 'home_odd']
+
+
+def _stream(rng, n, shift=0.0):
+    return np.column_stack([
+        rng.normal(shift, 1, n),
+        rng.normal(0, 1, n),
+        rng.lognormal(0.7, 0.3, n),
+    ])
+
+
+@pytest.fixture
+def monitor():
+    rng = np.random.default_rng(0)
+    drift = StreamingDriftMonitor(FEATURES, bucket_seconds=3600, window_buckets=6)
+    for _ in range(10):
+        drift.update_baseline(_stream(rng, 2000))
+    drift.freeze_baseline()
+    return drift
+
+
+class TestKLLSketch:
+    def test_quantiles_within_rank_error_and_bounded_size(self):
+        rng = np.random.default_rng(1)
+        values = rng.normal(size=100_000)
+        sketch = KLLSketch(k=200, seed=0)
+        for chunk in np.array_split(values, 100):
+            sketch.update(chunk)
+
+        estimates = sketch.quantile([0.01, 0.25, 0.5, 0.75, 0.99])
+        ranks = np.searchsorted(np.sort(values), estimates) / len(values)
+        assert np.allclose(ranks, [0.01, 0.25, 0.5, 0.75, 0.99], atol=0.02)
+        assert sketch.n == 100_000 and sketch.size < 1000
+
+    def test_merge_matches_single_sketch(self):
+        rng = np.random.default_rng(2)
+        a_values, b_values = rng.normal(size=20_000), rng.normal(2, 1, 20_000)
+        a, b = KLLSketch(seed=0), KLLSketch(seed=1)
+        a.update(a_values)
+        b.update(b_values)
+        a.merge(b)
+
+        combined = np.sort(np.concatenate([a_values, b_values]))
+        assert a.n == 40_000 and a.min == combined[0] and a.max == combined[-1]
+        grid = np.linspace(-2, 4, 13)
+        exact = np.searchsorted(combined, grid, side='right') / len(combined)
+        assert np.allclose(a.cdf(grid), exact, atol=0.02)
+
+    def test_merge_rejects_different_k(self):
+        a, b = KLLSketch(k=200), KLLSketch(k=100)
+        b.update(np.arange(10.0))
+        with pytest.raises(ValueError):
+            a.merge(b)
+        assert a.n == 0
+
+
+class TestStreamingDrift:
+    def test_stable_traffic_has_no_drift(self, monitor):
+        rng = np.random.default_rng(3)
+        for minute in range(0, 120, 5):
+            monitor.observe(_stream(rng, 200), T0 + minute * 60)
+
+        report = monitor.compute_drift()
+        assert set(report) == set(FEATURES)
+        for metrics in report.values():
+            assert metrics['psi'] < 0.05 and metrics['ks'] < 0.05 and metrics['js'] < 0.02
+            assert metrics['n_live'] == 24 * 200
+
+    def test_shift_is_detected_with_metrics_close_to_exact(self, monitor):
+        rng = np.random.default_rng(4)
+        live = _stream(rng, 5000, shift=0.5)
+        monitor.observe(live, T0)
+
+        report = monitor.compute_drift()
+        baseline = _stream(np.random.default_rng(0), 20000)
+        exact_ks = ks_2samp(baseline[:, 0], live[:, 0]).statistic
+        assert report['home_strength']['psi'] > 0.2
+        assert report['home_strength']['ks'] == pytest.approx(exact_ks, abs=0.03)
+        assert report['away_strength']['psi'] < 0.05
+
+    def test_live_window_expires_old_buckets(self, monitor):
+        rng = np.random.default_rng(5)
+        monitor.observe(_stream(rng, 2000, shift=1.0), T0)
+        assert monitor.compute_drift(T0)['home_strength']['psi'] > 0.5
+
+        monitor.observe(_stream(rng, 2000), T0 + 7 * 3600)
+        assert len(monitor.buckets) == 1
+        assert monitor.compute_drift()['home_strength']['psi'] < 0.05
+
+    def test_workers_merge_to_the_same_state(self, monitor):
+        rng = np.random.default_rng(6)
+        batches = [_stream(rng, 500, shift=0.3) for _ in range(4)]
+        workers = [StreamingDriftMonitor.from_dict(monitor.to_dict()) for _ in range(2)]
+        for i, batch in enumerate(batches):
+            workers[i % 2].observe(batch, T0 + i * 600)
+            monitor.observe(batch, T0 + i * 600)
+
+        merged = workers[0].merge(workers[1])
+        single = monitor.compute_drift()
+        for name, metrics in merged.compute_drift().items():
+            assert metrics['n_live'] == 2000
+            assert metrics['psi'] == pytest.approx(single[name]['psi'], rel=0.05)
+
+        other = StreamingDriftMonitor(FEATURES)
+        other.fit_baseline(_stream(rng, 1000, shift=3.0))
+        with pytest.raises(ValueError):
+            monitor.merge(other)
+
+        coarse = StreamingDriftMonitor.from_dict({**monitor.to_dict(), 'k': 100})
+        with pytest.raises(ValueError):
+            monitor.merge(coarse)
+
+    def test_state_is_persisted_compactly(self, monitor, tmp_path):
+        rng = np.random.default_rng(7)
+        for hour in range(6):
+            monitor.observe(_stream(rng, 10_000), T0 + hour * 3600)
+        path = tmp_path / 'drift.joblib'
+        monitor.save(str(path))
+
+        restored = StreamingDriftMonitor.load(str(path))
+        assert os.path.getsize(path) < 200_000  # 60k linhas x 3 features em float64 ocupariam 1.4 MB
+        original, loaded = monitor.compute_drift(), restored.compute_drift()
+        for name in FEATURES:
+            assert loaded[name]['psi'] == pytest.approx(original[name]['psi'], abs=1e-6)
+            assert loaded[name]['ks'] == pytest.approx(original[name]['ks'], abs=0.01)
+
+    def test_observe_requires_frozen_baseline(self):
+        with pytest.raises(ValueError):
+            StreamingDriftMonitor(FEATURES).observe(np.zeros((1, 3)))
+
+
+class TestMLModelMonitorIntegration:
+    def _metrics(self):
+        return ModelMetrics(accuracy=0.6, precision=0.6, recall=0.6, f1_score=0.6, auc_roc=0.0,
+                            prediction_confidence=0.7, data_quality_score=1.0, feature_importance={},
+                            timestamp=datetime.now())
+
+    def test_detect_model_drift_uses_streaming_sketches(self):
+        rng = np.random.default_rng(8)
+        ml_monitor = MLModelMonitor()
+        ml_monitor.enable_streaming_drift(FEATURES, baseline_data=_stream(rng, 20_000))
+
+        ml_monitor.observe_features(_stream(rng, 3000))
+        calm = ml_monitor.detect_model_drift(self._metrics())
+        assert calm.severity == AlertSeverity.LOW and set(calm.feature_drift) == set(FEATURES)
+
+        drift = ml_monitor.detect_model_drift(self._metrics(), _stream(rng, 20_000, shift=1.5))
+        assert drift.feature_drift['home_strength'] > 0.25
+        assert drift.data_drift > 0.1
+        assert drift.severity in (AlertSeverity.MEDIUM, AlertSeverity.HIGH, AlertSeverity.CRITICAL)
+        assert ml_monitor.get_streaming_drift()['home_strength']['n_live'] == 23_000
+
+    def test_worker_states_are_persisted_and_merged_from_the_training_baseline(self, tmp_path):
+        rng = np.random.default_rng(9)
+        baseline_path = str(tmp_path / 'baseline.joblib')
+        state_dir = str(tmp_path / 'workers')
+        baseline = StreamingDriftMonitor(FEATURES, window_buckets=6)
+        baseline.fit_baseline(_stream(rng, 20_000))
+        baseline.save(baseline_path)
+
+        for worker_id, shift in (('a', 0.0), ('b', 1.5)):
+            worker = MLModelMonitor()
+            worker.load_drift_state(baseline_path)
+            worker.observe_features(_stream(rng, 1000, shift=shift))
+            worker.persist_worker_drift(state_dir, worker_id)
+
+        stale = MLModelMonitor()
+        stale.load_drift_state(baseline_path)
+        stale.observe_features(_stream(rng, 1000))
+        stale_path = stale.persist_worker_drift(state_dir, 'stale')
+        os.utime(stale_path, (T0, T0))
+
+        retrained = MLModelMonitor()
+        retrained.enable_streaming_drift(FEATURES, baseline_data=_stream(rng, 1000, shift=3.0), window_buckets=6)
+        retrained.observe_features(_stream(rng, 1000))
+        retrained.persist_worker_drift(state_dir, 'retrained')
+
+        merger = MLModelMonitor()
+        merger.load_drift_state(baseline_path)
+        assert merger.merge_worker_drift(state_dir) == 2
+        assert not os.path.exists(stale_path)
+        report = merger.get_streaming_drift()
+        assert report['home_strength']['n_live'] == 2000
+        assert report['home_strength']['psi'] > 0.2 and report['away_strength']['psi'] < 0.05
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para a inferência em lote do ensemble
+"""
+
+import pytest
+import sys
+import os
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from ml.model_ensemble import AdvancedEnsemble, ModelEnsemble, benchmark_ensemble_inference
+
+CALLS = {'predict_proba': 0, 'predict': 0}
+
+
+class CountingTree(BaseEstimator, ClassifierMixin):
+    """Árvore que conta as chamadas de inferência"""
+
+    def __init__(self, max_depth=3):
+        self.max_depth = max_depth
+
+    def fit(self, X, y):
+        self.tree_ = DecisionTreeClassifier(max_depth=self.max_depth, random_state=0).fit(X, y)
+        self.classes_ = self.tree_.classes_
+        return self
+
+    def predict(self, X):
+        CALLS['predict'] += 1
+        return self.tree_.predict(X)
+
+    def predict_proba(self, X):
+        CALLS['predict_proba'] += 1
+        return self.tree_.predict_proba(X)
+
+
+@pytest.fixture
+def data():
+    X, y = make_classification(n_samples=400, n_features=8, n_informative=5, n_classes=3, random_state=1)
+    return X, y + 1  # rótulos 1, 2, 3 exercitam o LabelEncoder do VotingClassifier
+
+
+def _ensemble(X, y, voting='soft', weights=(2.0, 1.0, 1.0)):
+    ensemble = ModelEnsemble()
+    ensemble.add_model('rf', RandomForestClassifier(n_estimators=20, random_state=0), weights[0])
+    ensemble.add_model('lr', LogisticRegression(max_iter=1000), weights[1])
+    ensemble.add_model('tree', CountingTree(), weights[2])
+    ensemble.create_voting_ensemble(voting)
+    ensemble.train_ensemble(X, y)
+    return ensemble
+
+
+class TestModelEnsemble:
+    def test_batch_matches_voting_classifier(self, data):
+        X, y = data
+        ensemble = _ensemble(X, y)
+        batch = ensemble.predict_batch(X)
+
+        assert np.array_equal(batch['predictions'], ensemble.ensemble_model.predict(X))
+        assert np.allclose(batch['probabilities'], ensemble.ensemble_model.predict_proba(X))
+        assert np.allclose(batch['confidence'], batch['probabilities'].max(axis=1))
+        fitted_lr = ensemble.ensemble_model.named_estimators_['lr']
+        assert np.array_equal(batch['individual_predictions']['lr'],
+                              ensemble.ensemble_model.classes_[fitted_lr.predict(X)])
+
+    def test_hard_voting_matches_voting_classifier(self, data):
+        X, y = data
+        ensemble = _ensemble(X, y, voting='hard')
+        batch = ensemble.predict_batch(X)
+        assert np.array_equal(batch['predictions'], ensemble.ensemble_model.predict(X))
+        assert np.allclose(batch['probabilities'].sum(axis=1), 1.0)
+
+    def test_each_base_model_runs_once_per_batch(self, data):
+        X, y = data
+        ensemble = _ensemble(X, y)
+        CALLS.update(predict_proba=0, predict=0)
+
+        rows = ensemble.predict_rows(X[:250])
+
+        assert len(rows) == 250
+        assert CALLS == {'predict_proba': 1, 'predict': 0}
+
+    def test_rows_and_agreement(self, data):
+        X, y = data
+        ensemble = _ensemble(X, y)
+        rows = ensemble.predict_rows(X[:20])
+
+        for row in rows:
+            labels = list(row['individual_predictions'].values())
+            modal = max(set(labels), key=labels.count)
+            assert row['agreement'] == pytest.approx(labels.count(modal) / len(labels))
+            assert row['weights'] == ensemble.weights
+
+        single = ensemble.predict(X[5:6])
+        assert single['prediction'] == rows[5]['prediction']
+        assert np.allclose(single['probability'], rows[5]['probability'])
+
+
+class TestAdvancedEnsemble:
+    def test_meta_features_reuse_ensemble_outputs(self, data):
+        X, y = data
+        advanced = AdvancedEnsemble()
+        advanced.add_ensemble('a', _ensemble(X, y))
+        advanced.add_ensemble('b', _ensemble(X, y, weights=(1.0, 1.0, 3.0)))
+        advanced.create_meta_ensemble(X, y)
+
+        expected = np.hstack([
+            np.hstack([e.ensemble_model.predict(X).reshape(-1, 1), e.ensemble_model.predict_proba(X)])
+            for e in advanced.ensembles.values()
+        ])
+        assert np.allclose(advanced._create_meta_features(X), expected)
+
+        CALLS.update(predict_proba=0, predict=0)
+        rows = advanced.predict_rows(X[:50])
+        assert CALLS['predict_proba'] == 2 and CALLS['predict'] == 0
+        assert len(rows) == 50
+        assert set(rows[0]['ensemble_predictions']) == {'a', 'b'}
+        assert np.allclose(rows[3]['probability'], advanced.meta_model.predict_proba(
+            advanced._create_meta_features(X[3:4]))[0])
+
+
+def test_benchmark_reports_matchday_speedup():
+    result = benchmark_ensemble_inference(n_fixtures=200)
+    assert result['fixtures'] == 200
+    assert result['batch_seconds'] < result['per_fixture_seconds']
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para o cache de folds da validação cruzada
+"""
+
+import pytest
+import sys
+import os
+import numpy as np
+import optuna
+from unittest.mock import patch
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from optimization.optimizers.hyperparameter_optimizer import HyperparameterOptimizer
+from optimization.validation.fold_cache import FoldCache, clear_fold_caches, get_fold_cache
+from optimization.validation.time_series_cv import create_time_series_cv
+
+optuna.logging.set_verbosity(optuna.logging.WARNING)
+
+
+@pytest.fixture
+def data():
+    rng = np.random.RandomState(1)
+    X = rng.randn(800, 5)
+    y = np.where(X[:, 0] + 0.3 * rng.randn(800) > 0, 2, 1)
+    return X, y
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    clear_fold_caches()
+    yield
+    clear_fold_caches()
+
+
+class TestFoldMaterialization:
+    def test_time_series_folds_are_views_of_one_memmap(self, data):
+        X, y = data
+        cache = FoldCache(create_time_series_cv(n_splits=4).cv, X, y)
+
+        X_train, X_test, y_train, y_test = cache.fold(0)
+        assert isinstance(cache.X, np.memmap)
+        assert np.shares_memory(X_train, cache.X) and np.shares_memory(X_test, cache.X)
+        train, test = cache.splits[0]
+        assert np.array_equal(X_train, X[train]) and np.array_equal(y_test, y[test])
+
+    def test_shuffled_folds_are_materialized_once(self, data):
+        X, y = data
+        from optimization.validation.time_series_cv import MonteCarloCrossValidation
+        cache = FoldCache(MonteCarloCrossValidation(n_splits=3, test_size=0.2, random_state=0), X, y)
+        X_train, _, y_train, _ = cache.fold(1)
+        assert isinstance(X_train, np.memmap)
+        assert os.path.exists(os.path.join(cache.cache_dir, 'fold1_X_train.npy'))
+        assert np.array_equal(y_train, y[cache.splits[1][0]])
+
+    def test_splits_are_computed_once_across_trials(self, data):
+        X, y = data
+        manager = create_time_series_cv(n_splits=3)
+        from sklearn.linear_model import LogisticRegression
+
+        with patch.object(manager.cv, 'split', wraps=manager.cv.split) as split:
+            for _ in range(5):
+                list(manager.iter_fold_scores(LogisticRegression(), X, y))
+            manager.cross_validate(LogisticRegression(), X, y)
+        assert split.call_count == 1
+
+    def test_cache_is_shared_between_optimizers_with_equal_data(self, data):
+        X, y = data
+        first = get_fold_cache(create_time_series_cv(n_splits=3), X, y)
+        second = get_fold_cache(create_time_series_cv(n_splits=3), X.copy(), y.copy())
+        other_cv = get_fold_cache(create_time_series_cv(n_splits=4), X, y)
+        assert first is second and first is not other_cv
+
+    def test_clear_removes_memmap_files(self, data):
+        X, y = data
+        cache = get_fold_cache(create_time_series_cv(n_splits=3), X, y)
+        clear_fold_caches()
+        assert not os.path.exists(cache.cache_dir)
+
+
+class TestNativeDatasets:
+    @pytest.mark.parametrize('kind', ['xgboost', 'lightgbm'])
+    def test_binning_happens_once_per_fold(self, data, tmp_path, kind):
+        X, y = data
+        optimizer = HyperparameterOptimizer(
+            study_name=kind, storage_url=f"sqlite:///{tmp_path / 'study.db'}",
+            n_trials=4, cv_params={'n_splits': 3}, random_state=0
+        )
+        optimizer.optimize_model(kind, X, y)
+
+        folds = optimizer.cv_manager.get_fold_cache(X, y)
+        assert folds.stats['native_builds'] == 3
+        assert folds.stats['native_hits'] == 9
+        assert all(t.value > 0.8 for t in optimizer.study.trials)
+
+    def test_native_xgboost_matches_sklearn_wrapper(self, data):
+        import xgboost as xgb
+        X, y = data
+        manager = create_time_series_cv(n_splits=3)
+        params = dict(max_depth=3, learning_rate=0.1, subsample=1.0, colsample_bytree=1.0,
+                      reg_alpha=0.0, reg_lambda=1.0)
+
+        wrapper = [s for _, s in manager.iter_fold_scores(
+            xgb.XGBClassifier(n_estimators=30, random_state=0, **params), X, y - 1)]
+        native = [s for _, s in manager.get_fold_cache(X, y).iter_native_scores('xgboost', {
+            'max_depth': 3, 'eta': 0.1, 'subsample': 1.0, 'colsample_bytree': 1.0,
+            'alpha': 0.0, 'lambda': 1.0, 'seed': 0
+        }, num_boost_round=30)]
+        assert np.allclose(wrapper, native, atol=0.01)
+
+    def test_unsupported_metric_is_rejected(self, data):
+        X, y = data
+        cache = FoldCache(create_time_series_cv(n_splits=3).cv, X, y)
+        with pytest.raises(ValueError):
+            next(cache.iter_native_scores('xgboost', {}, 10, scoring='r2'))
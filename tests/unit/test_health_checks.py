@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para os health checks concorrentes e em cache
+"""
+
+import pytest
+import sys
+import os
+import time
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from monitoring import health_checks
+from monitoring.health_checks import HealthChecker, PROBE_CONFIG
+
+
+def _probe(calls, name, delay=0.0, status='healthy'):
+    def check():
+        calls.append(name)
+        time.sleep(delay)
+        return {'status': status, 'message': name}
+    return check
+
+
+@pytest.fixture
+def checker(monkeypatch):
+    checker = HealthChecker(refresh_interval=3600)
+    checker.calls = []
+    for name in ('database', 'redis', 'api_football', 'telegram', 'system_resources'):
+        setattr(checker, f'check_{name}', _probe(checker.calls, name, delay=0.2))
+    yield checker
+    checker.stop_background_refresh()
+
+
+class TestConcurrentProbes:
+    def test_probes_run_in_parallel(self, checker):
+        start = time.monotonic()
+        report = checker.run_all_checks()
+        elapsed = time.monotonic() - start
+
+        assert elapsed < 0.6
+        assert report['overall_status'] == 'healthy'
+        assert set(report['checks']) == set(PROBE_CONFIG)
+
+    def test_timeout_reports_unhealthy_and_late_result_fills_cache(self, checker, monkeypatch):
+        monkeypatch.setitem(PROBE_CONFIG, 'telegram', (120.0, 0.1))
+        checker.check_telegram = _probe(checker.calls, 'telegram', delay=0.3)
+
+        result = checker.run_checks(['telegram'])['telegram']
+        assert result['status'] == 'unhealthy'
+        assert 'timeout' in result['error']
+
+        time.sleep(0.4)
+        assert checker.run_checks(['telegram'])['telegram']['status'] == 'healthy'
+        assert checker.calls.count('telegram') == 1
+
+    def test_failing_probe_does_not_break_report(self, checker):
+        def boom():
+            raise RuntimeError('down')
+        checker.check_redis = boom
+
+        report = checker.run_all_checks()
+        assert report['checks']['redis']['status'] == 'unhealthy'
+        assert report['overall_status'] == 'unhealthy'
+
+
+class TestSnapshot:
+    def test_snapshot_is_served_from_cache(self, checker):
+        checker.snapshot(('database', 'redis'))
+        checker.calls.clear()
+
+        start = time.monotonic()
+        checks = checker.snapshot(('database', 'redis'))
+        assert time.monotonic() - start < 0.05
+        assert checker.calls == []
+        assert checks['database']['status'] == 'healthy'
+
+    def test_stale_results_are_refreshed_in_background(self, checker, monkeypatch):
+        checker.snapshot(('database',))
+        monkeypatch.setitem(PROBE_CONFIG, 'database', (0.01, 2.0))
+        time.sleep(0.02)
+        checker.calls.clear()
+        checker.check_database = _probe(checker.calls, 'database', delay=0.2, status='warning')
+
+        start = time.monotonic()
+        stale = checker.snapshot(('database',))['database']
+        assert time.monotonic() - start < 0.05
+        assert stale['status'] == 'healthy'
+
+        time.sleep(0.3)
+        monkeypatch.setitem(PROBE_CONFIG, 'database', (10.0, 2.0))
+        assert checker.snapshot(('database',))['database']['status'] == 'warning'
+        assert checker.calls == ['database']
+
+
+class TestEndpoints:
+    @pytest.fixture
+    def client(self, checker, monkeypatch):
+        from flask import Flask
+        monkeypatch.setattr(health_checks, 'health_checker', checker)
+        app = Flask(__name__)
+        app.register_blueprint(health_checks.health_bp)
+        return app.test_client()
+
+    def test_liveness_runs_no_dependency_probes(self, client, checker):
+        response = client.get('/health/live')
+        assert response.status_code == 200
+        assert checker.calls == []
+
+    def test_readiness_uses_readiness_probes(self, client, checker):
+        checker.check_api_football = _probe(checker.calls, 'api_football', status='unhealthy')
+        response = client.get('/health/ready')
+        assert response.status_code == 503
+        assert response.get_json()['failed_check'] == 'api_football'
+        assert sorted(checker.calls) == ['api_football', 'database']
+
+    def test_deep_health(self, client):
+        response = client.get('/health/')
+        assert response.status_code == 200
+        assert set(response.get_json()['checks']) == set(PROBE_CONFIG)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para a validação fold a fold com poda e os trials paralelos
+"""
+
+import pytest
+import sys
+import os
+import numpy as np
+import optuna
+from sklearn.dummy import DummyClassifier
+from sklearn.linear_model import LogisticRegression
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from optimization.optimizers.hyperparameter_optimizer import HyperparameterOptimizer
+from optimization.validation.time_series_cv import create_time_series_cv
+
+optuna.logging.set_verbosity(optuna.logging.WARNING)
+
+
+@pytest.fixture
+def data():
+    rng = np.random.RandomState(0)
+    X = rng.randn(600, 6)
+    y = (X[:, 0] + 0.5 * X[:, 1] + 0.3 * rng.randn(600) > 0).astype(int)
+    return X, y
+
+
+def _optimizer(tmp_path, **kwargs):
+    params = dict(
+        study_name='pruning',
+        storage_url=f"sqlite:///{tmp_path / 'study.db'}",
+        n_trials=20,
+        cv_params={'n_splits': 5},
+        random_state=0
+    )
+    params.update(kwargs)
+    return HyperparameterOptimizer(**params)
+
+
+class TestFoldEvaluation:
+    def test_fold_scores_are_streamed_without_keeping_estimators(self, data):
+        X, y = data
+        cv = create_time_series_cv(n_splits=4)
+        scores = list(cv.iter_fold_scores(LogisticRegression(), X, y))
+        assert [fold for fold, _ in scores] == [0, 1, 2, 3]
+        assert all(0.8 < score <= 1 for _, score in scores)
+
+        results = cv.cross_validate(LogisticRegression(), X, y)
+        assert 'estimator' not in results
+        assert np.allclose(results['test_score'], [score for _, score in scores])
+
+    def test_bad_trials_are_pruned_after_warmup_folds(self, data, tmp_path):
+        X, y = data
+        optimizer = _optimizer(tmp_path)
+
+        def objective(trial):
+            good = trial.number < 5 or trial.number % 2 == 0
+            model = LogisticRegression() if good else DummyClassifier(strategy='constant', constant=0)
+            return optimizer._evaluate(trial, model, X, y)
+
+        optimizer.study.optimize(objective, n_trials=20)
+        stats = optimizer.get_pruning_stats()
+
+        pruned = [t for t in optimizer.study.trials if t.state == optuna.trial.TrialState.PRUNED]
+        assert stats['pruned'] == len(pruned) == 8
+        assert all(t.user_attrs['folds_evaluated'] == 2 for t in pruned)
+        assert stats['fold_budget_fraction'] == pytest.approx((12 * 5 + 8 * 2) / (20 * 5))
+
+    def test_model_optimizers_report_intermediate_values(self, data, tmp_path):
+        X, y = data
+        optimizer = _optimizer(tmp_path, n_trials=8)
+        study = optimizer.optimize_model('logistic_regression', X, y)
+
+        complete = [t for t in study.trials if t.state == optuna.trial.TrialState.COMPLETE]
+        assert complete and all(len(t.intermediate_values) == 5 for t in complete)
+        assert 'state' in optimizer.get_optimization_history()[0]
+
+    def test_unknown_model_is_rejected(self, tmp_path):
+        with pytest.raises(ValueError):
+            _optimizer(tmp_path).optimize_model('svm', np.zeros((10, 2)), np.zeros(10))
+
+
+class TestParallelTrials:
+    def test_workers_share_one_study_through_storage(self, data, tmp_path):
+        X, y = data
+        optimizer = _optimizer(tmp_path, n_trials=6, cv_params={'n_splits': 3})
+        study = optimizer.optimize_parallel('logistic_regression', X, y, n_workers=2)
+
+        assert len(study.trials) == 6
+        assert len({tuple(sorted(t.params.items())) for t in study.trials}) == 6
+
+    def test_in_memory_storage_is_rejected(self, data):
+        optimizer = HyperparameterOptimizer(study_name='mem', storage_url='sqlite://', n_trials=2)
+        with pytest.raises(ValueError):
+            optimizer.optimize_parallel('logistic_regression', *data, n_workers=2)
+
+    def test_worker_config_recreates_the_optimizer(self, tmp_path):
+        optimizer = _optimizer(tmp_path, warmup_folds=2)
+        clone = HyperparameterOptimizer(n_trials=1, **optimizer.get_worker_config())
+        assert clone.study_name == optimizer.study_name
+        assert clone.storage_url == optimizer.storage_url
+        assert clone.warmup_folds == 2 and clone.cv_params == {'n_splits': 5}
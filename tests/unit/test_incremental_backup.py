@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para os backups incrementais e deduplicados
+"""
+
+import pytest
+import sys
+import os
+import io
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backup.incremental_backup import IncrementalBackup, content_defined_chunks
+
+
+def _rows(n):
+    rng = random.Random(n)
+    return [(rng.randbytes(150).hex(),) for _ in range(n)]
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'sports.db'
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE odds (id INTEGER PRIMARY KEY, payload TEXT)')
+    conn.executemany('INSERT INTO odds (payload) VALUES (?)', _rows(8000))
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def backups(tmp_path):
+    return IncrementalBackup(str(tmp_path / 'store'), step_pages=64, step_sleep=0,
+                             min_chunk=4096, avg_chunk=16384, max_chunk=65536)
+
+
+def _count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT count(*) FROM odds').fetchone()[0]
+    finally:
+        conn.close()
+
+
+class TestChunking:
+    def test_local_edit_only_changes_nearby_chunks(self):
+        data = random.Random(1).randbytes(1_000_000)
+        edited = data[:500_000] + b'inserted bytes' + data[500_000:]
+
+        chunks = list(content_defined_chunks(io.BytesIO(data), 4096, 16384, 65536, block_size=100_000))
+        edited_chunks = list(content_defined_chunks(io.BytesIO(edited), 4096, 16384, 65536, block_size=100_000))
+
+        assert b''.join(chunks) == data
+        assert all(len(c) <= 65536 for c in chunks)
+        assert len(set(edited_chunks) - set(chunks)) <= 2
+
+
+class TestIncrementalBackup:
+    def test_second_backup_stores_only_changed_chunks(self, source, backups):
+        first = backups.backup(str(source))
+        assert first.is_full and first.new_chunks == first.num_chunks
+
+        conn = sqlite3.connect(source)
+        conn.execute("UPDATE odds SET payload = 'x' WHERE id = 10")
+        conn.commit()
+        conn.close()
+
+        second = backups.backup(str(source))
+        assert second.parent == first.backup_id
+        assert 0 < second.new_chunks < first.new_chunks / 4
+        assert sum(op[0] == 'n' for op in second.changes) == second.new_chunks
+
+    def test_point_in_time_restore_through_manifest_chain(self, source, backups, tmp_path):
+        ids = []
+        for extra in (0, 500, 1000):
+            if extra:
+                conn = sqlite3.connect(source)
+                conn.executemany('INSERT INTO odds (payload) VALUES (?)', _rows(extra))
+                conn.commit()
+                conn.close()
+            ids.append(backups.backup(str(source)))
+            time.sleep(0.01)
+
+        assert backups.restore(str(tmp_path / 'r1.db'), backup_id=ids[1].backup_id).backup_id == ids[1].backup_id
+        assert _count(tmp_path / 'r1.db') == 8500
+
+        backups.restore(str(tmp_path / 'r0.db'), at=ids[0].created_at + timedelta(microseconds=1))
+        assert _count(tmp_path / 'r0.db') == 8000
+
+        backups.restore(str(tmp_path / 'latest.db'))
+        assert _count(tmp_path / 'latest.db') == 9500
+
+    def test_full_manifest_bounds_the_chain(self, source, backups):
+        backups.full_every = 2
+        manifests = [backups.backup(str(source)) for _ in range(3)]
+        assert [m.is_full for m in manifests] == [True, False, True]
+
+    def test_backup_does_not_block_writers(self, source, tmp_path):
+        backups = IncrementalBackup(str(tmp_path / 'store'), step_pages=8, step_sleep=0.001)
+        writes = []
+        stop = threading.Event()
+
+        def writer():
+            conn = sqlite3.connect(source, timeout=1)
+            while not stop.is_set():
+                conn.execute("INSERT INTO odds (payload) VALUES ('live')")
+                conn.commit()
+                writes.append(time.time())
+                time.sleep(0.002)
+            conn.close()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            manifest = backups.backup(str(source))
+        finally:
+            stop.set()
+            thread.join()
+
+        assert writes
+        backups.restore(str(tmp_path / 'restored.db'), manifest.backup_id)
+        assert _count(tmp_path / 'restored.db') >= 8000
+
+
+class TestVerificationAndRetention:
+    def test_parallel_verification_detects_corruption(self, source, backups):
+        manifest = backups.backup(str(source))
+        assert backups.verify(workers=4)['valid']
+
+        digest = backups.resolve(manifest.backup_id)[3][0]
+        path = backups.store.path(digest)
+        path.write_bytes(path.read_bytes()[:-10] + b'0123456789')
+        report = backups.verify(workers=4)
+        assert not report['valid'] and report['corrupt'] == [digest]
+
+    def test_prune_rebases_children_and_collects_chunks(self, source, backups, tmp_path):
+        old = backups.backup(str(source))
+        conn = sqlite3.connect(source)
+        conn.execute("UPDATE odds SET payload = 'x' WHERE id < 50")
+        conn.commit()
+        conn.close()
+        new = backups.backup(str(source))
+        assert new.parent == old.backup_id
+
+        result = backups.prune(keep_within=timedelta(0), keep_last=1, now=datetime.utcnow() + timedelta(days=1))
+        assert result['backups_removed'] == [old.backup_id]
+        assert result['chunks_removed'] > 0
+        assert backups.load_manifest(new.backup_id).is_full
+        assert backups.verify()['valid']
+        backups.restore(str(tmp_path / 'after_prune.db'))
+        assert _count(tmp_path / 'after_prune.db') == 8000
+
+    def test_prune_keeps_recent_unreferenced_chunks(self, source, backups):
+        backups.backup(str(source))
+        # Chunk de um backup concorrente que ainda não gravou o manifesto
+        digest, _ = backups.store.put(b'in-flight' * 1000)
+
+        result = backups.prune(keep_within=timedelta(0), keep_last=1)
+        assert result['chunks_removed'] == 0
+        assert backups.store.has(digest)
+
+        later = backups.prune(keep_within=timedelta(0), keep_last=1, now=datetime.utcnow() + timedelta(hours=2))
+        assert later['chunks_removed'] == 1
+        assert not backups.store.has(digest)
+        assert backups.verify()['valid']
+
+    def test_prune_waits_for_backup_in_other_process(self, source, tmp_path):
+        store = str(tmp_path / 'store')
+        first, second = IncrementalBackup(store), IncrementalBackup(store)
+        events = []
+
+        def slow_snapshot(source_db, target):
+            events.append('backup-start')
+            time.sleep(0.3)
+            result = IncrementalBackup.snapshot(first, source_db, target)
+            events.append('backup-end')
+            return result
+
+        first.snapshot = slow_snapshot
+        worker = threading.Thread(target=first.backup, args=(str(source),))
+        worker.start()
+        time.sleep(0.1)
+        second.prune(keep_within=timedelta(0), keep_last=1)
+        events.append('prune')
+        worker.join()
+
+        assert events == ['backup-start', 'backup-end', 'prune']
+        assert second.verify()['valid']
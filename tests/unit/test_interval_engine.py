@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para o motor vetorizado de intervalos de confiança/predição
+"""
+
+import pytest
+import sys
+import os
+import numpy as np
+from unittest.mock import patch
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from confidence.interval_engine import IntervalEngine, sorted_quantile
+from confidence.confidence_calculator import ConfidenceCalculator, ConfidenceMethod
+from confidence.prediction_intervals import PredictionIntervalMethod, PredictionIntervals
+
+LEVELS = [0.68, 0.80, 0.90, 0.95, 0.99]
+DETERMINISTIC = [ConfidenceMethod.NORMAL, ConfidenceMethod.PREDICTION,
+                 ConfidenceMethod.QUANTILE, ConfidenceMethod.BAYESIAN]
+
+
+@pytest.fixture
+def predictions():
+    return np.random.RandomState(0).beta(5, 4, size=200)
+
+
+@pytest.fixture
+def errors():
+    return np.random.RandomState(1).normal(0.01, 0.06, size=25)
+
+
+class TestIntervalEngine:
+    def test_sorted_quantile_matches_numpy(self, predictions):
+        q = np.linspace(0, 1, 41)
+        assert np.allclose(sorted_quantile(np.sort(predictions), q), np.quantile(predictions, q))
+
+    def test_bootstrap_is_drawn_once_and_chunked(self, predictions):
+        engine = IntervalEngine(predictions, bootstrap_samples=500, random_state=0)
+        with patch('confidence.interval_engine.BOOTSTRAP_CHUNK_SIZE', 1000):
+            first = engine.bootstrap_means
+        assert first is engine.bootstrap_means
+        assert len(first) == 500 and np.all(np.diff(first) >= 0)
+        assert np.mean(first) == pytest.approx(np.mean(predictions), abs=0.01)
+
+        with pytest.raises(ValueError):
+            IntervalEngine([])
+
+
+class TestConfidenceCalculator:
+    @pytest.mark.parametrize('method', DETERMINISTIC)
+    @pytest.mark.parametrize('size', [12, 200])
+    def test_levels_match_per_level_path(self, predictions, method, size):
+        calculator = ConfidenceCalculator()
+        sample = predictions[:size]
+        intervals = calculator.calculate_multiple_confidence_levels(sample, LEVELS, method)
+
+        for level in LEVELS:
+            expected = calculator.calculate_confidence_interval(sample, method, level)
+            got = intervals[level]
+            assert got.method == expected.method and got.sample_size == expected.sample_size
+            assert got.degrees_of_freedom == expected.degrees_of_freedom
+            for field in ('prediction', 'lower_bound', 'upper_bound', 'margin_of_error', 'standard_error'):
+                assert getattr(got, field) == pytest.approx(getattr(expected, field), rel=1e-9)
+
+    def test_bootstrap_levels_share_one_distribution(self, predictions):
+        calculator = ConfidenceCalculator(bootstrap_samples=2000)
+        intervals = calculator.calculate_multiple_confidence_levels(predictions, LEVELS, ConfidenceMethod.BOOTSTRAP)
+
+        expected = calculator.calculate_confidence_interval(predictions, ConfidenceMethod.BOOTSTRAP, 0.95)
+        assert intervals[0.95].lower_bound == pytest.approx(expected.lower_bound, abs=0.005)
+        assert intervals[0.95].upper_bound == pytest.approx(expected.upper_bound, abs=0.005)
+        # Mesma amostra bootstrap: intervalos aninhados por construção
+        widths = [intervals[level].upper_bound - intervals[level].lower_bound for level in LEVELS]
+        assert widths == sorted(widths)
+
+    def test_single_prediction_keeps_per_method_rules(self):
+        intervals = ConfidenceCalculator().calculate_multiple_confidence_levels([0.6], [0.9, 0.95],
+                                                                                ConfidenceMethod.QUANTILE)
+        assert intervals[0.95].margin_of_error == pytest.approx(1.959964 * 0.1, rel=1e-6)
+
+
+class TestPredictionIntervals:
+    @pytest.mark.parametrize('method', [m for m in PredictionIntervalMethod if m != PredictionIntervalMethod.BOOTSTRAP])
+    def test_multiple_intervals_match_per_prediction_path(self, errors, method):
+        system = PredictionIntervals()
+        predictions = [0.45, 0.62, 0.81, 2.4]
+        per_prediction = [list(errors), list(errors), None, []]
+
+        results = system.calculate_multiple_prediction_intervals(predictions, per_prediction, LEVELS, method)
+
+        for level in LEVELS:
+            for i, prediction in enumerate(predictions):
+                expected = system.calculate_prediction_interval(prediction, per_prediction[i], method, level)
+                got = results[level][i]
+                assert got.method == expected.method and got.sample_size == expected.sample_size
+                assert got.lower_bound == pytest.approx(expected.lower_bound, rel=1e-9)
+                assert got.upper_bound == pytest.approx(expected.upper_bound, rel=1e-9)
+                assert got.interval_width == pytest.approx(expected.interval_width, rel=1e-9)
+
+    def test_batch_shares_error_state_across_fixtures(self, errors):
+        system = PredictionIntervals(bootstrap_samples=2000)
+        predictions = np.random.RandomState(2).uniform(0.2, 0.8, size=500)
+
+        with patch('confidence.prediction_intervals.IntervalEngine', wraps=IntervalEngine) as engine:
+            batch = system.calculate_prediction_intervals_batch(predictions, errors, LEVELS)
+        assert engine.call_count == 1
+
+        assert batch['confidence_levels'].tolist() == LEVELS
+        for method in PredictionIntervalMethod:
+            bounds = batch['intervals'][method.value]
+            assert bounds['lower'].shape == bounds['upper'].shape == (500, len(LEVELS))
+            assert np.all(np.diff(bounds['upper'] - bounds['lower'], axis=1) > 0)
+
+        conformal = batch['intervals']['conformal']
+        q95 = np.quantile(np.abs(errors), 0.95)
+        assert np.allclose(conformal['upper'][:, 3], predictions + q95)
+
+        single = system.calculate_prediction_interval(0.5, list(errors), PredictionIntervalMethod.BOOTSTRAP, 0.9)
+        shift = batch['intervals']['bootstrap']['lower'][:, 2] - predictions
+        assert np.allclose(shift, shift[0]) and shift[0] == pytest.approx(single.lower_bound - 0.5, abs=0.01)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para o agendador orientado a eventos
+"""
+
+import pytest
+import sys
+import os
+import threading
+import time
+from datetime import datetime
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from scheduler.job_scheduler import JobScheduler, ScheduledJob
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = JobScheduler(max_workers=4)
+    yield scheduler
+    scheduler.stop()
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+class TestDispatch:
+    def test_slow_job_does_not_delay_other_jobs(self, scheduler):
+        release = threading.Event()
+        fast_runs = []
+
+        scheduler.add_job('slow', release.wait, every=10, run_immediately=True)
+        scheduler.add_job('fast', lambda: fast_runs.append(time.time()), every=0.02, run_immediately=True)
+        scheduler.start()
+
+        try:
+            assert _wait_for(lambda: len(fast_runs) >= 5)
+            assert scheduler.get_stats()['slow']['running'] == 1
+        finally:
+            release.set()
+
+    def test_overlapping_run_is_skipped(self, scheduler):
+        release = threading.Event()
+        scheduler.add_job('collect', release.wait, every=0.02, run_immediately=True)
+        scheduler.start()
+
+        assert _wait_for(lambda: scheduler.get_stats()['collect']['skipped'] >= 2)
+        release.set()
+        assert _wait_for(lambda: scheduler.get_stats()['collect']['runs'] >= 1)
+        stats = scheduler.get_stats()['collect']
+        assert stats['running'] <= 1
+
+    def test_per_job_concurrency_limit(self, scheduler):
+        active = []
+        peak = []
+        lock = threading.Lock()
+        release = threading.Event()
+
+        def job():
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            release.wait()
+            with lock:
+                active.pop()
+
+        scheduler.add_job('leagues', job, every=0.01, max_concurrency=2, run_immediately=True)
+        scheduler.start()
+        assert _wait_for(lambda: scheduler.get_stats()['leagues']['skipped'] >= 3)
+        release.set()
+        assert max(peak) == 2
+
+    def test_errors_are_counted_and_do_not_stop_the_loop(self, scheduler):
+        calls = []
+
+        def failing():
+            calls.append(1)
+            raise RuntimeError('API fora do ar')
+
+        scheduler.add_job('odds', failing, every=0.02, run_immediately=True)
+        scheduler.start()
+        assert _wait_for(lambda: len(calls) >= 3)
+        stats = scheduler.get_stats()['odds']
+        assert stats['failures'] >= 2 and stats['last_error'] == 'API fora do ar'
+
+
+class TestTiming:
+    def test_durations_and_lag_are_recorded(self, scheduler):
+        scheduler.add_job('analysis', lambda: time.sleep(0.02), every=60, run_immediately=True)
+        scheduler.start()
+        assert _wait_for(lambda: scheduler.get_stats()['analysis']['runs'] == 1)
+
+        stats = scheduler.get_stats()['analysis']
+        assert stats['last_duration'] >= 0.02
+        assert 0 <= stats['last_lag'] < 1
+        assert stats['next_run'] > datetime.now()
+
+    def test_jitter_stays_within_bounds(self):
+        scheduler = JobScheduler()
+        now = time.time()
+        job = scheduler.add_job('odds', lambda: None, every=900, jitter=30)
+        assert now + 900 <= job.next_run <= time.time() + 930
+
+    def test_daily_job_fires_at_next_occurrence(self):
+        clock = datetime(2024, 6, 1, 3, 0).timestamp()
+        scheduler = JobScheduler(clock=lambda: clock)
+        scheduler.add_job('cleanup', lambda: None, at='02:00')
+        scheduler.add_job('report', lambda: None, at='08:00')
+
+        assert scheduler.next_run('cleanup') == datetime(2024, 6, 2, 2, 0)
+        assert scheduler.next_run('report') == datetime(2024, 6, 1, 8, 0)
+
+    def test_missed_intervals_do_not_pile_up(self):
+        job = ScheduledJob('odds', lambda: None, interval=10, nominal_run=100)
+        assert job.following(135) == 140
+
+
+def test_invalid_job_definitions_are_rejected():
+    scheduler = JobScheduler()
+    with pytest.raises(ValueError):
+        scheduler.add_job('x', lambda: None)
+    with pytest.raises(ValueError):
+        scheduler.add_job('x', lambda: None, every=1, at='02:00')
+    scheduler.add_job('x', lambda: None, every=1)
+    with pytest.raises(ValueError):
+        scheduler.add_job('x', lambda: None, every=1)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para o cache de tokens verificados e o filtro de revogação
+"""
+
+import pytest
+import sys
+import os
+import time
+from unittest.mock import patch
+
+from fastapi import HTTPException
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from auth import jwt_auth as jwt_module
+from auth.jwt_auth import JWTAuth, benchmark_authentication
+from auth.token_cache import VerifiedTokenCache, BloomFilter, RevocationList
+
+
+class FakeRedis:
+    """Subconjunto mínimo de comandos Redis usado pela lista de revogação"""
+
+    def __init__(self):
+        self.zsets = {}
+        self.hashes = {}
+        self.calls = []
+
+    def zadd(self, key, mapping):
+        self.calls.append('zadd')
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zscore(self, key, member):
+        self.calls.append('zscore')
+        return self.zsets.get(key, {}).get(member)
+
+    def zremrangebyscore(self, key, low, high):
+        zset = self.zsets.get(key, {})
+        for member in [m for m, score in zset.items() if score <= high]:
+            del zset[member]
+
+    def zrangebyscore(self, key, low, high, withscores=False):
+        return [(m, s) for m, s in self.zsets.get(key, {}).items() if s >= low]
+
+    def hset(self, key, field, value):
+        self.calls.append('hset')
+        self.hashes.setdefault(key, {})[field] = str(value)
+
+    def hget(self, key, field):
+        self.calls.append('hget')
+        return self.hashes.get(key, {}).get(field)
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.ops.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.ops]
+
+
+@pytest.fixture
+def auth():
+    return JWTAuth(token_cache=VerifiedTokenCache(), revocation_list=RevocationList(sync_interval=3600))
+
+
+def _token(auth, **extra):
+    return auth.create_access_token({'user_id': 1, 'username': 'ana', 'role': 'user', **extra})
+
+
+class TestVerifiedTokenCache:
+    def test_second_verification_skips_signature_check(self, auth):
+        token = _token(auth)
+        with patch.object(jwt_module.jwt, 'decode', wraps=jwt_module.jwt.decode) as decode:
+            first = auth.verify_token(token)
+            second = auth.verify_token(token)
+        assert decode.call_count == 1
+        assert first == second and second['username'] == 'ana'
+        assert auth.token_cache.get_stats()['hits'] == 1
+
+    def test_entries_do_not_outlive_token_expiry(self):
+        cache = VerifiedTokenCache(ttl=3600)
+        cache.put('t', {'exp': time.time() + 0.05})
+        assert cache.get('t') is not None
+        time.sleep(0.06)
+        assert cache.get('t') is None
+
+    def test_lru_is_bounded(self):
+        cache = VerifiedTokenCache(maxsize=2)
+        exp = time.time() + 60
+        for token in ('a', 'b', 'c'):
+            cache.put(token, {'exp': exp})
+        assert cache.get('a') is None and cache.get('c') is not None
+        assert cache.get_stats()['evictions'] == 1
+
+    def test_cached_claims_still_check_token_type(self, auth):
+        token = _token(auth)
+        auth.verify_token(token)
+        with pytest.raises(HTTPException):
+            auth.verify_token(token, 'refresh')
+
+    def test_invalid_token_is_rejected(self, auth):
+        with pytest.raises(HTTPException) as error:
+            auth.verify_token('not.a.token')
+        assert error.value.status_code == 401
+
+
+class TestRevocation:
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f'jti:{i}')
+        assert all(f'jti:{i}' in bloom for i in range(1000))
+        false_positives = sum(f'other:{i}' in bloom for i in range(10000))
+        assert false_positives < 300
+
+    def test_revoked_token_is_rejected_even_when_cached(self, auth):
+        token = _token(auth)
+        other = _token(auth)
+        auth.verify_token(token)
+        assert auth.revoke_token(token)
+
+        with pytest.raises(HTTPException) as error:
+            auth.verify_token(token)
+        assert error.value.detail == 'Token revogado'
+        assert auth.verify_token(other)['user_id'] == 1
+
+    def test_revoke_user_rejects_only_earlier_tokens(self, auth):
+        old = _token(auth)
+        auth.revoke_user_tokens(1)
+        time.sleep(0.01)
+        new = _token(auth)
+
+        with pytest.raises(HTTPException):
+            auth.verify_token(old)
+        assert auth.verify_token(new)['user_id'] == 1
+
+    def test_negative_lookups_never_touch_redis(self):
+        redis = FakeRedis()
+        revocations = RevocationList(redis_client=redis, sync_interval=3600)
+        revocations.sync()
+        for i in range(100):
+            assert not revocations.is_revoked(f'jti-{i}', user_id=i, issued_at=time.time())
+        assert redis.calls == []
+
+    def test_revocations_propagate_through_redis(self):
+        redis = FakeRedis()
+        node_a = JWTAuth(token_cache=VerifiedTokenCache(), revocation_list=RevocationList(redis, sync_interval=3600))
+        node_b = JWTAuth(token_cache=VerifiedTokenCache(), revocation_list=RevocationList(redis, sync_interval=3600))
+        token = _token(node_a)
+        node_b.verify_token(token)
+
+        node_a.revoke_token(token)
+        node_b.verify_token(token)  # Ainda não sincronizado
+        node_b.revocation_list.sync()
+        with pytest.raises(HTTPException):
+            node_b.verify_token(token)
+
+    def test_expired_revocations_are_pruned(self):
+        redis = FakeRedis()
+        revocations = RevocationList(redis, sync_interval=3600)
+        revocations.revoke_token('old', time.time() + 0.05)
+        time.sleep(0.06)
+        revocations.sync()
+        assert revocations.get_stats()['revoked_tokens'] == 0
+        assert redis.zsets['marabet:auth:revoked'] == {}
+
+
+def test_benchmark_reports_requests_per_second():
+    result = benchmark_authentication(n=200)
+    assert set(result) == {'uncached_rps', 'cached_rps'}
+    assert result['cached_rps'] > result['uncached_rps']
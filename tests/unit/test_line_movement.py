@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para o motor de line movement
+"""
+
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from análise.line_movement import LineMovementEngine, compute_line_movement
+
+T0 = datetime(2024, 1, 1, 12, 0)
+
+
+class TestLineMovementEngine:
+    def test_opening_closing_and_extremes(self):
+        engine = LineMovementEngine()
+        engine.update(1, 'Bet365', 'h2h', 'Home', 2.10, T0)
+        engine.update(1, 'Bet365', 'h2h', 'Home', 2.30, T0 + timedelta(hours=1))
+        engine.update(1, 'Bet365', 'h2h', 'Home', 1.90, T0 + timedelta(hours=2))
+
+        features = engine.get_features(1, 'h2h', 'Home')
+        assert features.opening_odd == 2.10
+        assert features.closing_odd == 1.90
+        assert features.max_odd == 2.30
+        assert features.min_odd == 1.90
+        assert features.movement_pct == pytest.approx(1.90 / 2.10 - 1)
+        assert features.n_updates == 3
+
+    def test_movement_compares_consensus_with_opening_consensus(self):
+        engine = LineMovementEngine()
+        engine.update(1, 'Bet365', 'h2h', 'Home', 2.0, T0)
+        # Uma casa mais alta que chega depois não é movimento de linha
+        engine.update(1, 'Betfair', 'h2h', 'Home', 2.4, T0 + timedelta(hours=1))
+        features = engine.get_features(1, 'h2h', 'Home')
+        assert features.opening_odd == pytest.approx(2.2)
+        assert features.movement_pct == pytest.approx(0.0)
+
+        engine.update(1, 'Bet365', 'h2h', 'Home', 1.8, T0 + timedelta(hours=2))
+        engine.update(1, 'Betfair', 'h2h', 'Home', 2.2, T0 + timedelta(hours=2))
+        assert engine.get_features(1, 'h2h', 'Home').movement_pct == pytest.approx(2.0 / 2.2 - 1)
+
+    def test_consensus_across_bookmakers(self):
+        engine = LineMovementEngine()
+        engine.update(1, 'Bet365', 'h2h', 'Home', 2.0, T0)
+        engine.update(1, 'Betfair', 'h2h', 'Home', 2.2, T0)
+        engine.update(1, 'Bet365', 'h2h', 'Home', 2.1, T0 + timedelta(minutes=5))
+
+        features = engine.get_features(1, 'h2h', 'Home')
+        assert features.n_bookmakers == 2
+        assert features.consensus_odd == pytest.approx(2.15)
+        assert features.consensus_probability == pytest.approx(1 / 2.15)
+
+    def test_slope_follows_consensus(self):
+        engine = LineMovementEngine()
+        for hour, odd in enumerate([2.4, 2.3, 2.2, 2.1]):
+            engine.update(1, 'Bet365', 'h2h', 'Away', odd, T0 + timedelta(hours=hour))
+
+        assert engine.get_features(1, 'h2h', 'Away').slope_per_hour == pytest.approx(-0.1)
+
+    def test_steam_move_requires_several_bookmakers(self):
+        engine = LineMovementEngine(steam_threshold=0.03, steam_window_minutes=10, steam_min_bookmakers=3)
+        books = ['A', 'B', 'C', 'D']
+        for book in books:
+            engine.update(1, book, 'h2h', 'Home', 2.0, T0)
+
+        engine.update(1, 'A', 'h2h', 'Home', 1.90, T0 + timedelta(minutes=1))
+        engine.update(1, 'B', 'h2h', 'Home', 1.90, T0 + timedelta(minutes=2))
+        assert engine.get_features(1, 'h2h', 'Home').steam_moves == 0
+
+        engine.update(1, 'C', 'h2h', 'Home', 1.91, T0 + timedelta(minutes=3))
+        engine.update(1, 'D', 'h2h', 'Home', 1.92, T0 + timedelta(minutes=4))
+        features = engine.get_features(1, 'h2h', 'Home')
+        assert features.steam_moves == 1
+        assert features.last_steam_at == T0 + timedelta(minutes=3)
+
+    def test_moves_outside_window_are_not_steam(self):
+        engine = LineMovementEngine(steam_min_bookmakers=2, steam_window_minutes=5)
+        for book in ['A', 'B']:
+            engine.update(1, book, 'h2h', 'Home', 2.0, T0)
+
+        engine.update(1, 'A', 'h2h', 'Home', 1.8, T0 + timedelta(minutes=1))
+        engine.update(1, 'B', 'h2h', 'Home', 1.8, T0 + timedelta(minutes=30))
+        assert engine.get_features(1, 'h2h', 'Home').steam_moves == 0
+
+    def test_unknown_selection_and_forget(self):
+        engine = LineMovementEngine()
+        engine.update(1, 'A', 'h2h', 'Home', 2.0, T0)
+        engine.update(1, 'A', 'h2h', 'Away', 3.0, T0)
+
+        assert engine.get_features(2, 'h2h', 'Home') is None
+        assert len(engine.get_fixture_features(1)) == 2
+        assert engine.forget_fixture(1) == 2
+        assert len(engine) == 0
+
+
+def test_forget_stale_fixtures():
+    engine = LineMovementEngine()
+    engine.update(1, 'A', 'h2h', 'Home', 2.0, T0)
+    engine.update(2, 'A', 'h2h', 'Home', 2.0, T0)
+    engine.update(2, 'A', 'h2h', 'Away', 3.0, T0 + timedelta(days=3))
+
+    assert engine.forget_stale(T0 + timedelta(days=1)) == 1
+    assert engine.fixture_ids() == [2]
+
+
+class TestCollectorLineMovement:
+    """Aquecimento a partir de odds_movements e descarte de partidas encerradas"""
+
+    @pytest.fixture
+    def collector(self):
+        import threading
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from armazenamento.banco_de_dados import Base, Match, OddsMovement
+        from scheduler.automated_collector import AutomatedCollector
+
+        db_engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(db_engine)
+        db = sessionmaker(bind=db_engine)()
+        now = datetime.utcnow()
+        db.add_all([Match(fixture_id=1, status='NS'), Match(fixture_id=2, status='FT')])
+        for fixture_id, book, odd, hours_ago in [(1, 'A', 2.0, 30), (1, 'A', 1.9, 2), (1, 'B', 2.1, 1),
+                                                 (2, 'A', 1.5, 3), (3, 'A', 4.0, 24 * 30)]:
+            db.add(OddsMovement(fixture_id=fixture_id, bookmaker=book, market='h2h', selection='Home',
+                                odd=odd, timestamp=now - timedelta(hours=hours_ago)))
+        db.commit()
+
+        collector = AutomatedCollector.__new__(AutomatedCollector)
+        collector.db = db
+        collector.line_movement = LineMovementEngine()
+        collector._db_lock = threading.RLock()
+        yield collector
+        db.close()
+
+    def test_warm_up_restores_opening_prices(self, collector):
+        assert collector._warm_line_movement() == 3
+        # Encerradas e sem movimento recente ficam de fora
+        assert collector.line_movement.fixture_ids() == [1]
+
+        features = collector.line_movement.get_features(1, 'h2h', 'Home')
+        assert features.opening_odd == pytest.approx(2.05)
+        assert features.consensus_odd == pytest.approx(2.0)
+
+    def test_finished_fixtures_are_forgotten(self, collector):
+        engine = collector.line_movement
+        now = datetime.utcnow()
+        for fixture_id in (1, 2, 4):
+            engine.update(fixture_id, 'A', 'h2h', 'Home', 2.0, now)
+        engine.update(5, 'A', 'h2h', 'Home', 2.0, now - timedelta(days=30))
+
+        collected = [{'fixture': {'id': 4, 'status': {'short': 'AET'}}},
+                     {'fixture': {'id': 1, 'status': {'short': '2H'}}}]
+        # 2 pelo status no banco, 4 pelos dados coletados, 5 por inatividade
+        assert collector._forget_finished_fixtures(collected) == 3
+        assert engine.fixture_ids() == [1]
+
+
+def test_bulk_api_matches_incremental():
+    rows = [
+        {'fixture_id': 1, 'bookmaker': 'A', 'market': 'h2h', 'selection': 'Home',
+         'odd': 2.0 - 0.05 * i, 'timestamp': T0 + timedelta(hours=i)}
+        for i in range(4)
+    ]
+    shuffled = pd.DataFrame(rows).sample(frac=1, random_state=0)
+
+    frame = compute_line_movement(shuffled)
+
+    assert len(frame) == 1
+    assert frame.loc[0, 'opening_odd'] == 2.0
+    assert frame.loc[0, 'closing_odd'] == pytest.approx(1.85)
+    assert frame.loc[0, 'slope_per_hour'] == pytest.approx(-0.05)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para o arquivo colunar de odds
+"""
+
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+pytest.importorskip('pyarrow')
+
+from armazenamento.banco_de_dados import Base, Match, OddsMovement
+from armazenamento.odds_archive import OddsArchive
+
+
+def _rows(league_id, fixture_id, start, prices, bookmaker='Bet365'):
+    rows = []
+    for i, (home, draw, away) in enumerate(prices):
+        ts = start + timedelta(hours=i)
+        for selection, odd in (('Home', home), ('Draw', draw), ('Away', away)):
+            rows.append({'league_id': league_id, 'fixture_id': fixture_id, 'bookmaker': bookmaker,
+                         'market': 'h2h', 'selection': selection, 'odd': odd, 'timestamp': ts})
+    return rows
+
+
+@pytest.fixture
+def archive(temp_dir):
+    archive = OddsArchive(temp_dir)
+    rows = (
+        _rows(39, 1, datetime(2024, 1, 10), [(2.0, 3.4, 4.0), (1.9, 3.5, 4.2)])
+        + _rows(39, 2, datetime(2024, 2, 5), [(2.5, 3.2, 2.9)])
+        + _rows(140, 3, datetime(2024, 1, 20), [(1.5, 4.0, 6.0)])
+    )
+    archive.write(pd.DataFrame(rows))
+    return archive
+
+
+class TestOddsArchive:
+    def test_partitioned_layout(self, archive, temp_dir):
+        partitions = sorted(
+            str(p.relative_to(temp_dir)) for p in archive.root.glob('league_id=*/month=*')
+        )
+        assert partitions == [
+            os.path.join('league_id=140', 'month=2024-01'),
+            os.path.join('league_id=39', 'month=2024-01'),
+            os.path.join('league_id=39', 'month=2024-02'),
+        ]
+
+    def test_query_filters(self, archive):
+        assert set(archive.query(league_ids=[39])['fixture_id']) == {1, 2}
+        assert set(archive.query(start=datetime(2024, 2, 1))['fixture_id']) == {2}
+        assert set(archive.query(end=datetime(2024, 1, 15))['fixture_id']) == {1}
+        assert len(archive.query(fixture_ids=[1], columns=['odd'])) == 6
+
+    def test_closing_odds_frame(self, archive):
+        frame = archive.closing_odds_frame(league_ids=[39]).set_index('fixture_id')
+
+        assert frame.loc[1, 'home_odd'] == 1.9
+        assert frame.loc[1, 'away_odd'] == 4.2
+        assert frame.loc[2, 'draw_odd'] == 3.2
+        assert frame.loc[1, 'date'] == pd.Timestamp(2024, 1, 10, 1)
+
+    def test_closing_line_ignores_in_play_prices(self, temp_dir):
+        archive = OddsArchive(temp_dir)
+        rows = pd.DataFrame(_rows(39, 1, datetime(2024, 1, 10, 18), [(2.0, 3.4, 4.0), (1.9, 3.5, 4.2), (1.2, 6.0, 15.0)]))
+        # Kickoff às 20:00: a linha das 20:00 já é um preço ao vivo
+        rows['kickoff'] = datetime(2024, 1, 10, 20)
+        archive.write(rows)
+        archive.write(pd.DataFrame(_rows(39, 2, datetime(2024, 1, 11, 18), [(2.5, 3.2, 2.9), (9.0, 5.0, 1.3)])))
+
+        frame = archive.closing_odds_frame().set_index('fixture_id')
+        assert frame.loc[1, 'home_odd'] == 1.9
+        assert frame.loc[1, 'date'] == pd.Timestamp(2024, 1, 10, 19)
+        # Sem kickoff arquivado: o chamador pode informá-lo
+        assert frame.loc[2, 'home_odd'] == 9.0
+        explicit = archive.closing_odds_frame(kickoffs={2: datetime(2024, 1, 11, 19)}).set_index('fixture_id')
+        assert explicit.loc[2, 'home_odd'] == 2.5
+
+    def test_legacy_files_without_kickoff_are_readable(self, archive):
+        legacy = archive.root / 'league_id=39' / 'month=2023-12'
+        legacy.mkdir(parents=True)
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.table({'fixture_id': [9], 'bookmaker': ['Bet365'], 'market': ['h2h'],
+                                 'selection': ['Home'], 'odd': [2.2],
+                                 'timestamp': pa.array([datetime(2023, 12, 1)], pa.timestamp('us'))}),
+                       legacy / 'part-legacy.parquet')
+        archive.write(pd.DataFrame(_rows(39, 9, datetime(2023, 12, 2), [(2.1, 3.3, 3.9)])))
+
+        assert archive.closing_odds_frame(fixture_ids=[9])['home_odd'].iloc[0] == 2.1
+        archive.compact(39, '2023-12')
+        assert len(archive.query(fixture_ids=[9])) == 4
+
+    def test_compact_keeps_rows(self, archive):
+        archive.write(pd.DataFrame(_rows(39, 1, datetime(2024, 1, 11), [(1.8, 3.6, 4.5)])))
+        partition = archive.root / 'league_id=39' / 'month=2024-01'
+        assert len(list(partition.glob('*.parquet'))) == 2
+
+        archive.compact(39, '2024-01')
+        assert len(list(partition.glob('*.parquet'))) == 1
+        assert archive.closing_odds_frame(fixture_ids=[1])['home_odd'].iloc[0] == 1.8
+
+    def test_empty_archive(self, temp_dir):
+        assert OddsArchive(temp_dir).closing_odds_frame().empty
+
+    def test_incremental_export_from_db(self, temp_dir):
+        engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        db.add(Match(fixture_id=7, league_id=61, date=datetime(2024, 3, 5, 20)))
+        db.add(OddsMovement(fixture_id=7, bookmaker='Bet365', market='h2h', selection='Home',
+                            odd=2.1, timestamp=datetime(2024, 3, 1, 12)))
+        db.commit()
+
+        archive = OddsArchive(os.path.join(temp_dir, 'archive'))
+        assert archive.export_from_db(db, until=datetime(2024, 3, 2))['odds_movements'] == 1
+
+        db.add(OddsMovement(fixture_id=7, bookmaker='Bet365', market='h2h', selection='Home',
+                            odd=2.3, timestamp=datetime(2024, 3, 2, 12)))
+        db.commit()
+        assert archive.export_from_db(db, until=datetime(2024, 3, 3))['odds_movements'] == 1
+
+        result = archive.query(league_ids=[61])
+        assert sorted(result['odd']) == [2.1, 2.3]
+        assert set(result['kickoff']) == {pd.Timestamp(2024, 3, 5, 20)}
+        db.close()
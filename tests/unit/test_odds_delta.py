@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para o armazenamento delta de odds
+"""
+
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from armazenamento.banco_de_dados import Base, OddsMovement
+from armazenamento.odds_delta import (
+    OddsChangeDetector, OddsDeltaStore, flatten_bookmaker_odds, make_odds_key
+)
+from análise.best_price_index import BestPriceIndex
+from value_identification import ValueIdentifier
+
+
+def _obs(odd, selection='Home', bookmaker='Bet365', fixture_id=1):
+    return {'fixture_id': fixture_id, 'bookmaker': bookmaker, 'market': 'h2h',
+            'selection': selection, 'odd': odd}
+
+
+@pytest.fixture
+def db():
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+class TestOddsChangeDetector:
+    def test_only_changes_are_emitted(self):
+        detector = OddsChangeDetector()
+
+        assert len(detector.detect([_obs(2.0), _obs(3.4, 'Draw')])) == 2
+        assert detector.detect([_obs(2.0), _obs(3.4, 'Draw')]) == []
+
+        deltas = detector.detect([_obs(2.1), _obs(3.4, 'Draw')])
+        assert [(d['selection'], d['odd']) for d in deltas] == [('Home', 2.1)]
+        assert detector.stats == {'observed': 6, 'changed': 3}
+
+    def test_last_observation_in_batch_wins(self):
+        detector = OddsChangeDetector()
+        deltas = detector.detect([_obs(2.0), _obs(2.2)])
+
+        assert len(deltas) == 1
+        assert deltas[0]['odd'] == 2.2
+
+    def test_redis_state_is_shared(self):
+        redis_client = Mock()
+        redis_client.hmget.return_value = ['2.0']
+        detector = OddsChangeDetector(redis_client=redis_client)
+
+        assert detector.detect([_obs(2.0)]) == []
+        redis_client.hmget.assert_called_once_with(
+            OddsChangeDetector.REDIS_KEY, ['1|Bet365|h2h|Home']
+        )
+
+    def test_redis_failure_falls_back_to_memory(self):
+        redis_client = Mock()
+        redis_client.hmget.side_effect = ConnectionError('down')
+        redis_client.hset.side_effect = ConnectionError('down')
+        detector = OddsChangeDetector(redis_client=redis_client)
+
+        assert len(detector.detect([_obs(2.0)])) == 1
+        assert detector.detect([_obs(2.0)]) == []
+
+    def test_forget_fixture(self):
+        detector = OddsChangeDetector()
+        detector.detect([_obs(2.0), _obs(1.5, fixture_id=2)])
+
+        assert detector.forget_fixture(1) == 1
+        assert detector.last_price(make_odds_key(1, 'Bet365', 'h2h', 'Home')) is None
+        assert detector.last_price(make_odds_key(2, 'Bet365', 'h2h', 'Home')) == 1.5
+
+    def test_forget_fixtures_clears_fields_of_other_workers(self):
+        redis_client = Mock()
+        redis_client.hmget.return_value = [None, None]
+        redis_client.hscan_iter.return_value = [(b'1|Pinnacle|h2h|Home', b'2.0'), (b'2|Bet365|h2h|Home', b'1.5')]
+        detector = OddsChangeDetector(redis_client=redis_client)
+        detector.detect([_obs(2.0), _obs(1.5, fixture_id=2)])
+
+        assert detector.forget_fixtures([1]) == 2
+        redis_client.hscan_iter.assert_called_once_with(OddsChangeDetector.REDIS_KEY, match='1|*')
+        assert set(redis_client.hdel.call_args.args[1:]) == {'1|Pinnacle|h2h|Home'}
+
+    def test_memory_is_bounded(self):
+        detector = OddsChangeDetector(max_entries=2)
+        detector.detect([_obs(2.0, fixture_id=f) for f in (1, 2, 3)])
+        assert detector.last_price(make_odds_key(1, 'Bet365', 'h2h', 'Home')) is None
+        assert detector.last_price(make_odds_key(3, 'Bet365', 'h2h', 'Home')) == 2.0
+
+    def test_find_changes_does_not_mark_prices_as_seen(self):
+        detector = OddsChangeDetector()
+        deltas = detector.find_changes([_obs(2.0)])
+        assert len(deltas) == 1 and len(detector.find_changes([_obs(2.0)])) == 1
+
+        detector.apply(deltas)
+        assert detector.find_changes([_obs(2.0)]) == []
+
+
+class TestOddsDeltaStore:
+    def test_record_writes_only_movements(self, db):
+        store = OddsDeltaStore(db)
+        t0 = datetime(2024, 1, 1, 12, 0)
+
+        assert store.record([_obs(2.0), _obs(3.4, 'Draw')], t0) == 2
+        assert store.record([_obs(2.0), _obs(3.4, 'Draw')], t0 + timedelta(minutes=15)) == 0
+        assert store.record([_obs(1.9), _obs(3.4, 'Draw')], t0 + timedelta(minutes=30)) == 1
+        assert db.query(OddsMovement).count() == 3
+
+    def test_failed_write_keeps_movement_pending(self, db):
+        store = OddsDeltaStore(db)
+        t0 = datetime(2024, 1, 1, 12, 0)
+        original_commit = db.commit
+        db.commit = Mock(side_effect=RuntimeError('disk full'))
+        with pytest.raises(RuntimeError):
+            store.record([_obs(2.0)], t0)
+        db.rollback()
+
+        db.commit = original_commit
+        assert store.record([_obs(2.0)], t0 + timedelta(minutes=15)) == 1
+        assert db.query(OddsMovement).count() == 1
+
+    def test_snapshot_reconstruction(self, db):
+        store = OddsDeltaStore(db)
+        t0 = datetime(2024, 1, 1, 12, 0)
+        store.record([_obs(2.0), _obs(3.4, 'Draw')], t0)
+        store.record([_obs(1.9)], t0 + timedelta(minutes=30))
+
+        before = {s['selection']: s['odd'] for s in store.snapshot_at(1, t0 + timedelta(minutes=20))}
+        after = {s['selection']: s['odd'] for s in store.snapshot_at(1)}
+
+        assert before == {'Home': 2.0, 'Draw': 3.4}
+        assert after == {'Home': 1.9, 'Draw': 3.4}
+        assert store.snapshot_at(1, t0 - timedelta(minutes=1)) == []
+
+    def test_history_and_warm_up(self, db):
+        t0 = datetime(2024, 1, 1, 12, 0)
+        OddsDeltaStore(db).record([_obs(2.0)], t0)
+        OddsDeltaStore(db).record([_obs(1.8)], t0 + timedelta(hours=1))
+
+        store = OddsDeltaStore(db)
+        assert store.warm_up() == 1
+        assert store.record([_obs(1.8)], t0 + timedelta(hours=2)) == 0
+
+        series = store.history(1)
+        assert series[make_odds_key(1, 'Bet365', 'h2h', 'Home')] == [
+            (t0, 2.0), (t0 + timedelta(hours=1), 1.8)
+        ]
+
+    def test_best_price_index_follows_every_collected_price(self, db):
+        t0 = datetime(2024, 1, 1, 12, 0)
+        OddsDeltaStore(db).record([_obs(2.0), _obs(2.1, bookmaker='Pinnacle')], t0)
+
+        # Processo recém-iniciado: o warm-up e os preços repetidos também entram no índice
+        index = BestPriceIndex()
+        store = OddsDeltaStore(db, best_price_index=index)
+        store.warm_up()
+        assert index.best_price(1, 'h2h', 'Home') == (2.1, 'Pinnacle')
+
+        assert store.record([_obs(2.0), _obs(2.3, bookmaker='Betfair')], t0 + timedelta(minutes=15)) == 1
+        assert store.record([_obs(2.4)], t0 + timedelta(minutes=30)) == 1
+        assert index.best_price(1, 'h2h', 'Home') == (2.4, 'Bet365')
+
+        identifier = ValueIdentifier(best_price_index=index)
+        assert identifier._best_available_odd({'fixture_id': 1}, 'home_win', 2.0) == (2.4, 'Bet365')
+
+
+def test_flatten_bookmaker_odds():
+    odds_list = [{
+        'fixture_id': 10,
+        'bookmakers': [{
+            'title': 'Bet365',
+            'markets': [{'key': 'h2h', 'outcomes': [
+                {'name': 'Home', 'price': 2.0},
+                {'name': 'Away', 'price': None}
+            ]}]
+        }]
+    }, {'bookmakers': []}]
+
+    assert flatten_bookmaker_odds(odds_list) == [_obs(2.0, fixture_id=10)]
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para o treinamento paralelo de famílias de modelos
+"""
+
+import pytest
+import sys
+import os
+import numpy as np
+from unittest.mock import patch
+from sklearn.datasets import make_classification
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GridSearchCV
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from ml.model_training import (
+    ModelTrainer, ParallelTrainingOrchestrator, apply_thread_budget, benchmark_training, plan_thread_budgets
+)
+import lightgbm as lgb
+
+
+@pytest.fixture
+def data():
+    X, y = make_classification(n_samples=300, n_features=6, n_informative=4, n_classes=3, random_state=0)
+    return X, y
+
+
+def _config():
+    return {
+        'logistic_regression': {'model': LogisticRegression(max_iter=500), 'use_grid_search': False},
+        'lightgbm': {'model': lgb.LGBMClassifier(n_estimators=20, verbose=-1, n_jobs=-1), 'use_grid_search': True},
+        'gradient_boosting': {'model': GradientBoostingClassifier(n_estimators=10), 'use_grid_search': False},
+    }
+
+
+class TestThreadBudgets:
+    def test_budgets_fill_the_cores_and_favor_grid_search(self):
+        config = {
+            'rf': {'use_grid_search': True},
+            'xgb': {'use_grid_search': True},
+            'lr': {'use_grid_search': False},
+        }
+        assert plan_thread_budgets(config, total_threads=8, n_workers=3) == {'rf': 4, 'xgb': 2, 'lr': 2}
+        assert plan_thread_budgets(config, total_threads=2, n_workers=4) == {'rf': 1, 'xgb': 1, 'lr': 1}
+        assert sum(plan_thread_budgets(config, total_threads=16, n_workers=2).values()) == 24
+
+    def test_nested_n_jobs_are_limited(self):
+        grid = GridSearchCV(RandomForestClassifier(n_jobs=-1), {'max_depth': [2, 3]}, n_jobs=-1)
+        apply_thread_budget(grid, 2)
+        assert grid.n_jobs == 2 and grid.estimator.n_jobs == 2
+
+
+class TestTrainSingleModel:
+    def test_grid_search_cv_results_are_reused(self, data):
+        X, y = data
+        trainer = ModelTrainer()
+        with patch('ml.model_training.cross_val_score', side_effect=AssertionError('CV repetida')):
+            results = trainer.train_single_model('lightgbm', lgb.LGBMClassifier(n_estimators=20, verbose=-1),
+                                                 X, y, use_grid_search=True, n_jobs=1)
+
+        assert results['cv_folds'] == 3
+        assert set(results['best_params']) == {'n_estimators', 'max_depth', 'learning_rate'}
+        assert isinstance(trainer.models['lightgbm'], lgb.LGBMClassifier)
+        assert results['feature_importance']
+
+    def test_plain_models_still_cross_validate(self, data):
+        X, y = data
+        results = ModelTrainer().train_single_model('lr', LogisticRegression(max_iter=500), X, y)
+        assert results['cv_folds'] == 5 and results['best_params'] is None
+
+
+class TestOrchestrator:
+    def test_families_are_trained_and_persisted(self, data, tmp_path):
+        X, y = data
+        trainer = ModelTrainer()
+        orchestrator = ParallelTrainingOrchestrator(trainer, n_workers=2, total_threads=4, output_dir=str(tmp_path))
+
+        finished = orchestrator.train(X, y, _config())
+
+        assert set(finished) == set(trainer.models) == {'logistic_regression', 'lightgbm', 'gradient_boosting'}
+        assert trainer.is_trained and trainer.find_best_model() in finished
+        for name, results in finished.items():
+            assert os.path.exists(results['model_path'])
+            assert results['threads'] == orchestrator.stats['thread_budgets'][name]
+        assert orchestrator.stats['workers'] == 2 and orchestrator.stats['failed'] == 0
+        assert 0 < orchestrator.stats['cpu_utilization']
+
+    def test_failed_family_does_not_stop_the_others(self, data, tmp_path):
+        X, y = data
+        config = _config()
+        config['broken'] = {'model': LogisticRegression(C=-1.0), 'use_grid_search': False}
+        orchestrator = ParallelTrainingOrchestrator(n_workers=2, total_threads=2, output_dir=str(tmp_path))
+
+        finished = orchestrator.train(X, y, config)
+
+        assert 'broken' not in finished and len(finished) == 3
+        assert orchestrator.stats['failed'] == 1
+        assert not os.path.exists(tmp_path / 'broken.joblib')
+
+
+def test_benchmark_reports_wall_clock_and_cpu(data):
+    X, y = data
+    config = {k: v for k, v in _config().items() if k != 'lightgbm'}
+    result = benchmark_training(X, y, config, total_threads=2)
+    assert result['families'] == 2
+    assert result['sequential_seconds'] > 0 and result['parallel_seconds'] > 0
+    assert 0 < result['parallel_cpu_utilization'] and 0 < result['sequential_cpu_utilization']
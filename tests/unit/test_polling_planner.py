@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para o planejador adaptativo de polling
+"""
+
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from armazenamento.banco_de_dados import Base, Match
+from armazenamento.odds_delta import flatten_bookmaker_odds
+from coletores.football_collector import FootballCollector
+from scheduler.polling_planner import (
+    Fixture, PollingPlanner, PollingSimulator, dispatch_plan, load_fixtures, plan_window
+)
+
+KICKOFF = datetime(2024, 5, 18, 15, 0)
+
+
+def _times(refreshes, kind='odds'):
+    return [r.eta for r in refreshes if r.kind == kind]
+
+
+class TestFixturePlan:
+    def test_density_increases_towards_kickoff(self):
+        planner = PollingPlanner(requests_per_hour=10_000)
+        fixture = Fixture(1, KICKOFF)
+
+        day_before = _times(planner.plan([fixture], KICKOFF - timedelta(hours=30), KICKOFF - timedelta(hours=24)))
+        final_hour = _times(planner.plan([fixture], KICKOFF - timedelta(hours=1), KICKOFF))
+        in_play = planner.plan([fixture], KICKOFF, KICKOFF + timedelta(hours=1))
+
+        assert len(day_before) == 1
+        assert len(final_hour) == 12
+        # O endpoint de odds é pré-jogo: durante a partida só as estatísticas são atualizadas
+        assert _times(in_play) == []
+        assert len(_times(in_play, 'stats')) == 12
+
+    def test_nothing_after_full_time(self):
+        planner = PollingPlanner()
+        finished = Fixture(1, KICKOFF, status='FT')
+        assert planner.plan([finished], KICKOFF, KICKOFF + timedelta(hours=2)) == []
+
+        postponed = Fixture(3, KICKOFF + timedelta(days=3), status='PST')
+        assert not postponed.finished
+        assert planner.plan([postponed], KICKOFF + timedelta(days=2), KICKOFF + timedelta(days=3))
+
+        known_end = Fixture(2, KICKOFF, finished_at=KICKOFF + timedelta(minutes=100))
+        plan = planner.plan([known_end], KICKOFF, KICKOFF + timedelta(hours=3))
+        assert max(r.eta for r in plan) < KICKOFF + timedelta(minutes=100)
+
+    def test_live_fixture_is_polled_through_extra_time(self):
+        planner = PollingPlanner()
+        live = Fixture(1, KICKOFF, status='ET')
+        window = (KICKOFF + timedelta(minutes=130), KICKOFF + timedelta(minutes=160))
+        assert len(_times(planner.plan([live], *window), 'stats')) == 6
+
+    def test_consecutive_windows_do_not_duplicate_refreshes(self):
+        planner = PollingPlanner(requests_per_hour=10_000)
+        fixture = Fixture(1, KICKOFF)
+        whole = planner.plan([fixture], KICKOFF - timedelta(hours=2), KICKOFF + timedelta(hours=1))
+        pieces = []
+        start = KICKOFF - timedelta(hours=2)
+        while start < KICKOFF + timedelta(hours=1):
+            pieces.extend(planner.plan([fixture], start, start + timedelta(minutes=30)))
+            start += timedelta(minutes=30)
+        assert pieces == whole
+
+    def test_plan_window_is_clock_aligned(self):
+        assert plan_window(datetime(2024, 5, 18, 14, 59), timedelta(minutes=30)) == (
+            datetime(2024, 5, 18, 14, 30), datetime(2024, 5, 18, 15, 0)
+        )
+
+
+class TestQuota:
+    def test_budget_keeps_high_priority_and_thins_evenly(self):
+        planner = PollingPlanner(requests_per_hour=32)  # 8 por janela de 15 minutos
+        live = [Fixture(i, KICKOFF) for i in range(2)]
+        upcoming = [Fixture(100 + i, KICKOFF + timedelta(hours=3)) for i in range(5)]
+
+        plan = planner.plan(live + upcoming, KICKOFF, KICKOFF + timedelta(minutes=15))
+
+        # 'stats' consome duas chamadas (partida + estatísticas)
+        assert sum(planner.cost(r) for r in plan) == 8
+        assert all(r.phase == 'in_play' for r in plan)
+        assert {r.fixture_id for r in planner.last_dropped if r.phase != 'in_play'} == {100, 101, 102, 103, 104}
+        stats = _times([r for r in plan if r.fixture_id == 0], 'stats')
+        assert {b - a for a, b in zip(stats, stats[1:])} == {timedelta(minutes=10)}
+
+
+class TestSimulator:
+    def test_weekly_replay_uses_less_quota_with_fresher_match_data(self):
+        start = datetime(2024, 5, 13)
+        fixtures = [
+            Fixture(i, start + timedelta(days=5 + i % 2, hours=12 + 2 * (i % 4)), league_id=i % 4,
+                    finished_at=start + timedelta(days=5 + i % 2, hours=12 + 2 * (i % 4), minutes=115))
+            for i in range(20)
+        ]
+
+        result = PollingSimulator(PollingPlanner(requests_per_hour=300)).run(fixtures, start, days=7)
+        adaptive, fixed = result['adaptive'], result['fixed']
+
+        assert adaptive['requests'] < fixed['requests']
+        assert adaptive['stats_staleness_in_play_minutes'] < fixed['stats_staleness_in_play_minutes']
+        assert adaptive['odds_staleness_final_hour_minutes'] < fixed['odds_staleness_final_hour_minutes']
+        assert adaptive['peak_requests_per_hour'] <= 300
+
+
+class TestIntegration:
+    def test_load_fixtures_skips_finished_matches(self):
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        db.add_all([
+            Match(fixture_id=1, date=KICKOFF, status='NS'),
+            Match(fixture_id=2, date=KICKOFF - timedelta(hours=1), status='FT'),
+            Match(fixture_id=3, date=KICKOFF - timedelta(hours=4), status='2H'),
+            Match(fixture_id=4, date=KICKOFF + timedelta(days=30), status='NS'),
+        ])
+        db.commit()
+
+        fixtures = load_fixtures(db, KICKOFF - timedelta(minutes=30), KICKOFF,
+                                 timedelta(days=7), timedelta(minutes=130))
+        assert sorted(f.fixture_id for f in fixtures) == [1, 3]
+
+    def test_dispatch_sends_eta_tasks(self):
+        sent = []
+
+        class FakeTask:
+            def apply_async(self, **kwargs):
+                sent.append(kwargs)
+
+        plan = PollingPlanner().plan([Fixture(7, KICKOFF)], KICKOFF - timedelta(minutes=10), KICKOFF)
+        assert dispatch_plan(plan, FakeTask()) == len(plan) > 0
+        assert sent[0]['args'] == [7, plan[0].kind]
+        assert sent[0]['eta'] == plan[0].eta and sent[0]['expires'] > sent[0]['eta']
+        assert sent[0]['queue'] == 'data_queue'
+
+    def test_fixture_odds_use_internal_market_keys(self):
+        response = {'response': [{'bookmakers': [{'name': 'Bet365', 'bets': [
+            {'name': 'Match Winner', 'values': [{'value': 'Home', 'odd': '2.10'}, {'value': 'Draw', 'odd': '3.40'}]},
+            {'name': 'Goals Over/Under', 'values': [{'value': 'Over 2.5', 'odd': '1.90'},
+                                                    {'value': 'Under 1.5', 'odd': '3.10'}]},
+            {'name': 'Exact Score', 'values': [{'value': '1:0', 'odd': '7.00'}]},
+        ]}]}]}
+        collector = FootballCollector()
+        with patch.object(collector, '_make_request', return_value=response):
+            observations = flatten_bookmaker_odds(collector.collect_fixture_odds(5))
+
+        assert [(o['market'], o['selection'], o['odd']) for o in observations] == [
+            ('h2h', 'Home', 2.1), ('h2h', 'Draw', 3.4), ('totals', 'Over', 1.9), ('totals', 'Under 1.5', 3.1)
+        ]
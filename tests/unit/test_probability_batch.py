@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para o cálculo de probabilidades em lote
+"""
+
+import pytest
+import sys
+import os
+import random
+import numpy as np
+from unittest.mock import patch
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from probability_calculator import ProbabilityCalculator, ProbabilityResult, ProbabilityWeights
+
+TEAMS = ['Flamengo', 'Palmeiras', 'Santos', 'Corinthians', 'Grêmio', 'Internacional']
+
+
+@pytest.fixture
+def fixtures():
+    # Cada time aparece em várias partidas da rodada
+    return [
+        {'home_team': home, 'away_team': away, 'date': '2024-01-15'}
+        for i, home in enumerate(TEAMS) for away in TEAMS[i + 1:i + 4]
+    ]
+
+
+def _seed():
+    random.seed(42)
+    np.random.seed(42)
+
+
+def _assert_same(a: ProbabilityResult, b: ProbabilityResult):
+    assert a.calculation_method == b.calculation_method == 'weighted_combination'
+    for field in ('home_win', 'draw', 'away_win', 'confidence'):
+        assert getattr(a, field) == pytest.approx(getattr(b, field), rel=1e-12, abs=1e-15)
+    assert set(a.breakdown) == set(b.breakdown)
+    for name, component in a.breakdown.items():
+        assert component['weight'] == b.breakdown[name]['weight']
+        assert component['confidence'] == pytest.approx(b.breakdown[name]['confidence'], rel=1e-12)
+        for key, value in component['contribution'].items():
+            assert value == pytest.approx(b.breakdown[name]['contribution'][key], rel=1e-12, abs=1e-15)
+
+
+class TestCalculateProbabilitiesMany:
+    @pytest.mark.parametrize('weights', [None, ProbabilityWeights(0.5, 0.1, 0.2, 0.1, 0.1)])
+    def test_matches_per_match_path(self, fixtures, weights):
+        _seed()
+        single = ProbabilityCalculator(weights)
+        expected = [single.calculate_probabilities(f) for f in fixtures]
+
+        _seed()
+        batch = ProbabilityCalculator(weights)
+        results = batch.calculate_probabilities_many(fixtures)
+
+        assert len(results) == len(fixtures)
+        for got, want in zip(results, expected):
+            _assert_same(got, want)
+            assert got.home_win + got.draw + got.away_win == pytest.approx(1.0)
+        assert len(batch.calculation_history) == len(fixtures)
+
+    def test_team_data_is_computed_once_per_session(self, fixtures):
+        calculator = ProbabilityCalculator()
+        with patch.object(calculator, '_simulate_team_recent_form',
+                          wraps=calculator._simulate_team_recent_form) as recent, \
+             patch.object(calculator, '_simulate_h2h_data', wraps=calculator._simulate_h2h_data) as h2h:
+            calculator.calculate_probabilities_many(fixtures)
+            calculator.calculate_probabilities_many(fixtures[:3])
+            calculator.calculate_probabilities(fixtures[0])
+
+        assert recent.call_count == len(TEAMS)
+        assert h2h.call_count == len(fixtures)
+
+        calculator.clear_cache()
+        assert calculator._team_cache == {} and calculator._h2h_cache == {}
+
+    def test_empty_round_and_fallback(self, fixtures):
+        calculator = ProbabilityCalculator()
+        assert calculator.calculate_probabilities_many([]) == []
+
+        with patch.object(calculator, '_combine_probabilities_batch', side_effect=ValueError('boom')):
+            results = calculator.calculate_probabilities_many(fixtures[:2])
+        assert [r.calculation_method for r in results] == ['weighted_combination'] * 2
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para o motor de retenção em lotes
+"""
+
+import pytest
+import sys
+import os
+import gzip
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from armazenamento.banco_de_dados import Base, Match, Odds, Prediction, SettledPrediction
+from armazenamento.odds_archive import OddsArchive
+from armazenamento.retention import RetentionEngine, RetentionPolicy, DEFAULT_POLICIES
+
+NOW = datetime(2024, 6, 1)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sports.db'}")
+
+    @event.listens_for(engine, 'connect')
+    def incremental(dbapi_connection, connection_record):
+        dbapi_connection.execute('PRAGMA auto_vacuum = INCREMENTAL')
+
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        Match(fixture_id=1, league_id=39, date=NOW - timedelta(days=800), status='FT'),
+        Match(fixture_id=2, league_id=39, date=NOW - timedelta(days=800), status='NS'),
+        Match(fixture_id=3, league_id=140, date=NOW - timedelta(days=10), status='FT'),
+    ])
+    db.bulk_insert_mappings(Odds, [
+        {'fixture_id': 1 + i % 3, 'bookmaker': 'bet365', 'market': 'h2h', 'selection': 'Home',
+         'odd': 1.5 + i / 1000, 'timestamp': NOW - timedelta(days=200, minutes=i)}
+        for i in range(250)
+    ] + [
+        {'fixture_id': 3, 'bookmaker': 'bet365', 'market': 'h2h', 'selection': 'Home',
+         'odd': 2.0, 'timestamp': NOW - timedelta(days=1, minutes=i)}
+        for i in range(20)
+    ])
+    db.commit()
+    db.close()
+    return engine
+
+
+@pytest.fixture
+def retention(engine, tmp_path):
+    return RetentionEngine(engine, archive_dir=str(tmp_path / 'archive'),
+                           odds_archive_dir=str(tmp_path / 'odds_archive'), batch_size=100, pause=0)
+
+
+def _count(engine, table):
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+
+
+class TestChunkedPrune:
+    def test_prunes_in_bounded_batches_and_reports_metrics(self, retention, engine):
+        policy = RetentionPolicy('odds', 'timestamp', timedelta(days=90))
+        stats = retention.prune(policy, NOW - policy.max_age)
+
+        assert stats['rows_deleted'] == 250
+        assert stats['batches'] == 3
+        assert stats['rows_per_second'] > 0
+        assert stats['lock_wait_seconds'] >= 0 and stats['max_lock_wait_seconds'] <= stats['lock_wait_seconds']
+        assert _count(engine, 'odds') == 20
+
+    def test_max_batches_limits_work_per_run(self, retention, engine):
+        retention.max_batches = 1
+        policy = RetentionPolicy('odds', 'timestamp', timedelta(days=90))
+        assert retention.prune(policy, NOW - policy.max_age)['rows_deleted'] == 100
+        assert _count(engine, 'odds') == 170
+
+    def test_writers_are_not_blocked_between_batches(self, engine, tmp_path):
+        retention = RetentionEngine(engine, archive_dir=str(tmp_path / 'a'), batch_size=10, pause=0.01)
+        policy = RetentionPolicy('odds', 'timestamp', timedelta(days=90))
+        writes = []
+
+        def collector():
+            deadline = time.time() + 0.3
+            while time.time() < deadline:
+                with engine.begin() as conn:
+                    conn.execute(text(
+                        "INSERT INTO odds (fixture_id, bookmaker, market, selection, odd, timestamp) "
+                        "VALUES (3, 'x', 'h2h', 'Draw', 3.1, :ts)"
+                    ), {'ts': NOW})
+                writes.append(time.time())
+                time.sleep(0.005)
+
+        thread = threading.Thread(target=collector)
+        thread.start()
+        stats = retention.prune(policy, NOW - policy.max_age)
+        thread.join()
+
+        assert stats['rows_deleted'] == 250
+        assert len(writes) > 10
+
+
+class TestArchiving:
+    def test_odds_are_archived_before_deletion(self, retention, engine, tmp_path):
+        results = retention.run(
+            [p for p in DEFAULT_POLICIES if p.table in ('odds', 'matches')], now=NOW
+        )
+
+        assert results['odds']['rows_archived'] == 250
+        archived = OddsArchive(str(tmp_path / 'odds_archive')).query()
+        assert len(archived) == 250
+        assert set(archived['league_id'].astype(int)) == {39, 140}
+
+    def test_only_finished_matches_are_pruned_and_archived(self, retention, engine, tmp_path):
+        results = retention.run([p for p in DEFAULT_POLICIES if p.table == 'matches'], now=NOW)
+
+        assert results['matches']['rows_deleted'] == 1
+        files = list((tmp_path / 'archive' / 'matches').glob('*.jsonl.gz'))
+        with gzip.open(files[0], 'rt') as f:
+            rows = [json.loads(line) for line in f]
+        assert [row['fixture_id'] for row in rows] == [1]
+        with engine.connect() as conn:
+            remaining = {row[0] for row in conn.execute(text("SELECT fixture_id FROM matches"))}
+        assert remaining == {2, 3}
+
+    def test_unsettled_predictions_keep_their_match_and_odds(self, retention, engine):
+        db = sessionmaker(bind=engine)()
+        db.add_all([Prediction(id=1, fixture_id=1, market='h2h', selection='Home'),
+                    Prediction(id=2, fixture_id=3, market='h2h', selection='Home')])
+        db.add(SettledPrediction(prediction_id=2, fixture_id=3, outcome=1))
+        db.commit()
+        db.close()
+
+        results = retention.run(
+            [p for p in DEFAULT_POLICIES if p.table in ('odds', 'matches')], now=NOW
+        )
+
+        # Partida 1 tem predição por liquidar; a predição da 3 já foi liquidada
+        assert results['odds']['rows_deleted'] == 250 - 84
+        assert results['matches']['rows_deleted'] == 0
+        with engine.connect() as conn:
+            kept = conn.execute(text("SELECT DISTINCT fixture_id FROM odds WHERE timestamp < :c"),
+                                {'c': NOW - timedelta(days=90)}).scalars().all()
+        assert kept == [1]
+
+    def test_rows_already_exported_are_not_archived_twice(self, retention, engine, tmp_path):
+        db = sessionmaker(bind=engine)()
+        OddsArchive(str(tmp_path / 'odds_archive')).export_from_db(db, until=NOW - timedelta(days=200, minutes=100))
+        db.close()
+
+        policy = RetentionPolicy('odds', 'timestamp', timedelta(days=90), archive='odds')
+        stats = retention.prune(policy, NOW - policy.max_age)
+        assert stats['rows_deleted'] == 250
+        assert len(OddsArchive(str(tmp_path / 'odds_archive')).query()) == 250
+
+
+class TestSQLiteSpace:
+    def test_incremental_vacuum_releases_pages(self, retention, engine):
+        assert retention.enable_incremental_vacuum()['mode'] == 2
+
+        policy = RetentionPolicy('odds', 'timestamp', timedelta(days=90))
+        stats = retention.prune(policy, NOW - policy.max_age)
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql('PRAGMA freelist_count').scalar() == 0
+        assert stats['vacuumed_pages'] > 0
+
+    def test_existing_database_conversion_is_reported(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+        Base.metadata.create_all(engine)
+        retention = RetentionEngine(engine)
+
+        assert retention.enable_incremental_vacuum()['conversion_pending'] is True
+        assert retention.enable_incremental_vacuum(convert=True)['mode'] == 2
+
+
+def test_missing_tables_are_skipped(retention):
+    results = retention.run(now=NOW)
+    assert 'application_logs' not in results
+    assert results['odds']['rows_deleted'] == 250
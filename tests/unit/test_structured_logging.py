@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para o pipeline de logs estruturados baseado em fila
+"""
+
+import pytest
+import sys
+import os
+import gzip
+import json
+import logging
+import queue
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from monitoring.structured_logging import (
+    StructuredLogger, LogSink, BackpressureQueueHandler, benchmark_logging
+)
+
+
+def _read(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def slog(tmp_path, request):
+    logger = StructuredLogger(f'marabet.test.{request.node.name}', log_dir=str(tmp_path), console=False)
+    yield logger
+    logger.close()
+
+
+class TestQueuePipeline:
+    def test_records_fan_out_by_level_and_are_formatted_once(self, slog, tmp_path):
+        format_calls = []
+        original = slog.listener.formatter.format
+        slog.listener.formatter.format = lambda record: format_calls.append(record) or original(record)
+
+        slog.debug("debug")
+        slog.log_bet_placed("bet_1", "39_1", "home_win", 100.0, 1.85)
+        slog.error("falhou", component="test")
+        slog.flush()
+
+        general = _read(tmp_path / 'mara_bet.json')
+        assert [e['message'] for e in general] == ['debug', 'Aposta realizada', 'falhou']
+        assert general[1]['bet_id'] == 'bet_1' and general[1]['event_type'] == 'bet_placed'
+        assert [e['message'] for e in _read(tmp_path / 'mara_bet_errors.json')] == ['falhou']
+        assert len(_read(tmp_path / 'mara_bet_business.json')) == 2
+        assert len(format_calls) == 3
+
+    def test_alert_context_keeps_record_message(self, slog, tmp_path):
+        slog.log_alert("a1", "low_roi", "warning", message="ROI baixo")
+        slog.flush()
+
+        entry = _read(tmp_path / 'mara_bet.json')[0]
+        assert entry['message'] == 'Alerta disparado'
+        assert entry['rule_name'] == 'low_roi'
+        assert entry['alert_message'] == 'ROI baixo'
+
+    def test_exception_is_serialized_on_caller_thread(self, slog, tmp_path):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            slog.logger.exception("erro")
+        slog.flush()
+
+        entry = _read(tmp_path / 'mara_bet_errors.json')[0]
+        assert entry['exception']['type'] == 'ValueError'
+        assert 'boom' in entry['exception']['message']
+
+    def test_sync_mode(self, tmp_path):
+        slog = StructuredLogger('marabet.test.sync', log_dir=str(tmp_path), async_logging=False, console=False)
+        slog.info("síncrono", component="x")
+        slog.close()
+        assert _read(tmp_path / 'mara_bet.json')[0]['message'] == 'síncrono'
+
+
+class TestBackpressure:
+    def _record(self, level, msg='m'):
+        return logging.LogRecord('t', level, __file__, 1, msg, None, None)
+
+    def test_full_queue_drops_below_error(self):
+        handler = BackpressureQueueHandler(queue.Queue(maxsize=5), block_timeout=0.01)
+        for _ in range(8):
+            handler.emit(self._record(logging.INFO))
+        handler.emit(self._record(logging.ERROR))
+
+        assert handler.queue.qsize() == 5
+        assert handler.stats['dropped'] == 4
+        assert handler.stats['enqueued'] == 5
+
+    def test_debug_is_sampled_above_high_watermark(self):
+        handler = BackpressureQueueHandler(queue.Queue(maxsize=100), high_watermark=0.1, debug_sample_every=5)
+        for _ in range(10):
+            handler.emit(self._record(logging.INFO))
+        for _ in range(50):
+            handler.emit(self._record(logging.DEBUG))
+
+        assert handler.stats['sampled_out'] == 40
+        assert handler.queue.qsize() == 20
+
+
+class TestRotation:
+    def test_size_based_rotation_with_gzip(self, tmp_path):
+        path = tmp_path / 'app.json'
+        sink = LogSink(str(path), max_bytes=100, backup_count=2)
+        for i in range(5):
+            sink.write([json.dumps({'i': i, 'pad': 'x' * 80})])
+        sink.close()
+
+        assert path.exists() and path.stat().st_size == 0
+        assert (tmp_path / 'app.json.1.gz').exists()
+        assert (tmp_path / 'app.json.2.gz').exists()
+        assert not (tmp_path / 'app.json.3.gz').exists()
+        with gzip.open(tmp_path / 'app.json.1.gz', 'rt') as f:
+            assert json.loads(f.readline())['i'] == 4
+
+
+def test_benchmark_reports_caller_cost():
+    result = benchmark_logging(n=200, burst=100)
+    assert set(result) == {'sync_us_per_call', 'async_us_per_call'}
+    assert all(value > 0 for value in result.values())
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para o pipeline de entrega do Telegram (contra uma Bot API falsa local)
+"""
+
+import pytest
+import sys
+import os
+import asyncio
+import time
+
+from aiohttp import web
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from notifications.telegram_delivery import (TelegramDelivery, TelegramAPIError, TokenBucket,
+                                             RedisTokenBucket, RedisDigestBuffer, build_digest_texts)
+
+TOKEN = 'TEST:TOKEN'
+
+
+class FakeRedis:
+    """Redis em memória com o mínimo usado pelos buckets e digests
+
+    O script do bucket é emulado em Python com a mesma regra do Lua.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.script_calls = 0
+        self.fail = False
+
+    def register_script(self, script):
+        def run(keys, args):
+            if self.fail:
+                raise ConnectionError('redis down')
+            self.script_calls += 1
+            rate, capacity, penalty = float(args[0]), float(args[1]), float(args[2])
+            now = time.monotonic()
+            tokens, updated = self.data.get(keys[0], (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+            delay = 0.0
+            if penalty > 0:
+                tokens = min(tokens, 1 - penalty * rate)
+            else:
+                tokens -= 1
+                if tokens < 0:
+                    delay = -tokens / rate
+            self.data[keys[0]] = (tokens, now)
+            return str(delay)
+        return run
+
+    def rpush(self, key, *values):
+        self.data.setdefault(key, []).extend(values)
+        return len(self.data[key])
+
+    def lpush(self, key, *values):
+        self.data[key] = list(reversed(values)) + self.data.get(key, [])
+        return len(self.data[key])
+
+    def lrange(self, key, start, end):
+        return list(self.data.get(key, []))
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def pipeline(self, transaction=True):
+        redis, calls = self, []
+
+        class Pipeline:
+            def __getattr__(self, name):
+                return lambda *args, **kwargs: calls.append((name, args, kwargs))
+
+            def execute(self):
+                return [getattr(redis, name)(*args, **kwargs) for name, args, kwargs in calls]
+        return Pipeline()
+
+
+class FakeBotAPI:
+    """Servidor local que imita o endpoint sendMessage da Bot API"""
+
+    def __init__(self):
+        self.requests = []
+        self.responses = []  # (status, body) a devolver antes das respostas normais
+
+    async def send_message(self, request):
+        payload = await request.json()
+        self.requests.append((time.monotonic(), payload))
+        if self.responses:
+            status, body = self.responses.pop(0)
+            return web.json_response(body, status=status)
+        return web.json_response({'ok': True, 'result': {
+            'message_id': len(self.requests), 'chat': {'id': payload['chat_id']}, 'text': payload['text']
+        }})
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post(f'/bot{TOKEN}/sendMessage', self.send_message)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://127.0.0.1:{port}'
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+
+def run(scenario):
+    async def main():
+        async with FakeBotAPI() as api:
+            return await scenario(api)
+    return asyncio.run(main())
+
+
+def test_token_bucket_reservations():
+    bucket = TokenBucket(rate=2.0, capacity=2.0)
+    assert bucket.reserve(now=0.0) == 0.0
+    assert bucket.reserve(now=0.0) == 0.0
+    assert bucket.reserve(now=0.0) == pytest.approx(0.5)
+    assert bucket.reserve(now=0.0) == pytest.approx(1.0)
+    assert bucket.reserve(now=10.0) == 0.0
+
+    bucket.penalize(3.0, now=20.0)
+    assert bucket.reserve(now=20.0) == pytest.approx(3.0)
+
+
+def test_send_message_and_ordering_per_chat():
+    async def scenario(api):
+        delivery = TelegramDelivery(TOKEN, api_base=api.url, chat_rate=20.0)
+        results = await asyncio.gather(*(delivery.send_message('1', f'msg {i}') for i in range(5)))
+        await delivery.close()
+        return api, results
+
+    api, results = run(scenario)
+    assert [r['text'] for r in results] == [f'msg {i}' for i in range(5)]
+    assert [p['text'] for _, p in api.requests] == [f'msg {i}' for i in range(5)]
+    assert api.requests[0][1]['parse_mode'] == 'HTML'
+
+
+def test_per_chat_rate_limit_does_not_block_other_chats():
+    async def scenario(api):
+        delivery = TelegramDelivery(TOKEN, api_base=api.url, chat_rate=10.0)
+        await asyncio.gather(*(delivery.send_message(chat, 'x') for chat in ('a', 'b') for _ in range(4)))
+        await delivery.close()
+        return api
+
+    api = run(scenario)
+    by_chat = {}
+    for ts, payload in api.requests:
+        by_chat.setdefault(payload['chat_id'], []).append(ts)
+    for stamps in by_chat.values():
+        gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+        assert min(gaps) >= 0.08
+    # Os dois chats avançam em paralelo
+    assert max(ts for ts, _ in api.requests) - min(ts for ts, _ in api.requests) < 0.5
+
+
+def test_retry_after_is_honoured():
+    async def scenario(api):
+        api.responses.append((429, {'ok': False, 'error_code': 429,
+                                    'description': 'Too Many Requests', 'parameters': {'retry_after': 1}}))
+        delivery = TelegramDelivery(TOKEN, api_base=api.url, chat_rate=50.0)
+        result = await delivery.send_message('1', 'hello')
+        await delivery.close()
+        return api, result, delivery.get_stats()
+
+    api, result, stats = run(scenario)
+    assert result['text'] == 'hello'
+    assert len(api.requests) == 2
+    assert api.requests[1][0] - api.requests[0][0] >= 0.9
+    assert stats['rate_limited'] == 1 and stats['sent'] == 1
+
+
+def test_client_errors_are_not_retried():
+    async def scenario(api):
+        api.responses.append((400, {'ok': False, 'error_code': 400, 'description': 'Bad Request: chat not found'}))
+        delivery = TelegramDelivery(TOKEN, api_base=api.url)
+        try:
+            with pytest.raises(TelegramAPIError) as error:
+                await delivery.send_message('1', 'hello')
+        finally:
+            await delivery.close()
+        return api, error.value
+
+    api, error = run(scenario)
+    assert len(api.requests) == 1
+    assert error.error_code == 400
+
+
+def test_value_bet_burst_is_coalesced_into_digest():
+    async def scenario(api):
+        delivery = TelegramDelivery(TOKEN, api_base=api.url, digest_window=0.1)
+        results = await asyncio.gather(*(delivery.send_value_bet('1', f'bet {i}') for i in range(5)))
+        single = await delivery.send_value_bet('1', 'lonely bet')
+        await delivery.close()
+        return api, results, single, delivery.get_stats()
+
+    api, results, single, stats = run(scenario)
+    assert len(api.requests) == 2
+    digest_text = api.requests[0][1]['text']
+    assert digest_text.startswith('🚨 <b>5 Value Bets')
+    assert all(f'bet {i}' in digest_text for i in range(5))
+    assert {r['message_id'] for r in results} == {1}
+    assert single['text'] == 'lonely bet'
+    assert stats['digests'] == 1 and stats['coalesced'] == 5
+
+
+def test_digest_is_split_at_telegram_length_limit():
+    async def scenario(api):
+        delivery = TelegramDelivery(TOKEN, api_base=api.url, digest_window=0.05, chat_rate=50.0)
+        await asyncio.gather(*(delivery.send_value_bet('1', 'x' * 1500) for _ in range(6)))
+        await delivery.close()
+        return api
+
+    api = run(scenario)
+    assert len(api.requests) == 3
+    assert all(len(p['text']) <= 4096 for _, p in api.requests)
+
+
+def test_digest_texts_group_alerts():
+    assert build_digest_texts(['only'], '{count} bets') == [('only', 1)]
+    messages = build_digest_texts(['a', 'b', 'c'], '{count} bets')
+    assert len(messages) == 1 and messages[0][1] == 3
+    assert messages[0][0].startswith('3 bets') and all(t in messages[0][0] for t in 'abc')
+
+
+def test_redis_digest_buffer_opens_one_window_per_chat():
+    buffer = RedisDigestBuffer(FakeRedis(), window=2.0)
+    assert buffer.push('1', 'bet 0') == (1, True)
+    # Outros workers só acrescentam: o flush já está agendado
+    assert buffer.push('1', 'bet 1', parse_mode=None) == (2, False)
+    assert buffer.push('2', 'other') == (1, True)
+
+    items = buffer.drain('1')
+    assert [i['text'] for i in items] == ['bet 0', 'bet 1']
+    assert items[1]['parse_mode'] is None
+    assert buffer.drain('1') == []
+    # Depois do flush o próximo alerta abre nova janela
+    assert buffer.push('1', 'bet 2') == (1, True)
+
+    buffer.restore('1', items)
+    assert [i['text'] for i in buffer.drain('1')] == ['bet 0', 'bet 1', 'bet 2']
+
+
+def test_shared_bucket_limits_across_deliveries():
+    """Duas instâncias (dois processos) partilham o mesmo limite global"""
+    async def scenario(api):
+        redis = FakeRedis()
+        deliveries = [TelegramDelivery(TOKEN, api_base=api.url, global_rate=10.0, chat_rate=100.0,
+                                       redis_client=redis) for _ in range(2)]
+        await asyncio.gather(*(d.send_message(f'chat{i}', 'x') for d in deliveries for i in range(10)))
+        for d in deliveries:
+            await d.close()
+        return api, redis
+
+    api, redis = run(scenario)
+    stamps = sorted(ts for ts, _ in api.requests)
+    # 20 mensagens a 10 msg/s com 10 tokens iniciais: pelo menos ~1 s
+    assert stamps[-1] - stamps[0] >= 0.9
+    assert 'marabet:telegram:bucket:TEST:global' in redis.data
+    assert not any(TOKEN in key for key in redis.data)
+
+
+def test_shared_bucket_falls_back_to_local_limit():
+    redis = FakeRedis()
+    bucket = RedisTokenBucket(redis, 'k', rate=1.0, capacity=1.0)
+    redis.fail = True
+    assert bucket.reserve(now=0.0) == 0.0
+    assert bucket.reserve(now=0.0) == pytest.approx(1.0)
+    bucket.penalize(5.0, now=0.0)
+    assert redis.script_calls == 0
+
+
+def test_chat_buckets_are_bounded():
+    delivery = TelegramDelivery(TOKEN, max_chat_buckets=3)
+    for chat in ('a', 'b', 'c'):
+        delivery._chat_bucket(chat)
+    delivery._chat_bucket('a')
+    delivery._chat_bucket('d')
+    assert list(delivery._chat_buckets) == ['c', 'a', 'd']
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Testes unitários para a análise em lote do ValueFinder
+"""
+
+import pytest
+import sys
+import os
+import asyncio
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from armazenamento.banco_de_dados import Base, Prediction
+from análise.value_finder import ValueFinder
+from notifications.notification_queue import NotificationQueue
+
+
+def _match(fixture_id):
+    return {'fixture': {'id': fixture_id},
+            'teams': {'home': {'name': f'Home {fixture_id}'}, 'away': {'name': f'Away {fixture_id}'}}}
+
+
+def _odds(fixture_id, over, under, home=2.0):
+    return [{
+        'fixture_id': fixture_id,
+        'bookmakers': [{'title': 'Bet365', 'markets': [
+            {'key': 'h2h', 'outcomes': [{'name': 'Home', 'price': home},
+                                        {'name': 'Draw', 'price': 3.3},
+                                        {'name': 'Away', 'price': 3.9}]},
+            {'key': 'totals', 'outcomes': [{'name': 'Over', 'price': over},
+                                           {'name': 'Under', 'price': under}]},
+        ]}]
+    }]
+
+
+@pytest.fixture
+def value_finder():
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    finder = ValueFinder()
+    finder.db.close()
+    finder.db = sessionmaker(bind=engine)()
+    with patch('análise.value_finder.enqueue_notification') as enqueue:
+        finder.enqueue = enqueue
+        yield finder
+
+
+class TestAnalyzeMatches:
+    def test_matches_per_fixture_path(self, value_finder):
+        odds_by_fixture = {1: _odds(1, 1.80, 2.00), 2: _odds(2, 1.40, 3.00), 3: _odds(3, 1.75, 2.05)}
+        matches = [_match(1), _match(2), _match(3)]
+
+        batch = value_finder.analyze_matches(matches, odds_by_fixture)
+        single = [value_finder.analyze_match(m, odds_by_fixture[m['fixture']['id']]) for m in matches]
+        single = [p for p in single if p is not None]
+
+        def key(p):
+            return (p.fixture_id, p.market, p.selection, round(p.expected_value, 10),
+                    round(p.confidence, 10), round(p.stake_percentage, 10))
+
+        assert sorted(map(key, batch)) == sorted(map(key, single))
+        assert {p.fixture_id for p in batch} == {1, 3}
+
+    def test_single_bulk_commit_and_notifications(self, value_finder):
+        odds_by_fixture = {i: _odds(i, 1.80, 2.00) for i in range(1, 21)}
+        with patch.object(value_finder.db, 'commit', wraps=value_finder.db.commit) as commit:
+            predictions = value_finder.analyze_matches([_match(i) for i in range(1, 21)], odds_by_fixture)
+
+        assert len(predictions) == 20
+        assert commit.call_count == 1
+        assert value_finder.db.query(Prediction).count() == 20
+        assert value_finder.enqueue.call_count == 20
+
+    def test_fixtures_without_odds_are_ignored(self, value_finder):
+        assert value_finder.analyze_matches([_match(1)], {}) == []
+        assert value_finder.analyze_matches([], {1: _odds(1, 1.8, 2.0)}) == []
+
+    def test_probability_matrix_is_built_without_per_match_calls(self, value_finder):
+        matches = [_match(i) for i in range(1, 6)]
+
+        class CustomModel(ValueFinder):
+            def _calculate_probabilities(self, match_data):
+                return {'home_win': match_data['fixture']['id'] / 10}
+
+        # Modelo substituído sem versão em lote => caminho partida a partida
+        custom = CustomModel()
+        custom.db.close()
+        fallback = custom._calculate_probabilities_batch(matches)
+        assert fallback[:, 0].tolist() == [0.1, 0.2, 0.3, 0.4, 0.5]
+        assert fallback[:, 1:].sum() == 0
+
+        with patch.object(ValueFinder, '_calculate_probabilities', wraps=value_finder._calculate_probabilities) as per_match:
+            matrix = value_finder._calculate_probabilities_batch(matches)
+        assert per_match.call_count == 0
+        assert matrix.shape == (5, len(ValueFinder.PROBABILITY_KEYS))
+        expected = [value_finder._calculate_probabilities(m)[k] for m in matches for k in ValueFinder.PROBABILITY_KEYS]
+        assert matrix.ravel().tolist() == expected
+
+    def test_vectorized_stakes_match_kelly(self, value_finder):
+        import numpy as np
+        probability = np.array([0.68, 0.45, 0.0, 0.5])
+        odd = np.array([1.80, 2.00, 2.0, 1.0])
+
+        stakes = value_finder._calculate_stakes(probability, odd)
+        expected = [value_finder.stats_processor.kelly_criterion(p, o, fraction=0.25)
+                    for p, o in zip(probability, odd)]
+        assert stakes == pytest.approx(expected)
+
+
+def test_notification_queue_runs_coroutines_from_sync_code():
+    queue = NotificationQueue(workers=2)
+    received = []
+
+    async def notify(payload):
+        await asyncio.sleep(0)
+        received.append(payload)
+
+    for i in range(10):
+        queue.submit(notify, i)
+    assert queue.join(timeout=5)
+    queue.stop()
+
+    assert sorted(received) == list(range(10))
+    assert queue.get_stats()['sent'] == 10
@@ -71,6 +71,15 @@ class BacktestingEngine:
     Executa simulações históricas com métricas reais
     """
     
+    # Predição -> coluna de odds quando as odds vêm do OddsArchive
+    SELECTION_ODDS_COLUMNS = {
+        '1': 'home_odd',
+        'X': 'draw_odd',
+        '2': 'away_odd',
+        'Over': 'over_odd',
+        'Under': 'under_odd'
+    }
+    
     def __init__(self, 
                  initial_capital: float = 10000.0,
                  stake_strategy: str = "fixed",
@@ -109,7 +118,8 @@ class BacktestingEngine:
         Args:
             matches_file: Arquivo com resultados de partidas
             predictions_file: Arquivo com predições do modelo
-            odds_file: Arquivo com odds históricas
+            odds_file: Arquivo CSV com odds históricas ou diretório de um
+                OddsArchive (Parquet), lido diretamente com as odds de fecho
             
         Returns:
             True se carregado com sucesso
@@ -124,7 +134,15 @@ class BacktestingEngine:
             self.predictions_df['date'] = pd.to_datetime(self.predictions_df['date'])
             
             # Carregar odds
-            self.odds_df = pd.read_csv(odds_file)
+            if os.path.isdir(odds_file):
+                from armazenamento.odds_archive import OddsArchive
+                self.odds_df = OddsArchive(odds_file).closing_odds_frame(
+                    fixture_ids=self.matches_df['fixture_id'].unique().tolist(),
+                    start=self.matches_df['date'].min() - timedelta(days=31),
+                    end=self.matches_df['date'].max() + timedelta(days=1)
+                )
+            else:
+                self.odds_df = pd.read_csv(odds_file)
             self.odds_df['date'] = pd.to_datetime(self.odds_df['date'])
             
             logger.info(f"✅ Dados históricos carregados:")
@@ -320,8 +338,12 @@ class BacktestingEngine:
             else:
                 return
             
-            # Obter odds
+            # Obter odds (formato do arquivo de odds: uma coluna por seleção)
+            if odds_col not in match_odds.columns:
+                odds_col = self.SELECTION_ODDS_COLUMNS.get(str(prediction), odds_col)
             odds_value = match_odds[odds_col].iloc[0] if odds_col in match_odds.columns else 1.0
+            if pd.isna(odds_value):
+                return
             
             if odds_value <= 1.0:
                 return
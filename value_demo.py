@@ -10,6 +10,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from value_identification import ValueIdentifier, ValueThresholds, ValueLevel
 from value_integration import AdvancedValueSystem
+from análise.best_price_index import best_price_index
 import numpy as np
 
 def main():
@@ -31,7 +32,7 @@ def main():
     print("\n🧮 TESTE DA CALCULADORA DE EV")
     print("-" * 40)
     
-    identifier = ValueIdentifier()
+    identifier = ValueIdentifier(best_price_index=best_price_index)
     
     # Exemplos de cálculo de EV
     test_cases = [
@@ -242,7 +243,7 @@ def main():
         excellent=0.15    # 15% para valor excelente
     )
     
-    custom_identifier = ValueIdentifier(custom_thresholds)
+    custom_identifier = ValueIdentifier(custom_thresholds, best_price_index=best_price_index)
     custom_analysis = custom_identifier.create_value_analysis(match_data, probabilities, market_odds)
     
     print(f"Análise com Limiares Customizados:")
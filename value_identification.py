@@ -12,6 +12,8 @@ from dataclasses import dataclass
 from enum import Enum
 import json
 
+from análise.best_price_index import BestPriceIndex
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -77,10 +79,35 @@ class ValueIdentifier:
     Implementa a fórmula: EV = (Probabilidade Real × Odd) - 1
     """
     
-    def __init__(self, thresholds: Optional[ValueThresholds] = None):
+    # Resultado -> (mercado, seleção) no BestPriceIndex
+    OUTCOME_SELECTIONS = {
+        'home_win': ('h2h', 'Home'),
+        'draw': ('h2h', 'Draw'),
+        'away_win': ('h2h', 'Away')
+    }
+    
+    def __init__(self, thresholds: Optional[ValueThresholds] = None,
+                 best_price_index: Optional[BestPriceIndex] = None):
         self.thresholds = thresholds or ValueThresholds()
+        self.best_price_index = best_price_index
         self.opportunities_history = []
         self.market_data = {}
+    
+    def _best_available_odd(self, match_data: Dict, outcome: str,
+                            market_odd: Optional[float]) -> Tuple[Optional[float], Optional[str]]:
+        """Melhor linha disponível entre casas (ou a odd informada, se maior)"""
+        fixture_id = match_data.get('fixture_id', match_data.get('id'))
+        if self.best_price_index is None or fixture_id is None or outcome not in self.OUTCOME_SELECTIONS:
+            return market_odd, None
+        
+        try:
+            best = self.best_price_index.best_price(int(fixture_id), *self.OUTCOME_SELECTIONS[outcome])
+        except (TypeError, ValueError):
+            return market_odd, None
+        
+        if best is None or (market_odd is not None and market_odd >= best[0]):
+            return market_odd, None
+        return best
         
     def calculate_expected_value(self, probability: float, odds: float) -> float:
         """
@@ -124,11 +151,15 @@ class ValueIdentifier:
         opportunities = []
         
         for outcome in ['home_win', 'draw', 'away_win']:
-            if outcome not in probabilities or outcome not in market_odds:
+            if outcome not in probabilities:
                 continue
             
             probability = probabilities[outcome]
-            market_odd = market_odds[outcome]
+            market_odd, best_bookmaker = self._best_available_odd(
+                match_data, outcome, market_odds.get(outcome)
+            )
+            if market_odd is None:
+                continue
             
             # Calcula EV
             ev = self.calculate_expected_value(probability, market_odd)
@@ -168,7 +199,8 @@ class ValueIdentifier:
                     'value_score': ev * 100,  # Score de 0-100
                     'edge_percentage': ev * 100,
                     'implied_probability': 1 / market_odd if market_odd > 0 else 0,
-                    'probability_edge': probability - (1 / market_odd) if market_odd > 0 else 0
+                    'probability_edge': probability - (1 / market_odd) if market_odd > 0 else 0,
+                    'best_bookmaker': best_bookmaker
                 }
             )
             
@@ -14,6 +14,7 @@ from value_identification import (
     ValueIdentifier, ValueThresholds, ValueLevel, 
     ValueOpportunity, ValueAnalysis
 )
+from análise.best_price_index import BestPriceIndex, best_price_index as shared_best_price_index
 from probability_integration import AdvancedProbabilitySystem
 from framework_integration import MaraBetFramework
 from data_framework import DataProcessor
@@ -27,11 +28,15 @@ class AdvancedValueSystem:
     Integra identificação de valor com todo o framework
     """
     
-    def __init__(self, custom_thresholds: Optional[ValueThresholds] = None):
+    def __init__(self, custom_thresholds: Optional[ValueThresholds] = None,
+                 best_price_index: Optional[BestPriceIndex] = None):
         self.framework = MaraBetFramework()
         self.data_processor = DataProcessor()
         self.probability_system = AdvancedProbabilitySystem()
-        self.value_identifier = ValueIdentifier(custom_thresholds)
+        # Por padrão, o índice partilhado que a coleta de odds mantém atualizado
+        if best_price_index is None:
+            best_price_index = shared_best_price_index
+        self.value_identifier = ValueIdentifier(custom_thresholds, best_price_index=best_price_index)
         self.value_history = []
         
     def analyze_match_value(self, home_team: str, away_team: str, match_date: str) -> Dict: